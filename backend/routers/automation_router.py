@@ -93,9 +93,10 @@ async def get_automations():
 # Cap-map cache. detect_capabilities() iterates every HA state + IR device
 # and runs every capability rule against each. The result only changes when
 # entities or IR devices are added/removed (capabilities are intrinsic to
-# device_class, not to runtime state). Cache fingerprinted by the entity_id
-# set + ir-device id list so a per-state tick doesn't invalidate. Templates
-# page mount used to fire two heavy rebuilds in parallel.
+# device_class, not to runtime state). Cache fingerprinted by the device
+# registry generation + entity_id set + ir-device id list so a per-state tick
+# doesn't invalidate but a pair/unpair or status change does. Templates page
+# mount used to fire two heavy rebuilds in parallel.
 _CAP_CACHE_TTL_S = 30.0
 _cap_cache_value: dict | None = None
 _cap_cache_fp: tuple = ()
@@ -113,7 +114,13 @@ def _cap_snapshot(all_states, ir_devices=None):
     # Fingerprint: cheap-to-build set/tuple over identities, not state values.
     # If two snapshots have the same entities and same IR devices, the cap_map
     # is identical regardless of what state any individual entity is in.
+    try:
+        from services.device_registry import generation as _registry_generation
+        registry_gen = _registry_generation()
+    except Exception:
+        registry_gen = 0
     fp = (
+        registry_gen,
         frozenset(s.get("entity_id", "") for s in all_states),
         tuple(sorted(d.get("id", "") for d in ir_devices)),
     )
@@ -132,7 +139,8 @@ def _cap_snapshot(all_states, ir_devices=None):
 def invalidate_capability_cache() -> None:
     """Force the next call to /api/automations/templates* to rebuild cap_map.
 
-    Call after device_registry refresh, IR device pair/unpair, etc.
+    Registry changes already move the fingerprint (generation); call this
+    after IR device pair/unpair and other changes outside the registry.
     """
     global _cap_cache_value, _cap_cache_ts
     _cap_cache_value = None
@@ -213,7 +221,7 @@ def _safe_list_automations() -> list:
 
 
 def _safe_signal_fires() -> dict:
-    """Wrap get_active_template_signals so a broken events.jsonl or
+    """Wrap get_active_template_signals so a broken event store or
     pattern_detector import failure can't take down the templates endpoint.
     Returns {template_id: fire_record} on success, {} on any failure."""
     try:
@@ -227,10 +235,9 @@ def _safe_signal_fires() -> dict:
 async def get_automation_templates():
     """Return the full curated template library with runability flags."""
     from services.automation_templates import TEMPLATES
-    from services.home_automation import get_all_states
+    from services import ha_client
 
-    # Sync HA REST call — release the event loop while HA replies.
-    all_states = await asyncio.to_thread(get_all_states)
+    all_states = await ha_client.get_all_states_async()
     ir_devices: list = []
     try:
         from services.ir_manager import list_ir_devices
@@ -518,12 +525,12 @@ async def import_blueprint_endpoint(body: BlueprintImportBody):
 async def get_suggested_templates():
     """Return templates that match the user's installed devices, with pre-filled wizard data."""
     from services.automation_templates import TEMPLATES, matches_suggestion
-    from services.home_automation import get_all_states
+    from services import ha_client
 
-    # Both calls below hit HA REST sync. Run them in parallel via threads so
-    # the page (Dashboard mounts this) doesn't pay them serially.
+    # Both HA reads run in parallel so the page (Dashboard mounts this)
+    # doesn't pay them serially; the automation list is still sync REST.
     all_states, existing_autos = await asyncio.gather(
-        asyncio.to_thread(get_all_states),
+        ha_client.get_all_states_async(),
         asyncio.to_thread(lambda: _safe_list_automations()),
     )
     ir_devices: list = []
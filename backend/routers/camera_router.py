@@ -21,10 +21,6 @@ def _ha_token() -> str:
     return ha_client.token()
 
 
-def _headers() -> dict:
-    return ha_client.headers()
-
-
 def _stream_headers() -> dict:
     return {"Authorization": f"Bearer {ha_client.token()}"}
 
@@ -63,7 +59,7 @@ def list_cameras():
 
 
 @router.get("/api/cameras/motion")
-def camera_motion_events(hours: int = 24):
+async def camera_motion_events(hours: int = 24):
     """Recent motion events from HA history for motion binary_sensors and cameras."""
     from services.ha_subscriber import state_cache
 
@@ -81,17 +77,8 @@ def camera_motion_events(hours: int = 24):
         return {"events": []}
 
     try:
-        resp = requests.get(
-            f"{_ha_url()}/api/history/period/{start}",
-            headers=_headers(),
-            params={"filter_entity_id": ",".join(all_ids), "minimal_response": "true"},
-            timeout=15,
-        )
-        if not resp.ok:
-            return {"events": []}
-
         events = []
-        for entity_history in resp.json():
+        for entity_history in await ha_client.history_async(all_ids, start):
             if not entity_history:
                 continue
             for item in entity_history:
@@ -116,17 +103,13 @@ def camera_motion_events(hours: int = 24):
 
 
 @router.get("/api/cameras/{entity_id}/snapshot")
-def camera_snapshot(entity_id: str):
+async def camera_snapshot(entity_id: str):
     """Proxy a JPEG snapshot from HA. HA token stays server-side."""
     if not _ha_ok():
         raise HTTPException(status_code=503, detail="HA not configured")
     try:
-        r = requests.get(
-            f"{_ha_url()}/api/camera_proxy/{entity_id}",
-            headers=_headers(),
-            timeout=10,
-        )
-        if not r.ok:
+        r = await ha_client.request_async("GET", f"/api/camera_proxy/{entity_id}", timeout=10)
+        if not r.is_success:
             raise HTTPException(status_code=r.status_code, detail="HA snapshot failed")
         return Response(
             content=r.content,
@@ -141,7 +124,10 @@ def camera_snapshot(entity_id: str):
 
 @router.get("/api/cameras/{entity_id}/stream")
 def camera_stream(entity_id: str):
-    """Proxy MJPEG stream from HA. One thread per viewer — suitable for a home LAN."""
+    """Proxy MJPEG stream from HA. One thread per viewer — suitable for a home LAN.
+
+    Stays on requests: a stream holds its connection for as long as someone
+    watches, which must not occupy a slot in ha_client's bounded pool."""
     if not _ha_ok():
         raise HTTPException(status_code=503, detail="HA not configured")
 
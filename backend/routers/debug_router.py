@@ -11,6 +11,16 @@ Endpoints:
   GET  /api/debug/export              — download full debug report as JSON
   POST /api/debug/simulate            — parse + trace an intent without executing it
   GET  /api/debug/last-request/{id}   — get all events for a specific request_id
+  GET  /api/debug/state-dispatch      — per-hook counters for HA state_changed hooks
+  GET  /api/debug/ws-clients          — per-client WS send counters + delta-stream state
+  GET  /api/debug/json-stores         — read/write/flush counters for write-behind JSON stores
+  GET  /api/debug/permissions-cache   — hit/miss/invalidation counters for the PEP decision cache
+  GET  /api/debug/prompt-prefix       — per-purpose assembly time and prefix reuse for LLM prompts
+  GET  /api/debug/registry-reconcile  — device-registry delta counters, generation and last audit drift
+  GET  /api/debug/health-aggregate    — event / rescan / topology-build counters behind /api/health
+  GET  /api/debug/entity-history      — recorded / flushed / pruned points and reads of the local chart store
+  GET  /api/debug/ha-client           — pooled HA REST client: requests, errors, timeouts, in-flight, latency
+  GET  /api/debug/service-batch       — batched service calls: merged groups, WS vs REST sends, failures
 """
 from __future__ import annotations
 
@@ -323,6 +333,22 @@ async def debug_self_test(_: dict = Depends(require_role("super_admin"))):
     }
 
 
+# ─── HA state_changed hook dispatch ────────────────────────────────────────────
+
+@router.get("/state-dispatch")
+async def get_state_dispatch(
+    reset: bool = Query(False, description="Zero the counters after reading"),
+    _: dict = Depends(require_role("super_admin")),
+):
+    """Per-hook call counts, errors and handler time for ha_subscriber's
+    state_changed dispatcher, plus how many events hit no hook at all."""
+    from services import state_dispatch
+    snapshot = state_dispatch.stats()
+    if reset:
+        state_dispatch.reset_stats()
+    return snapshot
+
+
 # ─── Home context (Ziggy Pro designer input) ──────────────────────────────────
 #
 # Dumps the compact JSON blob the Pro-mode designer (Session D3) consumes when
@@ -372,3 +398,100 @@ async def get_capabilities(
     if include_drift:
         out["drift"] = detect_drift()
     return out
+
+
+@router.get("/ws-clients")
+async def get_ws_clients(_: dict = Depends(require_role("super_admin"))):
+    """Messages and bytes sent per /ws client (totals and a rolling
+    per-second rate), plus seq/ack/coalescing state for delta-mode clients."""
+    from backend.ws_manager import manager
+    return {"clients": manager.client_stats()}
+
+
+@router.get("/json-stores")
+async def get_json_stores(
+    flush: bool = Query(False, description="Flush pending writes before reading"),
+    _: dict = Depends(require_role("super_admin")),
+):
+    """Counters for every services.json_store document: reads, reloads from
+    disk, updates, flushes (one flush covers a burst of updates) and whether
+    writes are pending."""
+    from services import json_store
+    if flush:
+        json_store.flush_all()
+    return {"stores": json_store.all_stats()}
+
+
+@router.get("/permissions-cache")
+async def get_permissions_cache(_: dict = Depends(require_role("super_admin"))):
+    """Decision-cache counters for the permission service: hits, misses,
+    entries dropped because a grant expired inside their window, LRU
+    evictions and whole-cache invalidations on policy writes."""
+    from services.permissions.runtime import get_service
+    return get_service().decision_cache_stats()
+
+
+@router.get("/prompt-prefix")
+async def get_prompt_prefix(
+    reset: bool = Query(False, description="Zero the counters after reading"),
+    _: dict = Depends(require_role("super_admin")),
+):
+    """Per-purpose prompt assembly counters (intent_parse, chat,
+    automation_design): assemblies, blocks reused vs rebuilt, assembly time,
+    and how often the whole prefix was byte-identical to the previous one."""
+    from core import prompt_prefix
+    snapshot = prompt_prefix.stats()
+    if reset:
+        prompt_prefix.reset_stats()
+    return snapshot
+
+
+@router.get("/registry-reconcile")
+async def get_registry_reconcile(
+    _: dict = Depends(require_role("super_admin")),
+):
+    """Device-registry incremental reconcile: state / registry deltas applied,
+    coalesced writes, refresh and audit passes, the current generation and
+    the drift the last audit found."""
+    from services import device_registry
+    return device_registry.reconcile_stats()
+
+
+@router.get("/health-aggregate")
+async def get_health_aggregate(
+    _: dict = Depends(require_role("super_admin")),
+):
+    """/api/health aggregate: state events folded in, signal changes, full
+    rescans, topology rebuilds, derivations vs reads and health_changed pushes."""
+    from services import health_aggregate
+    return health_aggregate.stats()
+
+
+@router.get("/entity-history")
+async def get_entity_history(
+    _: dict = Depends(require_role("super_admin")),
+):
+    """Local chart history: points recorded and skipped, batched flushes,
+    rows written and pruned, reads and points served."""
+    from services import entity_history
+    return entity_history.stats()
+
+
+@router.get("/ha-client")
+async def get_ha_client(
+    _: dict = Depends(require_role("super_admin")),
+):
+    """Pooled HA REST client: requests, errors and timeouts, current and peak
+    in-flight against the concurrency gate, latency and the configured limits."""
+    from services import ha_client
+    return ha_client.rest_stats()
+
+
+@router.get("/service-batch")
+async def get_service_batch(
+    _: dict = Depends(require_role("super_admin")),
+):
+    """Batched service-call executor: batches, entity calls and the merged
+    groups they became, WebSocket vs REST sends, failed groups and latency."""
+    from services import service_batch
+    return service_batch.stats()
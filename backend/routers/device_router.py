@@ -3,6 +3,7 @@ from __future__ import annotations
 import asyncio
 import threading
 import time as _time
+from datetime import datetime, timedelta, timezone
 from typing import Optional
 
 from fastapi import APIRouter, Depends, HTTPException, BackgroundTasks, Request
@@ -17,7 +18,7 @@ from services.ha_areas import (
     assign_entity_to_area, assign_device_to_area, sync_device_area_to_ha,
     invalidate_registry_cache, _ws,
 )
-from services.home_automation import get_all_states, get_state
+from services.home_automation import get_all_states
 from .auth_deps import require_role, get_current_user
 
 router = APIRouter()
@@ -51,19 +52,20 @@ _enrich_cache: dict = {"ts": 0.0, "data": None, "key": None}
 
 def _enrich_cache_key() -> tuple:
     """Cheap dependency signature so we can bust the cache on registry edits
-    without timing them. Uses len() of the registry and the IR device count;
-    any add/remove on either side will produce a different key."""
+    without timing them: the registry generation (bumped on every row change —
+    status, room, type, add/remove) and the IR device file's version. A
+    room move or status flip changes the key; len() of the registry did not."""
     try:
         import services.device_registry as dr
-        registry_len = len(dr._registry) if dr._initialized else 0
+        registry_gen = dr.generation() if dr._initialized else 0
     except Exception:
-        registry_len = 0
+        registry_gen = 0
     try:
-        from services.ir_manager import list_ir_devices as _list_ir
-        ir_len = len(_list_ir(enabled_only=False))
+        from services.ir_manager import devices_version as _ir_version
+        ir_version = _ir_version()
     except Exception:
-        ir_len = 0
-    return (registry_len, ir_len)
+        ir_version = None
+    return (registry_gen, ir_version)
 
 
 def _invalidate_enrich_cache() -> None:
@@ -528,7 +530,8 @@ async def upsert_device(device: DeviceUpsert,
     dtype = device.type.lower().strip()
 
     if device.validate_ha and device.entity_id:
-        check = get_state(device.entity_id)
+        from services import ha_client
+        check = await ha_client.get_state_async(device.entity_id)
         if not check.get("ok"):
             raise HTTPException(status_code=422, detail=f"Entity '{device.entity_id}' not found in Home Assistant.")
 
@@ -567,8 +570,9 @@ async def delete_device(room: str, dtype: str,
 
 @router.get("/api/devices/validate")
 async def validate_device_map():
+    from services import ha_client
     try:
-        all_states = get_all_states()
+        all_states = await ha_client.get_all_states_async()
         known_ids: set[str] = {e["entity_id"] for e in all_states}
         device_map: dict = settings.get("device_map", {})
 
@@ -984,16 +988,15 @@ def _partition_config_entries(
     return safe, blocked
 
 
-def _delete_ha_config_entry(entry_id: str, timeout: float = 10.0) -> bool:
+async def _delete_ha_config_entry(entry_id: str, timeout: float = 10.0) -> bool:
     """Delete a config entry via HA's REST API. This nukes the entry AND every
     device/entity it owns, and — unlike the device-registry WS remove — works
     even when the device is offline (the entry persists regardless of reach).
     Returns True on 2xx."""
     from services import ha_client
-    import requests
     try:
-        url = f"{ha_client.url().rstrip('/')}/api/config/config_entries/entry/{entry_id}"
-        resp = requests.delete(url, headers=ha_client.headers(), timeout=timeout)
+        resp = await ha_client.request_async(
+            "DELETE", f"/api/config/config_entries/entry/{entry_id}", timeout=timeout)
         ok = 200 <= resp.status_code < 300
         if not ok:
             log_info(f"[API] delete config_entry {entry_id} -> HTTP {resp.status_code}")
@@ -1151,7 +1154,7 @@ async def delete_ha_entity(entity_id: str, delete_device: bool = False,
             log_info(f"[API] delete_ha_entity: NOT deleting shared/hub config entry "
                      f"{ce} (domain={domain_by_entry.get(ce)}) — removing the device instead")
         for ce in safe_entry_ids:
-            if _delete_ha_config_entry(ce):
+            if await _delete_ha_config_entry(ce):
                 ha_device_removed = True
 
         # Devices whose (shared) entry we deliberately kept: remove just the one
@@ -1456,12 +1459,12 @@ async def entity_details(entity_id: str):
     # ── 1. Read state from the WS cache (continuously updated). Fall back to
     #       one REST hit ONLY if the cache is cold for this entity — handles
     #       the brief window before the subscriber's snapshot completes on
-    #       boot. Using the thread pool so even the fallback doesn't block
-    #       the event loop. ────────────────────────────────────────────────
+    #       boot. The fallback goes through ha_client's pooled async client
+    #       so it doesn't block the event loop. ──────────────────────────────
     cached = state_cache.get(entity_id)
     if cached is None:
-        from services.home_automation import get_state
-        rest = await asyncio.to_thread(get_state, entity_id)
+        from services import ha_client
+        rest = await ha_client.get_state_async(entity_id)
         if not rest.get("ok"):
             msg = (rest.get("message") or "")
             is_404 = "404" in msg or "not_found" in msg.lower()
@@ -1853,59 +1856,76 @@ async def execute_device_command(
 
 # ---------------------------------------------------------------------------
 # Historical state for a single entity (used by the sensor chart on
-# DeviceDetail). Wraps HA's /api/history/period/ endpoint and filters to
-# numeric states only — non-numeric points (e.g. "unavailable") are dropped
-# so the FE chart can render a clean line without per-point guards.
+# DeviceDetail). Served from Ziggy's own downsampled store
+# (services.entity_history), fed by the ha_subscriber stream; HA's
+# /api/history/period/ is only asked for the part of the window before Ziggy
+# started recording the entity. Numeric states only — non-numeric points
+# (e.g. "unavailable") are dropped so the FE chart can render a clean line
+# without per-point guards.
 # ---------------------------------------------------------------------------
 
+async def _ha_history(entity_id: str, start: datetime, end: datetime | None) -> tuple[list, str | None]:
+    """Numeric (epoch, value) points from HA's recorder for [start, end]."""
+    from services import ha_client
+
+    if not ha_client.url() or not ha_client.token():
+        return [], None
+    data = await ha_client.history_async(
+        [entity_id], start.isoformat(), end.isoformat() if end is not None else None)
+    points = []
+    unit = None
+    for item in (data[0] if data else []):
+        try:
+            v = float(item.get("state"))
+        except (TypeError, ValueError):
+            continue  # "unavailable", "unknown", strings — skip
+        t = item.get("last_changed") or item.get("last_updated")
+        if not t:
+            continue
+        try:
+            points.append((datetime.fromisoformat(t.replace("Z", "+00:00")).timestamp(), v))
+        except ValueError:
+            continue
+        u = (item.get("attributes") or {}).get("unit_of_measurement")
+        if u:
+            unit = u
+    return points, unit
+
+
 @router.get("/api/devices/{entity_id:path}/history")
-async def entity_history(entity_id: str, hours: int = 24):
-    import requests
-    from datetime import datetime, timedelta, timezone
+async def entity_history(entity_id: str, hours: int = 24, points: int = 0):
     from core.logger_module import log_error
-
-    ha_url = settings.get("home_assistant", {}).get("url", "").rstrip("/")
-    ha_tok = settings.get("home_assistant", {}).get("token", "")
-    if not ha_url or not ha_tok:
-        return {"points": [], "unit": None}
+    from services import entity_history as eh
 
     # Clamp the window — protects against a misbehaving client asking for
-    # weeks of data (HA history is expensive on the recorder DB).
+    # weeks of data. `points` is the chart's pixel budget.
     hours = max(1, min(int(hours or 24), 168))
-    start = (datetime.now(timezone.utc) - timedelta(hours=hours)).isoformat()
+    budget = max(20, min(int(points or eh.DEFAULT_POINTS), 2000))
+    start = datetime.now(timezone.utc) - timedelta(hours=hours)
+    loop = asyncio.get_running_loop()
 
     try:
-        resp = requests.get(
-            f"{ha_url}/api/history/period/{start}",
-            headers={"Authorization": f"Bearer {ha_tok}"},
-            params={
-                "filter_entity_id": entity_id,
-                "minimal_response": "true",
-                "no_attributes": "false",
-            },
-            timeout=15,
-        )
-        if not resp.ok:
-            return {"points": [], "unit": None}
-        data = resp.json() or []
-        series = data[0] if data else []
-        points = []
-        unit = None
-        for item in series:
-            try:
-                v = float(item.get("state"))
-            except (TypeError, ValueError):
-                continue  # "unavailable", "unknown", strings — skip
-            t = item.get("last_changed") or item.get("last_updated")
-            if not t:
-                continue
-            points.append({"t": t, "v": v})
-            attrs = item.get("attributes") or {}
-            u = attrs.get("unit_of_measurement")
-            if u:
-                unit = u
-        return {"points": points, "unit": unit}
+        local = await loop.run_in_executor(None, eh.series, entity_id, start.timestamp(), None, budget)
     except Exception as e:
-        log_error(f"[device_router] entity_history({entity_id}): {e}")
-        return {"points": [], "unit": None}
+        log_error(f"[device_router] entity_history({entity_id}) local read: {e}")
+        local = {"points": [], "unit": None, "recorded_since": None}
+    series = list(local["points"])
+    unit = local["unit"]
+
+    # Gap before Ziggy started recording this entity (or it never has): fill
+    # from HA, bounded to the gap so the recorder only scans what we lack.
+    since = local["recorded_since"]
+    if since is None or since > start.timestamp() + 60:
+        gap_end = datetime.fromtimestamp(since, timezone.utc) if since is not None else None
+        try:
+            ha_points, ha_unit = await _ha_history(entity_id, start, gap_end)
+            series = eh.lttb([p for p in ha_points if since is None or p[0] < since] + series, budget)
+            unit = unit or ha_unit
+        except Exception as e:
+            log_error(f"[device_router] entity_history({entity_id}): {e}")
+
+    return {
+        "points": [{"t": datetime.fromtimestamp(t, timezone.utc).isoformat(), "v": v} for t, v in series],
+        "unit":   unit,
+    }
 
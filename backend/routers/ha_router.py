@@ -10,7 +10,7 @@ from core.errors import ErrorCode, ZiggyError, entity_not_found, ha_unavailable
 from core.logger_module import log_info
 from core.settings_loader import save_settings, settings
 from services.entity_filter import filter_entities
-from services.home_automation import get_all_states, get_state, call_service
+from services import ha_client
 
 router = APIRouter()
 
@@ -71,7 +71,7 @@ async def ha_entities(domain: Optional[str] = None, all: bool = False):
                 for eid, entry in state_cache.items()
             ]
         else:
-            raw_states = get_all_states()
+            raw_states = await ha_client.get_all_states_async()
         if not raw_states and not all:
             raise ha_unavailable()
 
@@ -139,7 +139,7 @@ async def ha_entities(domain: Optional[str] = None, all: bool = False):
 
 @router.get("/api/ha/state/{entity_id:path}")
 async def ha_state(entity_id: str):
-    result = get_state(entity_id)
+    result = await ha_client.get_state_async(entity_id)
     if not result.get("ok"):
         raise entity_not_found(entity_id)
     return result["data"]
@@ -312,7 +312,6 @@ def _ha_service_allowed(domain: str, service: str) -> tuple[bool, str]:
 
 @router.post("/api/ha/service")
 async def ha_call_service(body: HaServiceCall):
-    import asyncio as _asyncio
     import time as _t
 
     # Domain/service allowlist — closes the audit's S3 finding where any
@@ -344,13 +343,11 @@ async def ha_call_service(body: HaServiceCall):
             except Exception as _e:
                 log_info(f"[HASvc] default-preset resolve skipped for {eid}: {_e}")
 
-    # call_service is sync (requests.post) — running it inline on an async
-    # endpoint blocks the event loop for the full HA round-trip (100-300 ms
-    # typical, up to several seconds on a slow tunnel or unresponsive
-    # Wi-Fi device). Other concurrent requests stall behind it. to_thread
-    # frees the loop to keep serving traffic while HA processes the call.
+    # The HA round-trip (100-300 ms typical, up to several seconds on a slow
+    # tunnel or unresponsive Wi-Fi device) runs on ha_client's pooled async
+    # client, so the loop keeps serving other requests meanwhile.
     _t0 = _t.perf_counter()
-    result = await _asyncio.to_thread(call_service, body.domain, body.service, body.data)
+    result = await ha_client.call_service_async(body.domain, body.service, body.data)
     _ha_ms = round((_t.perf_counter() - _t0) * 1000, 1)
     if not result.get("ok"):
         # Keep the HA upstream message in `details` for admin debug but never
@@ -421,17 +418,13 @@ async def ha_control(body: HaControlBody, background_tasks: BackgroundTasks):
                 result = await loop.run_in_executor(None, route_command, entry, body.action)
             else:
                 domain = body.entity_id.split(".")[0]
-                result = await loop.run_in_executor(
-                    None, call_service, domain, body.action,
-                    {"entity_id": body.entity_id},
-                )
+                result = await ha_client.call_service_async(
+                    domain, body.action, {"entity_id": body.entity_id})
         except Exception as e:
             try:
                 domain = body.entity_id.split(".")[0]
-                result = await loop.run_in_executor(
-                    None, call_service, domain, body.action,
-                    {"entity_id": body.entity_id},
-                )
+                result = await ha_client.call_service_async(
+                    domain, body.action, {"entity_id": body.entity_id})
             except Exception:
                 result = {"ok": False, "message": str(e)}
 
@@ -109,198 +109,25 @@ async def _discover_coordinator_entry() -> dict | None:
     _coordinator_cache_checked = True
     return _coordinator_entry_cache
 
-# Use entity_filter as the single source of truth for what counts as a "real" device.
-# This ensures offline_count matches exactly the entities visible on the Devices page,
-# rather than inflating the count with battery sensors, ZHA config entities (number/select),
-# phone sensors, router sensors, IR blaster helpers, etc.
-from services.entity_filter import _should_hide as _entity_should_hide
-
-_BATTERY_THRESHOLD_DEFAULT = 20
-
 
 @router.get("/api/health")
 async def get_health():
     # ── Imports are deferred to avoid circular issues at import time ──────────
     try:
-        from services.ha_subscriber import state_cache, ha_connected
+        from services.ha_subscriber import ha_connected
     except ImportError:
-        state_cache, ha_connected = {}, False
-
-    try:
-        from services.anomaly_engine import get_automation_deps
-        deps = get_automation_deps()
-    except Exception:
-        deps = {}
-
-    try:
-        from core.settings_loader import settings
-        batt_threshold: int = int(
-            settings.get("anomaly_engine", {}).get("anom08_battery_threshold", _BATTERY_THRESHOLD_DEFAULT)
-        )
-        ha_url: str = settings.get("home_assistant", {}).get("url", "").rstrip("/")
-    except Exception:
-        batt_threshold = _BATTERY_THRESHOLD_DEFAULT
-        ha_url = ""
-
-    # Apply the same extra filters the Devices page uses, otherwise the
-    # Dashboard's "13 offline" claim mismatches the 7 the user can actually
-    # see and act on. Build the lazy filter set once outside the loop.
-    try:
-        from services.entity_filter import filter_entities
-        ef = settings.get("entity_filter", {}) or {}
-        _ef_extra_hidden = (ef.get("extra_hidden_domains") or [],
-                            ef.get("extra_hidden_patterns") or [])
-        # filter_entities expects entity records, so we'll apply it once
-        # over the candidate offline set below rather than per-entity here.
-    except Exception:
-        filter_entities = None
-        _ef_extra_hidden = ([], [])
-
-    # ── Group collapse: count physical devices, not entities. A Switcher
-    #    boiler exposes 4 entities (switch + 3 sensors); if all four are
-    #    unavailable, that's ONE offline device on the Devices page card —
-    #    not four. Use the same grouping the FE renders from.
-    primary_by_eid: dict[str, str] = {}   # eid → its group's primary_entity_id
-    try:
-        from services.device_groups import build_groups, get_cached_registry_async
-        import services.device_registry as _dr
-        if not _dr._initialized:
-            _dr.init()
-        from backend.routers.device_router import _enrich_devices_with_ha_state
-        enriched = _enrich_devices_with_ha_state(_dr.get_all())
-        registry = await get_cached_registry_async()
-        for g in build_groups(enriched, registry):
-            primary = g.get("primary_entity_id")
-            if not primary:
-                continue
-            for ge in (g.get("entities") or []):
-                eid = ge.get("entity_id")
-                if eid:
-                    primary_by_eid[eid] = primary
-    except Exception:
-        pass
+        ha_connected = False
 
-    # Siblings the USER promoted to their own tile (is_tile). The Devices grid
-    # keeps these as standalone cards (getGroupedEntities), so if one is offline
-    # it DOES show under Review — the banner must count it standalone too, or the
-    # counts diverge the other way. Best-effort; empty on any failure.
-    _promoted_eids: set[str] = set()
-    try:
-        from services import entity_prefs as _ep
-        _promoted_eids = {k for k, v in (_ep.get_all() or {}).items()
-                          if isinstance(v, dict) and v.get("is_tile")}
-    except Exception:
-        pass
-
-    # HA entities that are the Wi-Fi half of an IR+Wi-Fi MERGED device (a TV /
-    # AC with a linked IR remote). When such an entity goes 'unavailable' the
-    # device is merely OFF and still IR-controllable — the Devices grid hides it
-    # from the disconnected filter, so the banner must NOT count it either, or
-    # the two diverge (banner says N offline, Review shows fewer). Best-effort.
-    _ir_linked_eids: set[str] = set()
-    try:
-        from services.ir_manager import list_ir_devices as _list_ir
-        _ir_linked_eids = {(d.get("ha_entity_id") or "").strip()
-                           for d in _list_ir(enabled_only=False)
-                           if (d.get("ha_entity_id") or "").strip()}
-    except Exception:
-        pass
-
-    offline_all:       list[dict] = []
-    offline_with_deps: list[dict] = []
-    battery_warnings:  list[dict] = []
-    _offline_primaries_seen: set[str] = set()   # dedupe groups → one count per physical device
-
-    for eid, entry in state_cache.items():
-        if _entity_should_hide(eid):
-            continue
-        if eid in _ir_linked_eids:
-            continue   # IR+Wi-Fi merged device that's just off → not "disconnected"
-
-        state = entry.get("state", "")
-        attrs = entry.get("attributes", {}) or {}
-        name  = attrs.get("friendly_name") or eid.split(".")[-1].replace("_", " ").title()
-
-        # ── Offline detection ────────────────────────────────────────────────
-        if state in ("unavailable", "unknown"):
-            # Count a device offline ONLY when its group PRIMARY (the
-            # controllable the Devices card is keyed on) is offline. A
-            # config/diagnostic SIBLING that merely sits at 'unknown' — e.g. a
-            # Z2M `auto_close_when_water_shortage` switch that was never set —
-            # does NOT make the device offline, and the Devices grid collapses
-            # such siblings into the (online) primary. Counting them here made
-            # the banner claim more offline devices than Review could ever show
-            # ("N offline" → tap Review → fewer cards). Attribute + dedupe by
-            # primary, and record the PRIMARY so Review highlights the device,
-            # not a hidden sub-sensor.
-            primary = primary_by_eid.get(eid, eid)
-            promoted = eid in _promoted_eids
-            if primary != eid and not promoted:
-                p_state = (state_cache.get(primary) or {}).get("state")
-                if p_state not in ("unavailable", "unknown"):
-                    continue   # primary is online → the device is fine
-            # A promoted sibling stands on its own card, so it's counted under
-            # its OWN id; every other row is attributed to (and deduped by) the
-            # group primary.
-            key = eid if (primary == eid or promoted) else primary
-            if key in _offline_primaries_seen:
-                continue
-            _offline_primaries_seen.add(key)
-
-            k_entry = state_cache.get(key) or {}
-            k_attrs = k_entry.get("attributes", {}) or {}
-            k_name  = k_attrs.get("friendly_name") or key.split(".")[-1].replace("_", " ").title()
-            auto_names = deps.get(key) or deps.get(eid) or []
-            record = {
-                "entity_id":       key,
-                "name":            k_name,
-                "ha_state":        k_entry.get("state") or state,
-                "automation_deps": auto_names,
-            }
-            offline_all.append(record)
-            if auto_names:
-                offline_with_deps.append(record)
-
-        # ── Battery detection ────────────────────────────────────────────────
-        battery: int | None = None
-        if attrs.get("device_class") == "battery":
-            try:
-                battery = int(float(state))
-            except (ValueError, TypeError):
-                pass
-        else:
-            for key in ("battery_level", "battery", "battery_percent"):
-                if key in attrs:
-                    try:
-                        battery = int(attrs[key])
-                        break
-                    except (ValueError, TypeError):
-                        pass
-
-        if battery is not None and 0 <= battery < batt_threshold:
-            battery_warnings.append({
-                "entity_id": eid,
-                "name":      name,
-                "battery":   battery,
-            })
-
-    # Last filter pass: drop anything the user has configured to hide on the
-    # Devices page (extra_hidden_domains / patterns). _should_hide() above
-    # only knows about built-in patterns; this matches the Devices fetch.
-    if filter_entities is not None and (_ef_extra_hidden[0] or _ef_extra_hidden[1]):
-        try:
-            kept = filter_entities(
-                [{"entity_id": r["entity_id"]} for r in offline_all],
-                extra_hidden_domains=_ef_extra_hidden[0],
-                extra_hidden_patterns=_ef_extra_hidden[1],
-            )
-            kept_ids = {e["entity_id"] for e in kept}
-            offline_all       = [r for r in offline_all       if r["entity_id"] in kept_ids]
-            offline_with_deps = [r for r in offline_with_deps if r["entity_id"] in kept_ids]
-        except Exception:
-            pass
+    # Offline / battery signals are maintained per state_changed event and the
+    # group topology is rebuilt only when the registry changes — see
+    # services.health_aggregate. The lists come back whole; truncate here.
+    from services import health_aggregate
+    agg = await health_aggregate.read()
+    offline_all       = agg["offline_devices"]
+    offline_with_deps = agg["offline_with_deps"]
+    battery_warnings  = agg["battery_warnings"]
 
-    coordinator_warning = len(offline_all) >= 3
+    coordinator_warning = agg["coordinator_warning"]
 
     # Discover coordinator entry when warning is active (lazy, cached after first hit)
     coordinator_entry_id = ""
@@ -318,12 +145,11 @@ async def get_health():
     try:
         from services import ha_health
         offline_primary_ids: set[str] = {r["entity_id"] for r in offline_all}
-        # `_offline_primaries_seen` already collapsed multi-entity groups, so
-        # primary IDs are the right denominator alongside the group count.
-        # We approximate total_devices by the group count we built above; if
-        # device_groups wasn't available, fall back to "0" so share thresholds
-        # are skipped (compute() guards on MIN_DEVICES_FOR_SHARE).
-        total_devices = len(primary_by_eid) if primary_by_eid else 0
+        # The aggregate already collapsed multi-entity groups, so primary IDs
+        # are the right denominator alongside the group count. total_devices
+        # is 0 when device_groups wasn't available, so share thresholds are
+        # skipped (compute() guards on MIN_DEVICES_FOR_SHARE).
+        total_devices = agg["total_devices"]
         coord_state_obj = (await ha_health.fetch_coordinator_state()) if ha_connected else None
         system_health = ha_health.compute_system_health(
             ha_connected=ha_connected,
@@ -343,7 +169,7 @@ async def get_health():
         "offline_count":        len(offline_all),
         "offline_devices":      offline_all[:20],
         "offline_with_deps":    offline_with_deps[:10],
-        "battery_warnings":     sorted(battery_warnings, key=lambda x: x["battery"])[:10],
+        "battery_warnings":     battery_warnings[:10],
         "coordinator_warning":  coordinator_warning,
         "coordinator_entry_id": coordinator_entry_id,
         "coordinator_title":    coordinator_title,
@@ -381,8 +207,9 @@ async def reload_zigbee(_user: dict = Depends(require_role("admin"))):
     title    = coord["title"]
 
     try:
-        from services.home_automation import call_service
-        result = call_service("homeassistant", "reload_config_entry", {"entry_id": entry_id})
+        from services import ha_client
+        result = await ha_client.call_service_async(
+            "homeassistant", "reload_config_entry", {"entry_id": entry_id})
         if result.get("ok"):
             from core.logger_module import log_info
             log_info(f"[Health] Coordinator reload triggered for entry '{entry_id}' ({title})")
@@ -504,7 +504,7 @@ async def remove_ir_device(device_id: str):
         if entry_id:
             try:
                 from backend.routers.device_router import _delete_ha_config_entry
-                if _delete_ha_config_entry(entry_id):
+                if await _delete_ha_config_entry(entry_id):
                     log_info(f"[IR] cascade-deleted linked config entry {entry_id} "
                              f"({linked_eid or '?'}) with IR device {device_id}")
             except Exception as e:
@@ -68,9 +68,10 @@ async def authorize(body: AuthorizeBody, user: dict = Depends(get_current_user))
 async def authorize_explain(body: AuthorizeBody, user: dict = Depends(get_current_user)):
     subject = body.subject or _self_ref(user)
     _guard_subject(subject, user)
+    # Always a fresh engine run so the trace reflects the policy as it is now.
     d = get_service().authorize(
         subject=subject, action=body.action, resource=body.resource,
-        context=body.context, now=body.now, record=False)
+        context=body.context, now=body.now, record=False, use_cache=False)
     return d.to_json()
 
 
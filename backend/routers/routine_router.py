@@ -94,12 +94,12 @@ async def get_suggested_routines():
     populated by subsequent prompts — the endpoint is wired now so frontend
     can rely on it being present."""
     from services.routine_templates import ROUTINE_TEMPLATES, matches_suggestion
-    from services.home_automation import get_all_states
+    from services import ha_client
     from services.capability_matcher import detect_capabilities
 
-    # Same off-thread pattern as get_suggested_templates — HA REST is sync.
+    # Same parallel pattern as get_suggested_templates — list_scripts is sync.
     all_states, existing_routines = await asyncio.gather(
-        asyncio.to_thread(get_all_states),
+        ha_client.get_all_states_async(),
         asyncio.to_thread(_safe_list_scripts),
     )
     ir_devices: list = []
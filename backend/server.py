@@ -287,6 +287,21 @@ async def _warm_ha_catalog():
         log_info(f"[Permissions] bootstrap skipped: {e}")
 
 
+@app.on_event("shutdown")
+async def _shutdown():
+    # Write-behind JSON stores hold up to a flush interval of changes in
+    # memory; write them out before the process goes away.
+    from services.json_store import flush_all
+    flushed = flush_all()
+    if flushed:
+        log_info(f"[Shutdown] flushed {flushed} JSON store(s)")
+    # Chart history buffers up to _FLUSH_DELAY_S of numeric states.
+    from services import entity_history
+    entity_history.flush()
+    from services import ha_client
+    await ha_client.aclose()
+
+
 async def _run_update_checker():
     """Run the HA update check once in the background after startup."""
     from services.ha_update_checker import background_check
@@ -573,12 +588,14 @@ async def websocket_endpoint(websocket: WebSocket, token: str = ""):
                 # Prevents Cloudflare Tunnel from closing idle connections.
                 await websocket.send_text('{"type":"pong"}')
 
-            elif msg_type in ("subscribe", "unsubscribe"):
+            elif msg_type in ("subscribe", "unsubscribe", "ack", "resync"):
                 # Per-client broadcast filter. Default (no subscribe ever
                 # sent) is the legacy firehose, so existing clients are
                 # unaffected. Clients can narrow to specific message types
-                # and/or entity_ids via a `subscribe` message.
-                manager.handle_client_message(
+                # and/or entity_ids via a `subscribe` message, and opt in to
+                # the coalesced delta stream with `"delta": true` (acked /
+                # resynced via `ack` and `resync` — see ws_manager._DeltaStream).
+                await manager.handle_stream_message(
                     websocket,
                     {"action": msg_type, **{k: v for k, v in msg.items() if k != "type"}},
                 )
@@ -3,6 +3,7 @@ from __future__ import annotations
 
 import asyncio
 import json
+import time
 import uuid
 from fastapi import WebSocket
 
@@ -11,6 +12,115 @@ from fastapi import WebSocket
 # healthy client over LAN; anything slower gets evicted.
 _BROADCAST_TIMEOUT_S = 0.5
 
+# Delta stream (opt-in, see _DeltaStream). Default coalescing window and the
+# range a client may ask for via `window_ms`.
+_DELTA_WINDOW_S = 0.1
+_DELTA_WINDOW_MAX_S = 2.0
+
+# Rolling window for the per-client msgs/s and bytes/s counters.
+_RATE_WINDOW_S = 10
+
+
+class _ClientStats:
+    """Send counters for one connection: totals plus per-second buckets for
+    the last _RATE_WINDOW_S seconds."""
+
+    __slots__ = ("connected_at", "messages", "bytes", "_buckets")
+
+    def __init__(self) -> None:
+        self.connected_at = time.time()
+        self.messages = 0
+        self.bytes = 0
+        self._buckets: dict[int, list[int]] = {}
+
+    def record(self, nbytes: int) -> None:
+        self.messages += 1
+        self.bytes += nbytes
+        now = int(time.monotonic())
+        bucket = self._buckets.get(now)
+        if bucket is None:
+            if len(self._buckets) > _RATE_WINDOW_S:
+                for sec in [s for s in self._buckets if s <= now - _RATE_WINDOW_S]:
+                    del self._buckets[sec]
+            bucket = self._buckets[now] = [0, 0]
+        bucket[0] += 1
+        bucket[1] += nbytes
+
+    def rates(self) -> tuple[float, float]:
+        floor = int(time.monotonic()) - _RATE_WINDOW_S
+        msgs = sum(b[0] for s, b in self._buckets.items() if s > floor)
+        nbytes = sum(b[1] for s, b in self._buckets.items() if s > floor)
+        return msgs / _RATE_WINDOW_S, nbytes / _RATE_WINDOW_S
+
+
+class _DeltaStream:
+    """Per-client state for the delta protocol.
+
+    Opt in with {"type": "subscribe", "delta": true, "window_ms": 100, ...}.
+    The client then gets a `state_snapshot` of its subscribed entities and,
+    instead of one full state_changed per HA event, `state_delta` frames:
+
+      {"type": "state_delta", "seq": 12, "changes": [
+          {"entity_id": "light.a", "new_state": "on", "set": {...}, "unset": [...]},
+          {"entity_id": "sensor.new", "new_state": "3", "attributes": {...}},
+      ]}
+
+    Events for the same entity within the window collapse into one change;
+    `set`/`unset` are the attribute differences against the last version
+    this connection was sent (a full `attributes` dict when there is none).
+    Every frame to a delta client carries `seq`, +1 per frame. The client
+    acks with {"type": "ack", "seq": n}; on a seq gap or a reconnect it
+    sends {"type": "resync"} (or subscribes again) and gets a fresh
+    snapshot that resets the baselines.
+    """
+
+    __slots__ = ("window_s", "seq", "acked_seq", "sent", "pending",
+                 "flush_task", "lock", "coalesced", "resyncs")
+
+    def __init__(self, window_s: float) -> None:
+        self.window_s = window_s
+        self.seq = 0
+        self.acked_seq = 0
+        # entity_id → (state, attributes) last sent on this connection
+        self.sent: dict[str, tuple] = {}
+        # entity_id → (state, attributes) waiting for the flush window
+        self.pending: dict[str, tuple] = {}
+        self.flush_task: asyncio.Task | None = None
+        # Serializes frames so seq order == wire order.
+        self.lock = asyncio.Lock()
+        self.coalesced = 0
+        self.resyncs = 0
+
+    def changes(self, pending: dict[str, tuple]) -> list[dict]:
+        out = []
+        for eid, (state, attrs) in pending.items():
+            prev = self.sent.get(eid)
+            if prev is None:
+                out.append({"entity_id": eid, "new_state": state, "attributes": attrs})
+            else:
+                old_state, old_attrs = prev
+                changed = {k: v for k, v in attrs.items()
+                           if k not in old_attrs or old_attrs[k] != v}
+                removed = [k for k in old_attrs if k not in attrs]
+                if state == old_state and not changed and not removed:
+                    continue
+                change: dict = {"entity_id": eid, "new_state": state}
+                if changed:
+                    change["set"] = changed
+                if removed:
+                    change["unset"] = removed
+                out.append(change)
+            self.sent[eid] = (state, attrs)
+        return out
+
+
+def _window_from(msg: dict) -> float:
+    try:
+        ms = float(msg.get("window_ms"))
+    except (TypeError, ValueError):
+        return _DELTA_WINDOW_S
+    return min(max(ms / 1000.0, 0.0), _DELTA_WINDOW_MAX_S)
+
 
 class ConnectionManager:
     def __init__(self):
@@ -22,17 +132,25 @@ class ConnectionManager:
         # full-firehose behaviour); the client can opt in to narrower
         # subscriptions by sending a `subscribe` message over the WS.
         self._filters: dict[WebSocket, dict] = {}
+        # ws → delta-protocol state, only for clients that opted in
+        self._streams: dict[WebSocket, _DeltaStream] = {}
+        self._stats: dict[WebSocket, _ClientStats] = {}
 
     async def connect(self, ws: WebSocket) -> str:
         await ws.accept()
         client_id = str(uuid.uuid4())
         self._connections[ws] = client_id
         self._filters[ws] = {"types": None, "entities": None}
+        self._stats[ws] = _ClientStats()
         return client_id
 
     def disconnect(self, ws: WebSocket) -> None:
         client_id = self._connections.pop(ws, None)
         self._filters.pop(ws, None)
+        self._stats.pop(ws, None)
+        stream = self._streams.pop(ws, None)
+        if stream is not None and stream.flush_task is not None:
+            stream.flush_task.cancel()
         if client_id:
             try:
                 from services.display_registry import registry
@@ -64,9 +182,11 @@ class ConnectionManager:
 
         Recognized shapes:
           {"action": "subscribe",   "types": [...], "entities": [...]}
+          {"action": "subscribe",   ..., "delta": true, "window_ms": 100}
           {"action": "unsubscribe"}   # clears filters → resume full firehose
-        Unknown messages are ignored (other handlers in server.py may consume
-        them).
+        A subscribe without `delta` switches the client back to full
+        state_changed messages. Unknown messages are ignored (other handlers
+        in server.py may consume them).
         """
         if not isinstance(msg, dict):
             return
@@ -77,9 +197,78 @@ class ConnectionManager:
                 types=msg.get("types"),
                 entities=msg.get("entities"),
             )
+            if ws not in self._filters:
+                return
+            old = self._streams.pop(ws, None)
+            if old is not None and old.flush_task is not None:
+                old.flush_task.cancel()
+            if msg.get("delta"):
+                stream = _DeltaStream(_window_from(msg))
+                if old is not None:
+                    stream.seq, stream.acked_seq = old.seq, old.acked_seq
+                self._streams[ws] = stream
         elif action == "unsubscribe":
             self.set_subscription(ws, types=None, entities=None)
 
+    async def handle_stream_message(self, ws: WebSocket, msg: dict) -> None:
+        """Async entry point for the subscription + delta protocol messages.
+
+          subscribe / unsubscribe   → handle_client_message; a delta
+                                      subscribe is answered with a snapshot
+          {"action": "ack", "seq": n}
+          {"action": "resync"}      → fresh state_snapshot
+        """
+        if not isinstance(msg, dict):
+            return
+        action = msg.get("action")
+        if action in ("subscribe", "unsubscribe"):
+            self.handle_client_message(ws, msg)
+            if action == "subscribe" and msg.get("delta"):
+                await self.resync(ws)
+        elif action == "ack":
+            stream = self._streams.get(ws)
+            try:
+                seq = int(msg.get("seq"))
+            except (TypeError, ValueError):
+                return
+            if stream is not None and seq <= stream.seq:
+                stream.acked_seq = max(stream.acked_seq, seq)
+        elif action == "resync":
+            await self.resync(ws)
+
+    async def resync(self, ws: WebSocket) -> bool:
+        """Send a delta client a full snapshot of its subscribed entities and
+        reset its baselines. Returns False for non-delta / failed clients."""
+        stream = self._streams.get(ws)
+        if stream is None:
+            return False
+        try:
+            from services.ha_subscriber import state_cache
+        except Exception:
+            state_cache = {}
+        flt = self._filters.get(ws) or {}
+        async with stream.lock:
+            if stream.flush_task is not None:
+                stream.flush_task.cancel()
+                stream.flush_task = None
+            stream.pending.clear()
+            entities = {}
+            if flt.get("types") is None or "state_changed" in flt["types"]:
+                wanted = flt.get("entities")
+                for eid, entry in list(state_cache.items()):
+                    if wanted is not None and eid not in wanted:
+                        continue
+                    entities[eid] = {"new_state": entry.get("state"),
+                                     "attributes": entry.get("attributes") or {}}
+            stream.sent = {eid: (v["new_state"], v["attributes"]) for eid, v in entities.items()}
+            stream.resyncs += 1
+            stream.seq += 1
+            frame = {"type": "state_snapshot", "seq": stream.seq, "entities": entities}
+            ok = await self._send_frame(ws, frame)
+        if not ok:
+            self.disconnect(ws)
+        return ok
+
     # ------------------------------------------------------------------
     # Broadcast
     # ------------------------------------------------------------------
@@ -121,13 +310,24 @@ class ConnectionManager:
             # Fall back to per-client send_json if dumps fails (e.g. non-JSON
             # value sneaks through). Keeps behaviour bug-compatible.
             payload = None
+        nbytes = len(payload.encode("utf-8")) if payload is not None else 0
+        is_state = data.get("type") == "state_changed"
 
         async def _send(ws: WebSocket) -> WebSocket | None:
+            stream = self._streams.get(ws)
             try:
+                if stream is not None:
+                    if is_state:
+                        self._enqueue(ws, stream, data)
+                        if stream.window_s <= 0:
+                            return None if await self._flush(ws) else ws
+                        return None
+                    return None if await self._send_sequenced(ws, stream, data) else ws
                 if payload is None:
                     await asyncio.wait_for(ws.send_json(data), timeout=_BROADCAST_TIMEOUT_S)
                 else:
                     await asyncio.wait_for(ws.send_text(payload), timeout=_BROADCAST_TIMEOUT_S)
+                self._record(ws, nbytes)
                 return None
             except Exception:
                 return ws
@@ -137,13 +337,108 @@ class ConnectionManager:
             if ws is not None:
                 self.disconnect(ws)
 
+    # ------------------------------------------------------------------
+    # Delta stream
+    # ------------------------------------------------------------------
+
+    def _record(self, ws: WebSocket, nbytes: int) -> None:
+        stats = self._stats.get(ws)
+        if stats is not None:
+            stats.record(nbytes)
+
+    async def _send_frame(self, ws: WebSocket, frame: dict) -> bool:
+        try:
+            text = json.dumps(frame, default=str)
+            await asyncio.wait_for(ws.send_text(text), timeout=_BROADCAST_TIMEOUT_S)
+        except Exception:
+            return False
+        self._record(ws, len(text.encode("utf-8")))
+        return True
+
+    def _enqueue(self, ws: WebSocket, stream: _DeltaStream, data: dict) -> None:
+        eid = data.get("entity_id")
+        if eid in stream.pending:
+            stream.coalesced += 1
+        stream.pending[eid] = (data.get("new_state"), data.get("attributes") or {})
+        if stream.window_s > 0 and stream.flush_task is None:
+            stream.flush_task = asyncio.create_task(self._flush_later(ws, stream))
+
+    async def _flush_later(self, ws: WebSocket, stream: _DeltaStream) -> None:
+        await asyncio.sleep(stream.window_s)
+        if stream.flush_task is asyncio.current_task():
+            stream.flush_task = None
+        if not await self._flush(ws):
+            self.disconnect(ws)
+
+    async def _flush(self, ws: WebSocket) -> bool:
+        """Send whatever is pending for a delta client as one state_delta
+        frame. Returns False if the send failed."""
+        stream = self._streams.get(ws)
+        if stream is None:
+            return True
+        async with stream.lock:
+            if not stream.pending:
+                return True
+            pending, stream.pending = stream.pending, {}
+            changes = stream.changes(pending)
+            if not changes:
+                return True
+            stream.seq += 1
+            return await self._send_frame(
+                ws, {"type": "state_delta", "seq": stream.seq, "changes": changes}
+            )
+
+    async def _send_sequenced(self, ws: WebSocket, stream: _DeltaStream, data: dict) -> bool:
+        # Pending entity frames go out first so a client never sees e.g.
+        # entity_removed before the last state of that entity.
+        if not await self._flush(ws):
+            return False
+        async with stream.lock:
+            if data.get("type") == "entity_removed":
+                stream.sent.pop(data.get("entity_id"), None)
+            stream.seq += 1
+            return await self._send_frame(ws, {**data, "seq": stream.seq})
+
+    def client_stats(self) -> list[dict]:
+        """Per-connection send counters (all clients) plus delta-stream state."""
+        out = []
+        for ws, cid in list(self._connections.items()):
+            stats = self._stats.get(ws)
+            if stats is None:
+                continue
+            msgs_per_s, bytes_per_s = stats.rates()
+            row = {
+                "client_id": cid,
+                "mode": "delta" if ws in self._streams else "full",
+                "connected_s": round(time.time() - stats.connected_at, 1),
+                "messages": stats.messages,
+                "bytes": stats.bytes,
+                "messages_per_s": round(msgs_per_s, 2),
+                "bytes_per_s": round(bytes_per_s, 1),
+            }
+            stream = self._streams.get(ws)
+            if stream is not None:
+                row.update({
+                    "window_ms": int(stream.window_s * 1000),
+                    "seq": stream.seq,
+                    "acked_seq": stream.acked_seq,
+                    "unacked": stream.seq - stream.acked_seq,
+                    "pending": len(stream.pending),
+                    "coalesced": stream.coalesced,
+                    "resyncs": stream.resyncs,
+                })
+            out.append(row)
+        return out
+
     async def push_to_display(self, ws_id: str, payload: dict) -> bool:
         """Send a display_push event to a specific browser display client.
         Returns True if the client was found and the message was sent."""
         for ws, cid in list(self._connections.items()):
             if cid == ws_id:
+                msg = {"type": "display_push", **payload}
                 try:
-                    await ws.send_json({"type": "display_push", **payload})
+                    await ws.send_json(msg)
+                    self._record(ws, len(json.dumps(msg, default=str).encode("utf-8")))
                     return True
                 except Exception:
                     self.disconnect(ws)
@@ -211,7 +211,14 @@ async def handle_intent(intent_result: dict, **kwargs) -> dict:
 
 
 def _log_event_safe(intent: str, params: dict, result: dict, source: str) -> None:
-    """Log the dispatched intent to the pattern event store. Never raises."""
+    """Log the dispatched intent to the pattern event store, and report the
+    outcome to the intent cache (a learned parse is only kept once it has
+    executed cleanly). Never raises."""
+    try:
+        from core import intent_cache
+        intent_cache.confirm(intent, params, result)
+    except Exception:
+        pass
     try:
         from services.pattern_logger import log_event
         log_event(intent, params, result, source)
@@ -1,4 +1,6 @@
 from __future__ import annotations
+import asyncio
+
 from core.intent_utils import ok, err
 from core.result_utils import L
 from core.logger_module import log_info
@@ -516,7 +518,9 @@ async def handle_create_occupancy_sensor(params: dict, *, source: str = "unknown
     walkout_grace = params.get("walkout_grace_seconds", 120)
     create_new = bool(params.get("create_new", False))
 
-    result = create_occupancy_sensor(
+    # Several config-flow POSTs through ha_client's sync facade — off the loop.
+    result = await asyncio.to_thread(
+        create_occupancy_sensor,
         room=room,
         sensor_entities=sensor_entities,
         friendly_name=friendly,
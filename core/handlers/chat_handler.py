@@ -11,6 +11,7 @@ from integrations.openai_client import (
     require_cloud_llm_active,
 )
 from integrations.llm_gateway import chat_completion
+from core import prompt_prefix
 
 # ── Web search tool — GPT decides when to use it ──────────────────────────────
 
@@ -205,10 +206,12 @@ async def handle_chat_with_gpt(params: dict, *, source: str = "unknown") -> dict
         "  user: 'מה מזג האוויר?' → '28 מעלות ושמש בתל אביב.'"
     )
 
-    system_prompt = (
-        f"You are Ziggy, the smart home assistant. The user's name is {user_name} (Hebrew: יובל). "
-        "Always use this exact spelling when addressing them by name in Hebrew. "
-        f"{lang_rule}\n\n"
+    # Stable-first ordering (core.prompt_prefix): the rules are identical for
+    # every user and turn, the language rule has two variants, and only the
+    # tail — name, memory, tasks — is per-request. Keeping it in that order
+    # lets provider-side prompt caching reuse the long common prefix.
+    rules_block = (
+        "You are Ziggy, the smart home assistant.\n\n"
         f"{shape_rule}\n\n"
         "Use the user's memory and tasks to answer contextually.\n\n"
         "ABSOLUTE RULES (never violate):\n"
@@ -294,8 +297,16 @@ async def handle_chat_with_gpt(params: dict, *, source: str = "unknown") -> dict
         "If no category clearly fits, fall back to [GIBBERISH] — ask "
         "for a rephrase. NEVER fall back to [GREETING] or to a task "
         "question.\n\n"
-        f"User memory:\n{json.dumps(memory_context)}\n\n"
-        f"Task list:\n{json.dumps(task_context)}"
+    )
+    lang_key = "he" if input_is_hebrew else "en"
+    system_prompt = "".join(prompt_prefix.assemble("chat", [
+        ("chat.rules", 1, lambda: rules_block),
+        (f"chat.lang.{lang_key}", 1, lambda: lang_rule + "\n\n"),
+    ])) + (
+        f"The user's name is {user_name} (Hebrew: יובל). "
+        "Always use this exact spelling when addressing them by name in Hebrew.\n\n"
+        f"User memory:\n{json.dumps(memory_context, sort_keys=True)}\n\n"
+        f"Task list:\n{json.dumps(task_context, sort_keys=True)}"
     )
 
     messages = [{"role": "system", "content": system_prompt}, *chat_history]
@@ -0,0 +1,296 @@
+"""
+Local intent cache for the tool-calling parser.
+
+Anything that misses voice_intents and the fast patterns goes to
+intent_parser._parse_with_tools: a full LLM round trip, even for the
+commands a household says the same way every day. This cache answers those
+repeats locally, from user_files/intent_cache.db.
+
+Key: the utterance after Hebrew room/device normalization (lowercased,
+whitespace-collapsed, trailing punctuation stripped) plus a fingerprint of
+what the model was shown about the home — tool schema version, IR device
+hint, device-room map. Adding a device or renaming a room changes the
+fingerprint, so stale parses are never replayed; they age out of the table.
+
+Learned, not guessed. A fresh LLM parse is only *remembered* (held in
+memory). It is written to the table when every intent in it has executed
+successfully — action_parser._log_event_safe calls confirm(). A misparse
+that fails, or is never executed (dry run, confirmation dialog abandoned),
+is never served. A cached parse whose execution later fails is dropped.
+
+Never involved when the parse could depend on conversation state:
+  * chat history present (follow-up turns) — no lookup, nothing remembered;
+  * the utterance contains a reference word ("it", "that", "again",
+    "אותו", "שוב" …) — no lookup, nothing remembered;
+  * a parse made while a conversation_context slot was live is not
+    remembered, so every stored entry stands on the utterance alone.
+"""
+from __future__ import annotations
+
+import copy
+import hashlib
+import json
+import re
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+CACHE_DB = Path("user_files/intent_cache.db")
+MAX_ENTRIES = 2000
+# A remembered parse must be executed within this window to be learned.
+PENDING_TTL_S = 120
+_PENDING_MAX = 64
+
+# Intents that are never worth caching: not a resolved command.
+_UNCACHEABLE_INTENTS = frozenset({"unrecognized_command", "unsupported_feature"})
+
+_REFERENCE_WORDS = re.compile(
+    r"\b(it|its|it's|that|this|them|those|these|they|there|again|back|undo|restore|"
+    r"same|one|ones|previous|last)\b"
+    r"|אותו|אותה|אותם|אותן|זה|זאת|אלה|שוב|בחזרה|אותו דבר|הקודם",
+    re.IGNORECASE,
+)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS intents (
+    key          TEXT PRIMARY KEY,
+    utterance    TEXT NOT NULL,
+    fingerprint  TEXT NOT NULL,
+    result       TEXT NOT NULL,
+    hits         INTEGER NOT NULL DEFAULT 0,
+    confirmed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_intents_confirmed ON intents(confirmed_at);
+"""
+
+_lock = threading.RLock()
+_ready_for: Path | None = None
+
+# key → {"utterance", "fingerprint", "result", "outstanding": [leaf], "hit": bool, "ts"}
+_pending: dict[str, dict] = {}
+_stats = {"hits": 0, "misses": 0, "bypass": 0, "learned": 0, "dropped": 0}
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+
+def normalize(text: str) -> str:
+    s = re.sub(r"\s+", " ", (text or "").strip().lower())
+    return s.strip(" \t\r\n.!?,;:\"'׳״`")
+
+
+def cacheable(text: str) -> bool:
+    """False when the utterance may refer back to an earlier turn."""
+    norm = normalize(text)
+    return bool(norm) and not _REFERENCE_WORDS.search(norm)
+
+
+def fingerprint(*parts: str) -> str:
+    """Fingerprint of what the model is shown about this home."""
+    h = hashlib.sha256()
+    for p in parts:
+        h.update((p or "").encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()[:16]
+
+
+def _key(utterance: str, fp: str) -> str:
+    return hashlib.sha256(f"{utterance}\n{fp}".encode("utf-8")).hexdigest()
+
+
+def _matches(leaf: dict, intent: Optional[str], params: Optional[dict]) -> bool:
+    # Handlers may add derived keys to params (toggle_light fills turn_on in
+    # from status), so the executed params need only contain the parsed ones.
+    params = params or {}
+    return leaf.get("intent") == intent and all(
+        params.get(k) == v for k, v in (leaf.get("params") or {}).items())
+
+
+def _leaves(result: dict) -> list[dict]:
+    if result.get("intent") == "__multi__":
+        return list(result.get("intents") or [])
+    return [result]
+
+
+# ---------------------------------------------------------------------------
+# Lookup / learning
+# ---------------------------------------------------------------------------
+
+def lookup(text: str, fp: str) -> Optional[dict]:
+    """The learned parse for this utterance and home fingerprint, or None."""
+    utterance = normalize(text)
+    key = _key(utterance, fp)
+    rows = _query("SELECT result FROM intents WHERE key = ?", [key])
+    try:
+        result = json.loads(rows[0][0]) if rows else None
+    except (json.JSONDecodeError, TypeError):
+        result = None
+    if not isinstance(result, dict):
+        _stats["misses"] += 1
+        return None
+    _stats["hits"] += 1
+    result["source"] = "intent_cache"
+    for leaf in result.get("intents") or []:
+        leaf["source"] = "intent_cache"
+    # Watch its execution: a replay that fails is dropped.
+    _track(key, utterance, fp, result, hit=True)
+    return result
+
+
+def remember(text: str, fp: str, result: dict) -> None:
+    """Hold a fresh LLM parse until its execution confirms it."""
+    leaves = _leaves(result)
+    if not leaves or any(l.get("intent") in _UNCACHEABLE_INTENTS for l in leaves):
+        return
+    if result.get("source") != "tools":
+        return
+    utterance = normalize(text)
+    _track(_key(utterance, fp), utterance, fp, copy.deepcopy(result), hit=False)
+
+
+def bypass() -> None:
+    _stats["bypass"] += 1
+
+
+def _track(key: str, utterance: str, fp: str, result: dict, *, hit: bool) -> None:
+    now = time.monotonic()
+    with _lock:
+        for k in [k for k, p in _pending.items() if now - p["ts"] > PENDING_TTL_S]:
+            del _pending[k]
+        while len(_pending) >= _PENDING_MAX:
+            _pending.pop(next(iter(_pending)))
+        _pending[key] = {
+            "utterance": utterance, "fingerprint": fp, "result": result, "hit": hit,
+            "outstanding": copy.deepcopy(_leaves(result)),
+            "ts": now,
+        }
+
+
+def confirm(intent: Optional[str], params: Optional[dict], result: dict) -> None:
+    """Record one executed intent. Called for every dispatched intent; never raises."""
+    try:
+        ok = bool(result.get("ok"))
+        with _lock:
+            found = next(((k, i) for k, p in _pending.items()
+                          for i, leaf in enumerate(p["outstanding"])
+                          if _matches(leaf, intent, params)), None)
+            if found is None:
+                return
+            key, idx = found
+            entry = _pending[key]
+            if not ok:
+                del _pending[key]
+            else:
+                del entry["outstanding"][idx]
+                if entry["outstanding"]:
+                    return
+                del _pending[key]
+        if not ok:
+            if entry["hit"]:
+                _drop(key)
+            return
+        _store(key, entry)
+    except Exception:
+        pass  # never let cache bookkeeping break command handling
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+def _connect() -> sqlite3.Connection:
+    global _ready_for
+    with _lock:
+        fresh = _ready_for != CACHE_DB or not CACHE_DB.exists()
+        if fresh:
+            CACHE_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(CACHE_DB, timeout=10.0)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if fresh:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            conn.commit()
+            _ready_for = CACHE_DB
+        return conn
+
+
+def _query(sql: str, args: list) -> list[tuple]:
+    try:
+        conn = _connect()
+    except (sqlite3.Error, OSError):
+        return []
+    try:
+        return conn.execute(sql, args).fetchall()
+    except sqlite3.Error:
+        return []
+    finally:
+        conn.close()
+
+
+def _store(key: str, entry: dict) -> None:
+    stored = copy.deepcopy(entry["result"])
+    stored["source"] = "tools"
+    for leaf in stored.get("intents") or []:
+        leaf["source"] = "tools"
+    try:
+        with _lock:
+            conn = _connect()
+            try:
+                conn.execute(
+                    "INSERT INTO intents (key, utterance, fingerprint, result, hits, confirmed_at)"
+                    " VALUES (?, ?, ?, ?, ?, ?)"
+                    " ON CONFLICT(key) DO UPDATE SET hits = hits + excluded.hits,"
+                    " confirmed_at = excluded.confirmed_at",
+                    (key, entry["utterance"], entry["fingerprint"], json.dumps(stored),
+                     1 if entry["hit"] else 0, time.time()),
+                )
+                conn.execute(
+                    "DELETE FROM intents WHERE key NOT IN"
+                    " (SELECT key FROM intents ORDER BY confirmed_at DESC LIMIT ?)",
+                    (MAX_ENTRIES,),
+                )
+                conn.commit()
+            finally:
+                conn.close()
+    except (sqlite3.Error, OSError):
+        return
+    if not entry["hit"]:
+        _stats["learned"] += 1
+
+
+def _drop(key: str) -> None:
+    try:
+        with _lock:
+            conn = _connect()
+            try:
+                conn.execute("DELETE FROM intents WHERE key = ?", (key,))
+                conn.commit()
+            finally:
+                conn.close()
+    except (sqlite3.Error, OSError):
+        return
+    _stats["dropped"] += 1
+
+
+def clear() -> None:
+    """Forget every learned parse (e.g. after a schema or prompt change)."""
+    with _lock:
+        _pending.clear()
+    try:
+        with _lock:
+            conn = _connect()
+            try:
+                conn.execute("DELETE FROM intents")
+                conn.commit()
+            finally:
+                conn.close()
+    except (sqlite3.Error, OSError):
+        pass
+
+
+def stats() -> dict:
+    rows = _query("SELECT COUNT(*) FROM intents", [])
+    return {**_stats, "entries": rows[0][0] if rows else 0, "pending": len(_pending)}
@@ -7,6 +7,7 @@ from integrations.openai_client import (
     require_cloud_llm_active,
 )
 from integrations.llm_gateway import chat_completion
+from core import intent_cache, prompt_prefix, tool_router
 
 # ---------------------------------------------------------------------------
 # Fast path — answered locally, no API call
@@ -270,6 +271,108 @@ def quick_parse(text: str, chat_history: list | None = None) -> dict:
     return _parse_with_tools(text, chat_history=chat_history)
 
 
+# Bumps whenever the prompt or tool schema changes, so learned parses from
+# an older schema are never replayed.
+_PROMPT_VERSION = intent_cache.fingerprint(SYSTEM_PROMPT, json.dumps(TOOLS, sort_keys=True))
+
+
+def _ir_hint() -> str:
+    # Live IR device list so GPT knows which devices exist and picks the
+    # right intent (ir_send_command vs control_tv / control_ac).
+    try:
+        from services.ir_manager import build_ir_context_hint
+        hint = build_ir_context_hint()
+        return "\n\n" + hint if hint else ""
+    except Exception:
+        return ""  # IR manager not yet configured — ignore silently
+
+
+def _rooms_hint() -> str:
+    # Live device-room map so GPT knows which rooms have which devices
+    # (needed for reliable multi-call enumeration like "turn on all lights").
+    try:
+        from services.device_registry import get_rooms_by_device_type
+        room_map = get_rooms_by_device_type()
+        if room_map:
+            parts = []
+            for dtype, rooms in sorted(room_map.items()):
+                parts.append(f"{dtype}: {', '.join(rooms)}")
+            return "\n\nConfigured devices by room: " + "; ".join(parts) + "."
+    except Exception:
+        pass
+    return ""
+
+
+def _version(module: str, stamp: str) -> object:
+    """The input stamp for a prompt block; unstampable → always rebuild."""
+    try:
+        import importlib
+        return getattr(importlib.import_module(module), stamp)()
+    except Exception:
+        return object()
+
+
+def _home_hints() -> tuple[str, str]:
+    """The per-home parts of the system prompt: (IR device hint, device-room map).
+
+    Served from core.prompt_prefix and only rebuilt when the IR device file
+    or the device registry generation moves.
+    """
+    _, ir_hint, rooms_hint = prompt_prefix.assemble("intent_parse", [
+        ("intent_parse.system", _PROMPT_VERSION, lambda: SYSTEM_PROMPT),
+        ("intent_parse.ir", _version("services.ir_manager", "devices_version"), _ir_hint),
+        ("intent_parse.rooms", _version("services.device_registry", "generation"), _rooms_hint),
+    ])
+    return ir_hint, rooms_hint
+
+
+def _complete(messages: list[dict], tools: list[dict] | None, groups: list[str],
+              text: str, fallback: bool = False):
+    """One tool-calling round trip. Returns (response, duration_ms) and reports
+    schema size, prompt tokens and latency on the debug bus."""
+    import time as _time
+    from core.debug_bus import bus as _dbus, VERBOSE
+    t0 = _time.perf_counter()
+    response = chat_completion(
+        "intent_parse",
+        messages,
+        tools=tools or TOOLS,
+        tool_choice="auto",
+        parallel_tool_calls=True,
+        # Parsing is a lookup, not a creative task: deterministic output
+        # also lets the relay answer repeats from its cache.
+        temperature=0,
+    )
+    duration_ms = round((_time.perf_counter() - t0) * 1000, 1)
+    if _dbus.is_active("intent", VERBOSE):
+        usage = getattr(response, "usage", None)
+        _dbus.emit("intent", VERBOSE, "gpt_parse_usage", input=text,
+                   tools=len(tools or TOOLS), pruned=tools is not None, groups=groups,
+                   fallback=fallback,
+                   schema_bytes=len(json.dumps(tools or TOOLS, separators=(",", ":"))),
+                   # Not "*_tokens": the bus masks any key containing "token".
+                   usage={"prompt": getattr(usage, "prompt_tokens", None),
+                          "completion": getattr(usage, "completion_tokens", None)},
+                   duration_ms=duration_ms)
+    return response, duration_ms
+
+
+def _context_live() -> bool:
+    """True while a conversation_context slot could resolve "the light" / "it"."""
+    try:
+        from core.conversation_context import get_bulk_context, get_context
+        return get_context() is not None or bool(get_bulk_context())
+    except Exception:
+        return True
+
+
+def _learn(text: str, home_fp: str | None, parsed: dict) -> dict:
+    """Offer a fresh parse to the intent cache, unless it may lean on context."""
+    if home_fp is not None and not _context_live():
+        intent_cache.remember(text, home_fp, parsed)
+    return parsed
+
+
 def _parse_with_tools(text: str, chat_history: list | None = None) -> dict:
     # Cloud LLM gate (Prompt 9 chunk 3). On gated subscription, fall
     # through to the unrecognized_command path — which is handled by
@@ -290,29 +393,24 @@ def _parse_with_tools(text: str, chat_history: list | None = None) -> dict:
     text = _normalize_hebrew_rooms(text)
     text = _normalize_hebrew_devices(text)
     try:
-        # Append live IR device list so GPT knows which devices exist and picks
-        # the right intent (ir_send_command vs control_tv / control_ac).
-        system = SYSTEM_PROMPT
-        try:
-            from services.ir_manager import build_ir_context_hint
-            ir_hint = build_ir_context_hint()
-            if ir_hint:
-                system = system + "\n\n" + ir_hint
-        except Exception:
-            pass  # IR manager not yet configured — ignore silently
-
-        # Inject live device-room map so GPT knows which rooms have which devices
-        # (needed for reliable multi-call enumeration like "turn on all lights").
-        try:
-            from services.device_registry import get_rooms_by_device_type
-            room_map = get_rooms_by_device_type()
-            if room_map:
-                parts = []
-                for dtype, rooms in sorted(room_map.items()):
-                    parts.append(f"{dtype}: {', '.join(rooms)}")
-                system = system + "\n\nConfigured devices by room: " + "; ".join(parts) + "."
-        except Exception:
-            pass
+        ir_hint, rooms_hint = _home_hints()
+        system = SYSTEM_PROMPT + ir_hint + rooms_hint
+
+        # Learned parses (core.intent_cache): a repeat of a command that
+        # executed cleanly before, against the same devices and rooms, is
+        # answered locally. Follow-up turns, pronouns and anything said while
+        # a last-device context is live always go to GPT.
+        home_fp = None
+        if not chat_history and intent_cache.cacheable(text) and not _context_live():
+            home_fp = intent_cache.fingerprint(_PROMPT_VERSION, ir_hint, rooms_hint)
+            cached = intent_cache.lookup(text, home_fp)
+            if cached is not None:
+                from core.debug_bus import bus as _dbus, VERBOSE
+                _dbus.emit("intent", VERBOSE, "intent_cache_hit", input=text,
+                           intent=cached.get("intent"))
+                return cached
+        else:
+            intent_cache.bypass()
 
         # Inject last-device context so GPT can resolve pronouns like
         # "it", "that", "turn it back on", "the light", etc.
@@ -332,21 +430,20 @@ def _parse_with_tools(text: str, chat_history: list | None = None) -> dict:
             messages.extend(chat_history[-10:])
         messages.append({"role": "user", "content": text})
 
-        import time as _time
         from core.debug_bus import bus as _dbus, BASIC, VERBOSE, TRACE
         _dbus.emit("intent", VERBOSE, "gpt_parse_start", input=text,
                    history_turns=len(chat_history) if chat_history else 0)
-        t0 = _time.perf_counter()
-
-        response = chat_completion(
-            "intent_parse",
-            messages,
-            tools=TOOLS,
-            tool_choice="auto",
-            parallel_tool_calls=True,
-        )
-        duration_ms = round((_time.perf_counter() - t0) * 1000, 1)
 
+        # Send only the tool groups this utterance can be about (core.tool_router).
+        # Follow-up turns keep the full list: "Office" or "22 degrees" is only
+        # meaningful against the tool the previous turn was filling in.
+        tools, groups = (None, []) if chat_history else tool_router.select_tools(f"{raw_text} {text}")
+        response, duration_ms = _complete(messages, tools, groups, text)
+        if tools is not None and not response.choices[0].message.tool_calls:
+            # The pruned set may simply have missed the right tool: ask again
+            # with everything before concluding there is nothing to call.
+            response, retry_ms = _complete(messages, None, [], text, fallback=True)
+            duration_ms = round(duration_ms + retry_ms, 1)
         msg = response.choices[0].message
 
         if msg.tool_calls:
@@ -391,7 +488,7 @@ def _parse_with_tools(text: str, chat_history: list | None = None) -> dict:
                                reason="no action vocabulary detected in raw input")
                     return {"intent": "unrecognized_command",
                             "params": {"text": raw_text}, "source": "confidence_gate"}
-                return parsed
+                return _learn(text, home_fp, parsed)
 
             # Multiple tool calls — filter out any that lack action vocabulary.
             # Skip the gate when there is chat history (same reason as above).
@@ -410,8 +507,9 @@ def _parse_with_tools(text: str, chat_history: list | None = None) -> dict:
                 return {"intent": "unrecognized_command",
                         "params": {"text": raw_text}, "source": "confidence_gate"}
             if len(filtered) == 1:
-                return filtered[0]
-            return {"intent": "__multi__", "intents": filtered, "params": {}, "source": "tools"}
+                return _learn(text, home_fp, filtered[0])
+            return _learn(text, home_fp, {"intent": "__multi__", "intents": filtered,
+                                          "params": {}, "source": "tools"})
 
         _dbus.emit("intent", VERBOSE, "gpt_no_tool_matched",
                    input=text, duration_ms=duration_ms,
@@ -0,0 +1,112 @@
+"""
+Prompt-prefix assembly for LLM calls.
+
+The intent parser, chat and the Pro-mode designer each put a large system
+prompt in front of every request, and most of it only changes when the home
+does: the IR device hint, the device-room map, the designer's home snapshot.
+Rebuilding those per request costs local time, and any byte that differs
+between two requests — a timestamp, a dict in another order — also defeats
+provider-side prompt caching, which only matches an identical prefix.
+
+So prompts are assembled from named blocks here:
+
+  * block(name, version, build) returns the cached text while `version` — a
+    stamp of the inputs the block is built from (device_registry.generation(),
+    ir_manager.devices_version(), the home-context snapshot, …) — is
+    unchanged, and calls build() once when it moves;
+  * assemble(purpose, parts) does that for a list of blocks and records, per
+    purpose, how long assembly took, how many blocks were reused vs rebuilt
+    and how often the whole prefix came out byte-identical to the previous
+    one for that purpose.
+
+Callers order their prompts stable-first (static rules, then home blocks,
+then anything per-request) so the identical part is a real prefix.
+
+Counters: stats(), surfaced on GET /api/debug/prompt-prefix.
+"""
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from typing import Callable, Hashable, Iterable
+
+_lock = threading.Lock()
+_blocks: dict[str, tuple[Hashable, str]] = {}
+_stats: dict[str, dict] = {}
+_last_prefix: dict[str, str] = {}
+
+
+def _new_stats() -> dict:
+    return {"assemblies": 0, "blocks_reused": 0, "blocks_built": 0,
+            "prefix_repeats": 0, "assembly_ms_total": 0.0, "last_assembly_ms": 0.0,
+            "prefix_bytes": 0}
+
+
+def block(name: str, version: Hashable, build: Callable[[], str]) -> tuple[str, bool]:
+    """(text, reused) for one named block at this input version."""
+    with _lock:
+        cached = _blocks.get(name)
+        if cached is not None and cached[0] == version:
+            return cached[1], True
+    # Build outside the lock: builders read files / other locks, and two
+    # concurrent rebuilds of the same version produce the same text.
+    text = build() or ""
+    with _lock:
+        _blocks[name] = (version, text)
+    return text, False
+
+
+def assemble(purpose: str,
+             parts: Iterable[tuple[str, Hashable, Callable[[], str]]]) -> list[str]:
+    """Texts of `parts` ((name, version, build) each), in order, with per-purpose accounting."""
+    t0 = time.perf_counter()
+    texts: list[str] = []
+    reused = built = 0
+    for name, version, build in parts:
+        text, hit = block(name, version, build)
+        texts.append(text)
+        if hit:
+            reused += 1
+        else:
+            built += 1
+    ms = (time.perf_counter() - t0) * 1000
+    digest = hashlib.sha1("\0".join(texts).encode("utf-8")).hexdigest()
+    with _lock:
+        s = _stats.setdefault(purpose, _new_stats())
+        s["assemblies"] += 1
+        s["blocks_reused"] += reused
+        s["blocks_built"] += built
+        s["assembly_ms_total"] += ms
+        s["last_assembly_ms"] = round(ms, 3)
+        s["prefix_bytes"] = sum(len(t.encode("utf-8")) for t in texts)
+        if _last_prefix.get(purpose) == digest:
+            s["prefix_repeats"] += 1
+        _last_prefix[purpose] = digest
+    return texts
+
+
+def clear() -> None:
+    """Drop every cached block (counters are kept)."""
+    with _lock:
+        _blocks.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        out = {}
+        for purpose, s in _stats.items():
+            n = s["assemblies"] or 1
+            out[purpose] = {
+                **s,
+                "assembly_ms_total": round(s["assembly_ms_total"], 3),
+                "assembly_ms_avg": round(s["assembly_ms_total"] / n, 3),
+                "prefix_reuse_rate": round(s["prefix_repeats"] / n, 3),
+            }
+        return {"purposes": out, "blocks": sorted(_blocks)}
+
+
+def reset_stats() -> None:
+    with _lock:
+        _stats.clear()
+        _last_prefix.clear()
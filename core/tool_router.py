@@ -0,0 +1,240 @@
+"""
+Per-utterance tool-schema pruning for the intent parser.
+
+core.tools_schema.TOOLS is ~67 KB of JSON (104 tools) and most of it is
+irrelevant to any one utterance: "turn off the kitchen light" has no use for
+the email, calendar or automation-designer schemas, which alone are a third
+of the payload. select_tools() picks the tool groups an utterance can be
+about, before the LLM call, from three cheap signals:
+
+  1. keyword vocabulary per group (English, plus the Hebrew verbs and nouns
+     that _normalize_hebrew_rooms/_normalize_hebrew_devices leave as-is);
+  2. the home's own rooms and device types — naming a room or a configured
+     device type pulls in the device-control groups;
+  3. a per-home usage prior: the groups of the intents this household runs
+     most, from the pattern event store (services.pattern_logger). The store
+     records intents, not utterances, so it can't train a text classifier;
+     as a prior it keeps the everyday tools in every pruned call.
+
+A small ALWAYS set rides along with every pruned selection. When nothing
+matches, select_tools() returns None and the caller sends the full list, as
+before. _parse_with_tools also falls back to the full list when the model
+calls no tool on a pruned request — see there.
+
+scripts/eval_tool_routing.py measures routing recall of this selection
+against the intents the full-schema parser chose for recorded utterances.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from typing import Optional
+
+from core.tools_schema import TOOLS
+
+# group → (tool names, keyword pattern)
+GROUPS: dict[str, tuple[tuple[str, ...], str]] = {
+    "lights": (
+        ("toggle_light", "set_light_color", "adjust_light_brightness",
+         "toggle_all_lights_in_room", "turn_off_all_lights"),
+        r"\b(lights?|lamps?|bulbs?|dim|dimmer|brighte?n?|brightness|colou?r|warm white|"
+        r"red|green|blue|purple|pink|orange|yellow)\b|מנורה|מנורות",
+    ),
+    "climate": (
+        ("control_ac", "set_ac_temperature", "get_temperature", "get_humidity",
+         "report_all_temperatures", "ir_set_ac_temperature"),
+        r"\b(ac|a/c|air ?con\w*|aircon|heat\w*|cool\w*|temp\w*|degrees?|warm|cold|hot|"
+        r"humid\w*|thermostat|climate)\b|°|חם|קר|מעלות|טמפרטורה|לחות",
+    ),
+    "tv_ir": (
+        ("control_tv", "set_tv_source", "ir_send_command", "ir_set_ac_temperature",
+         "ir_send_channel", "ir_play_sequence", "ir_learn_command"),
+        r"\b(tv|television|channel|volume|hdmi|source|input|remote|ir|mute|unmute|"
+        r"learn|netflix|projector|receiver|soundbar)\b|ערוץ|ווליום|שלט",
+    ),
+    "devices": (
+        ("control_device", "list_active_devices"),
+        r"\b(fan|blinds?|shades?|shutters?|curtains?|covers?|locks?|unlock|door|gate|garage|"
+        r"switch|plug|outlet|socket|boiler|heater|hot water|vacuum|valve|speaker|"
+        r"devices?|open|close)\b",
+    ),
+    "notes_files": (
+        ("save_note", "read_notes", "search_notes", "append_to_note", "delete_note",
+         "save_file", "read_file", "delete_file", "list_files", "ref_read_note_or_file"),
+        r"\b(notes?|files?|write down|jot|document)\b|פתק|הערה|קובץ",
+    ),
+    "tasks": (
+        ("add_task", "list_tasks", "mark_task_done", "remove_task", "remove_tasks",
+         "remove_last_task", "postpone_task", "task_summary", "countdown"),
+        r"\b(tasks?|to-?dos?|remind\w*|postpone|timer|countdown|count down|done with|"
+        r"finished)\b|משימ|תזכיר|תזכורת|טיימר",
+    ),
+    "events": (
+        ("add_event", "list_events", "remove_event", "days_until_event", "next_event",
+         "visual_cast_calendar"),
+        r"\b(events?|calendar|appointments?|meetings?|birthday|anniversary|days until|"
+        r"how many days|next)\b|אירוע|יומן|פגישה|יום הולדת",
+    ),
+    "memory": (
+        ("remember_memory", "recall_memory", "delete_memory", "ref_search_history_or_memory"),
+        r"\b(remember|forget|recall|memory|memories|what did i|do you know)\b|תזכור|תשכח|זוכר",
+    ),
+    "time": (
+        ("get_time", "get_date", "get_day_of_week", "get_sun_times"),
+        r"\b(time|date|day|today|tomorrow|sunrise|sunset|weekday)\b|שעה|תאריך|זריחה|שקיעה",
+    ),
+    "system": (
+        ("get_system_status", "get_ip_address", "get_disk_usage", "get_wifi_status",
+         "get_network_adapters", "ping_test", "restart_ziggy", "shutdown_ziggy",
+         "get_internet_speed", "get_internet_status", "debug_mode"),
+        r"\b(system|ip|disk|storage|wi-?fi|network|adapters?|ping|restart|reboot|shut ?down|"
+        r"internet|online|offline|speed ?test|debug\w*|cpu)\b|אינטרנט|רשת|הפעל מחדש",
+    ),
+    "media": (
+        ("media_stream_youtube", "media_spotify_playlist", "media_start_movie_in_app",
+         "media_cast_camera_live", "media_play_podcast_episode"),
+        r"\b(play|music|songs?|spotify|playlists?|youtube|movies?|films?|podcasts?|episode|"
+        r"stream|watch)\b|שיר|מוזיקה|סרט|פודקאסט|תנגן",
+    ),
+    "web": (
+        ("web_recipe_read", "web_news_brief", "web_trip_updates", "web_stocks_update",
+         "web_search_summary", "get_weather", "ref_read_saved_recipe"),
+        r"\b(weather|forecast|rain\w*|sunny|news|headlines|recipes?|cook\w*|stocks?|market|"
+        r"trip|traffic|commute|flight|search|look up|google)\b|מזג|גשם|חדשות|מתכון|מניות|חפש",
+    ),
+    "comm": (
+        ("comm_read_emails", "comm_send_email", "comm_quick_message",
+         "comm_broadcast_announcement", "comm_read_sms"),
+        r"\b(e-?mails?|mail|inbox|messages?|sms|texts?|send|announce\w*|broadcast|whatsapp|"
+        r"tell)\b|מייל|הודעה|תשלח|הכרזה",
+    ),
+    "visual": (
+        ("visual_cast_calendar", "visual_cast_album", "visual_cast_camera",
+         "visual_image_slideshow", "media_cast_camera_live"),
+        r"\b(show|display|cast|album|photos?|pictures?|slideshow|cameras?)\b|תראה|תמונות|מצלמה",
+    ),
+    "household": (
+        ("is_someone_home", "add_shopping_list_item", "get_shopping_list", "ref_show_grocery"),
+        r"\b(who'?s|anyone|anybody|someone|somebody|home|shopping|grocer\w*|buy|milk|bread)\b"
+        r"|מי בבית|קניות|תקנה|רשימת",
+    ),
+    "automations": (
+        ("create_automation", "list_automations", "delete_automation", "toggle_automation",
+         "update_automation", "create_occupancy_sensor", "design_automation_set",
+         "apply_automation_bundle", "list_blueprints", "instantiate_blueprint"),
+        r"\b(automations?|automate\w*|automatically|routines?|schedules?|scheduled|every|"
+        r"each|daily|nightly|whenever|when|at \d|blueprints?|templates?|scenes?|"
+        r"occupancy|presence|motion|sensors?|smart|mode)\b|אוטומציה|שגרה|תבנית|חכם|כל יום|כל בוקר",
+    ),
+    "anomalies": (
+        ("get_active_anomalies",),
+        r"\b(anomal\w*|unusual|weird|strange|wrong|alerts?|problems?|issues?)\b|חריג|בעיה",
+    ),
+}
+
+# Small, generic tools that stay in every pruned request.
+ALWAYS = ("turn_off_everything", "list_rooms", "ziggy_chat", "ziggy_help",
+          "ziggy_identity", "ziggy_status")
+
+# Device-control verbs that don't name a device: any device group may apply.
+_CONTROL_VERBS = re.compile(
+    r"\b(turn|switch|set|make|put)\b|תדליק|הדלק|תכבה|כבה|תפתח|פתח|תסגור|סגור|תפעיל|הפעל",
+    re.IGNORECASE)
+_DEVICE_GROUPS = ("lights", "climate", "tv_ir", "devices")
+
+# Registry device types → groups, for "configured device type named" matches.
+_DTYPE_GROUPS = {
+    "light": ("lights",), "climate": ("climate",), "ac": ("climate", "tv_ir"),
+    "tv": ("tv_ir",), "media_player": ("tv_ir", "media"),
+}
+
+PRIOR_TOP_N = 3
+PRIOR_LOOKBACK_DAYS = 30
+_PRIOR_TTL_S = 900
+
+_BY_NAME = {t["function"]["name"]: t for t in TOOLS}
+_PATTERNS = {g: re.compile(p, re.IGNORECASE) for g, (_, p) in GROUPS.items()}
+_GROUP_OF: dict[str, str] = {}
+for _g, (_names, _) in GROUPS.items():
+    for _n in _names:
+        _GROUP_OF.setdefault(_n, _g)
+
+_lock = threading.Lock()
+_prior: tuple[float, tuple[str, ...]] = (0.0, ())
+# (personal alias keys it was built from, pattern) — rebuilt when the user's
+# rooms change in settings, so a room added at runtime counts straight away.
+_rooms_re: tuple[tuple[str, ...], re.Pattern] | None = None
+
+
+def _room_pattern() -> re.Pattern:
+    global _rooms_re
+    from core.settings_loader import settings
+    aliases = settings.get("room_aliases") or {}
+    key = tuple(sorted(aliases))
+    if _rooms_re is None or _rooms_re[0] != key:
+        from services.room_alias_bank import all_known_room_names
+        names = sorted(all_known_room_names(aliases), key=len, reverse=True)
+        names = [re.escape(n.replace("_", " ")) for n in names if n]
+        _rooms_re = (key, re.compile(r"\b(" + "|".join(names) + r")\b", re.IGNORECASE) if names
+                     else re.compile(r"(?!)"))
+    return _rooms_re[1]
+
+
+def usage_prior() -> tuple[str, ...]:
+    """Groups of this home's most-run intents (refreshed every 15 minutes)."""
+    global _prior
+    now = time.monotonic()
+    with _lock:
+        if now - _prior[0] < _PRIOR_TTL_S:
+            return _prior[1]
+    groups: tuple[str, ...] = ()
+    try:
+        from collections import Counter
+        from services.pattern_logger import load_events
+        counts = Counter(ev.get("intent") for ev in load_events(PRIOR_LOOKBACK_DAYS)
+                         if ev.get("result") == "ok")
+        seen: list[str] = []
+        for intent, _ in counts.most_common():
+            g = _GROUP_OF.get(intent)
+            if g and g not in seen:
+                seen.append(g)
+            if len(seen) >= PRIOR_TOP_N:
+                break
+        groups = tuple(seen)
+    except Exception:
+        pass
+    with _lock:
+        _prior = (now, groups)
+    return groups
+
+
+def select_groups(text: str, room_map: Optional[dict] = None) -> list[str]:
+    """Tool groups the utterance can be about, keyword and home signals only."""
+    if room_map is None:
+        try:
+            from services.device_registry import get_rooms_by_device_type
+            room_map = get_rooms_by_device_type()
+        except Exception:
+            room_map = {}
+    groups = [g for g, pat in _PATTERNS.items() if pat.search(text)]
+    home_signal = bool(_room_pattern().search(text))
+    for dtype in (room_map or {}):
+        if re.search(rf"\b{re.escape(dtype.replace('_', ' '))}s?\b", text, re.IGNORECASE):
+            home_signal = True
+            groups.extend(_DTYPE_GROUPS.get(dtype, ()))
+    if home_signal or _CONTROL_VERBS.search(text):
+        groups.extend(_DEVICE_GROUPS)
+    return list(dict.fromkeys(groups))
+
+
+def select_tools(text: str, room_map: Optional[dict] = None) -> tuple[Optional[list[dict]], list[str]]:
+    """(tools, groups) for one utterance; tools is None when the full list should go."""
+    groups = select_groups(text, room_map)
+    if not groups:
+        return None, []
+    groups = list(dict.fromkeys(groups + list(usage_prior())))
+    names = dict.fromkeys(ALWAYS)
+    for g in groups:
+        names.update(dict.fromkeys(GROUPS[g][0]))
+    return [_BY_NAME[n] for n in names if n in _BY_NAME], groups
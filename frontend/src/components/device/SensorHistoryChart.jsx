@@ -1,10 +1,9 @@
 import { useEffect, useMemo, useState } from 'react'
 import { getEntityHistory } from '../../lib/api'
 
-// Hand-rolled SVG line chart — no chart library. The dataset is at most a
-// few hundred points per 24h (HA emits state_changed only when the value
-// actually changes), so an SVG path is plenty fast and ships zero extra
-// bundle weight.
+// Hand-rolled SVG line chart — no chart library. The backend decimates the
+// series to the chart's pixel width (one point per viewBox unit), so an SVG
+// path is plenty fast and ships zero extra bundle weight.
 //
 // Visual contract:
 //   - 280×96 viewBox with 8px insets on the value axis
@@ -57,7 +56,7 @@ export default function SensorHistoryChart({ entityId, unitFallback }) {
   useEffect(() => {
     let cancelled = false
     setLoading(true); setError(false)
-    getEntityHistory(entityId, range.hours)
+    getEntityHistory(entityId, range.hours, W)
       .then((r) => {
         if (cancelled) return
         const parsed = (r?.points || [])
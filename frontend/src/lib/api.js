@@ -806,8 +806,8 @@ export const getPushDevices        = ()       => get('/push/devices')
 export const revokePushDevice      = (ep)     => del('/push/subscribe', { endpoint: ep })
 export const getIntegrationsSettings = () => get('/settings/integrations')
 export const patchIntegrationsSettings = (data) => patch('/settings/integrations', data)
-export const getEntityHistory = (entityId, hours = 24) =>
-  get(`/devices/${encodeURIComponent(entityId)}/history?hours=${hours}`)
+export const getEntityHistory = (entityId, hours = 24, points = 0) =>
+  get(`/devices/${encodeURIComponent(entityId)}/history?hours=${hours}${points ? `&points=${points}` : ''}`)
 export const getFeaturesSettings = () => get('/settings/features')
 export const patchFeaturesSettings = (data) => patch('/settings/features', data)
 export const getDebugSettings = () => get('/settings/debug')
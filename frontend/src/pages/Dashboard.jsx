@@ -883,19 +883,23 @@ export default function Dashboard() {
   // Live refresh from the WS bus:
   //   - anomaly_active / anomaly_cleared → reload anomalies
   //   - presence_transition → reload presence persons
+  //   - health_changed → refetch /api/health (offline / battery summary moved)
   // Walk newest-to-oldest until we hit a message we've already processed.
   const messages = useWsMessages()
   const lastSeenWsTs = useRef(0)
   useEffect(() => {
     let refreshAnomalies = false
     let refreshPresence  = false
+    let refreshHealth    = false
     for (let i = messages.length - 1; i >= 0; i--) {
       const m = messages[i]
       if (!m || m.ts <= lastSeenWsTs.current) break
       if (m.type === 'anomaly_active' || m.type === 'anomaly_cleared') refreshAnomalies = true
       if (m.type === 'presence_transition') refreshPresence = true
+      if (m.type === 'health_changed') refreshHealth = true
     }
     if (refreshAnomalies) loadAnomalies()
+    if (refreshHealth) getHealth().then(setHealth).catch(() => {})
     if (refreshPresence) {
       getPresencePersons().then(r => setPresencePersons(r.persons ?? [])).catch(() => {})
     }
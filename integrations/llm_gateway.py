@@ -138,6 +138,10 @@ def chat_completion(
 
     Callers should access .choices[0].message.{content,tool_calls} as they
     would on a direct OpenAI client — Ollama exposes the same shape.
+
+    OpenAI calls carry the purpose in X-Ziggy-Purpose. The relay's LLM proxy
+    uses it to decide whether a temperature-0 call may be answered from its
+    response cache (relay/app/llm_cache.py); OpenAI itself ignores it.
     """
     backend, model = _resolve(purpose)
     if backend == _BACKEND_OPENAI_WHISPER:
@@ -161,6 +165,8 @@ def chat_completion(
         kwargs["timeout"] = timeout
     if response_format is not None:
         kwargs["response_format"] = response_format
+    if backend == _BACKEND_OPENAI:
+        kwargs["extra_headers"] = {"X-Ziggy-Purpose": purpose}
     return client.chat.completions.create(**kwargs)
 
 
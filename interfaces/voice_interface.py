@@ -632,6 +632,7 @@ def _translate_via_gpt_cached(text: str) -> str | None:
                 {"role": "system", "content": _TRANSLATE_SYSTEM},
                 {"role": "user", "content": text},
             ],
+            temperature=0,         # deterministic, so the relay's LLM cache can serve it
             max_tokens=150,
             timeout=3,
         )
@@ -11,18 +11,205 @@ server now). All comparisons use constant-time hmac.compare_digest.
 
 from __future__ import annotations
 
+import asyncio
 import hashlib
 import hmac
+import logging
+import os
 import time
 from datetime import datetime, timezone
 from typing import Optional
 
-from .database import get_db
+from .database import run_write
+
+log = logging.getLogger(__name__)
 
 
 # ---------------------------------------------------------------------------
 # Audit log
 # ---------------------------------------------------------------------------
+#
+# Every hub posts telemetry and polls its OTA manifest every few minutes, so
+# `telemetry_posted` and `ota_manifest_served` are the vast majority of audit
+# rows (357 of 400 in the fleet activity sample). Those two never need to be
+# read back by the request that produced them, so they do not write inline:
+#
+#   * log_event() puts them on an in-process queue (AUDIT_QUEUE_MAX entries)
+#     and returns. A background flusher, started from main.py's lifespan,
+#     writes what has queued up as one multi-row insert: when AUDIT_BATCH_MAX
+#     events are waiting, or AUDIT_FLUSH_INTERVAL_S after the first one.
+#     stop_audit_writer() drains the queue on shutdown.
+#   * AUDIT_HF_MODE decides what a *successful* one becomes:
+#       rollup  (default) a +1 on the per-home daily counter in audit_rollup;
+#               no audit_log row. The table grows with days, not hub polls.
+#       sample  the counter, plus every AUDIT_SAMPLE_EVERY-th event per
+#               (event, home) kept as a full audit_log row.
+#       rows    one audit_log row per event, as before.
+#     Failures (bad signature, unknown home, ...) are always individual rows.
+#   * When the queue is full, successes are dropped and counted in
+#     audit_stats()["dropped"]; failures are written inline instead, so
+#     back-pressure lands on the caller rather than losing them.
+#
+# Every other event is written inline through database.run_write, exactly as
+# before: they are rare, and callers such as support_session read back the
+# row they just wrote. Without a running flusher (tests, scripts) the queued
+# events are written inline too, through the same rollup path.
+
+HIGH_FREQUENCY_EVENTS = frozenset({"telemetry_posted", "ota_manifest_served"})
+
+AUDIT_HF_MODE = os.getenv("RELAY_AUDIT_HF_MODE", "rollup")
+AUDIT_SAMPLE_EVERY = int(os.getenv("RELAY_AUDIT_SAMPLE_EVERY", "12"))  # ~1/h at 5 min
+AUDIT_QUEUE_MAX = int(os.getenv("RELAY_AUDIT_QUEUE_MAX", "10000"))
+AUDIT_BATCH_MAX = 500
+AUDIT_FLUSH_INTERVAL_S = float(os.getenv("RELAY_AUDIT_FLUSH_S", "1.0"))
+
+_INSERT_ROW = """INSERT INTO audit_log (ts, event, home_id, source_ip, ok, detail)
+                 VALUES (?,?,?,?,?,?)"""
+
+_UPSERT_ROLLUP = """
+INSERT INTO audit_rollup (day, event, home_id, count, first_ts, last_ts, source_ip, detail)
+VALUES (?,?,?,?,?,?,?,?)
+ON CONFLICT(day, event, home_id) DO UPDATE SET
+    count     = count + excluded.count,
+    first_ts  = MIN(first_ts, excluded.first_ts),
+    last_ts   = MAX(last_ts, excluded.last_ts),
+    source_ip = CASE WHEN excluded.last_ts >= last_ts THEN excluded.source_ip ELSE source_ip END,
+    detail    = CASE WHEN excluded.last_ts >= last_ts THEN excluded.detail ELSE detail END
+"""
+
+# Position of each field in an audit row tuple.
+_TS, _EVENT, _HOME, _IP, _OK, _DETAIL = range(6)
+
+
+def _new_stats() -> dict:
+    return {"queued": 0, "flushes": 0, "flush_errors": 0, "max_batch": 0,
+            "rows": 0, "rolled_up": 0, "dropped": 0, "inline": 0}
+
+
+_stats = _new_stats()
+_sample_seen: dict[tuple[str, str], int] = {}
+
+
+def _plan(batch: list[tuple]) -> tuple[list[tuple], list[tuple]]:
+    """Split audit rows into audit_log inserts and audit_rollup upserts."""
+    rows: list[tuple] = []
+    buckets: dict[tuple[str, str, str], list] = {}
+    for row in batch:
+        if AUDIT_HF_MODE == "rows" or row[_EVENT] not in HIGH_FREQUENCY_EVENTS or not row[_OK]:
+            rows.append(row)
+            continue
+        home = row[_HOME] or ""
+        key = (row[_TS][:10], row[_EVENT], home)
+        b = buckets.get(key)
+        if b is None:
+            buckets[key] = [1, row[_TS], row[_TS], row[_IP], row[_DETAIL]]
+        else:
+            b[0] += 1
+            b[1] = min(b[1], row[_TS])
+            if row[_TS] >= b[2]:
+                b[2:] = [row[_TS], row[_IP], row[_DETAIL]]
+        if AUDIT_HF_MODE == "sample":
+            n = _sample_seen.get((row[_EVENT], home), 0)
+            _sample_seen[(row[_EVENT], home)] = n + 1
+            if n % max(AUDIT_SAMPLE_EVERY, 1) == 0:
+                rows.append(row)
+    rollups = [(*key, *b) for key, b in buckets.items()]
+    return rows, rollups
+
+
+async def _write(batch: list[tuple]) -> None:
+    rows, rollups = _plan(batch)
+
+    async def _insert(db) -> None:
+        if rows:
+            await db.executemany(_INSERT_ROW, rows)
+        if rollups:
+            await db.executemany(_UPSERT_ROLLUP, rollups)
+
+    await run_write(_insert)
+    _stats["rows"] += len(rows)
+    _stats["rolled_up"] += sum(r[3] for r in rollups)
+
+
+class _AuditWriter:
+    def __init__(self, maxsize: int) -> None:
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize)
+        self._full = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        # The sentinel queues behind everything already accepted, so the
+        # flusher writes all of it before returning.
+        self._full.set()
+        await self.queue.put(None)
+        await self._task
+
+    def offer(self, row: tuple) -> bool:
+        try:
+            self.queue.put_nowait(row)
+        except asyncio.QueueFull:
+            return False
+        if self.queue.qsize() >= AUDIT_BATCH_MAX:
+            self._full.set()
+        return True
+
+    async def _run(self) -> None:
+        while True:
+            first = await self.queue.get()
+            if first is None:
+                return
+            try:
+                await asyncio.wait_for(self._full.wait(), AUDIT_FLUSH_INTERVAL_S)
+            except asyncio.TimeoutError:
+                pass
+            self._full.clear()
+            batch, done = [first], False
+            while len(batch) < AUDIT_BATCH_MAX and not self.queue.empty():
+                row = self.queue.get_nowait()
+                if row is None:
+                    done = True
+                    break
+                batch.append(row)
+            if self.queue.qsize() >= AUDIT_BATCH_MAX:
+                self._full.set()
+            try:
+                await _write(batch)
+                _stats["flushes"] += 1
+                _stats["max_batch"] = max(_stats["max_batch"], len(batch))
+            except Exception:
+                # Audit logging must never break anything, the flusher included.
+                _stats["flush_errors"] += 1
+                log.exception("audit flush of %d events failed", len(batch))
+            if done:
+                return
+
+
+_writer: Optional[_AuditWriter] = None
+
+
+def start_audit_writer() -> None:
+    """Start the background flusher. Called from main.py's lifespan."""
+    global _writer
+    if _writer is None:
+        _writer = _AuditWriter(AUDIT_QUEUE_MAX)
+        _writer.start()
+
+
+async def stop_audit_writer() -> None:
+    """Flush everything queued and stop. Later events are written inline."""
+    global _writer
+    writer, _writer = _writer, None
+    if writer is not None:
+        await writer.stop()
+
+
+def audit_stats() -> dict:
+    return {**_stats, "mode": AUDIT_HF_MODE, "running": _writer is not None,
+            "queue_depth": _writer.queue.qsize() if _writer else 0}
+
 
 async def log_event(
     event: str,
@@ -32,22 +219,31 @@ async def log_event(
     ok: bool = True,
     detail: Optional[str] = None,
 ) -> None:
-    """Insert one row into audit_log. Best-effort; never raises."""
+    """Record one audit event. Best-effort; never raises.
+
+    High-frequency hub events are queued for the background flusher and
+    may become a counter rather than a row (see above); everything else is
+    written before this returns, through the shared writer
+    (database.run_write).
+    """
+    row = (
+        datetime.now(timezone.utc).isoformat(),
+        event,
+        home_id,
+        source_ip,
+        1 if ok else 0,
+        detail,
+    )
+    if event in HIGH_FREQUENCY_EVENTS and _writer is not None:
+        if _writer.offer(row):
+            _stats["queued"] += 1
+            return
+        if ok:
+            _stats["dropped"] += 1
+            return
+    _stats["inline"] += 1
     try:
-        async with get_db() as db:
-            await db.execute(
-                """INSERT INTO audit_log (ts, event, home_id, source_ip, ok, detail)
-                   VALUES (?,?,?,?,?,?)""",
-                (
-                    datetime.now(timezone.utc).isoformat(),
-                    event,
-                    home_id,
-                    source_ip,
-                    1 if ok else 0,
-                    detail,
-                ),
-            )
-            await db.commit()
+        await _write([row])
     except Exception:
         # Audit logging must never break the request path.
         pass
@@ -44,6 +44,7 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
+from .. import home_routes
 from ..audit import log_event
 from ..auth import require_role
 from ..database import get_db
@@ -119,6 +120,7 @@ async def mark_kit_received(home_id: str, body: KitReceivedBody, request: Reques
             f"UPDATE homes SET {', '.join(sets)} WHERE id=?", args,
         )
         await db.commit()
+    home_routes.invalidate(home_id)
 
     await log_event(
         "kit_received_marked", home_id=home_id, ok=True,
@@ -53,6 +53,7 @@ from typing import Any, Awaitable, Callable, Optional
 
 from fastapi import APIRouter, HTTPException, Request
 
+from .. import home_routes
 from ..audit import log_event
 from ..database import get_db
 from . import SUBSCRIPTION_STATES
@@ -133,6 +134,8 @@ async def _set_state(
             f"UPDATE homes SET {', '.join(sets)} WHERE id=?", args
         )
         await db.commit()
+    # The proxy gates on subscription_state; drop its cached decisions.
+    home_routes.invalidate(home_id)
 
     await log_event(
         "subscription_state_changed", home_id=home_id, ok=True,
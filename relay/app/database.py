@@ -1,8 +1,12 @@
 from __future__ import annotations
 
 import aiosqlite
+import asyncio
 import os
 from contextlib import asynccontextmanager
+from typing import Awaitable, Callable, Optional, TypeVar
+
+T = TypeVar("T")
 
 DATABASE_URL = os.getenv("DATABASE_URL", "/data/relay.db")
 
@@ -56,6 +60,23 @@ CREATE TABLE IF NOT EXISTS audit_log (
     detail      TEXT
 );
 
+-- Per-home daily counters for successful high-frequency audit events
+-- (telemetry_posted, ota_manifest_served). In the default 'rollup' mode
+-- (audit.AUDIT_HF_MODE) these replace one audit_log row per hub poll; failed
+-- attempts are still written to audit_log individually. home_id is ''
+-- when the event carried none, so it can sit in the primary key.
+CREATE TABLE IF NOT EXISTS audit_rollup (
+    day         TEXT    NOT NULL,   -- YYYY-MM-DD (UTC)
+    event       TEXT    NOT NULL,
+    home_id     TEXT    NOT NULL DEFAULT '',
+    count       INTEGER NOT NULL DEFAULT 0,
+    first_ts    TEXT    NOT NULL,
+    last_ts     TEXT    NOT NULL,
+    source_ip   TEXT,               -- of the newest event
+    detail      TEXT,               -- of the newest event
+    PRIMARY KEY (day, event, home_id)
+);
+
 -- Per-home wrapped key material for the encrypted backup pipeline.
 -- See DESIGN_BACKUP_DR.md §4 (envelope encryption) and §10 (this schema).
 --
@@ -86,9 +107,12 @@ CREATE TABLE IF NOT EXISTS home_backup_keys (
 -- last automation trigger. The relay never interprets the payload — it
 -- writes it as JSON text and lets the admin dashboard parse on read.
 --
--- Retention (relay/app/telemetry_retention.py runs daily):
+-- Retention (relay/app/telemetry_retention.py):
 --   telemetry_raw    — 30 days
---   telemetry_daily  — 365 days, aggregated from raw at end-of-day
+--   telemetry_hourly — 30 days, running per-hour aggregates folded from raw
+--                      every 5 min past a high-water mark (each raw row is
+--                      parsed once)
+--   telemetry_daily  — 365 days, rebuilt from hourly at end-of-day
 --
 -- Aggregation is one row per (home_id, day). last_seen_ts records the
 -- newest sample inside that day's window so a stale aggregate is
@@ -115,6 +139,66 @@ CREATE TABLE IF NOT EXISTS telemetry_daily (
     PRIMARY KEY (home_id, day)
 );
 
+-- One row per (home_id, UTC hour 'YYYY-MM-DDTHH'). Per metric: sum, n,
+-- min, max — mergeable, so a late batch folds in without re-reading raw.
+-- *_version_ts is the ts of the newest non-empty version string.
+CREATE TABLE IF NOT EXISTS telemetry_hourly (
+    home_id            TEXT    NOT NULL,
+    hour               TEXT    NOT NULL,
+    sample_count       INTEGER NOT NULL DEFAULT 0,
+    uptime_s_sum       REAL    NOT NULL DEFAULT 0,
+    uptime_s_n         INTEGER NOT NULL DEFAULT 0,
+    uptime_s_min       REAL,
+    uptime_s_max       REAL,
+    sensor_count_sum   REAL    NOT NULL DEFAULT 0,
+    sensor_count_n     INTEGER NOT NULL DEFAULT 0,
+    sensor_count_min   REAL,
+    sensor_count_max   REAL,
+    disk_pct_sum       REAL    NOT NULL DEFAULT 0,
+    disk_pct_n         INTEGER NOT NULL DEFAULT 0,
+    disk_pct_min       REAL,
+    disk_pct_max       REAL,
+    cpu_pct_sum        REAL    NOT NULL DEFAULT 0,
+    cpu_pct_n          INTEGER NOT NULL DEFAULT 0,
+    cpu_pct_min        REAL,
+    cpu_pct_max        REAL,
+    mem_pct_sum        REAL    NOT NULL DEFAULT 0,
+    mem_pct_n          INTEGER NOT NULL DEFAULT 0,
+    mem_pct_min        REAL,
+    mem_pct_max        REAL,
+    ha_version         TEXT,
+    ha_version_ts      TEXT,
+    ziggy_version      TEXT,
+    ziggy_version_ts   TEXT,
+    last_seen_ts       TEXT,
+    PRIMARY KEY (home_id, hour)
+);
+
+-- Fold bookkeeping for telemetry_retention: raw_hwm (last telemetry_raw.id
+-- folded into hourly) and daily_dirty_from (oldest day with hourly changes
+-- not yet published to telemetry_daily).
+CREATE TABLE IF NOT EXISTS telemetry_rollup_state (
+    key    TEXT PRIMARY KEY,
+    value  TEXT
+);
+
+-- Latest telemetry per home, interpreted at ingest (relay/app/home_latest.py).
+-- Upserted by POST /api/devices/{device_id}/telemetry in the same transaction
+-- as the telemetry_raw insert, so the fleet page and the remediator read one
+-- row per home instead of a GROUP BY over every raw post. `vitals` and
+-- `issues` are JSON (fleet_health.vitals / payload_issues); `rules` is the
+-- fingerprint of the fleet_health rules that produced them. Not pruned by
+-- retention — a long-silent hub must still read as silent.
+CREATE TABLE IF NOT EXISTS home_latest (
+    home_id   TEXT    PRIMARY KEY,
+    ts        TEXT    NOT NULL,               -- newest telemetry_raw.ts
+    raw_id    INTEGER,                        -- its telemetry_raw.id
+    payload   TEXT,                           -- its payload, for re-evaluation
+    vitals    TEXT    NOT NULL,
+    issues    TEXT    NOT NULL,
+    rules     TEXT    NOT NULL
+);
+
 -- OTA release catalog. Each row is an admin-authored target version that
 -- hubs may converge to. Resolution at GET /api/devices/{device_id}/ota-manifest:
 --   1. If homes.ota_pinned_release_id is set, return that release.
@@ -219,6 +303,8 @@ CREATE INDEX IF NOT EXISTS idx_audit_event    ON audit_log(event, ts);
 CREATE INDEX IF NOT EXISTS idx_audit_home     ON audit_log(home_id, ts);
 CREATE INDEX IF NOT EXISTS idx_ota_releases_created ON ota_releases(created_at DESC);
 CREATE INDEX IF NOT EXISTS idx_telemetry_raw_home_ts ON telemetry_raw(home_id, ts DESC);
+CREATE INDEX IF NOT EXISTS idx_telemetry_raw_ts ON telemetry_raw(ts);
+CREATE INDEX IF NOT EXISTS idx_telemetry_hourly_hour ON telemetry_hourly(hour);
 CREATE INDEX IF NOT EXISTS idx_telemetry_daily_day ON telemetry_daily(day);
 CREATE INDEX IF NOT EXISTS idx_home_cohorts_cohort  ON home_cohorts(cohort_name);
 CREATE INDEX IF NOT EXISTS idx_founder_slots_home   ON founder_slots(home_id);
@@ -243,6 +329,9 @@ BACKUP_AUDIT_EVENTS = (
 async def init_db():
     os.makedirs(os.path.dirname(DATABASE_URL), exist_ok=True)
     async with aiosqlite.connect(DATABASE_URL) as db:
+        # WAL is a property of the file, so set it once here: readers stop
+        # blocking behind the writer on every connection, pooled or not.
+        await db.execute("PRAGMA journal_mode=WAL")
         await db.executescript(SCHEMA)
         # Idempotent column addition for pre-Task-4 deployments. CREATE TABLE
         # IF NOT EXISTS leaves an existing users table alone, so the column
@@ -304,11 +393,218 @@ async def init_db():
             # Set when subscription_state flips to 'cancelled'. Drives the
             # 90-day post-cancellation B2 retention cron (chunk 3, decision 9).
             await db.execute("ALTER TABLE homes ADD COLUMN cancelled_at TEXT")
+        # home_latest arrived after telemetry_raw: seed it for homes that
+        # reported before the read model existed. A no-op once populated.
+        from .home_latest import backfill
+        await backfill(db)
         await db.commit()
 
 
+# ---------------------------------------------------------------------------
+# Connection pool
+# ---------------------------------------------------------------------------
+#
+# Without a pool every get_db() spawns an aiosqlite worker thread and opens
+# the file — on telemetry ingest, every OTA poll, every proxied request's
+# _authorize_home and every audit row. open_pool() (called from main.py's
+# lifespan) replaces that with long-lived connections:
+#
+#   * POOL_SIZE general connections handed out by get_db(). WAL lets them
+#     read concurrently with each other and with a writer; a handler that
+#     writes on one still works as before (busy_timeout covers the brief
+#     wait for SQLite's single write lock).
+#   * one dedicated writer connection behind run_write(). Write units queue
+#     up and the writer task runs everything queued as ONE transaction —
+#     each unit inside its own SAVEPOINT, so a failing unit is rolled back
+#     alone — and commits once. Under a burst of hub posts that is one
+#     commit per batch instead of per request.
+#
+# When no pool is open for the current DATABASE_URL (tests, scripts, a
+# pool opened against a path since changed) get_db() and run_write() fall
+# back to a fresh connection per call, exactly as before.
+
+POOL_SIZE = int(os.getenv("RELAY_DB_POOL_SIZE", "4"))
+WRITE_BATCH_MAX = 256
+
+_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    # WAL + NORMAL: commits don't fsync, checkpoints do. A power cut can lose
+    # the last few commits, never corrupt the file.
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA cache_size=-16000",       # KiB → 16 MB page cache per connection
+    "PRAGMA mmap_size=134217728",     # 128 MB memory-mapped reads
+    "PRAGMA temp_store=MEMORY",
+)
+
+
+async def _connect(path: str, **kwargs) -> aiosqlite.Connection:
+    conn = await aiosqlite.connect(path, **kwargs)
+    conn.row_factory = aiosqlite.Row
+    for pragma in _PRAGMAS:
+        await conn.execute(pragma)
+    return conn
+
+
+class _Pool:
+    def __init__(self, path: str, size: int) -> None:
+        self.path = path
+        self.size = size
+        self._idle: asyncio.Queue = asyncio.Queue()
+        self._conns: list[aiosqlite.Connection] = []
+        self._writer: Optional[aiosqlite.Connection] = None
+        self._writes: asyncio.Queue = asyncio.Queue()
+        self._writer_task: Optional[asyncio.Task] = None
+        self.stats = {"checkouts": 0, "waits": 0, "writes": 0,
+                      "write_batches": 0, "write_errors": 0, "max_batch": 0}
+
+    async def open(self) -> None:
+        for _ in range(self.size):
+            conn = await _connect(self.path)
+            self._conns.append(conn)
+            self._idle.put_nowait(conn)
+        # Autocommit mode: the writer task issues BEGIN/COMMIT itself.
+        self._writer = await _connect(self.path, isolation_level=None)
+        self._writer_task = asyncio.create_task(self._write_loop())
+
+    async def close(self) -> None:
+        if self._writer_task is not None:
+            # Let queued writes land before the connection goes away.
+            await self._writes.join()
+            self._writer_task.cancel()
+            try:
+                await self._writer_task
+            except asyncio.CancelledError:
+                pass
+        for conn in [*self._conns, self._writer]:
+            if conn is not None:
+                await conn.close()
+        self._conns.clear()
+
+    @asynccontextmanager
+    async def connection(self):
+        self.stats["checkouts"] += 1
+        if self._idle.empty():
+            self.stats["waits"] += 1
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            # A fresh connection closed without commit discarded the
+            # transaction; a pooled one must do the same explicitly.
+            try:
+                if conn.in_transaction:
+                    await conn.rollback()
+            finally:
+                self._idle.put_nowait(conn)
+
+    async def write(self, fn):
+        fut = asyncio.get_running_loop().create_future()
+        self._writes.put_nowait((fn, fut))
+        return await fut
+
+    async def _write_loop(self) -> None:
+        db = self._writer
+        while True:
+            batch = [await self._writes.get()]
+            while len(batch) < WRITE_BATCH_MAX and not self._writes.empty():
+                batch.append(self._writes.get_nowait())
+            results: list = []
+            try:
+                await db.execute("BEGIN IMMEDIATE")
+                for fn, _ in batch:
+                    await db.execute("SAVEPOINT unit")
+                    try:
+                        results.append((True, await fn(db)))
+                        await db.execute("RELEASE unit")
+                    except Exception as e:
+                        await db.execute("ROLLBACK TO unit")
+                        await db.execute("RELEASE unit")
+                        results.append((False, e))
+                await db.execute("COMMIT")
+            except Exception as e:
+                # The batch as a whole failed (lock timeout, disk full):
+                # nothing landed, every waiter hears about it.
+                try:
+                    if db.in_transaction:
+                        await db.execute("ROLLBACK")
+                except Exception:
+                    pass
+                results = [(False, e)] * len(batch)
+            self.stats["writes"] += len(batch)
+            self.stats["write_batches"] += 1
+            self.stats["max_batch"] = max(self.stats["max_batch"], len(batch))
+            for (_, fut), (ok, value) in zip(batch, results):
+                self._writes.task_done()
+                if fut.done():
+                    continue
+                if ok:
+                    fut.set_result(value)
+                else:
+                    self.stats["write_errors"] += 1
+                    fut.set_exception(value)
+
+
+_pool: Optional[_Pool] = None
+
+
+async def open_pool(size: Optional[int] = None) -> None:
+    """Open the shared pool on DATABASE_URL. Idempotent; call after init_db."""
+    global _pool
+    if _pool is not None and _pool.path == DATABASE_URL:
+        return
+    await close_pool()
+    pool = _Pool(DATABASE_URL, size or POOL_SIZE)
+    await pool.open()
+    _pool = pool
+
+
+async def close_pool() -> None:
+    global _pool
+    pool, _pool = _pool, None
+    if pool is not None:
+        await pool.close()
+
+
+def pool_stats() -> Optional[dict]:
+    if _pool is None:
+        return None
+    return {**_pool.stats, "size": _pool.size, "idle": _pool._idle.qsize(),
+            "queued_writes": _pool._writes.qsize()}
+
+
+def _active_pool() -> Optional[_Pool]:
+    pool = _pool
+    return pool if pool is not None and pool.path == DATABASE_URL else None
+
+
 @asynccontextmanager
 async def get_db():
+    pool = _active_pool()
+    if pool is not None:
+        async with pool.connection() as db:
+            yield db
+        return
     async with aiosqlite.connect(DATABASE_URL) as db:
         db.row_factory = aiosqlite.Row
         yield db
+
+
+async def run_write(fn: Callable[[aiosqlite.Connection], Awaitable[T]]) -> T:
+    """Run `await fn(db)` as one atomic write unit and return its result.
+
+    With the pool open, units from concurrent callers share a transaction
+    and a commit on the dedicated writer connection; `fn` runs inside its
+    own savepoint, so if it raises only its own statements are undone and
+    the exception propagates to this caller. `fn` must not commit or roll
+    back — the unit boundary is the function boundary.
+    """
+    pool = _active_pool()
+    if pool is not None:
+        return await pool.write(fn)
+    async with aiosqlite.connect(DATABASE_URL) as db:
+        db.row_factory = aiosqlite.Row
+        result = await fn(db)
+        await db.commit()
+        return result
+
@@ -127,9 +127,14 @@ def evaluate(
     last_seen_iso: Optional[str],
     *,
     now: float,
+    payload_issues: Optional[list[dict]] = None,
 ) -> dict:
     """Verdict for one home.
 
+    `payload_issues` short-circuits the payload rules with their already
+    computed result (`payload_issues(payload)`, kept in home_latest); the
+    payload itself is then not inspected.
+
     Returns::
 
         {
@@ -183,7 +188,9 @@ def evaluate(
             silent_for_s=round(silent_for),
         ))
 
-    if payload:
+    if payload_issues is not None:
+        issues.extend(payload_issues)
+    elif payload:
         issues.extend(_evaluate_payload(payload))
 
     level = _worst_level(issues)
@@ -203,6 +210,13 @@ def evaluate(
     }
 
 
+def payload_issues(payload: Optional[dict]) -> list[dict]:
+    """Every issue `evaluate` derives from the payload alone — i.e. all of
+    them except silence and suspension, which depend on the clock and the
+    homes row. Stable between posts, so ingest computes it once."""
+    return _evaluate_payload(payload) if isinstance(payload, dict) and payload else []
+
+
 def _evaluate_payload(p: dict) -> list[dict]:
     issues: list[dict] = []
     health = p.get("health") if isinstance(p.get("health"), dict) else {}
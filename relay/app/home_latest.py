@@ -0,0 +1,151 @@
+"""`home_latest` — one row per home: its newest telemetry, already interpreted.
+
+The fleet page and the remediator both need "every home's latest telemetry".
+They used to find it with a `GROUP BY home_id MAX(id)` join over the whole of
+telemetry_raw (10k homes × 30 days of 5-minute posts is ~86M rows) and then
+re-parse every payload and re-run every fleet_health rule on every request
+and every sweep. Neither answer changes between posts.
+
+So the ingest handler (routers/telemetry.py) does that work once, in the same
+transaction as the raw insert, and upserts the result here:
+
+  * `vitals` — fleet_health.vitals(payload), the numbers an operator reads;
+  * `issues` — fleet_health.payload_issues(payload), every rule that looks at
+    the payload. What is left at read time is silence, which depends only on
+    `ts` and the clock, and the homes-table status check — both cheap.
+
+Readers therefore cost O(homes), not O(raw rows).
+
+The stored issues are only as good as the rules that produced them, so each
+row carries `rules` — a fingerprint of fleet_health.py. A deploy that changes a
+threshold or a remedy makes every row stale; `load()` re-evaluates those from
+the stored payload and writes them back, once.
+
+A home whose raw rows have aged out of retention keeps its row here, so a hub
+silent for more than 30 days still reads as "silent", not "never reported".
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json as _json
+from typing import Any, Optional
+
+from . import fleet_health
+
+_COMPACT = (",", ":")
+
+
+def _rules_fingerprint() -> str:
+    try:
+        with open(fleet_health.__file__, "rb") as f:
+            return hashlib.sha1(f.read()).hexdigest()[:16]
+    except OSError:
+        return "unknown"
+
+
+RULES_FINGERPRINT = _rules_fingerprint()
+
+
+def _row(home_id: str, ts: str, raw_id: Optional[int], payload: Any) -> tuple:
+    payload = payload if isinstance(payload, dict) else None
+    return (
+        home_id, ts, raw_id,
+        _json.dumps(payload, separators=_COMPACT) if payload is not None else None,
+        _json.dumps(fleet_health.vitals(payload), separators=_COMPACT),
+        _json.dumps(fleet_health.payload_issues(payload), separators=_COMPACT),
+        RULES_FINGERPRINT,
+    )
+
+
+_UPSERT = """
+INSERT INTO home_latest (home_id, ts, raw_id, payload, vitals, issues, rules)
+VALUES (?,?,?,?,?,?,?)
+ON CONFLICT(home_id) DO UPDATE SET
+    ts=excluded.ts, raw_id=excluded.raw_id, payload=excluded.payload,
+    vitals=excluded.vitals, issues=excluded.issues, rules=excluded.rules
+"""
+
+
+async def upsert(db, home_id: str, ts: str, raw_id: Optional[int], payload: Any) -> None:
+    """Record a new latest post. Caller owns the transaction (commit)."""
+    await db.execute(_UPSERT, _row(home_id, ts, raw_id, payload))
+
+
+async def previous_release_tag(db, home_id: str) -> Optional[str]:
+    """Release tag of the post before the one being ingested, if any."""
+    rows = await db.execute_fetchall(
+        "SELECT vitals FROM home_latest WHERE home_id=?", (home_id,))
+    if not rows:
+        return None
+    try:
+        return (_json.loads(rows[0][0]) or {}).get("release_tag")
+    except (TypeError, ValueError):
+        return None
+
+
+async def backfill(db) -> int:
+    """Populate home_latest from telemetry_raw for homes that have no row yet.
+
+    Runs from init_db. After the first boot on a deployment it finds nothing
+    to do; the MAX(id) scan it needs is the one ingest now saves every read.
+    """
+    rows = await db.execute_fetchall(
+        """SELECT t.id, t.home_id, t.ts, t.payload
+           FROM telemetry_raw t
+           JOIN (SELECT home_id, MAX(id) AS mid
+                 FROM telemetry_raw
+                 WHERE home_id NOT IN (SELECT home_id FROM home_latest)
+                 GROUP BY home_id) m
+             ON t.id = m.mid"""
+    )
+    batch = []
+    for raw_id, home_id, ts, text in rows:
+        try:
+            payload = _json.loads(text)
+        except (TypeError, ValueError):
+            payload = None
+        batch.append(_row(home_id, ts, raw_id, payload))
+    if batch:
+        await db.executemany(_UPSERT, batch)
+    return len(batch)
+
+
+async def load(db) -> dict[str, dict]:
+    """home_id → {"ts", "vitals", "issues"} for every home that ever reported.
+
+    Rows written under a different rules fingerprint are re-evaluated from
+    their stored payload and written back.
+    """
+    rows = await db.execute_fetchall(
+        "SELECT home_id, ts, vitals, issues, rules FROM home_latest")
+    out: dict[str, dict] = {}
+    stale: list[str] = []
+    for home_id, ts, vitals, issues, rules in rows:
+        if rules != RULES_FINGERPRINT:
+            stale.append(home_id)
+            continue
+        out[home_id] = {"ts": ts, "vitals": _json.loads(vitals), "issues": _json.loads(issues)}
+
+    if stale:
+        placeholders = ",".join("?" for _ in stale)
+        refreshed = []
+        for home_id, ts, raw_id, text in await db.execute_fetchall(
+            f"SELECT home_id, ts, raw_id, payload FROM home_latest "
+            f"WHERE home_id IN ({placeholders})", stale,
+        ):
+            payload = _json.loads(text) if text else None
+            row = _row(home_id, ts, raw_id, payload)
+            refreshed.append(row)
+            out[home_id] = {"ts": ts, "vitals": _json.loads(row[4]), "issues": _json.loads(row[5])}
+        await db.executemany(_UPSERT, refreshed)
+        await db.commit()
+    return out
+
+
+def verdict(home: dict, latest: Optional[dict], *, now: float) -> dict:
+    """fleet_health.evaluate for one home from its home_latest entry."""
+    latest = latest or {}
+    return fleet_health.evaluate(
+        home, None, latest.get("ts"), now=now, payload_issues=latest.get("issues"),
+    )
@@ -0,0 +1,108 @@
+"""Short-lived cache of proxy authorization decisions (routers/proxy.py).
+
+A mobile app polling its home every few seconds made the HTTP and WS proxy
+re-read the same `homes` row — hub_base, relay_secret, status,
+subscription_state — on every request. _authorize_home() now keeps what it
+decided for (home, user) for up to ROUTE_TTL_S, granted or denied, and
+replays it without touching the DB.
+
+The TTL bounds staleness for changes nobody announced; changes we make are
+announced. Every code path that rewrites a home's routing or gating columns
+calls invalidate(home_id):
+
+    fleet.set_home_hostname       public_hostname
+    homes.rotate_hub_secret       relay_secret
+    homes.register_hub            tunnel_url, status
+    homes.update_home / delete_home, fleet.delete_home_record
+    provision.*                   status, tunnel_url, insert
+    billing webhooks + admin      status, subscription_state
+
+A lookup that straddles an invalidation is not stored (generation check), so
+a reader that loaded the row just before a change cannot re-cache it.
+Entries are also scoped to DATABASE_URL, like the connection pool.
+"""
+
+from __future__ import annotations
+
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Optional
+
+from fastapi import HTTPException
+
+from . import database
+
+ROUTE_TTL_S = float(os.getenv("RELAY_ROUTE_CACHE_TTL_S", "30"))
+MAX_ENTRIES = 4096
+
+# (home_id, user_id, role) → (expires_at, resolved dict | (status, detail))
+_entries: "OrderedDict[tuple, tuple[float, Any]]" = OrderedDict()
+_path: Optional[str] = None
+_generation = 0
+_stats = {"hits": 0, "misses": 0, "invalidations": 0, "evictions": 0}
+
+
+def _key(home_id: str, user: dict) -> tuple:
+    return (home_id, user.get("sub"), user.get("role"))
+
+
+def _scope() -> None:
+    global _path
+    if _path != database.DATABASE_URL:
+        _entries.clear()
+        _path = database.DATABASE_URL
+
+
+def generation() -> int:
+    """Take before loading a home row; pass to store()."""
+    return _generation
+
+
+def lookup(home_id: str, user: dict) -> Optional[dict]:
+    """The cached decision: the resolved route, or re-raises the cached
+    HTTPException. None on a miss."""
+    _scope()
+    key = _key(home_id, user)
+    entry = _entries.get(key)
+    if entry is None or entry[0] <= time.monotonic():
+        if entry is not None:
+            del _entries[key]
+        _stats["misses"] += 1
+        return None
+    _entries.move_to_end(key)
+    _stats["hits"] += 1
+    outcome = entry[1]
+    if isinstance(outcome, tuple):
+        raise HTTPException(*outcome)
+    return outcome
+
+
+def store(home_id: str, user: dict, outcome: Any, gen: int) -> None:
+    """Cache a resolved route dict or a denial HTTPException."""
+    _scope()
+    if gen != _generation or ROUTE_TTL_S <= 0:
+        return
+    if isinstance(outcome, HTTPException):
+        outcome = (outcome.status_code, outcome.detail)
+    _entries[_key(home_id, user)] = (time.monotonic() + ROUTE_TTL_S, outcome)
+    _entries.move_to_end(_key(home_id, user))
+    while len(_entries) > MAX_ENTRIES:
+        _entries.popitem(last=False)
+        _stats["evictions"] += 1
+
+
+def invalidate(home_id: Optional[str] = None) -> None:
+    """Forget every decision about home_id (all homes when None)."""
+    global _generation
+    _generation += 1
+    _stats["invalidations"] += 1
+    if home_id is None:
+        _entries.clear()
+        return
+    for key in [k for k in _entries if k[0] == home_id]:
+        del _entries[key]
+
+
+def stats() -> dict:
+    return {**_stats, "size": len(_entries), "ttl_s": ROUTE_TTL_S}
@@ -0,0 +1,175 @@
+"""Exact-match response cache + in-flight coalescing for the LLM proxy.
+
+Intent parsing sends the same ~69 KB tool schema and system prompt on every
+call, and the fleet sends many byte-for-byte identical requests ("turn off
+the lights" missing the fast path in a hundred homes, the same canned
+response being translated). For a deterministic call the answer to an
+identical body is the same answer, so routers/llm.py asks here first.
+
+Opt-in on both ends:
+
+  * the hub names the call's purpose in X-Ziggy-Purpose (llm_gateway does);
+  * the purpose must be in RELAY_LLM_CACHE_PURPOSES (default intent_parse,
+    translate) — never chat, whose history makes hits worthless and whose
+    answers should not be replayed.
+
+and only for requests that are deterministic by construction: explicit
+temperature 0, not streaming, a single choice. The key is a SHA-256 of the
+purpose and the canonical JSON of the body (sorted keys, no whitespace), so
+formatting differences between SDK versions still hit.
+
+Only 200 responses are stored, for RELAY_LLM_CACHE_TTL_S, within MAX_ENTRIES
+and MAX_BYTES (LRU). Identical requests arriving while the first is still
+upstream wait for its result instead of sending their own — whatever it
+turns out to be, errors included.
+
+Counters are kept per home and surface on /api/admin/fleet/health.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json as _json
+import os
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Optional
+
+PURPOSES = frozenset(
+    p.strip() for p in os.getenv("RELAY_LLM_CACHE_PURPOSES", "intent_parse,translate").split(",")
+    if p.strip()
+)
+TTL_S = float(os.getenv("RELAY_LLM_CACHE_TTL_S", "600"))
+MAX_ENTRIES = 2048
+MAX_BYTES = 64 * 2**20
+
+# key → (expires_at, status, media_type, body)
+_entries: "OrderedDict[str, tuple[float, int, str, bytes]]" = OrderedDict()
+_bytes = 0
+_inflight: dict[str, asyncio.Future] = {}
+_by_home: dict[str, dict[str, int]] = {}
+_totals = {"hits": 0, "misses": 0, "coalesced": 0, "bypass": 0, "evictions": 0}
+
+
+def cache_key(purpose: Optional[str], raw: bytes) -> Optional[str]:
+    """The cache key for this request, or None when it must not be cached."""
+    if not purpose or purpose not in PURPOSES:
+        return None
+    try:
+        body = _json.loads(raw or b"{}")
+    except ValueError:
+        return None
+    if not isinstance(body, dict) or body.get("stream"):
+        return None
+    if body.get("temperature") != 0 or body.get("n", 1) != 1:
+        return None
+    canonical = _json.dumps(body, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(f"{purpose}\n{canonical}".encode("utf-8")).hexdigest()
+
+
+def _count(home_id: str, outcome: str) -> None:
+    _totals[outcome] += 1
+    per = _by_home.setdefault(home_id, {"hits": 0, "misses": 0, "coalesced": 0, "bypass": 0})
+    per[outcome] += 1
+
+
+def _get(key: str) -> Optional[tuple[int, str, bytes]]:
+    global _bytes
+    entry = _entries.get(key)
+    if entry is None:
+        return None
+    if entry[0] <= time.monotonic():
+        del _entries[key]
+        _bytes -= len(entry[3])
+        return None
+    _entries.move_to_end(key)
+    return entry[1:]
+
+
+def _put(key: str, status: int, media_type: str, body: bytes) -> None:
+    global _bytes
+    if TTL_S <= 0 or len(body) > MAX_BYTES:
+        return
+    old = _entries.pop(key, None)
+    if old is not None:
+        _bytes -= len(old[3])
+    _entries[key] = (time.monotonic() + TTL_S, status, media_type, body)
+    _bytes += len(body)
+    while len(_entries) > MAX_ENTRIES or _bytes > MAX_BYTES:
+        _, evicted = _entries.popitem(last=False)
+        _bytes -= len(evicted[3])
+        _totals["evictions"] += 1
+
+
+async def fetch(
+    home_id: str,
+    key: Optional[str],
+    upstream: Callable[[], Awaitable[tuple[int, str, bytes]]],
+) -> tuple[int, str, bytes, str]:
+    """Return (status, media_type, body, outcome) for one request.
+
+    outcome is "hit", "coalesced", "miss" (went upstream, may now be cached)
+    or "bypass" (not cacheable). Exceptions from `upstream` propagate to the
+    caller and to every request coalesced onto it.
+    """
+    if key is None:
+        _count(home_id, "bypass")
+        return (*await upstream(), "bypass")
+
+    cached = _get(key)
+    if cached is not None:
+        _count(home_id, "hits")
+        return (*cached, "hit")
+
+    pending = _inflight.get(key)
+    if pending is not None:
+        _count(home_id, "coalesced")
+        try:
+            return (*await asyncio.shield(pending), "coalesced")
+        except asyncio.CancelledError:
+            if not pending.cancelled():
+                raise
+        # The request we were waiting on was cancelled (its client went
+        # away), not us: go again.
+        return await fetch(home_id, key, upstream)
+
+    _count(home_id, "misses")
+    fut = asyncio.get_running_loop().create_future()
+    _inflight[key] = fut
+    try:
+        result = await upstream()
+    except asyncio.CancelledError:
+        fut.cancel()
+        raise
+    except Exception as e:
+        fut.set_exception(e)
+        # Retrieved here so a request nobody coalesced onto doesn't log
+        # "exception was never retrieved".
+        fut.exception()
+        raise
+    else:
+        fut.set_result(result)
+        if result[0] == 200:
+            _put(key, *result)
+        return (*result, "miss")
+    finally:
+        _inflight.pop(key, None)
+
+
+def clear() -> None:
+    global _bytes
+    _entries.clear()
+    _bytes = 0
+
+
+def stats() -> dict:
+    lookups = _totals["hits"] + _totals["misses"] + _totals["coalesced"]
+    return {
+        **_totals,
+        "hit_rate": round((_totals["hits"] + _totals["coalesced"]) / lookups, 3) if lookups else None,
+        "entries": len(_entries),
+        "bytes": _bytes,
+        "purposes": sorted(PURPOSES),
+        "homes": {h: dict(c) for h, c in _by_home.items()},
+    }
@@ -7,11 +7,12 @@ from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
+from .audit import start_audit_writer, stop_audit_writer
 from .billing.admin import router as billing_admin_router
 from .billing.public import router as billing_public_router
 from .billing.webhooks import router as billing_webhooks_router
 from .config_guard import assert_prod_secrets
-from .database import init_db
+from .database import close_pool, init_db, open_pool
 from .routers.audit_log import router as audit_log_router
 from .routers.mobile_admin import router as mobile_admin_router
 from .routers.support_session import router as support_session_router
@@ -35,6 +36,13 @@ async def lifespan(app: FastAPI):
     # (RELAY_JWT_SECRET / RELAY_ADMIN_PASSWORD). No-op in dev.
     assert_prod_secrets()
     await init_db()
+    # Long-lived WAL connections + the batched writer (database.py). Opened
+    # after init_db so the schema exists; closed last so background tasks
+    # and queued writes finish on it.
+    await open_pool()
+    # Hub telemetry / OTA-poll audit events are queued and flushed in batches
+    # (audit.py) instead of written inside every request.
+    start_audit_writer()
     await ensure_relay_admin()
     # Telemetry retention runs once a day in the background. Cancellation on
     # shutdown is best-effort — the loop awaits sleep(86400) most of its
@@ -57,6 +65,9 @@ async def lifespan(app: FastAPI):
                 pass
         await _proxy_client.aclose()
         await _openai_client.aclose()
+        # Drain queued audit events while the pool's writer is still up.
+        await stop_audit_writer()
+        await close_pool()
 
 
 app = FastAPI(title="Ziggy Relay", version="1.0", lifespan=lifespan)
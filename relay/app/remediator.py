@@ -36,14 +36,13 @@ Guardrails
 from __future__ import annotations
 
 import asyncio
-import json as _json
 import os
 import time
 from typing import Any
 
 import httpx
 
-from . import fleet_health
+from . import fleet_health, home_latest
 from .audit import log_event
 from .database import get_db
 
@@ -84,28 +83,12 @@ async def _load_fleet(now: float) -> list[dict]:
                       public_hostname, relay_secret
                FROM homes ORDER BY created_at ASC"""
         )
-        latest = await db.execute_fetchall(
-            """SELECT t.home_id, t.ts, t.payload
-               FROM telemetry_raw t
-               JOIN (SELECT home_id, MAX(id) AS mid
-                     FROM telemetry_raw GROUP BY home_id) m
-                 ON t.id = m.mid"""
-        )
-
-    by_home: dict[str, tuple[str, dict | None]] = {}
-    for r in latest:
-        row = dict(r)
-        try:
-            payload = _json.loads(row["payload"])
-        except (TypeError, ValueError):
-            payload = None
-        by_home[row["home_id"]] = (row.get("ts"), payload if isinstance(payload, dict) else None)
+        latest = await home_latest.load(db)
 
     out = []
     for h in homes:
         home = dict(h)
-        ts, payload = by_home.get(home["id"], (None, None))
-        verdict = fleet_health.evaluate(home, payload, ts, now=now)
+        verdict = home_latest.verdict(home, latest.get(home["id"]), now=now)
         verdict["_home"] = home
         out.append(verdict)
     return out
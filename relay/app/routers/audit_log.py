@@ -24,6 +24,22 @@ Public surface (founder JWT, relay_admin role):
         has_more: bool,    # true if there are additional rows past offset+count
       }
 
+  GET /api/admin/audit-log/rollup
+    Per-home daily counters for successful telemetry_posted /
+    ota_manifest_served events, which in the default rollup mode are not
+    written to audit_log at all (see relay/app/audit.py).
+    Query params:
+      event      exact event name
+      home_id    exact match on home_id
+      since      YYYY-MM-DD (inclusive lower bound on day)
+      limit      default 100, max 500
+    Returns:
+      {
+        rows: [{day, event, home_id, count, first_ts, last_ts,
+                source_ip, detail}, ...],
+        stats: {...},      # audit writer counters (queued, dropped, ...)
+      }
+
 Indexes that cover the query:
   idx_audit_event(event, ts) — for event-substring + sort scenarios
   idx_audit_home(home_id, ts) — for home_id filter
@@ -39,6 +55,7 @@ from typing import Optional
 
 from fastapi import APIRouter, HTTPException, Request
 
+from ..audit import audit_stats
 from ..auth import require_role
 from ..database import get_db
 
@@ -121,3 +138,37 @@ async def list_audit_log(
         "count":    len(page),
         "has_more": has_more,
     }
+
+
+@router.get("/api/admin/audit-log/rollup")
+async def list_audit_rollup(
+    request: Request,
+    event:   Optional[str] = None,
+    home_id: Optional[str] = None,
+    since:   Optional[str] = None,
+    limit:   int = DEFAULT_LIMIT,
+):
+    require_role("relay_admin")(request)
+    limit = max(1, min(limit, MAX_LIMIT))
+
+    where_parts: list[str] = []
+    params: list = []
+    if event:
+        where_parts.append("event = ?")
+        params.append(event)
+    if home_id:
+        where_parts.append("home_id = ?")
+        params.append(home_id)
+    if since:
+        where_parts.append("day >= ?")
+        params.append(since)
+    where_sql = ("WHERE " + " AND ".join(where_parts)) if where_parts else ""
+
+    async with get_db() as db:
+        rows = await db.execute_fetchall(
+            f"SELECT day, event, home_id, count, first_ts, last_ts, source_ip, detail "
+            f"FROM audit_rollup {where_sql} "
+            f"ORDER BY day DESC, event, home_id LIMIT ?",
+            (*params, limit),
+        )
+    return {"rows": [dict(r) for r in rows], "stats": audit_stats()}
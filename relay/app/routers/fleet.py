@@ -14,10 +14,10 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Request
 from pydantic import BaseModel
 
-from ..audit import log_event
+from ..audit import audit_stats, log_event
 from ..auth import require_role
-from ..database import get_db
-from .. import fleet_health
+from ..database import get_db, pool_stats
+from .. import fleet_health, home_latest, home_routes, llm_cache
 
 router = APIRouter(prefix="/admin/fleet")
 
@@ -53,6 +53,13 @@ async def fleet_health_report(request: Request):
     Silence is evaluated as its own signal — a hub that is off, crashed, or
     cut off from the internet says nothing at all, so absence of telemetry is
     the only evidence there will ever be.
+
+    Reads home_latest (relay/app/home_latest.py): payload rules ran at ingest,
+    so only silence is computed here and the cost scales with homes, not posts.
+
+    `relay` carries this process's own counters: the proxy's route cache
+    (hits / misses / invalidations), the LLM response cache (per home), the
+    DB pool and the audit writer.
     """
     require_role("relay_admin")(request)
     now = _time.time()
@@ -62,34 +69,20 @@ async def fleet_health_report(request: Request):
             """SELECT id, name, type, tunnel_url, status, subscription_state, owner_email
                FROM homes ORDER BY created_at ASC"""
         )
-        # Latest telemetry row per home in one pass — no N+1 over the fleet.
-        latest = await db.execute_fetchall(
-            """SELECT t.home_id, t.ts, t.payload
-               FROM telemetry_raw t
-               JOIN (SELECT home_id, MAX(id) AS mid
-                     FROM telemetry_raw GROUP BY home_id) m
-                 ON t.id = m.mid"""
-        )
-
-    by_home: dict[str, tuple[str, dict | None]] = {}
-    for r in latest:
-        row = dict(r)
-        try:
-            payload = _json.loads(row["payload"])
-        except (TypeError, ValueError):
-            payload = None
-        by_home[row["home_id"]] = (row.get("ts"), payload if isinstance(payload, dict) else None)
+        # Latest telemetry per home, already interpreted at ingest — one row
+        # per home, whatever the size of telemetry_raw.
+        latest = await home_latest.load(db)
 
     verdicts = []
     for h in homes:
         home = dict(h)
-        ts, payload = by_home.get(home["id"], (None, None))
-        v = fleet_health.evaluate(home, payload, ts, now=now)
+        entry = latest.get(home["id"])
+        v = home_latest.verdict(home, entry, now=now)
         v["tunnel_url"] = home.get("tunnel_url")
         v["subscription_state"] = home.get("subscription_state")
         v["status"] = home.get("status")
         v["owner_email"] = home.get("owner_email")
-        v["vitals"] = fleet_health.vitals(payload)
+        v["vitals"] = entry["vitals"] if entry else fleet_health.vitals(None)
         verdicts.append(v)
 
     # Worst first, so the thing needing attention is row one.
@@ -101,6 +94,12 @@ async def fleet_health_report(request: Request):
         "summary": fleet_health.summarize(verdicts),
         "versions": fleet_health.version_rollup(verdicts),
         "homes": verdicts,
+        "relay": {
+            "proxy_routes": home_routes.stats(),
+            "llm_cache": llm_cache.stats(),
+            "db_pool": pool_stats(),
+            "audit": audit_stats(),
+        },
     }
 
 
@@ -147,11 +146,11 @@ async def fleet_activity(request: Request, limit: int = 40):
 
 # Tables that carry a home_id. SQLite only honours `ON DELETE CASCADE` when
 # `PRAGMA foreign_keys=ON`, which is OFF by default and not set here — and
-# telemetry_raw / telemetry_daily / audit_log have no foreign key at all. So the
+# the telemetry tables / audit_log have no foreign key at all. So the
 # cascade is done explicitly; otherwise "removing" a home leaves its telemetry
 # behind to be re-counted forever.
 _HOME_CHILD_TABLES = (
-    "telemetry_raw", "telemetry_daily", "home_cohorts",
+    "telemetry_raw", "telemetry_hourly", "telemetry_daily", "home_latest", "home_cohorts",
     "home_backup_keys", "founder_slots", "invites",
 )
 
@@ -227,6 +226,7 @@ async def delete_home_record(home_id: str, request: Request, force: bool = False
             pass
         await db.execute("DELETE FROM homes WHERE id=?", (home_id,))
         await db.commit()
+    home_routes.invalidate(home_id)
 
     return {"ok": True, "deleted": {"home": home.get("name"), "children": deleted}}
 
@@ -266,6 +266,7 @@ async def set_home_hostname(home_id: str, body: HostnameBody, request: Request):
         await db.execute(
             "UPDATE homes SET public_hostname=? WHERE id=?", (value, home_id))
         await db.commit()
+    home_routes.invalidate(home_id)
 
     await log_event(
         "home_hostname_set", home_id=home_id, ok=True,
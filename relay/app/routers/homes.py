@@ -8,6 +8,7 @@ from typing import Optional
 from fastapi import APIRouter, HTTPException, Request, BackgroundTasks
 from pydantic import BaseModel
 
+from .. import home_routes
 from ..audit import log_event, verify as verify_signature
 from ..auth import require_role, current_user, new_id, new_token
 from ..database import get_db
@@ -159,6 +160,7 @@ async def register_hub(request: Request):
             (body.tunnel_url.rstrip("/"), body.home_id),
         )
         await db.commit()
+    home_routes.invalidate(body.home_id)
 
     await log_event(
         "register_hub", home_id=body.home_id, source_ip=src_ip, ok=True,
@@ -232,6 +234,7 @@ async def rotate_hub_secret(request: Request):
             (new_secret, body.home_id),
         )
         await db.commit()
+    home_routes.invalidate(body.home_id)
 
     await log_event(
         "rotate_hub_secret", home_id=body.home_id, source_ip=src_ip,
@@ -316,6 +319,7 @@ async def update_home(home_id: str, body: UpdateHomeBody, request: Request):
         if body.status:
             await db.execute("UPDATE homes SET status=? WHERE id=?", (body.status, home_id))
         await db.commit()
+    home_routes.invalidate(home_id)
     return {"ok": True}
 
 
@@ -325,6 +329,7 @@ async def delete_home(home_id: str, request: Request):
     async with get_db() as db:
         await db.execute("DELETE FROM homes WHERE id=?", (home_id,))
         await db.commit()
+    home_routes.invalidate(home_id)
     return {"ok": True}
 
 
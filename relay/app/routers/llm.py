@@ -10,6 +10,10 @@ relay-held OPENAI_API_KEY (a Fly secret), streaming the response back.
 Because the endpoint mirrors OpenAI's /v1/chat/completions shape, the hub SDK
 needs no special code — only a base_url + a signing auth hook.
 
+Deterministic non-streaming calls the hub marks with a cacheable purpose
+(X-Ziggy-Purpose) are answered from an exact-match cache, and identical ones
+in flight share one upstream call — see relay/app/llm_cache.py.
+
 STT (Whisper) is deliberately NOT proxied — it stays local (DECISIONS.md).
 """
 from __future__ import annotations
@@ -21,6 +25,7 @@ import httpx
 from fastapi import APIRouter, HTTPException, Request
 from fastapi.responses import Response, StreamingResponse
 
+from .. import llm_cache
 from ..audit import log_event, verify as verify_signature
 from ..billing import is_subscription_active
 from ..database import get_db
@@ -96,8 +101,13 @@ async def proxy_chat_completions(device_id: str, request: Request):
         await log_event("llm_proxied", home_id=home_id, source_ip=src_ip, ok=True, detail="stream")
         return StreamingResponse(_relay_stream(), media_type="text/event-stream")
 
-    try:
+    async def _upstream() -> tuple[int, str, bytes]:
         r = await _openai_client.post("/v1/chat/completions", content=raw, headers=fwd_headers)
+        return r.status_code, r.headers.get("content-type", "application/json"), r.content
+
+    cache_key = llm_cache.cache_key(request.headers.get("X-Ziggy-Purpose"), raw)
+    try:
+        status, media_type, content, outcome = await llm_cache.fetch(home_id, cache_key, _upstream)
     except httpx.TimeoutException:
         await log_event("llm_proxied", home_id=home_id, source_ip=src_ip, ok=False, detail="upstream_timeout")
         raise HTTPException(504, "LLM upstream timed out.")
@@ -105,10 +115,12 @@ async def proxy_chat_completions(device_id: str, request: Request):
         await log_event("llm_proxied", home_id=home_id, source_ip=src_ip, ok=False, detail=f"upstream_error:{type(e).__name__}")
         raise HTTPException(502, "LLM upstream error.")
 
+    detail = f"status={status}" if outcome == "bypass" else f"status={status} cache={outcome}"
     await log_event("llm_proxied", home_id=home_id, source_ip=src_ip,
-                    ok=(r.status_code < 400), detail=f"status={r.status_code}")
+                    ok=(status < 400), detail=detail)
     return Response(
-        content=r.content,
-        status_code=r.status_code,
-        media_type=r.headers.get("content-type", "application/json"),
+        content=content,
+        status_code=status,
+        media_type=media_type,
+        headers={"X-Ziggy-Cache": outcome},
     )
@@ -19,6 +19,7 @@ from typing import Optional
 from fastapi import APIRouter, BackgroundTasks, HTTPException, Request
 from pydantic import BaseModel
 
+from .. import home_routes
 from ..auth import require_role, current_user, new_id, ROLE_ORDER
 from ..database import get_db
 from ..provisioner import provision_hub, deprovision_hub
@@ -99,6 +100,7 @@ async def provision_hub_endpoint(body: HubProvisionBody, request: Request) -> Hu
                 (body.home_name, body.owner_email, home_id),
             )
             await db.commit()
+        home_routes.invalidate(home_id)
     else:
         async with get_db() as db:
             await db.execute(
@@ -107,6 +109,7 @@ async def provision_hub_endpoint(body: HubProvisionBody, request: Request) -> Hu
                 (home_id, body.home_name, "hub", now, body.owner_email),
             )
             await db.commit()
+        home_routes.invalidate(home_id)
 
     try:
         result = await provision_hub(
@@ -124,6 +127,7 @@ async def provision_hub_endpoint(body: HubProvisionBody, request: Request) -> Hu
                 (f"failed: {str(e)[:200]}", home_id),
             )
             await db.commit()
+        home_routes.invalidate(home_id)
         raise HTTPException(500, f"Hub provisioning failed: {e}")
 
     async with get_db() as db:
@@ -135,6 +139,7 @@ async def provision_hub_endpoint(body: HubProvisionBody, request: Request) -> Hu
              result.reachable_url, home_id),
         )
         await db.commit()
+    home_routes.invalidate(home_id)
 
     return HubProvisionBundle(
         home_id       = result.home_id,
@@ -180,6 +185,8 @@ async def _provision_hub_background(home_id: str, home_name: str):
                 (f"failed: {str(e)[:200]}", home_id),
             )
             await db.commit()
+    finally:
+        home_routes.invalidate(home_id)
 
 
 # ---------------------------------------------------------------------------
@@ -200,6 +207,7 @@ async def deprovision(home_id: str, bg: BackgroundTasks, request: Request):
             "UPDATE homes SET status='deprovisioning' WHERE id=?", (home_id,)
         )
         await db.commit()
+    home_routes.invalidate(home_id)
     bg.add_task(deprovision_hub, cf_id, home_id)
     return {"ok": True, "status": "deprovisioning"}
 
@@ -11,12 +11,16 @@ Flow:
 """
 
 import asyncio
+import os
 
 import httpx
-from fastapi import APIRouter, HTTPException, Request, Response, WebSocket
+from fastapi import APIRouter, HTTPException, Request, WebSocket
+from fastapi.responses import StreamingResponse
+from starlette.background import BackgroundTask
 from websockets.asyncio.client import connect as ws_connect
 from websockets.exceptions import WebSocketException
 
+from .. import home_routes
 from ..auth import current_user, decode_jwt
 from ..billing import is_subscription_active
 from ..database import get_db
@@ -25,6 +29,10 @@ router = APIRouter(prefix="/proxy")
 
 PROXY_TIMEOUT = 30
 
+# Upload cap, enforced on the declared Content-Length up front and on the
+# bytes actually received as they stream (a chunked upload declares none).
+MAX_PROXY_BODY_BYTES = int(os.getenv("RELAY_PROXY_MAX_BODY_MB", "256")) * 2**20
+
 # Module-level client → keeps TCP/TLS connections to each hub tunnel hot.
 # Previously every request opened a fresh AsyncClient, costing one TLS
 # handshake per proxied call. With keepalive at 20 connections per host
@@ -73,11 +81,28 @@ async def _authorize_home(user: dict, home_id: str) -> dict:
     exact status codes the HTTP path has always returned — the HTTP handler
     propagates them unchanged, and the WS handler translates them to close
     codes.
+
+    Decisions past the ownership check are cached per (home, user) for a few
+    seconds — see relay/app/home_routes.py for TTL and invalidation.
     """
     # Users can only proxy to their own home; relay_admin can proxy to any
     if user.get("role") != "relay_admin" and user.get("home_id") != home_id:
         raise HTTPException(403, "Access denied to this home.")
 
+    cached = home_routes.lookup(home_id, user)
+    if cached is not None:
+        return cached
+    gen = home_routes.generation()
+    try:
+        resolved = await _resolve_home(user, home_id)
+    except HTTPException as exc:
+        home_routes.store(home_id, user, exc, gen)
+        raise
+    home_routes.store(home_id, user, resolved, gen)
+    return resolved
+
+
+async def _resolve_home(user: dict, home_id: str) -> dict:
     async with get_db() as db:
         rows = await db.execute_fetchall(
             "SELECT tunnel_url, public_hostname, relay_secret, status, subscription_state "
@@ -115,8 +140,40 @@ async def _authorize_home(user: dict, home_id: str) -> dict:
     return {"hub_base": hub_base, "relay_secret": home["relay_secret"], "home": home}
 
 
+class _BodyTooLarge(Exception):
+    pass
+
+
+async def _upload(request: Request):
+    """The client's body, chunk by chunk as it arrives, capped."""
+    received = 0
+    async for chunk in request.stream():
+        received += len(chunk)
+        if received > MAX_PROXY_BODY_BYTES:
+            raise _BodyTooLarge()
+        if chunk:
+            yield chunk
+
+
+async def _download(resp: httpx.Response):
+    try:
+        async for chunk in resp.aiter_bytes():
+            yield chunk
+    finally:
+        await resp.aclose()
+
+
 @router.api_route("/{home_id}/{path:path}", methods=["GET", "POST", "PUT", "PATCH", "DELETE"])
 async def proxy(home_id: str, path: str, request: Request):
+    """Forward one request to the hub, streaming both bodies.
+
+    Neither the upload nor the hub's response is ever held whole on the
+    relay: the client's body is fed to the hub as it arrives, and the hub's
+    body goes back to the client as httpx yields it. Memory per request is
+    a few chunks whatever the payload (camera snapshots, backup downloads,
+    history queries), and the client sees the first bytes as soon as the
+    hub sends them.
+    """
     user = current_user(request)
     resolved = await _authorize_home(user, home_id)
     hub_base = resolved["hub_base"]
@@ -132,7 +189,7 @@ async def proxy(home_id: str, path: str, request: Request):
     # because we set them after this filter.
     headers = {
         k: v for k, v in request.headers.items()
-        if k.lower() not in ("host", "authorization", "content-length")
+        if k.lower() not in ("host", "authorization", "content-length", "transfer-encoding")
         and not k.lower().startswith("x-relay-")
     }
     headers["X-Relay-Secret"] = resolved["relay_secret"]
@@ -140,24 +197,33 @@ async def proxy(home_id: str, path: str, request: Request):
     headers["X-Relay-Role"]   = user.get("role", "user")
     headers["X-Relay-Home"]   = home_id
 
-    body = await request.body()
-
+    # A declared length is forwarded so the hub gets a plain body rather
+    # than a chunked one; a chunked upload stays chunked.
+    declared = request.headers.get("content-length")
+    if declared is not None:
+        try:
+            length = int(declared)
+        except ValueError:
+            raise HTTPException(400, "Invalid Content-Length.")
+        if length > MAX_PROXY_BODY_BYTES:
+            raise HTTPException(413, "Request body too large.")
+        headers["Content-Length"] = str(length)
+        content = _upload(request) if length else None
+    elif "chunked" in request.headers.get("transfer-encoding", "").lower():
+        content = _upload(request)
+    else:
+        content = None
+
+    upstream = _proxy_client.build_request(
+        method  = request.method,
+        url     = target,
+        headers = headers,
+        content = content,
+    )
     try:
-        resp = await _proxy_client.request(
-            method  = request.method,
-            url     = target,
-            headers = headers,
-            content = body,
-        )
-        safe_headers = {
-            k: v for k, v in resp.headers.items()
-            if k.lower() not in _STRIP_RESPONSE_HEADERS
-        }
-        return Response(
-            content     = resp.content,
-            status_code = resp.status_code,
-            headers     = safe_headers,
-        )
+        resp = await _proxy_client.send(upstream, stream=True)
+    except _BodyTooLarge:
+        raise HTTPException(413, "Request body too large.")
     except httpx.ConnectError:
         raise HTTPException(503, "Cannot reach home hub. Tunnel may be down.")
     except httpx.TimeoutException:
@@ -165,6 +231,20 @@ async def proxy(home_id: str, path: str, request: Request):
     except Exception as e:
         raise HTTPException(502, f"Proxy error: {e}")
 
+    safe_headers = {
+        k: v for k, v in resp.headers.items()
+        if k.lower() not in _STRIP_RESPONSE_HEADERS
+    }
+    # _download closes the upstream response when it finishes; the
+    # background task covers a client that disconnects before the first
+    # chunk is pulled.
+    return StreamingResponse(
+        _download(resp),
+        status_code = resp.status_code,
+        headers     = safe_headers,
+        background  = BackgroundTask(resp.aclose),
+    )
+
 
 # ---------------------------------------------------------------------------
 # WebSocket proxy — forwards realtime upgrades to the home hub's /ws endpoint.
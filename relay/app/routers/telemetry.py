@@ -8,9 +8,12 @@ Public surface:
   Founder JWT (relay_admin role, or home-owner for their own home):
     GET  /api/admin/homes/{home_id}/telemetry      latest N raw + summary
     GET  /api/admin/homes/{home_id}/telemetry/days daily aggregates
+    GET  /api/admin/homes/{home_id}/telemetry/hours hourly curve for one day
 
-The relay never interprets the payload — it stores it verbatim as JSON.
-Aggregation runs separately in relay/app/telemetry_retention.py. Schema
+The payload is stored verbatim as JSON. The only interpretation at ingest is
+the home_latest upsert (relay/app/home_latest.py) — vitals and fleet_health
+payload issues for the fleet page and remediator. Aggregation runs
+separately in relay/app/telemetry_retention.py. Schema
 documentation for the payload shape lives at the top of this file so
 edge-side telemetry_client.py stays the source of truth for fields:
 
@@ -45,7 +48,9 @@ from pydantic import BaseModel
 from ..audit import log_event, verify as verify_signature
 from ..auth import current_user
 from ..billing import is_operational
-from ..database import get_db
+from ..database import get_db, run_write
+from .. import home_latest
+from ..telemetry_retention import METRICS
 from .ota import (
     _client_ip,
     _resolve_home_id_from_device_id,
@@ -67,7 +72,8 @@ async def post_telemetry(device_id: str, request: Request):
     """Hub posts every 5 min. HMAC-signed with the home's relay_secret.
 
     The body must be a JSON object (top-level dict). Anything else is 400.
-    On success: writes one row to telemetry_raw and an audit_log entry.
+    On success: writes one row to telemetry_raw, refreshes the home's
+    home_latest row, and writes an audit_log entry.
     """
     raw = await request.body()
     src_ip = _client_ip(request)
@@ -133,27 +139,22 @@ async def post_telemetry(device_id: str, request: Request):
     # Detect a version change before the new row lands. A hub deploys locally,
     # so nothing in the cloud ever recorded "this home changed release" — which
     # left the fleet with no answer to "what changed?" after an incident. The
-    # comparison is one indexed read against the row we are about to replace.
-    previous_tag = None
-    try:
-        async with get_db() as db:
-            prev = await db.execute_fetchall(
-                "SELECT payload FROM telemetry_raw WHERE home_id=? ORDER BY id DESC LIMIT 1",
-                (home_id,),
-            )
-        if prev:
-            prev_payload = _json.loads(dict(prev[0])["payload"])
-            previous_tag = ((prev_payload.get("deploy") or {}).get("release_tag")
-                            or (prev_payload.get("deploy") or {}).get("git_describe"))
-    except Exception:
-        previous_tag = None
-
-    async with get_db() as db:
-        await db.execute(
+    # comparison is one primary-key read of the home_latest row we are about
+    # to replace, and the replacement lands in the same write unit as the
+    # raw row so the two can never disagree.
+    async def _ingest(db) -> Optional[str]:
+        try:
+            previous = await home_latest.previous_release_tag(db, home_id)
+        except Exception:
+            previous = None
+        cur = await db.execute(
             "INSERT INTO telemetry_raw (home_id, ts, payload) VALUES (?,?,?)",
             (home_id, now_iso, _json.dumps(payload, separators=(",", ":"))),
         )
-        await db.commit()
+        await home_latest.upsert(db, home_id, now_iso, cur.lastrowid, payload)
+        return previous
+
+    previous_tag = await run_write(_ingest)
 
     try:
         deploy = payload.get("deploy") or {}
@@ -228,3 +229,39 @@ async def list_daily_telemetry(home_id: str, request: Request, limit: int = 90):
             (home_id, limit),
         )
     return {"home_id": home_id, "days": [dict(r) for r in rows], "count": len(rows)}
+
+
+@router.get("/api/admin/homes/{home_id}/telemetry/hours")
+async def list_hourly_telemetry(home_id: str, request: Request, day: Optional[str] = None):
+    """Hourly rollups for one UTC day (default today), oldest hour first.
+
+    Served from telemetry_hourly — per metric avg/min/max — so an intra-day
+    curve costs ≤24 rows, not a re-parse of every raw post. Trails ingest
+    by at most one rollup interval (telemetry_retention.ROLLUP_INTERVAL_S).
+    """
+    user = current_user(request)
+    if user.get("role") != "relay_admin" and user.get("home_id") != home_id:
+        raise HTTPException(403, "Access denied.")
+    if day is None:
+        day = datetime.now(timezone.utc).date().isoformat()
+    try:
+        datetime.strptime(day, "%Y-%m-%d")
+    except ValueError:
+        raise HTTPException(400, "day must be YYYY-MM-DD.")
+    async with get_db() as db:
+        rows = await db.execute_fetchall(
+            "SELECT * FROM telemetry_hourly "
+            "WHERE home_id=? AND hour >= ? AND hour < ? ORDER BY hour ASC",
+            (home_id, day, f"{day}U"),  # 'U' sorts after 'T': every hour of `day`
+        )
+    hours = []
+    for r in rows:
+        out = {"hour": r["hour"], "sample_count": r["sample_count"],
+               "ha_version": r["ha_version"], "ziggy_version": r["ziggy_version"],
+               "last_seen_ts": r["last_seen_ts"]}
+        for m in METRICS:
+            n = r[f"{m}_n"]
+            out[m] = {"avg": (r[f"{m}_sum"] / n) if n else None,
+                      "min": r[f"{m}_min"], "max": r[f"{m}_max"]}
+        hours.append(out)
+    return {"home_id": home_id, "day": day, "hours": hours, "count": len(hours)}
@@ -1,27 +1,37 @@
 """Telemetry retention + aggregation (Prompt 2 §C).
 
-Two-tier retention:
-
-    telemetry_raw    kept 30 days
-    telemetry_daily  kept 365 days, one row per (home_id, day)
-
-One pass = one call to run_retention_pass(). It:
-
-  1. Computes the day-of-cutoff (now - 30 days, UTC).
-  2. For every distinct (home_id, day) older than today's UTC date,
-     aggregates any telemetry_raw rows in that window into a single
-     telemetry_daily row (upsert).
-  3. Deletes telemetry_raw rows older than the 30-day cutoff.
+Three-tier retention:
+
+    telemetry_raw     kept 30 days
+    telemetry_hourly  kept 30 days, one row per (home_id, UTC hour)
+    telemetry_daily   kept 365 days, one row per (home_id, day)
+
+Raw rows are read exactly once. fold_new_raw() walks telemetry_raw by id
+from a high-water mark (telemetry_rollup_state.raw_hwm), parses each payload
+once and adds it into running per-hour aggregates — sum, count, min and max
+per metric, plus the newest version strings. The mark and the hourly rows
+advance in the same transaction, so a row is never counted twice or missed.
+It runs every ROLLUP_INTERVAL_S, which keeps today's hourly curve current for
+the admin /telemetry/hours view.
+
+One retention pass = one call to run_retention_pass(). It:
+
+  1. Folds any raw rows past the high-water mark.
+  2. Re-publishes telemetry_daily for every day strictly before today that
+     a fold has touched since the last pass (telemetry_rollup_state
+     .daily_dirty_from), from that day's ≤24 hourly rows. Today's data is
+     left unpublished so partial-day aggregates never appear.
+  3. Deletes telemetry_raw and telemetry_hourly rows older than 30 days
+     (range predicates on ts / hour — both indexed; nothing is re-read).
   4. Deletes telemetry_daily rows older than 365 days.
 
-The relay background loop (started in lifespan) runs run_retention_loop()
-which sleeps 24 hours between passes. Tests call run_retention_pass()
-directly with a frozen `now` and an arbitrary db connection.
+The relay background loop (started in lifespan) runs run_retention_loop(),
+folding every ROLLUP_INTERVAL_S and running a full pass once a day. Tests
+call run_retention_pass() / fold_new_raw() directly with a frozen `now`.
 
-Aggregations:
+Aggregations (daily from hourly):
 
-  ha_version       most recent value in the window (LAST function via
-                   max(ts) join)
+  ha_version       most recent non-empty value in the window
   ziggy_version    same shape
   uptime_avg_s     average of payload.uptime_s where present
   sensor_count_avg average length of payload.sensors when present
@@ -40,6 +50,7 @@ from __future__ import annotations
 import asyncio
 import json as _json
 import logging
+import time
 from datetime import datetime, timedelta, timezone
 from typing import Optional
 
@@ -48,27 +59,41 @@ from .database import get_db
 log = logging.getLogger(__name__)
 
 RAW_RETENTION_DAYS = 30
+HOURLY_RETENTION_DAYS = RAW_RETENTION_DAYS
 DAILY_RETENTION_DAYS = 365
-RETENTION_INTERVAL_S = 24 * 60 * 60  # one pass per day
+RETENTION_INTERVAL_S = 24 * 60 * 60  # one full pass per day
+ROLLUP_INTERVAL_S = 5 * 60           # fold new raw rows at the posting cadence
+
+# Raw rows folded per transaction. Bounds memory and lock hold time on the
+# first fold after an upgrade, when the whole 30-day window is pending.
+FOLD_BATCH = 5000
+
+# Metrics rolled up per hour: (sum, n, min, max) columns each.
+METRICS = ("uptime_s", "sensor_count", "disk_pct", "cpu_pct", "mem_pct")
 
 
 def _utc_now() -> datetime:
     return datetime.now(timezone.utc)
 
 
-def _day_of(ts_iso: str) -> Optional[str]:
-    """Extract YYYY-MM-DD UTC from an ISO timestamp. None if unparseable."""
+def _utc_of(ts_iso: str) -> Optional[datetime]:
     try:
         # fromisoformat handles offset suffixes in 3.11+; strip Z for older.
         s = ts_iso.replace("Z", "+00:00") if ts_iso.endswith("Z") else ts_iso
         dt = datetime.fromisoformat(s)
         if dt.tzinfo is None:
             dt = dt.replace(tzinfo=timezone.utc)
-        return dt.astimezone(timezone.utc).date().isoformat()
-    except (ValueError, TypeError):
+        return dt.astimezone(timezone.utc)
+    except (ValueError, TypeError, AttributeError):
         return None
 
 
+def _hour_of(ts_iso: str) -> Optional[str]:
+    """Extract YYYY-MM-DDTHH UTC from an ISO timestamp. None if unparseable."""
+    dt = _utc_of(ts_iso)
+    return dt.strftime("%Y-%m-%dT%H") if dt else None
+
+
 def _float_or_none(value) -> Optional[float]:
     if isinstance(value, (int, float)) and not isinstance(value, bool):
         return float(value)
@@ -86,128 +111,248 @@ def _coerce_disk_pct(disk_field) -> Optional[float]:
     return _float_or_none(disk_field)
 
 
-async def _aggregate_day(db, home_id: str, day: str) -> None:
-    """Compute and upsert one (home_id, day) row from raw rows that fall in it.
+def _sample(payload: dict) -> dict[str, Optional[float]]:
+    """The rolled-up metrics of one payload; None where absent."""
+    sensors = payload.get("sensors")
+    return {
+        "uptime_s":     _float_or_none(payload.get("uptime_s")),
+        "sensor_count": float(len(sensors)) if isinstance(sensors, list) else None,
+        "disk_pct":     _coerce_disk_pct(payload.get("disk")),
+        "cpu_pct":      _float_or_none(payload.get("cpu_pct")),
+        "mem_pct":      _float_or_none(payload.get("mem_pct")),
+    }
+
 
-    Day boundary: ts where date-of-ts equals `day` (UTC). Pulled by string
-    prefix match — telemetry_raw.ts is the raw ISO string the edge sent, so
-    matching its first 10 chars to the day works because we always store
-    UTC ISO from the edge poster.
-    """
+class _Bucket:
+    """Running aggregate for one (home_id, hour) within a fold batch."""
+
+    __slots__ = ("count", "sums", "ns", "mins", "maxs", "versions", "last_seen_ts")
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.sums = dict.fromkeys(METRICS, 0.0)
+        self.ns = dict.fromkeys(METRICS, 0)
+        self.mins: dict[str, Optional[float]] = dict.fromkeys(METRICS)
+        self.maxs: dict[str, Optional[float]] = dict.fromkeys(METRICS)
+        # field → (ts, value) of the newest non-empty value
+        self.versions: dict[str, tuple[str, str]] = {}
+        self.last_seen_ts = ""
+
+    def add(self, ts: str, payload: dict) -> None:
+        self.count += 1
+        if ts > self.last_seen_ts:
+            self.last_seen_ts = ts
+        for field in ("ha_version", "ziggy_version"):
+            v = payload.get(field)
+            if isinstance(v, str) and v and ts >= self.versions.get(field, ("", ""))[0]:
+                self.versions[field] = (ts, v)
+        for m, v in _sample(payload).items():
+            if v is None:
+                continue
+            self.sums[m] += v
+            self.ns[m] += 1
+            lo, hi = self.mins[m], self.maxs[m]
+            self.mins[m] = v if lo is None else min(lo, v)
+            self.maxs[m] = v if hi is None else max(hi, v)
+
+    def row(self, home_id: str, hour: str) -> tuple:
+        out: list = [home_id, hour, self.count]
+        for m in METRICS:
+            out += [self.sums[m], self.ns[m], self.mins[m], self.maxs[m]]
+        for field in ("ha_version", "ziggy_version"):
+            ts, v = self.versions.get(field, (None, None))
+            out += [v, ts]
+        out.append(self.last_seen_ts)
+        return tuple(out)
+
+
+def _metric_cols(m: str) -> list[str]:
+    return [f"{m}_sum", f"{m}_n", f"{m}_min", f"{m}_max"]
+
+
+_HOURLY_COLS = (
+    ["home_id", "hour", "sample_count"]
+    + [c for m in METRICS for c in _metric_cols(m)]
+    + ["ha_version", "ha_version_ts", "ziggy_version", "ziggy_version_ts", "last_seen_ts"]
+)
+
+
+def _merge(m: str) -> str:
+    s, n, lo, hi = _metric_cols(m)
+    return (
+        f"{s}={s}+excluded.{s}, {n}={n}+excluded.{n}, "
+        # Scalar MIN/MAX return NULL if either side is NULL; COALESCE both
+        # ways so a missing side just yields the other.
+        f"{lo}=MIN(COALESCE({lo},excluded.{lo}),COALESCE(excluded.{lo},{lo})), "
+        f"{hi}=MAX(COALESCE({hi},excluded.{hi}),COALESCE(excluded.{hi},{hi}))"
+    )
+
+
+def _merge_version(field: str) -> str:
+    ts = f"{field}_ts"
+    return (
+        f"{field}=CASE WHEN excluded.{ts} >= COALESCE({ts},'') "
+        f"THEN excluded.{field} ELSE {field} END, "
+        f"{ts}=CASE WHEN excluded.{ts} >= COALESCE({ts},'') "
+        f"THEN excluded.{ts} ELSE {ts} END"
+    )
+
+
+_HOURLY_UPSERT = (
+    f"INSERT INTO telemetry_hourly ({', '.join(_HOURLY_COLS)}) "
+    f"VALUES ({', '.join('?' for _ in _HOURLY_COLS)}) "
+    f"ON CONFLICT(home_id, hour) DO UPDATE SET "
+    f"sample_count=sample_count+excluded.sample_count, "
+    + ", ".join(_merge(m) for m in METRICS) + ", "
+    + _merge_version("ha_version") + ", " + _merge_version("ziggy_version") + ", "
+    "last_seen_ts=MAX(COALESCE(last_seen_ts,''),excluded.last_seen_ts)"
+)
+
+
+async def _get_state(db, key: str) -> Optional[str]:
     rows = await db.execute_fetchall(
-        "SELECT ts, payload FROM telemetry_raw "
-        "WHERE home_id=? AND substr(ts,1,10)=? ORDER BY ts ASC",
-        (home_id, day),
+        "SELECT value FROM telemetry_rollup_state WHERE key=?", (key,))
+    return rows[0][0] if rows else None
+
+
+async def _set_state(db, key: str, value: Optional[str]) -> None:
+    await db.execute(
+        "INSERT OR REPLACE INTO telemetry_rollup_state (key, value) VALUES (?,?)",
+        (key, value),
     )
-    if not rows:
-        return
-
-    ha_version: Optional[str] = None
-    ziggy_version: Optional[str] = None
-    uptime_sum: float = 0.0
-    uptime_n: int = 0
-    sensor_count_sum: int = 0
-    sensor_count_n: int = 0
-    disk_sum: float = 0.0
-    disk_n: int = 0
-    cpu_sum: float = 0.0
-    cpu_n: int = 0
-    mem_sum: float = 0.0
-    mem_n: int = 0
-    last_seen_ts: Optional[str] = None
-
-    for r in rows:
-        try:
-            payload = _json.loads(r["payload"]) if r["payload"] else {}
-            if not isinstance(payload, dict):
+
+
+async def fold_new_raw(db, *, batch: int = FOLD_BATCH) -> int:
+    """Fold every telemetry_raw row past the high-water mark into
+    telemetry_hourly. Returns the number of raw rows folded.
+
+    Each batch is one IMMEDIATE transaction — the write lock is taken
+    before the mark is read, so two concurrent folds serialize instead of
+    both counting the same rows. The caller must not hold an open
+    transaction on `db`.
+    """
+    folded = 0
+    while True:
+        await db.execute("BEGIN IMMEDIATE")
+        hwm = int(await _get_state(db, "raw_hwm") or 0)
+        rows = await db.execute_fetchall(
+            "SELECT id, home_id, ts, payload FROM telemetry_raw "
+            "WHERE id > ? ORDER BY id LIMIT ?",
+            (hwm, batch),
+        )
+        if not rows:
+            await db.commit()
+            return folded
+
+        buckets: dict[tuple[str, str], _Bucket] = {}
+        for raw_id, home_id, ts, text in rows:
+            hour = _hour_of(ts) if ts else None
+            if hour is None:
+                continue
+            try:
+                payload = _json.loads(text) if text else {}
+                if not isinstance(payload, dict):
+                    payload = {}
+            except _json.JSONDecodeError:
                 payload = {}
-        except _json.JSONDecodeError:
-            payload = {}
-        last_seen_ts = r["ts"]  # rows are ASC, so this ends up at the latest
-
-        # Versions: take the latest non-empty value seen.
-        if isinstance(payload.get("ha_version"), str) and payload["ha_version"]:
-            ha_version = payload["ha_version"]
-        if isinstance(payload.get("ziggy_version"), str) and payload["ziggy_version"]:
-            ziggy_version = payload["ziggy_version"]
-
-        u = _float_or_none(payload.get("uptime_s"))
-        if u is not None:
-            uptime_sum += u
-            uptime_n += 1
-
-        sensors = payload.get("sensors")
-        if isinstance(sensors, list):
-            sensor_count_sum += len(sensors)
-            sensor_count_n += 1
-
-        d = _coerce_disk_pct(payload.get("disk"))
-        if d is not None:
-            disk_sum += d
-            disk_n += 1
-
-        c = _float_or_none(payload.get("cpu_pct"))
-        if c is not None:
-            cpu_sum += c
-            cpu_n += 1
-
-        m = _float_or_none(payload.get("mem_pct"))
-        if m is not None:
-            mem_sum += m
-            mem_n += 1
-
-    def _avg(s: float, n: int) -> Optional[float]:
+            bucket = buckets.get((home_id, hour))
+            if bucket is None:
+                bucket = buckets[(home_id, hour)] = _Bucket()
+            bucket.add(ts, payload)
+
+        await db.executemany(
+            _HOURLY_UPSERT, [b.row(home_id, hour) for (home_id, hour), b in buckets.items()])
+        await _set_state(db, "raw_hwm", str(rows[-1][0]))
+        if buckets:
+            touched = min(hour[:10] for _, hour in buckets)
+            dirty = await _get_state(db, "daily_dirty_from")
+            if dirty is None or touched < dirty:
+                await _set_state(db, "daily_dirty_from", touched)
+        await db.commit()
+        folded += len(rows)
+
+
+def _daily_row(home_id: str, day: str, hours: list) -> tuple:
+    """telemetry_daily row from one day's hourly rows (ordered by hour)."""
+    def total(m: str) -> tuple[float, int]:
+        return sum(h[f"{m}_sum"] for h in hours), sum(h[f"{m}_n"] for h in hours)
+
+    def avg(m: str) -> Optional[float]:
+        s, n = total(m)
         return (s / n) if n else None
 
-    uptime_avg = int(uptime_sum / uptime_n) if uptime_n else None
-    sensor_count_avg = int(round(sensor_count_sum / sensor_count_n)) if sensor_count_n else None
-    disk_avg = _avg(disk_sum, disk_n)
-    cpu_avg  = _avg(cpu_sum, cpu_n)
-    mem_avg  = _avg(mem_sum, mem_n)
+    def last(field: str) -> Optional[str]:
+        best = max((h for h in hours if h[field]), key=lambda h: h[f"{field}_ts"], default=None)
+        return best[field] if best else None
+
+    uptime, sensors = avg("uptime_s"), avg("sensor_count")
+    return (
+        home_id, day, last("ha_version"), last("ziggy_version"),
+        int(uptime) if uptime is not None else None,
+        int(round(sensors)) if sensors is not None else None,
+        avg("disk_pct"), avg("cpu_pct"), avg("mem_pct"),
+        sum(h["sample_count"] for h in hours),
+        max(h["last_seen_ts"] for h in hours),
+    )
+
 
-    await db.execute(
+async def _publish_daily(db, today_iso: str, floor_day: str) -> int:
+    """Rewrite telemetry_daily for dirty days in [floor_day, today). Returns
+    days written. Days before floor_day may have lost hourly rows to
+    retention; rebuilding them would replace a full day with a fragment."""
+    dirty = await _get_state(db, "daily_dirty_from")
+    if dirty is None or dirty >= today_iso:
+        return 0
+    hours = await db.execute_fetchall(
+        "SELECT * FROM telemetry_hourly WHERE hour >= ? AND hour < ? "
+        "ORDER BY home_id, hour",
+        (max(dirty, floor_day), today_iso),
+    )
+    by_day: dict[tuple[str, str], list] = {}
+    for h in hours:
+        by_day.setdefault((h["home_id"], h["hour"][:10]), []).append(h)
+    await db.executemany(
         """INSERT OR REPLACE INTO telemetry_daily
            (home_id, day, ha_version, ziggy_version, uptime_avg_s,
             sensor_count_avg, disk_pct_avg, cpu_pct_avg, mem_pct_avg,
             sample_count, last_seen_ts)
            VALUES (?,?,?,?,?,?,?,?,?,?,?)""",
-        (home_id, day, ha_version, ziggy_version, uptime_avg,
-         sensor_count_avg, disk_avg, cpu_avg, mem_avg,
-         len(rows), last_seen_ts),
+        [_daily_row(home_id, day, rows) for (home_id, day), rows in by_day.items()],
     )
+    # Today's hours may already be folded; they become publishable tomorrow.
+    await _set_state(db, "daily_dirty_from", today_iso)
+    return len(by_day)
 
 
 async def run_retention_pass(*, now: Optional[datetime] = None) -> dict:
     """Execute one aggregation + pruning cycle. Returns a small result dict."""
     if now is None:
         now = _utc_now()
-    today_iso = now.astimezone(timezone.utc).date().isoformat()
+    now = now.astimezone(timezone.utc)
+    today_iso = now.date().isoformat()
     raw_cutoff_iso = (now - timedelta(days=RAW_RETENTION_DAYS)).isoformat()
+    hourly_cutoff = (now - timedelta(days=HOURLY_RETENTION_DAYS)).strftime("%Y-%m-%dT%H")
     daily_cutoff = (now - timedelta(days=DAILY_RETENTION_DAYS)).date().isoformat()
-
-    aggregated_days = 0
-    deleted_raw = 0
-    deleted_daily = 0
+    # First day whose hours are all still inside hourly retention.
+    floor_day = (now - timedelta(days=HOURLY_RETENTION_DAYS - 1)).date().isoformat()
 
     async with get_db() as db:
-        # Aggregate every (home_id, day) seen in raw that's strictly older than today.
-        # Today's data is left raw so partial-day aggregates aren't published.
-        pairs = await db.execute_fetchall(
-            "SELECT DISTINCT home_id, substr(ts,1,10) AS day FROM telemetry_raw "
-            "WHERE substr(ts,1,10) < ?",
-            (today_iso,),
-        )
-        for row in pairs:
-            await _aggregate_day(db, row["home_id"], row["day"])
-            aggregated_days += 1
+        folded = await fold_new_raw(db)
+        aggregated_days = await _publish_daily(db, today_iso, floor_day)
 
-        # Prune raw older than cutoff. Two separate executes so cursor.rowcount
-        # is meaningful per delete.
+        # Prune by range on indexed columns. Everything below the cutoff has
+        # already been folded (step 1), so nothing is read back before it
+        # goes. Separate executes so cursor.rowcount is meaningful per delete.
         cur = await db.execute(
             "DELETE FROM telemetry_raw WHERE ts < ?", (raw_cutoff_iso,)
         )
         deleted_raw = cur.rowcount or 0
 
+        cur = await db.execute(
+            "DELETE FROM telemetry_hourly WHERE hour < ?", (hourly_cutoff,)
+        )
+        deleted_hourly = cur.rowcount or 0
+
         cur = await db.execute(
             "DELETE FROM telemetry_daily WHERE day < ?", (daily_cutoff,)
         )
@@ -215,25 +360,39 @@ async def run_retention_pass(*, now: Optional[datetime] = None) -> dict:
 
         await db.commit()
 
-    log.info("telemetry retention pass: aggregated=%d days, pruned raw=%d daily=%d",
-             aggregated_days, deleted_raw, deleted_daily)
+    log.info("telemetry retention pass: folded=%d raw, aggregated=%d days, "
+             "pruned raw=%d hourly=%d daily=%d",
+             folded, aggregated_days, deleted_raw, deleted_hourly, deleted_daily)
     return {
+        "folded_raw":      folded,
         "aggregated_days": aggregated_days,
         "deleted_raw":     deleted_raw,
+        "deleted_hourly":  deleted_hourly,
         "deleted_daily":   deleted_daily,
         "ran_at":          now.isoformat(),
     }
 
 
+async def run_rollup_once() -> int:
+    async with get_db() as db:
+        return await fold_new_raw(db)
+
+
 async def run_retention_loop() -> None:
-    """Background task started by relay's lifespan. Sleeps a day between passes.
+    """Background task started by relay's lifespan.
 
-    On the first tick after process start we run immediately so a relay
-    restart doesn't delay retention by a full day.
+    Folds new raw rows every ROLLUP_INTERVAL_S; runs the full pass once a
+    day. On the first tick after process start we run the full pass
+    immediately so a relay restart doesn't delay retention by a full day.
     """
+    last_pass = 0.0
     while True:
         try:
-            await run_retention_pass()
+            if time.monotonic() - last_pass >= RETENTION_INTERVAL_S or not last_pass:
+                await run_retention_pass()
+                last_pass = time.monotonic()
+            else:
+                await run_rollup_once()
         except Exception as e:
             log.error("telemetry retention pass failed: %s", e, exc_info=True)
-        await asyncio.sleep(RETENTION_INTERVAL_S)
+        await asyncio.sleep(ROLLUP_INTERVAL_S)
@@ -0,0 +1,158 @@
+"""Relay LLM proxy response cache + coalescing (relay/app/llm_cache.py).
+
+Only opted-in, deterministic, non-streaming calls are served from cache;
+identical calls in flight share one upstream request; only 200s are kept.
+The upstream httpx client is stubbed — no real OpenAI call.
+"""
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import json
+from collections import OrderedDict
+from datetime import datetime, timezone
+
+import pytest
+
+_has_httpx = importlib.util.find_spec("httpx") is not None
+pytestmark = pytest.mark.skipif(not _has_httpx, reason="httpx not installed")
+
+if _has_httpx:
+    import httpx
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from relay.app import database as dbmod
+    from relay.app import llm_cache
+    from relay.app.routers import llm as llmmod
+    from core.relay_signing import sign
+
+HOME_ID = "home-test-llm-cache"
+SECRET = "s3cr3t-relay-key"
+
+_REQ = {"model": "gpt-4o-mini", "temperature": 0,
+        "messages": [{"role": "user", "content": "turn off the lights"}],
+        "tools": [{"type": "function", "function": {"name": "control_lights"}}]}
+
+
+@pytest.fixture(autouse=True)
+def fresh_cache(monkeypatch):
+    monkeypatch.setattr(llm_cache, "_entries", OrderedDict())
+    monkeypatch.setattr(llm_cache, "_bytes", 0)
+    monkeypatch.setattr(llm_cache, "_inflight", {})
+    monkeypatch.setattr(llm_cache, "_by_home", {})
+    monkeypatch.setattr(llm_cache, "_totals", dict.fromkeys(llm_cache._totals, 0))
+
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(dbmod, "DATABASE_URL", str(tmp_path / "relay.db"))
+    await dbmod.init_db()
+    async with dbmod.get_db() as d:
+        await d.execute(
+            "INSERT INTO homes (id, name, type, status, subscription_state, relay_secret, created_at) "
+            "VALUES (?,?,?,?,?,?,?)",
+            (HOME_ID, "Test", "hub", "active", "active", SECRET,
+             datetime.now(timezone.utc).isoformat()),
+        )
+        await d.commit()
+    return dbmod
+
+
+@pytest.fixture
+def app_client(db, monkeypatch):
+    monkeypatch.setenv("OPENAI_API_KEY", "sk-relay-held-key")
+    calls = []
+    status = {"code": 200}
+
+    async def fake_post(path, content=None, headers=None):
+        calls.append(content)
+        return httpx.Response(status["code"], json={"choices": [{"n": len(calls)}]},
+                              headers={"content-type": "application/json"})
+
+    monkeypatch.setattr(llmmod._openai_client, "post", fake_post)
+    app = FastAPI()
+    app.include_router(llmmod.router)
+    c = TestClient(app)
+    c.calls, c.status = calls, status
+    return c
+
+
+def _post(client, body: bytes, purpose: str | None = "intent_parse"):
+    headers = {"X-Ziggy-Signature": sign(SECRET, body), "Content-Type": "application/json"}
+    if purpose:
+        headers["X-Ziggy-Purpose"] = purpose
+    return client.post(f"/api/devices/{HOME_ID}/llm/v1/chat/completions",
+                       content=body, headers=headers)
+
+
+def test_repeat_is_served_from_cache_regardless_of_formatting(app_client):
+    first = _post(app_client, json.dumps(_REQ).encode())
+    # Same request, different key order and whitespace.
+    again = json.dumps(dict(reversed(list(_REQ.items()))), indent=2).encode()
+    second = _post(app_client, again)
+    assert (first.headers["x-ziggy-cache"], second.headers["x-ziggy-cache"]) == ("miss", "hit")
+    assert second.json() == first.json()
+    assert len(app_client.calls) == 1
+    assert llm_cache.stats()["homes"][HOME_ID] == {
+        "hits": 1, "misses": 1, "coalesced": 0, "bypass": 0}
+
+
+@pytest.mark.parametrize("purpose,override", [
+    (None, {}),                      # hub did not opt in
+    ("chat", {}),                    # purpose not cacheable
+    ("intent_parse", {"temperature": 0.7}),
+    ("intent_parse", {"temperature": None}),
+    ("intent_parse", {"n": 2}),
+])
+def test_only_opted_in_deterministic_calls_are_cached(app_client, purpose, override):
+    req = {k: v for k, v in {**_REQ, **override}.items() if v is not None}
+    body = json.dumps(req).encode()
+    for _ in range(2):
+        assert _post(app_client, body, purpose).headers["x-ziggy-cache"] == "bypass"
+    assert len(app_client.calls) == 2
+
+
+def test_errors_are_not_cached(app_client):
+    body = json.dumps(_REQ).encode()
+    app_client.status["code"] = 429
+    assert _post(app_client, body).status_code == 429
+    app_client.status["code"] = 200
+    assert _post(app_client, body).headers["x-ziggy-cache"] == "miss"
+    assert len(app_client.calls) == 2
+
+
+async def test_identical_in_flight_requests_share_one_upstream_call():
+    calls = 0
+    gate = asyncio.Event()
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await gate.wait()
+        return 200, "application/json", b"{}"
+
+    key = llm_cache.cache_key("translate", json.dumps(_REQ).encode())
+    tasks = [asyncio.create_task(llm_cache.fetch(f"home-{i}", key, upstream)) for i in range(5)]
+    await asyncio.sleep(0)
+    gate.set()
+    outcomes = sorted(r[3] for r in await asyncio.gather(*tasks))
+    assert calls == 1
+    assert outcomes == ["coalesced"] * 4 + ["miss"]
+    assert llm_cache.stats()["hit_rate"] == 0.8
+
+
+async def test_upstream_failure_reaches_every_coalesced_request():
+    gate = asyncio.Event()
+
+    async def upstream():
+        await gate.wait()
+        raise httpx.ReadTimeout("slow")
+
+    key = llm_cache.cache_key("intent_parse", json.dumps(_REQ).encode())
+    tasks = [asyncio.create_task(llm_cache.fetch("h", key, upstream)) for _ in range(3)]
+    await asyncio.sleep(0)
+    gate.set()
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    assert all(isinstance(r, httpx.ReadTimeout) for r in results)
+    assert llm_cache.stats()["entries"] == 0
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full vs incremental anomaly rule loop.
+
+Usage:
+    python scripts/bench_anomaly_rule_loop.py [--entities 2000] [--areas 40]
+                                              [--events 500] [--stream events.jsonl]
+
+Builds a synthetic state cache (power sensors, batteries, lights, switches,
+motion/door binary sensors, climate, persons) spread over N areas, then
+replays a state_changed stream against it twice:
+
+  full         — every run re-evaluates every rule × every target, which is
+                 what anomaly_engine._run_rule_loop did before it went
+                 incremental
+  incremental  — evaluate()-style dirty marking, only affected pairs re-run
+                 (the periodic full sweep is pushed out of the window)
+
+Each event runs one rule loop (no debounce), so the numbers are per event.
+--stream replays a recorded stream instead: one JSON object per line with
+"entity_id", "state" and optional "attributes" (e.g. exported from the HA
+event log); entities missing from the synthetic cache are added to it.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services import anomaly_engine as ae  # noqa: E402
+
+
+_KINDS = [
+    # (domain, device_class, weight in cache, weight in event stream)
+    ("sensor", "power", 30, 70),
+    ("sensor", "battery", 15, 2),
+    ("light", None, 15, 8),
+    ("switch", None, 10, 5),
+    ("binary_sensor", "motion", 10, 10),
+    ("binary_sensor", "door", 10, 3),
+    ("climate", None, 5, 1),
+    ("sensor", "temperature", 5, 1),
+]
+
+
+def _synthetic_home(n_entities: int, n_areas: int, rng: random.Random):
+    cache: dict = {}
+    areas = {f"area_{i}": {"id": f"area_{i}", "name": f"Area {i}", "entities": []}
+             for i in range(n_areas)}
+    weights = [k[2] for k in _KINDS]
+    for i in range(n_entities):
+        domain, dc, _, _ = rng.choices(_KINDS, weights)[0]
+        eid = f"{domain}.e{i}"
+        attrs = {"friendly_name": eid}
+        if dc:
+            attrs["device_class"] = dc
+        state = {"sensor": "50", "light": "off", "switch": "off",
+                 "binary_sensor": "off", "climate": "off"}[domain]
+        cache[eid] = {"state": state, "attributes": attrs, "last_changed": ""}
+        if rng.random() < 0.9:
+            areas[f"area_{rng.randrange(n_areas)}"]["entities"].append(eid)
+    for name in ("alice", "bob"):
+        cache[f"person.{name}"] = {"state": "home", "attributes": {}, "last_changed": ""}
+    return cache, areas
+
+
+def _synthetic_stream(cache: dict, n_events: int, rng: random.Random) -> list[dict]:
+    by_kind: dict[tuple, list[str]] = {}
+    for eid, v in cache.items():
+        key = (eid.split(".", 1)[0], v["attributes"].get("device_class"))
+        by_kind.setdefault(key, []).append(eid)
+    kinds = [(k[0], k[1]) for k in _KINDS if (k[0], k[1]) in by_kind]
+    weights = [k[3] for k in _KINDS if (k[0], k[1]) in by_kind]
+    events = []
+    for _ in range(n_events):
+        domain, dc = rng.choices(kinds, weights)[0]
+        eid = rng.choice(by_kind[(domain, dc)])
+        if domain == "sensor":
+            state = str(rng.randint(0, 100) if dc == "battery" else rng.randint(0, 3000))
+        elif domain == "climate":
+            state = rng.choice(["off", "heat"])
+        else:
+            state = rng.choice(["on", "off"])
+        events.append({"entity_id": eid, "state": state})
+    return events
+
+
+def _load_stream(path: str, cache: dict) -> list[dict]:
+    events = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            ev = json.loads(line)
+            cache.setdefault(ev["entity_id"], {
+                "state": ev.get("state", ""), "attributes": dict(ev.get("attributes") or {}),
+                "last_changed": "",
+            })
+            events.append(ev)
+    return events
+
+
+def _quiet_engine(areas: dict) -> None:
+    ae._cfg = lambda: {"enabled": True}
+    ae._ziggy_load_persons = lambda: []
+    ae._log_history_fired = lambda *a, **k: None
+    ae._log_history_cleared = lambda *a, **k: None
+    ae.log_info = lambda *a, **k: None
+
+    async def _areas():
+        return areas
+    ae._get_area_map = _areas
+
+
+def _reset_engine() -> None:
+    ae._rule_index = None
+    ae._dirty_entities = set()
+    ae._last_full_sweep_ts = 0.0
+    ae._loop_stats = {"runs": 0, "full_sweeps": 0, "rule_evals": 0}
+    ae._last_fired.clear()
+    ae._last_on.clear()
+    ae._room_empty_since.clear()
+    ae._recent_unavailable.clear()
+
+
+async def _replay(cache: dict, events: list[dict], *, full: bool) -> tuple[float, int, dict]:
+    _reset_engine()
+    active: dict = {}
+    await ae._run_rule_loop(cache, active, full=True)      # warm index + state
+    ae._last_full_sweep_ts = time.time() + 1e9             # no periodic sweep
+    evals0 = ae._loop_stats["rule_evals"]
+    t0 = time.perf_counter()
+    for ev in events:
+        entry = cache[ev["entity_id"]]
+        entry["state"] = ev["state"]
+        if ev.get("attributes"):
+            entry["attributes"].update(ev["attributes"])
+        ae._dirty_entities.add(ev["entity_id"])
+        await ae._run_rule_loop(cache, active, full=full)
+    elapsed = time.perf_counter() - t0
+    return elapsed, ae._loop_stats["rule_evals"] - evals0, active
+
+
+async def _main(args) -> None:
+    rng = random.Random(args.seed)
+    cache, areas = _synthetic_home(args.entities, args.areas, rng)
+    events = (_load_stream(args.stream, cache) if args.stream
+              else _synthetic_stream(cache, args.events, rng))
+    _quiet_engine(areas)
+
+    initial = {eid: {"state": v["state"], "attributes": dict(v["attributes"])}
+               for eid, v in cache.items()}
+
+    def _restore():
+        for eid, v in initial.items():
+            cache[eid]["state"] = v["state"]
+            cache[eid]["attributes"] = dict(v["attributes"])
+
+    _restore()
+    full_s, full_evals, full_active = await _replay(cache, events, full=True)
+    _restore()
+    inc_s, inc_evals, inc_active = await _replay(cache, events, full=False)
+
+    n = len(events)
+    print(f"entities={len(cache)} areas={len(areas)} events={n}")
+    print(f"{'mode':>12} {'ms/event':>9} {'rule evals/event':>17}")
+    print(f"{'full':>12} {full_s / n * 1e3:>9.3f} {full_evals / n:>17.1f}")
+    print(f"{'incremental':>12} {inc_s / n * 1e3:>9.3f} {inc_evals / n:>17.1f}")
+    print(f"speed-up: {full_s / inc_s:.1f}x")
+
+    def _keys(active):
+        return sorted((room, e["rule_id"]) for room, lst in active.items() for e in lst)
+    if _keys(full_active) != _keys(inc_active):
+        raise SystemExit("parity failure: active anomaly sets differ")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Anomaly rule loop benchmark")
+    parser.add_argument("--entities", type=int, default=2000)
+    parser.add_argument("--areas", type=int, default=40)
+    parser.add_argument("--events", type=int, default=500)
+    parser.add_argument("--stream", help="JSONL state_changed stream to replay")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    asyncio.run(_main(args))
+
+
+if __name__ == "__main__":
+    main()
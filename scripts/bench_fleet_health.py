@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Benchmark: fleet health from telemetry_raw vs from the home_latest read model.
+
+Usage:
+    python scripts/bench_fleet_health.py [--homes 10000] [--days 30]
+                                         [--interval-min 5] [--runs 3]
+
+Builds a throwaway relay.db with --homes homes, each posting every
+--interval-min minutes for --days days (10k × 30 d × 5 min is 86.4M raw rows;
+older posts carry a small stub payload so the file stays a few GB, the newest
+post per home a realistic one), then times the work behind
+GET /admin/fleet/health and each remediator sweep two ways:
+
+  raw     — GROUP BY home_id MAX(id) join over telemetry_raw, json.loads
+            every latest payload, fleet_health.evaluate for every home
+            (what both callers did before home_latest)
+  latest  — home_latest.load() + home_latest.verdict(): one row per home,
+            payload rules already applied at ingest, only silence evaluated
+
+Finishes with a parity check: both paths must produce identical verdicts and
+vitals for every home.
+
+Smaller runs (e.g. --homes 2000 --days 3) show the same shape: raw grows
+with rows, latest with homes only.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from relay.app import database, fleet_health, home_latest  # noqa: E402
+
+
+def _payload(rng: random.Random) -> dict:
+    total = rng.randint(5, 60)
+    return {
+        "ha_version": "2026.6.1", "ziggy_version": "1.4.0",
+        "system_uptime_s": rng.randint(60, 10**6),
+        "disk_pct_used": rng.uniform(20, 97), "mem_pct": rng.uniform(20, 95),
+        "cpu_pct": rng.uniform(1, 60),
+        "deploy": {"release_tag": rng.choice(["release-2026.08.11-5",
+                                              "release-2026.08.11-5-1-gc97d6cd",
+                                              "release-2026.07.23"]),
+                   "drifted": rng.random() < 0.02},
+        "container_health": [{"name": "ziggy", "status": rng.choice(["Up 3 hours"] * 30 + ["Exited (1)"])}],
+        "health": {"ha_reachable": rng.random() > 0.01, "coordinator_state": "loaded",
+                   "devices": {"total": total, "offline": rng.choice([0, 0, 0, 1, total // 2])},
+                   "registry": {"total": total, "lost": rng.choice([0] * 20 + [total])},
+                   "automations": {"ziggy_ha_backed": 4, "ha_total": rng.choice([4] * 30 + [0])}},
+    }
+
+
+def _build(db_path: str, homes: int, days: int, interval_min: int, seed: int) -> int:
+    rng = random.Random(seed)
+    asyncio.run(database.init_db())
+    end = datetime.now(timezone.utc) - timedelta(minutes=1)
+    per_home = days * 24 * 60 // interval_min
+    ids = [f"home-{i:05d}" for i in range(homes)]
+    stub = json.dumps({"ha_version": "2026.6.1"})
+    with sqlite3.connect(db_path) as db:
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=OFF")
+        db.executemany(
+            "INSERT INTO homes (id, name, type, status, relay_secret, created_at) "
+            "VALUES (?,?,?,?,?,?)",
+            [(h, h, "hub", rng.choice(["active"] * 50 + ["suspended"]), "s", "2026-01-01")
+             for h in ids],
+        )
+        # Interleaved like real ingest: one post per home per tick. A home
+        # that went silent stops posting a few hours early.
+        silent = {h: rng.random() < 0.03 for h in ids}
+        rows = 0
+        for tick in range(per_home):
+            ts = (end - timedelta(minutes=interval_min * (per_home - 1 - tick))).isoformat()
+            last = tick == per_home - 1
+            batch = []
+            for h in ids:
+                if silent[h] and tick > per_home - 24:
+                    continue
+                final = last or (silent[h] and tick == per_home - 24)
+                batch.append((h, ts, json.dumps(_payload(rng)) if final else stub))
+            db.executemany("INSERT INTO telemetry_raw (home_id, ts, payload) VALUES (?,?,?)",
+                           batch)
+            rows += len(batch)
+        db.commit()
+    return rows
+
+
+async def _raw_path(now: float) -> list[dict]:
+    async with database.get_db() as db:
+        homes = await db.execute_fetchall(
+            "SELECT id, name, status FROM homes ORDER BY created_at ASC")
+        latest = await db.execute_fetchall(
+            """SELECT t.home_id, t.ts, t.payload
+               FROM telemetry_raw t
+               JOIN (SELECT home_id, MAX(id) AS mid
+                     FROM telemetry_raw GROUP BY home_id) m
+                 ON t.id = m.mid"""
+        )
+    by_home = {}
+    for r in latest:
+        payload = json.loads(r["payload"])
+        by_home[r["home_id"]] = (r["ts"], payload if isinstance(payload, dict) else None)
+    out = []
+    for h in homes:
+        home = dict(h)
+        ts, payload = by_home.get(home["id"], (None, None))
+        v = fleet_health.evaluate(home, payload, ts, now=now)
+        v["vitals"] = fleet_health.vitals(payload)
+        out.append(v)
+    return out
+
+
+async def _latest_path(now: float) -> list[dict]:
+    async with database.get_db() as db:
+        homes = await db.execute_fetchall(
+            "SELECT id, name, status FROM homes ORDER BY created_at ASC")
+        latest = await home_latest.load(db)
+    out = []
+    for h in homes:
+        home = dict(h)
+        entry = latest.get(home["id"])
+        v = home_latest.verdict(home, entry, now=now)
+        v["vitals"] = entry["vitals"] if entry else fleet_health.vitals(None)
+        out.append(v)
+    return out
+
+
+def _best(fn, runs: int) -> tuple[float, list]:
+    best, out = float("inf"), None
+    for _ in range(runs):
+        t0 = time.perf_counter()
+        out = asyncio.run(fn())
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3, out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Fleet health read-model benchmark")
+    parser.add_argument("--homes", type=int, default=10_000)
+    parser.add_argument("--days", type=int, default=30)
+    parser.add_argument("--interval-min", type=int, default=5)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="bench_fleet_")
+    database.DATABASE_URL = os.path.join(tmp, "relay.db")
+    t0 = time.perf_counter()
+    rows = _build(database.DATABASE_URL, args.homes, args.days, args.interval_min, args.seed)
+    build_s = time.perf_counter() - t0
+
+    # What init_db does on the first boot after upgrade.
+    t0 = time.perf_counter()
+    asyncio.run(database.init_db())
+    backfill_s = time.perf_counter() - t0
+
+    now = time.time()
+    raw_ms, raw = _best(lambda: _raw_path(now), args.runs)
+    latest_ms, latest = _best(lambda: _latest_path(now), args.runs)
+
+    if raw != latest:
+        bad = next(a["home_id"] for a, b in zip(raw, latest) if a != b)
+        raise SystemExit(f"parity failure: first differing home {bad}")
+
+    size_mb = os.path.getsize(database.DATABASE_URL) / 2**20
+    print(f"{args.homes} homes, {rows} raw rows ({size_mb:.0f} MB), "
+          f"built in {build_s:.0f}s, backfill {backfill_s:.1f}s")
+    print(f"{'path':>8} {'ms/call':>10} {'homes/s':>10}")
+    for name, ms in (("raw", raw_ms), ("latest", latest_ms)):
+        print(f"{name:>8} {ms:>10.1f} {args.homes / (ms / 1e3):>10.0f}")
+    print(f"speedup x{raw_ms / latest_ms:.1f}; verdict parity ok")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Benchmark: hub route latency under concurrent dashboard load with a slow HA.
+
+Usage:
+    python scripts/bench_ha_client.py [--ha-delay-ms 200] [--clients 8]
+                                      [--seconds 5] [--ping-hz 50]
+
+Starts a fake Home Assistant on localhost that answers /api/states/<id>
+after --ha-delay-ms, and a FastAPI app with two variants of the same
+HA-backed route, driven over ASGI in one event loop like the hub:
+
+  blocking  — the previous shape: an async route calling the sync
+              requests.Session (home_automation._session) inline
+  pooled    — services.ha_client.get_state_async (the shipped client)
+
+While --clients dashboard clients hammer the HA-backed route, a probe hits
+a route that never touches HA at --ping-hz, timed from when each probe was
+due. Reports p50/p99 of the probe (event-loop health) and of the HA-backed
+route, plus HA throughput.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI  # noqa: E402
+
+from core.settings_loader import settings  # noqa: E402
+from services import ha_client, home_automation  # noqa: E402
+
+
+class _FakeHA(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"   # keep-alive, like HA
+
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        time.sleep(self.server.delay)
+        eid = self.path.rsplit("/", 1)[-1]
+        raw = json.dumps({"entity_id": eid, "state": "21", "attributes": {}}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(raw)))
+        self.end_headers()
+        self.wfile.write(raw)
+
+
+def _start_fake_ha(delay_s: float) -> ThreadingHTTPServer:
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _FakeHA)
+    srv.daemon_threads = True
+    srv.delay = delay_s
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    return srv
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    @app.get("/blocking/{entity_id}")
+    async def blocking(entity_id: str):
+        resp = home_automation._session.get(
+            f"{ha_client.url()}/api/states/{entity_id}", headers=ha_client.headers(), timeout=10)
+        return resp.json()
+
+    @app.get("/pooled/{entity_id}")
+    async def pooled(entity_id: str):
+        return (await ha_client.get_state_async(entity_id))["data"]
+
+    return app
+
+
+def _pct(xs: list[float], p: float) -> float:
+    if not xs:
+        return float("nan")
+    xs = sorted(xs)
+    return xs[min(len(xs) - 1, int(p / 100 * len(xs)))]
+
+
+async def _run(variant: str, clients: int, seconds: float, ping_hz: float) -> dict:
+    transport = httpx.ASGITransport(app=_app())
+    probe_ms: list[float] = []
+    ha_ms: list[float] = []
+    stop = time.perf_counter() + seconds
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://hub") as hub:
+        async def dashboard(i: int):
+            n = 0
+            while time.perf_counter() < stop:
+                t0 = time.perf_counter()
+                r = await hub.get(f"/{variant}/sensor.c{i}_{n}")
+                r.raise_for_status()
+                ha_ms.append((time.perf_counter() - t0) * 1000)
+                n += 1
+
+        async def probe():
+            # Latency from when the probe was due, not from when the loop got
+            # round to sending it — a stalled loop shows up as delay here.
+            due = time.perf_counter()
+            while due < stop:
+                await asyncio.sleep(max(0.0, due - time.perf_counter()))
+                (await hub.get("/ping")).raise_for_status()
+                probe_ms.append((time.perf_counter() - due) * 1000)
+                due += 1 / ping_hz
+
+        await asyncio.gather(probe(), *(dashboard(i) for i in range(clients)))
+
+    return {
+        "probe_p50": _pct(probe_ms, 50), "probe_p99": _pct(probe_ms, 99),
+        "probe_n": len(probe_ms),
+        "ha_p50": _pct(ha_ms, 50), "ha_p99": _pct(ha_ms, 99),
+        "ha_rps": len(ha_ms) / seconds,
+    }
+
+
+def main() -> int:
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--ha-delay-ms", type=float, default=200)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--seconds", type=float, default=5)
+    ap.add_argument("--ping-hz", type=float, default=50)
+    args = ap.parse_args()
+
+    srv = _start_fake_ha(args.ha_delay_ms / 1000)
+    settings["home_assistant"] = {"url": f"http://127.0.0.1:{srv.server_address[1]}", "token": "bench"}
+    from services import ha_subscriber
+    ha_subscriber.state_cache.clear()   # force the REST path
+
+    print(f"fake HA delay {args.ha_delay_ms:.0f} ms · {args.clients} dashboard clients · "
+          f"{args.seconds:.0f} s per variant\n")
+    print(f"{'variant':<10} {'probe p50':>10} {'probe p99':>10} {'probes':>7} "
+          f"{'HA p50':>9} {'HA p99':>9} {'HA req/s':>9}")
+    for variant in ("blocking", "pooled"):
+        r = asyncio.run(_run(variant, args.clients, args.seconds, args.ping_hz))
+        print(f"{variant:<10} {r['probe_p50']:>8.1f}ms {r['probe_p99']:>8.1f}ms {r['probe_n']:>7} "
+              f"{r['ha_p50']:>7.1f}ms {r['ha_p99']:>7.1f}ms {r['ha_rps']:>9.1f}")
+    srv.shutdown()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmark: scalar fuzzy_match_pulses loop vs batched FuzzyPulseMatcher.
+
+Usage:
+    python scripts/bench_ir_fuzzy.py [--queries 200] [--sizes 10,100,1000]
+
+For each store size N, builds N synthetic short (NEC-style) stored trains,
+then times matching the same set of jittered received frames two ways:
+
+  scalar — what ir_listener's fuzzy pass used to do: loop every stored
+           train through fuzzy_match_pulses, keep the first hit
+  batch  — FuzzyPulseMatcher.best(): one vectorised pass over the
+           length-compatible bucket
+
+Reports µs per received frame and the speed-up. Both paths are checked to
+agree on whether *some* stored train matched.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.ir_protocol import FuzzyPulseMatcher, fuzzy_match_pulses  # noqa: E402
+
+
+def _train(rng: random.Random) -> list[int]:
+    out = [9000, 4500]
+    for _ in range(rng.choice([16, 24, 32])):
+        out += [560, 1690 if rng.random() < 0.5 else 560]
+    out.append(560)
+    return out
+
+
+def _jitter(rng: random.Random, pulses: list[int], pct: float = 0.12) -> list[int]:
+    return [max(1, int(p * (1 + rng.uniform(-pct, pct)))) for p in pulses]
+
+
+def _bench(n_codes: int, n_queries: int, seed: int = 1) -> tuple[float, float]:
+    rng = random.Random(seed)
+    stored = [_train(rng) for _ in range(n_codes)]
+    # Half the queries are jittered stored codes, half are unknown buttons.
+    queries = [
+        _jitter(rng, rng.choice(stored)) if i % 2 == 0 else _train(rng)
+        for i in range(n_queries)
+    ]
+
+    t0 = time.perf_counter()
+    scalar_hits = []
+    for q in queries:
+        hit = None
+        for i, s in enumerate(stored):
+            if fuzzy_match_pulses(q, s):
+                hit = i
+                break
+        scalar_hits.append(hit is not None)
+    scalar_s = time.perf_counter() - t0
+
+    matcher = FuzzyPulseMatcher(stored)
+    t0 = time.perf_counter()
+    batch_hits = [matcher.best(q) is not None for q in queries]
+    batch_s = time.perf_counter() - t0
+
+    if scalar_hits != batch_hits:
+        raise SystemExit(f"parity failure at N={n_codes}")
+    return scalar_s / n_queries * 1e6, batch_s / n_queries * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="IR fuzzy matcher benchmark")
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--sizes", default="10,100,1000")
+    args = parser.parse_args()
+
+    print(f"{'codes':>6} {'scalar µs/frame':>16} {'batch µs/frame':>15} {'speed-up':>9}")
+    for n in (int(x) for x in args.sizes.split(",")):
+        scalar_us, batch_us = _bench(n, args.queries)
+        print(f"{n:>6} {scalar_us:>16.1f} {batch_us:>15.1f} {scalar_us / batch_us:>8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
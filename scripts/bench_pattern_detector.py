@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark: full-window vs incremental pattern detection.
+
+Usage:
+    python scripts/bench_pattern_detector.py [--days 120] [--per-day 40]
+                                             [--lookback 30] [--new 20] [--runs 5]
+
+Fills a throwaway event store with --days of synthetic habits plus noise,
+then times pattern_detector.update_and_detect() two ways:
+
+  full         — statistics file removed before every run, so each run
+                 recomputes the whole lookback window from the store (what
+                 every run cost before the statistics were persisted)
+  incremental  — --new fresh events logged between runs; only those rows
+                 are folded in and only the touched candidates re-derived
+
+Finishes with pattern_stats.verify() — the incrementally maintained
+statistics must equal a recompute over the same log.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services import pattern_detector, pattern_logger, pattern_stats  # noqa: E402
+
+_HABITS = [
+    # (intent, room, action, hour, minute spread, follow-up intent)
+    ("control_light", "living_room", "on", 19, 40, "control_media"),
+    ("control_ac", "bedroom", "off", 2, 10, None),
+    ("control_light", "kitchen", "on", 7, 20, "control_coffee"),
+    ("control_fan", "office", "on", 13, 30, None),
+]
+_NOISE_INTENTS = ["control_light", "control_ac", "control_fan", "control_cover", "control_media"]
+_ROOMS = ["kitchen", "bedroom", "office", "hall", "bathroom", "garage"]
+
+
+def _event(ts: datetime, intent: str, room: str, action: str) -> dict:
+    return {"ts": ts.isoformat(timespec="seconds"), "source": "bench", "intent": intent,
+            "room": room, "action": action, "entity_id": f"{intent.split('_')[-1]}.{room}",
+            "result": "ok", "automatable": True, "reversed": False}
+
+
+def _day_events(rng: random.Random, day: datetime, per_day: int) -> list[dict]:
+    out = []
+    for intent, room, action, hour, spread, follow in _HABITS:
+        if rng.random() < 0.8:
+            t = day.replace(hour=hour, minute=rng.randint(0, spread), second=rng.randint(0, 59))
+            out.append(_event(t, intent, room, action))
+            if follow:
+                out.append(_event(t + timedelta(seconds=rng.randint(20, 200)), follow, room, "on"))
+    while len(out) < per_day:
+        t = day.replace(hour=rng.randint(0, 23), minute=rng.randint(0, 59), second=rng.randint(0, 59))
+        out.append(_event(t, rng.choice(_NOISE_INTENTS), rng.choice(_ROOMS), rng.choice(["on", "off"])))
+    return sorted(out, key=lambda e: e["ts"])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Pattern detector benchmark")
+    parser.add_argument("--days", type=int, default=120)
+    parser.add_argument("--per-day", type=int, default=40)
+    parser.add_argument("--lookback", type=int, default=30)
+    parser.add_argument("--new", type=int, default=20, help="events logged between incremental runs")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    tmp = Path(tempfile.mkdtemp(prefix="bench_patterns_"))
+    pattern_logger.EVENTS_DB = tmp / "events.db"
+    pattern_logger.EVENTS_FILE = tmp / "events.jsonl"
+    pattern_stats.STATS_FILE = tmp / "pattern_stats.json"
+    pattern_detector.CANDIDATES_FILE = tmp / "pattern_candidates.json"
+    pattern_detector._entity_id_is_known = lambda eid: True
+    pattern_detector._cfg = lambda: {"lookback_days": args.lookback}
+
+    now = datetime.now().replace(microsecond=0)
+    # Leave the last hours empty so incremental runs can log "new" events there.
+    start = (now - timedelta(days=args.days)).replace(hour=0, minute=0, second=0)
+    events = []
+    for d in range(args.days):
+        events.extend(_day_events(rng, start + timedelta(days=d), args.per_day))
+    events = [e for e in events if e["ts"] < (now - timedelta(hours=6)).isoformat()]
+    pattern_logger.inject_sample_events(events)
+    print(f"events={len(events)} days={args.days} lookback={args.lookback}d")
+
+    full_s = []
+    for _ in range(args.runs):
+        pattern_stats.STATS_FILE.unlink(missing_ok=True)
+        t0 = time.perf_counter()
+        pattern_detector.update_and_detect()
+        full_s.append(time.perf_counter() - t0)
+
+    pattern_detector.update_and_detect()          # warm persisted statistics
+    inc_s = []
+    cursor = now - timedelta(hours=5)
+    for _ in range(args.runs):
+        batch = []
+        for _ in range(args.new):
+            cursor += timedelta(seconds=rng.randint(5, 60))
+            batch.append(_event(cursor, rng.choice(_NOISE_INTENTS), rng.choice(_ROOMS),
+                                rng.choice(["on", "off"])))
+        pattern_logger.inject_sample_events(batch)
+        t0 = time.perf_counter()
+        pattern_detector.update_and_detect()
+        inc_s.append(time.perf_counter() - t0)
+
+    full_ms = sorted(full_s)[len(full_s) // 2] * 1e3
+    inc_ms = sorted(inc_s)[len(inc_s) // 2] * 1e3
+    print(f"{'mode':>12} {'median ms/run':>14}")
+    print(f"{'full':>12} {full_ms:>14.1f}")
+    print(f"{'incremental':>12} {inc_ms:>14.1f}  ({args.new} new events/run)")
+    print(f"speed-up: {full_ms / inc_ms:.1f}x")
+
+    report = pattern_stats.verify()
+    print(f"verify: ok={report['ok']} buckets={report['time_buckets']} pairs={report['pairs']}")
+    if not report["ok"]:
+        raise SystemExit(f"consistency failure: {report}")
+
+
+if __name__ == "__main__":
+    main()
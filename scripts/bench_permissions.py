@@ -0,0 +1,187 @@
+#!/usr/bin/env python3
+"""
+Benchmark: permission read-model rebuild latency and authorize() throughput.
+
+Usage:
+    python scripts/bench_permissions.py [--events 10000 100000] [--calls 1000]
+
+For each log size, writes a synthetic policy_events log (rooms, devices,
+people, role bindings, grants issued and revoked) into a throwaway
+permissions.db and measures:
+
+  replay       — build_state() from event 1 + Engine + resolver: what the
+                 service did after every policy write before snapshots
+  snapshot     — restore_state() from a snapshot 100 events behind the head
+  incremental  — apply one new event onto the live read model
+  uncached     — authorize(use_cache=False): expansion + engine on every call,
+                 memory only (head seq check)
+  authorize+q  — the same plus the per-call SELECT MAX(seq) it used to run
+  cold / warm  — authorize() through the decision cache, first pass over the
+                 request mix (all misses) and a repeat (burst) pass
+
+Ends with a parity check: the snapshot-restored and incrementally maintained
+states must equal a full replay.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from services.permissions.audit import AuditLog  # noqa: E402
+from services.permissions.context import ContextBuilder  # noqa: E402
+from services.permissions.service import PermissionService  # noqa: E402
+from services.permissions.store import PolicyStore, build_state, restore_state  # noqa: E402
+
+_ROLES = ["owner", "adult", "kid", "guest"]
+_DEVICE_CLASSES = ["light", "climate", "lock", "camera", "media", "sensor"]
+
+
+def _synthetic_log(n_events: int, rng: random.Random) -> list[tuple[str, dict]]:
+    events: list[tuple[str, dict]] = [("space_added", {"id": "home", "type": "home"})]
+    rooms = [f"room{i}" for i in range(40)]
+    for r in rooms:
+        events.append(("space_added", {"id": r, "type": "room", "parent_ids": ["home"]}))
+    people: list[str] = []
+    devices: list[str] = []
+    live_grants: list[str] = []
+    while len(events) < n_events:
+        roll = rng.random()
+        if roll < 0.05 or not people:
+            ref = f"person:p{len(people)}"
+            people.append(ref)
+            events.append(("principal_added", {"ref": ref, "attrs": {"age": rng.randint(5, 80)}}))
+            events.append(("role_bound", {"binding_id": f"b{len(people)}", "principal": ref,
+                                          "scope": "space:home", "role": rng.choice(_ROLES)}))
+        elif roll < 0.15:
+            did = f"d{len(devices)}"
+            devices.append(did)
+            events.append(("device_added", {"id": did, "device_class": rng.choice(_DEVICE_CLASSES),
+                                            "space_id": rng.choice(rooms)}))
+        elif roll < 0.70 or not live_grants:
+            gid = f"g{len(events)}"
+            live_grants.append(gid)
+            events.append(("grant_issued", {
+                "id": gid, "principal": rng.choice(people), "effect": rng.choice(["allow", "deny"]),
+                "resource": {"node": f"space:{rng.choice(rooms)}"},
+                "capability": {"scope_tag": rng.choice(["lighting", "climate", "media"])},
+                "expires_at": time.time() + rng.randint(-3600, 86400 * 30),
+            }))
+        else:
+            gid = live_grants.pop(rng.randrange(len(live_grants)))
+            events.append(("grant_revoked", {"id": gid}))
+    return events[:n_events]
+
+
+def _write_log(db_path: str, events: list[tuple[str, dict]]) -> None:
+    PolicyStore(db_path)  # schema
+    with sqlite3.connect(db_path) as db:
+        db.executemany(
+            "INSERT INTO policy_events (ts, event_type, payload) VALUES (?, ?, ?)",
+            [("2026-01-01T00:00:00+00:00", t, json.dumps(p)) for t, p in events],
+        )
+
+
+def _ms(fn, repeat: int = 3) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - t0)
+    return best * 1e3
+
+
+def _run(n_events: int, calls: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    tmp = tempfile.mkdtemp(prefix="bench_perm_")
+    db_path = os.path.join(tmp, "permissions.db")
+    _write_log(db_path, _synthetic_log(n_events, rng))
+
+    store = PolicyStore(db_path)
+    head = store.latest_seq()
+    svc = PermissionService(store=store, audit=AuditLog(os.path.join(tmp, "audit.db")))
+
+    def _full_replay():
+        state = build_state(store)
+        svc._build_engine(state)
+        svc._build_resolver(state)
+
+    replay_ms = _ms(_full_replay, repeat=1 if n_events >= 50_000 else 3)
+
+    reference = build_state(store, up_to_seq=head - 100)
+    store.save_snapshot(head - 100, reference.to_snapshot())
+    snapshot_ms = _ms(lambda: restore_state(store))
+
+    svc.state()
+    people = [ref for ref in svc.state().principals]
+    inc = []
+    for i in range(20):
+        svc.add_space(f"bench{i}", "room", parent_ids=["home"])
+        t0 = time.perf_counter()
+        svc.state()
+        inc.append(time.perf_counter() - t0)
+    incremental_ms = sorted(inc)[len(inc) // 2] * 1e3
+
+    ctx = ContextBuilder().session(channel="app", trust_level=3).build()
+    devices = [f"device:{d}" for d in list(svc.state().devices)[:200]]
+    now = time.time()
+    reqs = [(rng.choice(people), rng.choice(devices)) for _ in range(calls)]
+
+    def _authorize(extra_query: bool, use_cache: bool):
+        for subj, res in reqs:
+            if extra_query:
+                store.latest_seq()
+            svc.authorize(subject=subj, action="light.onoff", resource=res,
+                          context=ctx, now=now, record=False, use_cache=use_cache)
+
+    auth_s = _ms(lambda: _authorize(False, False), repeat=1) / 1e3
+    authq_s = _ms(lambda: _authorize(True, False), repeat=1) / 1e3
+    cold_s = _ms(lambda: _authorize(False, True), repeat=1) / 1e3
+    warm_s = _ms(lambda: _authorize(False, True), repeat=1) / 1e3
+    for subj, res in reqs:
+        cached = svc.authorize(subject=subj, action="light.onoff", resource=res,
+                               context=ctx, now=now, record=False)
+        fresh = svc.authorize(subject=subj, action="light.onoff", resource=res,
+                              context=ctx, now=now, record=False, use_cache=False)
+        if (cached.effect, cached.matched_grant_ids) != (fresh.effect, fresh.matched_grant_ids):
+            raise SystemExit(f"decision cache parity failure at {n_events} events")
+
+    restored, _, _ = restore_state(store)
+    truth = build_state(store).to_snapshot()
+    if restored.to_snapshot() != truth or svc.state().to_snapshot() != truth:
+        raise SystemExit(f"parity failure at {n_events} events")
+
+    return {
+        "events": n_events, "grants": len(svc.state().grants),
+        "replay_ms": replay_ms, "snapshot_ms": snapshot_ms, "incremental_ms": incremental_ms,
+        "auth_per_s": calls / auth_s, "authq_per_s": calls / authq_s,
+        "cold_per_s": calls / cold_s, "warm_per_s": calls / warm_s,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Permission read-model benchmark")
+    parser.add_argument("--events", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    print(f"{'events':>8} {'grants':>7} {'replay ms':>10} {'snapshot ms':>12} "
+          f"{'incr ms':>8} {'uncached/s':>11} {'authz+q/s':>10} {'cold/s':>8} {'warm/s':>8}")
+    for n in args.events:
+        r = _run(n, args.calls, args.seed)
+        print(f"{r['events']:>8} {r['grants']:>7} {r['replay_ms']:>10.1f} "
+              f"{r['snapshot_ms']:>12.1f} {r['incremental_ms']:>8.3f} "
+              f"{r['auth_per_s']:>11.0f} {r['authq_per_s']:>10.0f} "
+              f"{r['cold_per_s']:>8.0f} {r['warm_per_s']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+"""
+Benchmark: relay HTTP proxy memory and time-to-first-byte, buffered vs streamed.
+
+Usage:
+    python scripts/bench_relay_proxy_stream.py [--sizes-mb 1 16 64]
+                                               [--chunk-kb 64] [--chunk-delay-ms 1]
+
+Drives the relay's proxy route over raw ASGI (no sockets, no TestClient
+buffering) against a fake hub behind the shared _proxy_client that sends
+its body in --chunk-kb pieces, --chunk-delay-ms apart — a hub streaming a
+backup or snapshot over a tunnel. For each size, one download (GET) and
+one upload (POST) go through two handlers:
+
+  buffered  — the previous proxy body: await request.body(), then
+              resp.content, then Response(content=...)
+  streamed  — relay.app.routers.proxy.proxy as shipped
+
+Reports the relay's peak traced allocation (tracemalloc) and, for the
+download, the time until the client receives its first body byte. Fails
+if either path delivers a body that differs from what was sent.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import httpx  # noqa: E402
+from fastapi import FastAPI, Request, Response  # noqa: E402
+
+from relay.app import database  # noqa: E402
+from relay.app.auth import issue_jwt  # noqa: E402
+from relay.app.routers import proxy  # noqa: E402
+
+HOME_ID = "home-bench"
+
+
+class _HubBody(httpx.AsyncByteStream):
+    def __init__(self, size: int, chunk: int, delay: float) -> None:
+        self.size, self.chunk, self.delay = size, chunk, delay
+
+    async def __aiter__(self):
+        piece = b"z" * self.chunk
+        sent = 0
+        while sent < self.size:
+            await asyncio.sleep(self.delay)
+            n = min(self.chunk, self.size - sent)
+            yield piece[:n]
+            sent += n
+
+
+class _Hub(httpx.AsyncBaseTransport):
+    """Fake hub. Unlike httpx.MockTransport it reads uploads chunk by chunk,
+    so any buffering the benchmark sees is the relay's."""
+
+    def __init__(self, size: int, chunk: int, delay: float) -> None:
+        self.size, self.chunk, self.delay = size, chunk, delay
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        received = 0
+        async for c in request.stream:
+            received += len(c)
+        if request.method == "POST":
+            return httpx.Response(200, json={"received": received})
+        return httpx.Response(200, stream=_HubBody(self.size, self.chunk, self.delay),
+                              headers={"Content-Type": "application/octet-stream"})
+
+
+def _app() -> FastAPI:
+    app = FastAPI()
+
+    @app.api_route("/buffered/{home_id}/{path:path}", methods=["GET", "POST"])
+    async def buffered(home_id: str, path: str, request: Request):
+        # The proxy body before streaming, minus header filtering.
+        user = proxy.current_user(request)
+        resolved = await proxy._authorize_home(user, home_id)
+        body = await request.body()
+        resp = await proxy._proxy_client.request(
+            request.method, f"{resolved['hub_base']}/{path}", content=body,
+            headers={"X-Relay-Secret": resolved["relay_secret"]})
+        return Response(content=resp.content, status_code=resp.status_code)
+
+    app.include_router(proxy.router, prefix="/api")
+    return app
+
+
+async def _call(app, method: str, path: str, token: str, upload: int, chunk: int) -> dict:
+    headers = [(b"authorization", f"Bearer {token}".encode())]
+    if upload:
+        headers.append((b"content-length", str(upload).encode()))
+    scope = {"type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1",
+             "method": method, "scheme": "http", "path": path, "raw_path": path.encode(),
+             "query_string": b"", "root_path": "", "headers": headers,
+             "client": ("127.0.0.1", 1), "server": ("relay", 80)}
+    remaining = upload
+    piece = b"u" * chunk
+    out = {"status": None, "bytes": 0, "ttfb": None}
+    done = asyncio.Event()
+    body_sent = False
+    t0 = time.perf_counter()
+
+    async def receive():
+        nonlocal remaining, body_sent
+        if body_sent:
+            # Like a real server: nothing more until the client goes away.
+            await done.wait()
+            return {"type": "http.disconnect"}
+        n = min(chunk, remaining)
+        remaining -= n
+        body_sent = remaining <= 0
+        return {"type": "http.request", "body": piece[:n], "more_body": not body_sent}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            out["status"] = message["status"]
+        elif message["type"] == "http.response.body" and message.get("body"):
+            if out["ttfb"] is None:
+                out["ttfb"] = time.perf_counter() - t0
+            out["bytes"] += len(message["body"])
+        if message["type"] == "http.response.body" and not message.get("more_body"):
+            done.set()
+
+    tracemalloc.reset_peak()
+    base = tracemalloc.get_traced_memory()[0]
+    await app(scope, receive, send)
+    out["peak_mb"] = (tracemalloc.get_traced_memory()[1] - base) / 2**20
+    out["total"] = time.perf_counter() - t0
+    return out
+
+
+async def _main(args) -> list[tuple]:
+    database.DATABASE_URL = os.path.join(tempfile.mkdtemp(prefix="bench_proxy_"), "relay.db")
+    await database.init_db()
+    async with database.get_db() as db:
+        await db.execute(
+            "INSERT INTO homes (id, name, type, status, relay_secret, public_hostname, "
+            "created_at) VALUES (?,?,?,?,?,?,?)",
+            (HOME_ID, "B", "hub", "active", "s", "https://hub.bench", "2026-01-01"))
+        await db.commit()
+    token = issue_jwt("u-b", "b@ex.com", "user", HOME_ID)
+    app = _app()
+    chunk = args.chunk_kb * 1024
+    rows = []
+    tracemalloc.start()
+    for mb in args.sizes_mb:
+        size = mb * 2**20
+        proxy._proxy_client = httpx.AsyncClient(
+            transport=_Hub(size, chunk, args.chunk_delay_ms / 1e3))
+        # Warm-up: JWT decode, route cache, first DB connection.
+        await _call(app, "POST", f"/api/proxy/{HOME_ID}/api/upload", token, 1, chunk)
+        for name, prefix in (("buffered", "/buffered"), ("streamed", "/api/proxy")):
+            down = await _call(app, "GET", f"{prefix}/{HOME_ID}/api/backup", token, 0, chunk)
+            up = await _call(app, "POST", f"{prefix}/{HOME_ID}/api/upload", token, size, chunk)
+            if (down["status"], down["bytes"], up["status"]) != (200, size, 200):
+                raise SystemExit(f"{name} {mb} MB: bad transfer {down} {up}")
+            rows.append((mb, name, down, up))
+        await proxy._proxy_client.aclose()
+    tracemalloc.stop()
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Relay proxy streaming benchmark")
+    parser.add_argument("--sizes-mb", type=int, nargs="+", default=[1, 16, 64])
+    parser.add_argument("--chunk-kb", type=int, default=64)
+    parser.add_argument("--chunk-delay-ms", type=float, default=1.0)
+    args = parser.parse_args()
+
+    rows = asyncio.run(_main(args))
+    print(f"hub sends {args.chunk_kb} KB chunks every {args.chunk_delay_ms} ms")
+    print(f"{'MB':>4} {'mode':>9} {'GET peak MB':>12} {'GET ttfb ms':>12} "
+          f"{'GET total ms':>13} {'POST peak MB':>13}")
+    for mb, name, down, up in rows:
+        print(f"{mb:>4} {name:>9} {down['peak_mb']:>12.1f} {down['ttfb'] * 1e3:>12.1f} "
+              f"{down['total'] * 1e3:>13.1f} {up['peak_mb']:>13.1f}")
+
+
+if __name__ == "__main__":
+    main()
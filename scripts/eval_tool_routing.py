@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+"""
+Offline evaluation of intent-parser tool pruning (core/tool_router.py).
+
+Usage:
+    python scripts/eval_tool_routing.py [--recorded export.json | utterances.jsonl]
+                                        [--min-recall 0.95] [--live] [--show-misses]
+
+Each utterance comes with the intents the full-schema parser chose for it —
+the baseline. A routing is correct when every baseline intent is among the
+tools select_tools() would send (or when it sends the full list). Reports
+routing recall, how often the schema is pruned, and the mean schema size
+sent vs. the full 104-tool list.
+
+Utterances:
+  * default — the built-in SAMPLES below (EN + HE, every tool group);
+  * --recorded a debug-bus export (GET /api/debug/export, intent scope at
+    verbose): every gpt_parse_result event gives (input, intents). Record it
+    with pruning off, or from a build before it, for a full-schema baseline;
+  * --recorded a .jsonl file of {"text": ..., "intents": [...]} lines.
+
+--live additionally sends every utterance through the LLM twice, full and
+pruned (needs a working chat backend), and reports intent agreement, prompt
+tokens and latency for both.
+
+Exits non-zero when recall is below --min-recall.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import sys
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+from core import intent_parser, tool_router  # noqa: E402
+from core.tools_schema import SYSTEM_PROMPT, TOOLS  # noqa: E402
+
+# (utterance, intents the full-schema parser chose)
+SAMPLES: list[tuple[str, list[str]]] = [
+    ("turn off the kitchen light", ["toggle_light"]),
+    ("turn on living room lights", ["toggle_light"]),
+    ("set the bedroom light to blue", ["set_light_color"]),
+    ("dim the office lights to 30%", ["adjust_light_brightness"]),
+    ("turn off all the lights", ["turn_off_all_lights"]),
+    ("תדליק אור בסלון", ["toggle_light"]),
+    ("כבה את האור במטבח", ["toggle_light"]),
+    ("turn on the ac in the bedroom", ["control_ac"]),
+    ("set the living room ac to 23 degrees", ["set_ac_temperature"]),
+    ("what's the temperature in the bedroom?", ["get_temperature"]),
+    ("how humid is it in the bathroom", ["get_humidity"]),
+    ("תדליק את המזגן בחדר שינה", ["control_ac"]),
+    ("turn on the tv", ["control_tv"]),
+    ("switch the tv to hdmi 2", ["set_tv_source"]),
+    ("volume up on the tv", ["ir_send_command"]),
+    ("put on channel 12", ["ir_send_channel"]),
+    ("close the living room blinds", ["control_device"]),
+    ("turn on the boiler", ["control_device"]),
+    ("תדליק את הדוד", ["control_device"]),
+    ("turn off everything", ["turn_off_everything"]),
+    ("save a note: call the plumber", ["save_note"]),
+    ("read my notes", ["read_notes"]),
+    ("list my files", ["list_files"]),
+    ("add a task to pay the electricity bill", ["add_task"]),
+    ("what's on my to-do list", ["list_tasks"]),
+    ("remind me to take the trash out at 8", ["add_task"]),
+    ("set a timer for 10 minutes", ["countdown"]),
+    ("תזכיר לי להתקשר לאמא מחר", ["add_task"]),
+    ("add dentist appointment on friday", ["add_event"]),
+    ("how many days until my birthday", ["days_until_event"]),
+    ("what's my next event", ["next_event"]),
+    ("remember that the wifi password is on the fridge", ["remember_memory"]),
+    ("what did I ask you to remember about the car", ["recall_memory"]),
+    ("when is sunset today", ["get_sun_times"]),
+    ("what's the date today", ["get_date"]),
+    ("what's my ip address", ["get_ip_address"]),
+    ("how much disk space is left", ["get_disk_usage"]),
+    ("is the internet working", ["get_internet_status"]),
+    ("run a speed test", ["get_internet_speed"]),
+    ("restart ziggy", ["restart_ziggy"]),
+    ("play some jazz on spotify", ["media_spotify_playlist"]),
+    ("play the latest episode of the daily podcast", ["media_play_podcast_episode"]),
+    ("what's the weather tomorrow", ["get_weather"]),
+    ("מה מזג האוויר", ["get_weather"]),
+    ("give me the news", ["web_news_brief"]),
+    ("read my emails", ["comm_read_emails"]),
+    ("send an email to dana saying I'll be late", ["comm_send_email"]),
+    ("announce dinner is ready", ["comm_broadcast_announcement"]),
+    ("show the front door camera on the tv", ["visual_cast_camera"]),
+    ("is anyone home", ["is_someone_home"]),
+    ("מי בבית", ["is_someone_home"]),
+    ("add milk to the shopping list", ["add_shopping_list_item"]),
+    ("turn off the bedroom lights every day at 23:00", ["create_automation"]),
+    ("make the kitchen smart", ["design_automation_set"]),
+    ("תעשה אוטומציה לסלון", ["design_automation_set"]),
+    ("create an occupancy sensor for the office", ["create_occupancy_sensor"]),
+    ("what templates are there", ["list_blueprints"]),
+    ("list my automations", ["list_automations"]),
+    ("disable the morning routine", ["toggle_automation"]),
+    ("anything unusual going on", ["get_active_anomalies"]),
+    ("turn on the office light and the office ac", ["toggle_light", "control_ac"]),
+]
+
+
+def _load(path: str) -> list[tuple[str, list[str]]]:
+    with open(path, encoding="utf-8") as f:
+        raw = f.read()
+    if path.endswith(".jsonl"):
+        rows = [json.loads(line) for line in raw.splitlines() if line.strip()]
+        return [(r["text"], list(r["intents"])) for r in rows if r.get("intents")]
+    events = json.loads(raw).get("events", [])
+    out = []
+    for ev in events:
+        data = ev.get("data") or {}
+        if ev.get("step") == "gpt_parse_result" and data.get("input") and data.get("intents"):
+            out.append((data["input"], list(data["intents"])))
+    return out
+
+
+def _route(text: str, room_map: dict) -> tuple[list[dict] | None, list[str]]:
+    # Same input the parser gives the router: raw plus Hebrew-normalized text.
+    norm = intent_parser._normalize_hebrew_devices(intent_parser._normalize_hebrew_rooms(text))
+    return tool_router.select_tools(f"{text} {norm}", room_map)
+
+
+def _live(text: str, tools: list[dict] | None) -> dict:
+    messages = [{"role": "system", "content": SYSTEM_PROMPT},
+                {"role": "user", "content": text}]
+    response, ms = intent_parser._complete(messages, tools, [], text)
+    calls = response.choices[0].message.tool_calls or []
+    usage = getattr(response, "usage", None)
+    return {"intents": sorted(c.function.name for c in calls), "ms": ms,
+            "prompt_tokens": getattr(usage, "prompt_tokens", None)}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Tool-pruning routing evaluation")
+    parser.add_argument("--recorded", help="debug export .json or utterances .jsonl")
+    parser.add_argument("--min-recall", type=float, default=0.95)
+    parser.add_argument("--live", action="store_true", help="also compare real LLM calls")
+    parser.add_argument("--show-misses", action="store_true")
+    args = parser.parse_args()
+
+    samples = _load(args.recorded) if args.recorded else SAMPLES
+    if not samples:
+        raise SystemExit("no utterances with baseline intents found")
+    # A fixed, representative home; the usage prior is off so the run is repeatable.
+    room_map = {"light": ["kitchen", "living_room", "bedroom", "office"],
+                "climate": ["bedroom", "living_room", "office"]}
+    tool_router.usage_prior = lambda: ()
+
+    full_bytes = len(json.dumps(TOOLS, separators=(",", ":")))
+    hits, pruned, sizes, counts, misses, live_rows = 0, 0, [], [], [], []
+    for text, expected in samples:
+        tools, groups = _route(text, room_map)
+        sent = tools or TOOLS
+        names = {t["function"]["name"] for t in sent}
+        ok = set(expected) <= names
+        hits += ok
+        pruned += tools is not None
+        sizes.append(len(json.dumps(sent, separators=(",", ":"))))
+        counts.append(len(sent))
+        if not ok:
+            misses.append((text, expected, groups))
+        if args.live:
+            full, cut = _live(text, None), _live(text, tools)
+            live_rows.append((text, full, cut))
+
+    n = len(samples)
+    recall = hits / n
+    print(f"utterances            {n}")
+    print(f"routing recall        {recall:.3f}  ({hits}/{n})")
+    print(f"pruned                {pruned / n:.1%}")
+    print(f"tools sent, mean      {statistics.mean(counts):.1f}  (full: {len(TOOLS)})")
+    print(f"schema bytes, mean    {statistics.mean(sizes):,.0f}  (full: {full_bytes:,}, "
+          f"{1 - statistics.mean(sizes) / full_bytes:.0%} smaller, ~{(full_bytes - statistics.mean(sizes)) / 4:,.0f} "
+          f"prompt tokens saved per call)")
+    if args.show_misses or recall < args.min_recall:
+        for text, expected, groups in misses:
+            print(f"  MISS {text!r}: expected {expected}, groups {groups}")
+    if live_rows:
+        agree = sum(f["intents"] == c["intents"] for _, f, c in live_rows)
+        print(f"live agreement        {agree}/{len(live_rows)}")
+        for key in ("prompt_tokens", "ms"):
+            full = [f[key] for _, f, _ in live_rows if f[key] is not None]
+            cut = [c[key] for _, _, c in live_rows if c[key] is not None]
+            if full and cut:
+                print(f"live {key:<16} full {statistics.mean(full):,.0f}  pruned {statistics.mean(cut):,.0f}")
+        for text, f, c in live_rows:
+            if f["intents"] != c["intents"]:
+                print(f"  DIFF {text!r}: full {f['intents']} pruned {c['intents']}")
+    if recall < args.min_recall:
+        raise SystemExit(f"routing recall {recall:.3f} below {args.min_recall}")
+
+
+if __name__ == "__main__":
+    main()
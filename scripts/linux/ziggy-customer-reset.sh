@@ -10,7 +10,8 @@
 # CLEARS (Ziggy state):
 #   automations.json, automation_history.json, automation_meta.json,
 #   automation_state.json, local_automation_actions.json,
-#   device_registry.json, events.jsonl, zones.json, home_map.db
+#   device_registry.json, events.db (+ -wal/-shm), events.jsonl(.migrated),
+#   zones.json, home_map.db
 #
 # KEEPS:
 #   auth.db (accounts), vapid_keys.json (push), persons.json, ui_prefs/,
@@ -76,7 +77,11 @@ CLEAR_FILES=(
   automation_state.json
   local_automation_actions.json
   device_registry.json
+  events.db
+  events.db-wal
+  events.db-shm
   events.jsonl
+  events.jsonl.migrated
   zones.json
   home_map.db
 )
@@ -0,0 +1,181 @@
+#!/usr/bin/env python3
+"""
+Load test: relay hub traffic with per-call SQLite connections vs the pool.
+
+Usage:
+    python scripts/load_test_relay_db.py [--hubs 200] [--rounds 5]
+                                         [--concurrency 64] [--pool-size 4]
+
+Runs the real relay app in-process (httpx ASGITransport, no sockets) against
+a throwaway relay.db with --hubs provisioned homes and one OTA release. Each
+round, every hub signs and POSTs a telemetry payload and polls its OTA
+manifest — the two endpoints every hub hits on a timer — with at most
+--concurrency requests in flight. The same traffic runs twice:
+
+  per-call  — database.get_db() opens a fresh aiosqlite connection (thread
+              spawn + file open) per use, audit events written inline
+  pooled    — database.open_pool(): long-lived WAL connections, writes
+              through the batched single writer; audit.start_audit_writer()
+              queues hub audit events for the background flusher
+
+Reports p50/p99/max latency per endpoint and overall throughput, then
+checks both runs stored every telemetry post and accounted for every audit
+event (as an audit_log row or an audit_rollup count).
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+os.environ.setdefault("ZIGGY_AUTO_REMEDIATE", "0")
+
+import httpx  # noqa: E402
+
+from relay.app import audit, database  # noqa: E402
+from relay.app.audit import sign  # noqa: E402
+
+SECRET = "load-test-secret-32-bytes-aaaaaaa"
+
+
+def _app():
+    from fastapi import FastAPI
+    from relay.app.routers.ota import router as ota_router
+    from relay.app.routers.telemetry import router as telemetry_router
+    app = FastAPI()
+    app.include_router(ota_router)
+    app.include_router(telemetry_router)
+    return app
+
+
+async def _seed(hubs: int) -> list[str]:
+    await database.init_db()
+    ids = [f"home-{i:04d}" for i in range(hubs)]
+    async with database.get_db() as db:
+        await db.executemany(
+            "INSERT INTO homes (id, name, type, status, relay_secret, created_at) "
+            "VALUES (?,?,?,?,?,?)",
+            [(h, h, "hub", "active", SECRET, "2026-01-01") for h in ids],
+        )
+        await db.execute(
+            "INSERT INTO ota_releases (ha_version, ziggy_version, image_digests, created_at) "
+            "VALUES (?,?,?,?)", ("2026.6.1", "1.4.0", "{}", "2026-01-01"),
+        )
+        await db.commit()
+    return ids
+
+
+def _pct(values: list[float], p: float) -> float:
+    s = sorted(values)
+    return s[min(len(s) - 1, int(round(p / 100 * (len(s) - 1))))] * 1e3
+
+
+async def _run(ids: list[str], rounds: int, concurrency: int, seed: int) -> dict:
+    rng = random.Random(seed)
+    lat: dict[str, list[float]] = {"telemetry": [], "ota": []}
+    errors = 0
+    sem = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=_app())
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://relay") as client:
+        async def one(kind: str, home_id: str) -> None:
+            nonlocal errors
+            if kind == "telemetry":
+                body = json.dumps({"ha_version": "2026.6.1", "uptime_s": rng.randint(1, 10**6),
+                                   "cpu_pct": rng.uniform(1, 60), "mem_pct": rng.uniform(20, 80),
+                                   "sensors": [{}] * 12}, separators=(",", ":")).encode()
+                req = dict(method="POST", url=f"/api/devices/{home_id}/telemetry", content=body,
+                           headers={"X-Ziggy-Signature": sign(SECRET, body),
+                                    "Content-Type": "application/json"})
+            else:
+                req = dict(method="GET", url=f"/api/devices/{home_id}/ota-manifest",
+                           headers={"X-Ziggy-Signature": sign(SECRET, b"")})
+            async with sem:
+                t0 = time.perf_counter()
+                resp = await client.request(**req)
+                lat[kind].append(time.perf_counter() - t0)
+            if resp.status_code != 200:
+                errors += 1
+
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            jobs = [one(kind, h) for h in ids for kind in ("telemetry", "ota")]
+            rng.shuffle(jobs)
+            await asyncio.gather(*jobs)
+        wall = time.perf_counter() - t0
+
+    return {"lat": lat, "wall": wall, "errors": errors,
+            "requests": sum(len(v) for v in lat.values())}
+
+
+async def _counts(out: dict) -> dict:
+    async with database.get_db() as db:
+        out["raw"] = (await db.execute_fetchall("SELECT COUNT(*) FROM telemetry_raw"))[0][0]
+        rows = (await db.execute_fetchall("SELECT COUNT(*) FROM audit_log"))[0][0]
+        rolled = (await db.execute_fetchall(
+            "SELECT COALESCE(SUM(count), 0) FROM audit_rollup"))[0][0]
+    out["audit"], out["audit_rows"] = rows + rolled, rows
+    return out
+
+
+async def _scenario(name: str, args, pooled: bool) -> dict:
+    tmp = tempfile.mkdtemp(prefix=f"relay_load_{name}_")
+    database.DATABASE_URL = os.path.join(tmp, "relay.db")
+    ids = await _seed(args.hubs)
+    if pooled:
+        await database.open_pool(args.pool_size)
+        audit.start_audit_writer()
+    try:
+        out = await _run(ids, args.rounds, args.concurrency, args.seed)
+        # Flush before counting, as lifespan shutdown would.
+        await audit.stop_audit_writer()
+        out = await _counts(out)
+        out["pool"] = database.pool_stats()
+    finally:
+        await audit.stop_audit_writer()
+        await database.close_pool()
+    return out
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Relay DB connection load test")
+    parser.add_argument("--hubs", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--concurrency", type=int, default=64)
+    parser.add_argument("--pool-size", type=int, default=database.POOL_SIZE)
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    results = {}
+    for name, pooled in (("per-call", False), ("pooled", True)):
+        results[name] = asyncio.run(_scenario(name, args, pooled))
+
+    print(f"{args.hubs} hubs × {args.rounds} rounds (telemetry POST + OTA poll), "
+          f"concurrency {args.concurrency}")
+    print(f"{'mode':>9} {'endpoint':>10} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'req/s':>8}")
+    for name, r in results.items():
+        for kind, values in r["lat"].items():
+            print(f"{name:>9} {kind:>10} {_pct(values, 50):>8.1f} {_pct(values, 99):>8.1f} "
+                  f"{max(values) * 1e3:>8.1f} {r['requests'] / r['wall']:>8.0f}")
+    pool = results["pooled"]["pool"] or {}
+    print(f"pooled writer: {pool.get('writes')} writes in {pool.get('write_batches')} "
+          f"commits (max batch {pool.get('max_batch')}), {pool.get('waits')} checkout waits")
+    for name, r in results.items():
+        print(f"{name:>9} audit: {r['audit']} events, {r['audit_rows']} audit_log rows")
+
+    expected_raw = args.hubs * args.rounds
+    for name, r in results.items():
+        if r["errors"] or r["raw"] != expected_raw or r["audit"] != r["requests"]:
+            raise SystemExit(f"{name}: errors={r['errors']} raw={r['raw']}/{expected_raw} "
+                             f"audit={r['audit']}/{r['requests']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -32,7 +32,7 @@ Phases (each can be re-run idempotently):
     3. ir_devices       — remap ha_entity_id field in user_files/ir_devices.json
     4. ha_automations   — fetch every HA automation, rewrite entity_ids in
                           triggers/conditions/actions, PUT back via REST
-    5. state_reset      — clear state_memory.json, events.jsonl, anomaly state
+    5. state_reset      — clear state_memory.json, event store, anomaly state
                           (these re-learn from scratch — intentional)
 
 Phases that intentionally do NOTHING:
@@ -313,13 +313,16 @@ def _substitute_embedded(text: str, mapping: dict[str, str]) -> tuple[str, int]:
 # ── phase 5: reset learning state ─────────────────────────────────────────
 
 def reset_learning_state(dry_run: bool) -> dict:
-    """Clear state_memory, events.jsonl, anomaly state. Intentional reset —
+    """Clear state_memory, the event store, anomaly state. Intentional reset —
     these stores key on entity_ids that no longer exist; rather than try
     to remap, we let pattern learning rebuild on the new entity_ids."""
     cleared: list[str] = []
     targets = [
         Path("user_files/state_memory.json"),
         Path("user_files/events.jsonl"),
+        Path("user_files/events.db"),
+        Path("user_files/events.db-wal"),
+        Path("user_files/events.db-shm"),
         Path("user_files/anomaly_state.json"),  # written by anomaly_engine if present
     ]
     for p in targets:
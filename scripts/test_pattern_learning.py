@@ -8,7 +8,7 @@ Usage:
 
 Options:
     --no-llm   Use heuristic suggestions only (skip OpenAI call)
-    --clear    Wipe events.jsonl and suggestions.json before running
+    --clear    Wipe the event store and suggestions.json before running
 
 What this does:
   1. Injects realistic sample events into the event log
@@ -42,13 +42,15 @@ def main():
     parser.add_argument("--clear", action="store_true", help="Clear existing data first")
     args = parser.parse_args()
 
-    events_file = Path("user_files/events.jsonl")
+    events_files = [Path("user_files/events.jsonl"), Path("user_files/events.db"),
+                    Path("user_files/events.db-wal"), Path("user_files/events.db-shm")]
     suggestions_file = Path("user_files/suggestions.json")
 
     if args.clear:
-        if events_file.exists():
-            events_file.unlink()
-            print("  Cleared events.jsonl")
+        for events_file in events_files:
+            if events_file.exists():
+                events_file.unlink()
+                print(f"  Cleared {events_file.name}")
         if suggestions_file.exists():
             suggestions_file.unlink()
             print("  Cleared suggestions.json")
@@ -3,7 +3,8 @@ Anomaly Engine v2 — pluggable rule registry with confidence scoring.
 
 Architecture:
   - Rules registered via @register_rule(rule_id, scope, severity, cooldown_s)
-  - evaluate() dispatches every rule by scope on each HA state_changed event
+  - evaluate() marks the changed entity dirty; the debounced rule loop re-runs
+    only the (rule, scope target) pairs it can affect, plus a periodic full sweep
   - AnomalyResult carries confidence (0–1); results below MIN_CONFIDENCE are
     stored in active_anomalies but suppressed from Ziggy app push / WebSocket
   - HomeContext provides occupancy mode and time-of-day to every rule function
@@ -160,21 +161,48 @@ class AnomalyRule:
     severity:  Literal["critical", "warning", "info"]
     cooldown_s: int
     fn: Callable[[EvalContext], AnomalyResult | None]
+    # What state the rule reads. A change to an entity whose domain is in
+    # `domains` OR whose device_class is in `device_classes` marks the rule's
+    # targets dirty; both None means "any entity" (wildcard).
+    domains:        frozenset[str] | None = None
+    device_classes: frozenset[str] | None = None
+
+    def depends_on(self, entity_id: str, entry: dict | None) -> bool:
+        if self.domains is None and self.device_classes is None:
+            return True
+        if self.domains and entity_id.split(".", 1)[0] in self.domains:
+            return True
+        if self.device_classes:
+            dc = ((entry or {}).get("attributes") or {}).get("device_class")
+            return dc in self.device_classes
+        return False
 
 
 # ── Rule registry ─────────────────────────────────────────────────────────────
 _RULES: list[AnomalyRule] = []
 
+_MOTION_CLASSES = ("motion", "occupancy", "presence")
+
 
 def register_rule(
     rule_id:   str,
     scope:     Literal["home", "area", "entity"],
     severity:  Literal["critical", "warning", "info"],
     cooldown_s: int = _DEFAULT_COOLDOWN,
+    *,
+    domains:        tuple[str, ...] | None = None,
+    device_classes: tuple[str, ...] | None = None,
 ):
+    """Register a rule. `domains` / `device_classes` declare which entity
+    changes can alter its result — see _run_rule_loop's incremental pass.
+    Leave both unset for rules that read arbitrary entities."""
     def decorator(fn: Callable) -> Callable:
-        _RULES.append(AnomalyRule(rule_id=rule_id, scope=scope,
-                                  severity=severity, cooldown_s=cooldown_s, fn=fn))
+        _RULES.append(AnomalyRule(
+            rule_id=rule_id, scope=scope, severity=severity,
+            cooldown_s=cooldown_s, fn=fn,
+            domains=frozenset(domains) if domains is not None else None,
+            device_classes=frozenset(device_classes) if device_classes is not None else None,
+        ))
         return fn
     return decorator
 
@@ -539,7 +567,8 @@ def _build_context(cache: dict) -> HomeContext:
 
 # ── Rules ─────────────────────────────────────────────────────────────────────
 
-@register_rule("ANOM-01", scope="home", severity="warning")
+@register_rule("ANOM-01", scope="home", severity="warning",
+               domains=("person", "light"), device_classes=_MOTION_CLASSES)
 def _rule_anom01(ec: EvalContext) -> AnomalyResult | None:
     """All persons away ≥5 min + no recent motion + lights on."""
     global _all_away_since
@@ -573,7 +602,8 @@ def _rule_anom01(ec: EvalContext) -> AnomalyResult | None:
     )
 
 
-@register_rule("ANOM-02", scope="area", severity="warning")
+@register_rule("ANOM-02", scope="area", severity="warning",
+               domains=("climate",), device_classes=_MOTION_CLASSES)
 def _rule_anom02(ec: EvalContext) -> AnomalyResult | None:
     """Climate running + room empty for configurable period."""
     threshold_s = ec.cfg.get("anom02_empty_minutes", 30) * 60
@@ -603,7 +633,8 @@ def _rule_anom02(ec: EvalContext) -> AnomalyResult | None:
     )
 
 
-@register_rule("ANOM-03", scope="area", severity="warning")
+@register_rule("ANOM-03", scope="area", severity="warning",
+               device_classes=("door", "window", "garage_door"))
 def _rule_anom03(ec: EvalContext) -> AnomalyResult | None:
     """External door/window open > threshold."""
     door_threshold = ec.cfg.get("anom03_door_open_minutes", 60) * 60
@@ -622,7 +653,8 @@ def _rule_anom03(ec: EvalContext) -> AnomalyResult | None:
     return None
 
 
-@register_rule("ANOM-04", scope="area", severity="critical")
+@register_rule("ANOM-04", scope="area", severity="critical",
+               domains=("person",), device_classes=_MOTION_CLASSES)
 def _rule_anom04(ec: EvalContext) -> AnomalyResult | None:
     """Motion during quiet hours, only when nobody is confirmed home.
 
@@ -654,7 +686,8 @@ def _rule_anom04(ec: EvalContext) -> AnomalyResult | None:
     )
 
 
-@register_rule("ANOM-05", scope="home", severity="warning")
+@register_rule("ANOM-05", scope="home", severity="warning",
+               domains=("person",), device_classes=_MOTION_CLASSES)
 def _rule_anom05(ec: EvalContext) -> AnomalyResult | None:
     """No motion anywhere for >24 h while someone is home."""
     global _no_motion_since
@@ -688,7 +721,8 @@ def _rule_anom05(ec: EvalContext) -> AnomalyResult | None:
     )
 
 
-@register_rule("ANOM-06", scope="entity", severity="warning")
+@register_rule("ANOM-06", scope="entity", severity="warning",
+               domains=("switch", "light", "plug"))
 def _rule_anom06(ec: EvalContext) -> AnomalyResult | None:
     """Device continuously on > threshold hours."""
     eid   = ec.entity_id
@@ -729,7 +763,8 @@ def _rule_anom06(ec: EvalContext) -> AnomalyResult | None:
     )
 
 
-@register_rule("ANOM-11", scope="entity", severity="warning", cooldown_s=1800)
+@register_rule("ANOM-11", scope="entity", severity="warning", cooldown_s=1800,
+               domains=("water_heater",))
 def _rule_anom11_boiler_runaway(ec: EvalContext) -> AnomalyResult | None:
     """Water heater / boiler has been heating for > threshold minutes.
 
@@ -909,7 +944,11 @@ def _dispatch(rule: AnomalyRule, ec: EvalContext, active: dict, room_id: str) ->
     except Exception as e:
         log_error(f"[AnomalyEngine] {rule.rule_id} raised: {e}")
         return
+    _apply_result(rule, result, active, room_id)
+
 
+def _apply_result(rule: AnomalyRule, result: AnomalyResult | None,
+                  active: dict, room_id: str) -> None:
     if result is None:
         _clear_anomaly(active, room_id, rule.rule_id)
         return
@@ -937,6 +976,38 @@ def _dispatch(rule: AnomalyRule, ec: EvalContext, active: dict, room_id: str) ->
     _push_anomaly(active, room_id, rule, result)
 
 
+def _dispatch_entity_room(rule: AnomalyRule, base: EvalContext, active: dict,
+                          room_id: str, members: list[str]) -> None:
+    """Entity-scope rule over one room: first firing entity wins.
+
+    Entity-scope anomalies are keyed per (room, rule), so every entity of a
+    room shares one slot. Dispatching entity by entity let a later quiet
+    entity clear the alert an earlier one had just raised; the room is now
+    evaluated as a unit and cleared only when none of its entities fire.
+    """
+    cache = base.cache
+    result: AnomalyResult | None = None
+    failed = False
+    for eid in members:
+        entry = cache.get(eid)
+        if entry is None or not rule.depends_on(eid, entry):
+            continue
+        ec = EvalContext(cache=cache, ctx=base.ctx, cfg=base.cfg, now=base.now,
+                         area_map=base.area_map, entity_id=eid, entity_entry=entry)
+        _loop_stats["rule_evals"] += 1
+        try:
+            result = rule.fn(ec)
+        except Exception as e:
+            log_error(f"[AnomalyEngine] {rule.rule_id} raised: {e}")
+            failed = True
+            continue
+        if result is not None:
+            break
+    if result is None and failed:
+        return
+    _apply_result(rule, result, active, room_id)
+
+
 # ── Rule-loop debouncer ───────────────────────────────────────────────────────
 #
 # Without coalescing, every HA state_changed event runs the full rule loop —
@@ -950,14 +1021,88 @@ def _dispatch(rule: AnomalyRule, ec: EvalContext, active: dict, room_id: str) ->
 # at most once per _RULE_LOOP_DEBOUNCE_S. A pending task absorbs every
 # subsequent event in its window. Coverage is identical — every rule still
 # sees the latest cache when it runs, just less often.
+#
+# On top of that the loop is incremental: evaluate() collects the entities
+# that changed since the last run, and only the (rule, target) pairs those
+# entities can affect are re-run — a flickering power sensor re-runs the
+# wildcard rules for its own room, not every rule over 2000 entities. Which
+# pairs an entity affects comes from each rule's declared domains /
+# device_classes and the _RuleIndex below. Rules also depend on the clock
+# (door open > 1 h, light on > 4 h) and on state outside the cache (Ziggy
+# persons, automation deps), so a full sweep still runs every _FULL_SWEEP_S
+# and whenever the index is rebuilt.
 _RULE_LOOP_DEBOUNCE_S = 0.25
+_FULL_SWEEP_S = 60.0
 _eval_pending_task: asyncio.Task | None = None
 _eval_last_run_ts: float = 0.0
+_last_full_sweep_ts: float = 0.0
+_dirty_entities: set[str] = set()
+_loop_stats: dict[str, int] = {"runs": 0, "full_sweeps": 0, "rule_evals": 0}
+
+
+@dataclass
+class _RuleIndex:
+    """entity → scope targets, built once per (cache, area map) shape."""
+    cache_id: int
+    cache_len: int
+    area_map_id: int
+    entity_areas: dict[str, list[str]]   # area-scope targets of a mapped entity
+    room_of: dict[str, str]              # entity-scope room key (area or entity_id)
+    room_members: dict[str, list[str]]   # room key → entities, in cache order
+
+    def stale(self, cache: dict, area_map: dict) -> bool:
+        return (self.cache_id != id(cache) or self.cache_len != len(cache)
+                or self.area_map_id != id(area_map))
+
+
+_rule_index: _RuleIndex | None = None
+
+
+def _build_rule_index(cache: dict, area_map: dict) -> _RuleIndex:
+    entity_areas: dict[str, list[str]] = {}
+    # An entity listed under several areas keys its entity-scope anomalies
+    # to the last one, as the rule loop always has.
+    entity_to_area: dict[str, str] = {}
+    for aid, a in area_map.items():
+        for ent in a.get("entities", []):
+            entity_areas.setdefault(ent, []).append(aid)
+            entity_to_area[ent] = aid
+    room_of: dict[str, str] = {}
+    room_members: dict[str, list[str]] = {}
+    for eid in cache:
+        room_id = entity_to_area.get(eid, eid)
+        room_of[eid] = room_id
+        room_members.setdefault(room_id, []).append(eid)
+    return _RuleIndex(
+        cache_id=id(cache), cache_len=len(cache), area_map_id=id(area_map),
+        entity_areas=entity_areas, room_of=room_of, room_members=room_members,
+    )
 
 
-async def _run_rule_loop(cache: dict, active: dict) -> None:
-    """The expensive part of evaluate() — every rule × every scope target."""
-    global _eval_last_run_ts
+def _dirty_targets(rule: AnomalyRule, dirty: set[str], cache: dict,
+                   area_map: dict, index: _RuleIndex) -> list[str]:
+    """Scope targets of `rule` that a change to any `dirty` entity can affect."""
+    hits = [eid for eid in dirty if rule.depends_on(eid, cache.get(eid))]
+    if not hits:
+        return []
+    if rule.scope == "home":
+        return ["home"]
+    if rule.scope == "area":
+        targets: set[str] = set()
+        for eid in hits:
+            areas = index.entity_areas.get(eid)
+            if areas is None:
+                # Unmapped entities (persons, mostly) feed the home context
+                # every area rule reads.
+                return list(area_map)
+            targets.update(areas)
+        return [aid for aid in area_map if aid in targets]
+    return list(dict.fromkeys(index.room_of.get(eid, eid) for eid in hits))
+
+
+async def _run_rule_loop(cache: dict, active: dict, *, full: bool = False) -> None:
+    """The expensive part of evaluate() — rules × the scope targets that changed."""
+    global _eval_last_run_ts, _last_full_sweep_ts, _rule_index, _dirty_entities
     cfg = _cfg()
     now = time.time()
     ctx = _build_context(cache)
@@ -969,41 +1114,55 @@ async def _run_rule_loop(cache: dict, active: dict) -> None:
 
     disabled = settings.get("anomaly_engine", {}).get("disabled_rules", [])
 
+    dirty, _dirty_entities = _dirty_entities, set()
+    index = _rule_index
+    if index is None or index.stale(cache, area_map):
+        index = _rule_index = _build_rule_index(cache, area_map)
+        full = True
+    if now - _last_full_sweep_ts >= _FULL_SWEEP_S:
+        full = True
+    _loop_stats["runs"] += 1
+    if full:
+        _loop_stats["full_sweeps"] += 1
+        _last_full_sweep_ts = now
+
+    base = EvalContext(cache=cache, ctx=ctx, cfg=cfg, now=now, area_map=area_map)
     for rule in _RULES:
         if rule.rule_id in disabled:
             continue
 
+        if full:
+            targets = (["home"] if rule.scope == "home" else
+                       list(area_map) if rule.scope == "area" else
+                       list(index.room_members))
+        else:
+            targets = _dirty_targets(rule, dirty, cache, area_map, index)
+
         if rule.scope == "home":
-            ec = EvalContext(cache=cache, ctx=ctx, cfg=cfg, now=now, area_map=area_map)
-            _dispatch(rule, ec, active, "home")
+            for _ in targets:
+                _loop_stats["rule_evals"] += 1
+                _dispatch(rule, base, active, "home")
 
         elif rule.scope == "area":
-            for area_id, area in area_map.items():
+            for area_id in targets:
                 ec = EvalContext(cache=cache, ctx=ctx, cfg=cfg, now=now,
-                                 area_map=area_map, area_id=area_id, area=area)
+                                 area_map=area_map, area_id=area_id, area=area_map[area_id])
+                _loop_stats["rule_evals"] += 1
                 _dispatch(rule, ec, active, area_id)
 
         elif rule.scope == "entity":
-            # Build entity→area_id once per rule loop run instead of doing a
-            # generator scan over all areas for every entity. Previously the
-            # generator did O(areas × avg_entities_per_area) work per entity;
-            # this collapses it to O(total_entities) once, then O(1) per
-            # entity. Falls back to entity_id when the entity isn't mapped to
-            # any HA area.
-            _entity_to_area: dict[str, str] = {}
-            for aid, a in area_map.items():
-                for ent in a.get("entities", []):
-                    _entity_to_area[ent] = aid
-
-            for eid, entry in cache.items():
-                room_id = _entity_to_area.get(eid, eid)
-                ec = EvalContext(cache=cache, ctx=ctx, cfg=cfg, now=now,
-                                 area_map=area_map, entity_id=eid, entity_entry=entry)
-                _dispatch(rule, ec, active, room_id)
+            for room_id in targets:
+                _dispatch_entity_room(rule, base, active, room_id,
+                                      index.room_members.get(room_id, ()))
 
     _eval_last_run_ts = time.time()
 
 
+def rule_loop_stats() -> dict:
+    """Counters for the incremental rule loop (runs, full sweeps, rule evals)."""
+    return {**_loop_stats, "pending_dirty": len(_dirty_entities)}
+
+
 async def _debounced_rule_loop(cache: dict, active: dict) -> None:
     global _eval_pending_task
     try:
@@ -1025,6 +1184,7 @@ async def evaluate(changed_entity: str, cache: dict, active: dict) -> None:
         return
 
     now = time.time()
+    _dirty_entities.add(changed_entity)
 
     new_state = cache.get(changed_entity, {}).get("state", "unknown")
     if new_state == "off":
@@ -7,57 +7,17 @@ returns the buffer for a given id.
 """
 from __future__ import annotations
 
-import json
-import os
-import threading
 from datetime import datetime, timezone
 from typing import Any
 
+from services.json_store import UNCHANGED, JsonStore
+
 STORE_FILE = "user_files/automation_history.json"
 MAX_PER_AUTOMATION = 20
 
-_lock = threading.Lock()
-
-# In-memory cache keyed by file mtime — every record_run/get_history call
-# previously re-read history.json. The cache is invalidated when the file is
-# modified out-of-band.
-_cache: dict | None = None
-_cache_mtime: float = 0.0
-
-
-def _file_mtime() -> float:
-    try:
-        return os.path.getmtime(STORE_FILE)
-    except OSError:
-        return 0.0
-
-
-def _load() -> dict:
-    global _cache, _cache_mtime
-    if not os.path.exists(STORE_FILE):
-        _cache = {}
-        _cache_mtime = 0.0
-        return dict(_cache)
-    mtime = _file_mtime()
-    if _cache is None or mtime != _cache_mtime:
-        try:
-            with open(STORE_FILE, "r", encoding="utf-8") as f:
-                _cache = json.load(f)
-        except Exception:
-            _cache = {}
-        _cache_mtime = mtime
-    return dict(_cache)
-
-
-def _save(data: dict) -> None:
-    global _cache, _cache_mtime
-    os.makedirs(os.path.dirname(STORE_FILE), exist_ok=True)
-    tmp = STORE_FILE + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    os.replace(tmp, STORE_FILE)
-    _cache = dict(data) if isinstance(data, dict) else {}
-    _cache_mtime = _file_mtime()
+# In-memory document validated against the file's mtime (out-of-band edits
+# are picked up); record_run() lands in memory and is flushed write-behind.
+_store = JsonStore(lambda: STORE_FILE)
 
 
 def record_run(
@@ -89,17 +49,14 @@ def record_run(
         entry["skipped"] = True
         entry["skipped_reason"] = skipped_reason
 
-    with _lock:
-        data = _load()
-        runs = data.get(automation_id, [])
-        runs.insert(0, entry)
-        data[automation_id] = runs[:MAX_PER_AUTOMATION]
-        _save(data)
+    def _apply(data: dict) -> None:
+        data[automation_id] = [entry, *data.get(automation_id, [])][:MAX_PER_AUTOMATION]
+
+    _store.update(_apply)
 
 
 def get_history(automation_id: str, limit: int = MAX_PER_AUTOMATION) -> list[dict]:
-    with _lock:
-        runs = _load().get(automation_id, [])
+    runs = _store.read().get(automation_id, [])
     return runs[: max(1, min(limit, MAX_PER_AUTOMATION))]
 
 
@@ -109,7 +66,4 @@ def get_last_run(automation_id: str) -> dict | None:
 
 
 def delete_history(automation_id: str) -> None:
-    with _lock:
-        data = _load()
-        if data.pop(automation_id, None) is not None:
-            _save(data)
+    _store.update(lambda data: UNCHANGED if data.pop(automation_id, None) is None else None)
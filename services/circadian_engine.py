@@ -36,6 +36,7 @@ from typing import Optional
 from zoneinfo import ZoneInfo
 
 from core.logger_module import log_info, log_error
+from services import state_dispatch
 
 # The container runs in UTC, but the ramp anchors (wake/noon/bedtime) are the
 # user's LOCAL wall-clock times — so "now" must be the home's local time, or the
@@ -182,6 +183,7 @@ def save_config(cfg: dict) -> dict:
             json.dump(merged, f, indent=2, ensure_ascii=False)
     except Exception as e:
         log_error(f"[Circadian] save_config: {e}")
+    state_dispatch.invalidate()  # scheduled-light set feeds the ha_subscriber hook
     return merged
 
 
@@ -38,8 +38,10 @@ Caching
 -------
 `config/entity_registry/list` returns hundreds of rows on a real HA
 install. We cache the entity_id → device_id map (and per-entity
-device_class) for `_CACHE_TTL_S` seconds. The cache is invalidated by
-device_registry.refresh() so room edits don't show stale groupings.
+device_class) for `_CACHE_TTL_S` seconds, stamped with
+device_registry.generation() so a registry change (room edit, new or
+removed device) re-reads it. HA registry events invalidate it directly
+through ha_areas.invalidate_registry_cache().
 
 Failure mode
 ------------
@@ -219,7 +221,21 @@ _DIAGNOSTIC_DOMAINS: frozenset[str] = frozenset({
 
 _CACHE_TTL_S = 60.0
 _cache_lock = threading.Lock()
-_cache_entry: dict | None = None  # {fetched_at, by_entity, names}
+_cache_entry: dict | None = None  # {fetched_at, generation, by_entity, names}
+
+
+def _registry_generation() -> int:
+    try:
+        from services.device_registry import generation
+        return generation()
+    except Exception:
+        return 0
+
+
+def _cache_fresh(now: float) -> bool:
+    """Caller holds _cache_lock."""
+    return bool(_cache_entry) and (now - _cache_entry["fetched_at"]) < _CACHE_TTL_S \
+        and _cache_entry.get("generation") == _registry_generation()
 
 
 def _build_canonical_id_map(devices: list[dict]) -> dict[str, str]:
@@ -371,7 +387,7 @@ def _get_cached_registry() -> dict:
     """
     now = time.time()
     with _cache_lock:
-        if _cache_entry and (now - _cache_entry["fetched_at"]) < _CACHE_TTL_S:
+        if _cache_fresh(now):
             return _cache_entry
 
     # Cache miss — fetch. If we're already inside an event loop, the
@@ -400,11 +416,10 @@ def _get_cached_registry() -> dict:
         # used to pin "all devices ungrouped" until TTL expired, even after HA
         # recovered seconds later. Failed fetches return the empty result
         # transparently so the next caller retries.
-        if result.get("ok") and (
-            not _cache_entry or (now - _cache_entry["fetched_at"]) >= _CACHE_TTL_S
-        ):
+        if result.get("ok") and not _cache_fresh(now):
             globals()["_cache_entry"] = {
                 "fetched_at":   time.time(),
+                "generation":   _registry_generation(),
                 "by_entity":    result.get("by_entity") or {},
                 "device_names": result.get("device_names") or {},
                 "canonical_id": result.get("canonical_id") or {},
@@ -421,7 +436,7 @@ async def get_cached_registry_async() -> dict:
     """Async version of _get_cached_registry() — preferred from FastAPI handlers."""
     now = time.time()
     with _cache_lock:
-        if _cache_entry and (now - _cache_entry["fetched_at"]) < _CACHE_TTL_S:
+        if _cache_fresh(now):
             return _cache_entry
     fresh = await _fetch_ha_registry_async()
     with _cache_lock:
@@ -431,6 +446,7 @@ async def get_cached_registry_async() -> dict:
         if fresh.get("ok"):
             globals()["_cache_entry"] = {
                 "fetched_at":   time.time(),
+                "generation":   _registry_generation(),
                 "by_entity":    fresh.get("by_entity") or {},
                 "device_names": fresh.get("device_names") or {},
                 "canonical_id": fresh.get("canonical_id") or {},
@@ -446,12 +462,24 @@ async def get_cached_registry_async() -> dict:
 def invalidate_cache() -> None:
     """Drop the HA-registry cache so the next group fetch re-reads HA.
 
-    Called by device_registry.refresh() so room edits propagate quickly.
+    Called by ha_areas.invalidate_registry_cache() whenever HA's registry
+    changes (writes from Ziggy, registry events from ha_subscriber).
     """
     with _cache_lock:
         globals()["_cache_entry"] = None
 
 
+def cache_version() -> tuple | None:
+    """(fetched_at, generation) of the cached HA registry read; None when empty.
+
+    Changes whenever the groups are re-read, so consumers that derive from
+    them (health_aggregate's topology) can tell a refetch happened.
+    """
+    with _cache_lock:
+        entry = _cache_entry
+        return (entry["fetched_at"], entry.get("generation")) if entry else None
+
+
 # ---------------------------------------------------------------------------
 # Grouping
 # ---------------------------------------------------------------------------
@@ -6,7 +6,10 @@ Build order at startup:
   2. Seed from YAML device_map (backward compat — deprecated entries logged)
   3. Merge IR virtual devices from ir_devices.json
   4. Validate against live HA entity states → assign connection status
-  5. Start reconciliation loop (every 60 s)
+  5. Follow HA's event stream: ha_subscriber feeds per-entity deltas
+     (apply_state) and entity/device/area registry events
+     (apply_registry_event) into the table; the full pipeline stays as a
+     periodic consistency audit (consistency_pass)
 
 Connection states:
   connected     — entity_id set, HA confirms it's live
@@ -17,6 +20,7 @@ Connection states:
 """
 from __future__ import annotations
 
+import copy
 import json
 import os
 import threading
@@ -91,10 +95,30 @@ _initialized = False
 _idx_by_entity_id: dict[str, dict] = {}
 _idx_by_room_type: dict[tuple[str, str], list[dict]] = {}
 
+# Bumped on every index rebuild and every persist — i.e. whenever the set of
+# devices, their rooms/types or their statuses may have changed. Derived
+# caches (prompt blocks, …) key on generation() instead of re-deriving.
+_generation = 0
+
+
+def generation() -> int:
+    """Monotonic registry change counter (process-local)."""
+    return _generation
+
+
+# Write-behind for event deltas: apply_state / apply_registry_event only mark
+# the table dirty, and flush() writes it once _FLUSH_DELAY_S after the first
+# change — HA registering a few hundred entities at startup costs one write,
+# not one per entity. Pipeline passes write through _save_persistent directly.
+_FLUSH_DELAY_S = 2.0
+_dirty = False
+_flush_timer: Optional[threading.Timer] = None
+
 
 def _rebuild_indexes() -> None:
     """Recompute the lookup indexes from _registry. Caller holds _lock."""
-    global _idx_by_entity_id, _idx_by_room_type
+    global _idx_by_entity_id, _idx_by_room_type, _generation
+    _generation += 1
     by_eid: dict[str, dict] = {}
     by_rt: dict[tuple[str, str], list[dict]] = {}
     for d in _registry:
@@ -124,13 +148,21 @@ def _load_persistent() -> list[dict]:
         return []
 
 
-def _save_persistent(devices: list[dict]) -> None:
+# Serialises writers of REGISTRY_FILE. _run_pipeline writes its result without
+# holding _lock, so _lock alone no longer keeps two writes apart.
+_file_lock = threading.Lock()
+
+
+def _write_registry_file(devices: list[dict]) -> None:
     os.makedirs(os.path.dirname(REGISTRY_FILE), exist_ok=True)
     try:
-        with open(REGISTRY_FILE, "w", encoding="utf-8") as f:
+        with _file_lock, open(REGISTRY_FILE, "w", encoding="utf-8") as f:
             json.dump(devices, f, indent=2, ensure_ascii=False)
     except Exception as e:
         log_error(f"[DeviceRegistry] Failed to save {REGISTRY_FILE}: {e}")
+
+
+def _invalidate_resolve_cache() -> None:
     # Registry changed — resolve_entity() cache is now potentially stale.
     try:
         from services.home_automation import invalidate_resolve_entity_cache
@@ -139,6 +171,14 @@ def _save_persistent(devices: list[dict]) -> None:
         pass
 
 
+def _save_persistent(devices: list[dict]) -> None:
+    global _generation, _dirty
+    _generation += 1
+    _dirty = False   # this write covers any delta still waiting for flush()
+    _write_registry_file(devices)
+    _invalidate_resolve_cache()
+
+
 # ---------------------------------------------------------------------------
 # Population
 # ---------------------------------------------------------------------------
@@ -502,7 +542,10 @@ def _reconcile(devices: list[dict], live_ids: set[str]) -> list[dict]:
             log_info(f"[DeviceRegistry] Removing filtered entity from registry: {eid}")
             continue
         if eid in live_ids:
-            d["status"] = CONNECTED
+            # A room-less UNCLAIMED row stays UNCLAIMED: it is waiting for the
+            # user to place it (see _add_unclaimed), being live doesn't claim it.
+            if not (d.get("status") == UNCLAIMED and not d.get("room")):
+                d["status"] = CONNECTED
             d.pop("_lost_since", None)   # back in HA — clear the prune timer
             keep.append(d)
         else:
@@ -621,23 +664,25 @@ def _add_unclaimed(devices: list[dict], live_ids: set[str],
             continue
         if _is_hidden_category(eid):
             continue  # config/diagnostic entity — a setting, not a device
-        attrs = attrs_by_id.get(eid, {})
-        device_type = _infer_device_type(eid, attrs)
-        # Rooms are user-driven only (see _enforce_user_rooms). A newly
-        # discovered device is NEVER auto-placed — not by HA area, not by name.
-        # It surfaces as UNCLAIMED until the user assigns it a room in Ziggy.
-        devices.append({
-            "room": None,
-            "room_source": None,
-            "device_type": device_type,
-            "entity_id": eid,
-            "ir_device_id": None,
-            "status": UNCLAIMED,
-            "name": eid,
-        })
+        devices.append(_unclaimed_row(eid, attrs_by_id.get(eid, {})))
     return devices
 
 
+def _unclaimed_row(eid: str, attrs: dict) -> dict:
+    # Rooms are user-driven only (see _enforce_user_rooms). A newly
+    # discovered device is NEVER auto-placed — not by HA area, not by name.
+    # It surfaces as UNCLAIMED until the user assigns it a room in Ziggy.
+    return {
+        "room": None,
+        "room_source": None,
+        "device_type": _infer_device_type(eid, attrs),
+        "entity_id": eid,
+        "ir_device_id": None,
+        "status": UNCLAIMED,
+        "name": eid,
+    }
+
+
 def _heal_unclaimed(devices: list[dict],
                     states: list[dict] | None = None,
                     entity_areas: dict[str, str] | None = None) -> list[dict]:
@@ -1005,31 +1050,13 @@ async def _heal_ha_areas_from_user_rooms(existing_area_ids: set[str],
         log_info(f"[DeviceRegistry] convergence: healed {healed} device→HA-area assignment(s)")
 
 
-async def reconcile_with_ha() -> None:
-    """Phase 2: live HA REST reconciliation — runs as a background task.
-
-    Updates each entry's `status` field against the current HA entity list,
-    adds UNCLAIMED entries for new HA entities, then re-runs the IR merge
-    so anything that changed during reconciliation is consistent.
-
-    Idempotent: re-running just refreshes the status field. Used by the
-    60-second background loop too.
-
-    Also pulls HA area assignments (entity_id → area_name) and uses them to
-    auto-map newly-added entities to Ziggy rooms — and to heal already-
-    UNCLAIMED rows whose room never got set. This is what makes
-    `resolve_entity(room, "temperature")` work without manual mapping on
-    Z2M setups, where entity_ids are MAC-addressed and have no name hints.
+async def _fetch_entity_areas() -> tuple[dict[str, str], set[str]]:
+    """(entity_id → ziggy-room-key, existing HA area ids) from HA's area registry.
 
-    Cold start: HA may not be reachable yet (relay tunnel still waking, etc.).
-    On a failed snapshot we leave the registry as-is and rely on the periodic
-    refresh() loop to retry.
+    Empty on failure: HA may be reachable for /api/states but not for the
+    registry WS yet (different transport). Callers treat an empty map as "no
+    area data this pass" and change nothing.
     """
-    import asyncio as _asyncio
-
-    # HA area registry → entity_id → ziggy-room-key. The area registry lives
-    # behind a WebSocket call so it has to be awaited up here, before we drop
-    # into the sync `_do` worker.
     entity_areas: dict[str, str] = {}
     existing_area_ids: set[str] = set()
     try:
@@ -1050,14 +1077,14 @@ async def reconcile_with_ha() -> None:
             for eid in area.get("entities") or ():
                 entity_areas[eid] = area_key
     except Exception as e:
-        # HA may be reachable for /api/states but not for the registry WS yet
-        # (different transport). Don't fail reconcile — fall through with no
-        # area data; next loop will retry.
         log_info(f"[DeviceRegistry] HA area registry unavailable: {e}")
+    return entity_areas, existing_area_ids
 
-    # HA entity registry → which entities are config/diagnostic (settings /
-    # telemetry, not controllable devices). Cached so both this reconcile and
-    # the sync refresh() keep them out of the device list.
+
+async def _refresh_hidden_categories() -> None:
+    """Reload which entities are config/diagnostic (settings / telemetry, not
+    controllable devices) from HA's entity registry. Cached at module level so
+    every pipeline pass and delta keeps them out of the device list."""
     try:
         from services.ha_areas import get_registry_snapshot
         snap = await get_registry_snapshot()
@@ -1070,6 +1097,32 @@ async def reconcile_with_ha() -> None:
     except Exception as e:
         log_info(f"[DeviceRegistry] entity_category snapshot unavailable: {e}")
 
+
+async def reconcile_with_ha() -> None:
+    """Phase 2: live HA REST reconciliation — runs as a background task.
+
+    Updates each entry's `status` field against the current HA entity list,
+    adds UNCLAIMED entries for new HA entities, then re-runs the IR merge
+    so anything that changed during reconciliation is consistent.
+
+    Idempotent: re-running just refreshes the status field. Used by the
+    60-second background loop too.
+
+    Also pulls HA area assignments (entity_id → area_name) and uses them to
+    auto-map newly-added entities to Ziggy rooms — and to heal already-
+    UNCLAIMED rows whose room never got set. This is what makes
+    `resolve_entity(room, "temperature")` work without manual mapping on
+    Z2M setups, where entity_ids are MAC-addressed and have no name hints.
+
+    Cold start: HA may not be reachable yet (relay tunnel still waking, etc.).
+    On a failed snapshot we leave the registry as-is and rely on the periodic
+    refresh() loop to retry.
+    """
+    import asyncio as _asyncio
+
+    entity_areas, existing_area_ids = await _fetch_entity_areas()
+    await _refresh_hidden_categories()
+
     def _do() -> int:
         global _registry
         # One HA REST snapshot → reused for both reconcile and unclaimed scan.
@@ -1126,53 +1179,437 @@ async def reconcile_with_ha() -> None:
         log_error(f"[DeviceRegistry] auto_tag_critical_plugs failed: {e}")
 
 
+def _pipeline(devices: list[dict], states: list[dict], live_ids: set[str]) -> list[dict]:
+    """The full local reconcile pipeline over one HA snapshot. Caller holds _lock."""
+    # Strip stale IR-only rows so they get rebuilt from current ir_devices.json.
+    devices = [d for d in devices if not (d.get("ir_device_id") and not d.get("entity_id"))]
+    devices = _dedupe_by_entity_id(devices)
+    devices = _reconcile(devices, live_ids)
+    devices = _add_unclaimed(devices, live_ids, states=states)
+    # Merge IR devices LAST so the merge can see all HA-bound rows.
+    devices = _merge_ir_devices(devices)
+    devices = _merge_ziggy_smart_sensors(devices)
+    devices = _enforce_user_rooms(devices)  # user + HA-area rooms survive; ghosts cleared
+    return [d for d in devices if not _is_hidden_category(d.get("entity_id"))]
+
+
+def _row_key(d: dict) -> str:
+    if d.get("entity_id"):
+        return d["entity_id"]
+    if d.get("ir_device_id"):
+        return f"ir:{d['ir_device_id']}"
+    return f"row:{d.get('room')}:{d.get('device_type')}:{d.get('name')}"
+
+
+def _row_sigs(devices: list[dict]) -> dict[str, str]:
+    return {_row_key(d): json.dumps(d, sort_keys=True, default=str) for d in devices}
+
+
+def _diff(before: dict[str, str], after: dict[str, str]) -> dict[str, list[str]]:
+    return {
+        "added":   sorted(after.keys() - before.keys()),
+        "removed": sorted(before.keys() - after.keys()),
+        "changed": sorted(k for k in before.keys() & after.keys() if before[k] != after[k]),
+    }
+
+
+# A pipeline pass whose copy went stale under a concurrent change starts over
+# from the fresh table; the last attempt runs under _lock, as it always used to.
+_PIPELINE_ATTEMPTS = 3
+
+
+def _run_pipeline(states: list[dict], live_ids: set[str]) -> dict[str, list[str]]:
+    """Run _pipeline over the table and adopt the result. Returns the row diff.
+
+    Rows are compared before/after, so a pass that changes nothing neither
+    rewrites device_registry.json nor bumps generation() — the old refresh()
+    did both unconditionally, every tick and after every edit.
+
+    The pipeline and the file write run on a private copy with _lock
+    released: apply_state takes that lock on the HA event loop for every
+    state_changed, and must not wait out a whole pass. The result is swapped
+    in under the lock only if generation() hasn't moved since the copy —
+    every writer of the table bumps it.
+    """
+    for _ in range(_PIPELINE_ATTEMPTS - 1):
+        with _lock:
+            seen = _generation
+            devices = copy.deepcopy(_registry)
+        # Signatures are taken before the pipeline runs: _reconcile and the
+        # merges mutate the row dicts in place.
+        before = _row_sigs(devices)
+        devices = _pipeline(devices, states, live_ids)
+        diff = _diff(before, _row_sigs(devices))
+        if not any(diff.values()):
+            return diff
+        _write_registry_file(devices)
+        with _lock:
+            if _generation == seen:
+                _adopt(devices)
+                return diff
+            _schedule_flush()   # the file holds a discarded result now
+    with _lock:
+        before = _row_sigs(_registry)
+        devices = _pipeline(_registry, states, live_ids)
+        diff = _diff(before, _row_sigs(devices))
+        if any(diff.values()):
+            _write_registry_file(devices)
+            _adopt(devices)
+    return diff
+
+
+def _adopt(devices: list[dict]) -> None:
+    """Install a pipeline result already written to disk. Caller holds _lock."""
+    global _registry, _dirty
+    _registry = devices
+    _rebuild_indexes()
+    _dirty = False   # the write covered any delta still waiting for flush()
+    _invalidate_resolve_cache()
+    # IR links land here; ha_subscriber's command_router hook watches hybrid rows.
+    from services import state_dispatch
+    state_dispatch.invalidate()
+
+
+def _local_states_and_ids() -> tuple[list[dict], set[str]]:
+    """HA snapshot for refresh(): ha_subscriber's state_cache while the event
+    stream is live — it is what HA has pushed us, so no REST round-trip —
+    else a REST snapshot."""
+    if events_live():
+        from services import ha_subscriber
+        cache = dict(ha_subscriber.state_cache)   # one-shot copy; the loop keeps writing
+        states = [{"entity_id": eid, **row} for eid, row in cache.items()]
+        return states, set(cache)
+    return _live_states_and_ids()
+
+
 def refresh() -> None:
     """Re-reconcile against live HA and re-merge IR devices.
 
     Call after any device/room change. Includes _merge_ir_devices so newly
     paired IR devices and IR room/type changes are picked up without waiting
-    for the next process init().
+    for the next process init(). While the HA event stream is live the HA
+    side comes from ha_subscriber's state cache (see _local_states_and_ids).
     """
-    global _registry
-    # One HA REST snapshot reused for both reconcile and unclaimed scan
-    # (used to be two independent calls — wasted round-trip).
-    states, live_ids = _live_states_and_ids()
-    with _lock:
-        # Strip stale IR-only rows so they get rebuilt from current ir_devices.json.
-        devices = [d for d in _registry if not (d.get("ir_device_id") and not d.get("entity_id"))]
-        devices = _dedupe_by_entity_id(devices)
-        devices = _reconcile(devices, live_ids)
-        devices = _add_unclaimed(devices, live_ids, states=states)
-        # Merge IR devices LAST so the merge can see all HA-bound rows.
-        devices = _merge_ir_devices(devices)
-        devices = _merge_ziggy_smart_sensors(devices)
-        devices = _enforce_user_rooms(devices)  # user + HA-area rooms survive; ghosts cleared
-        devices = [d for d in devices if not _is_hidden_category(d.get("entity_id"))]
-        _save_persistent(devices)
-        _registry = devices
-        _rebuild_indexes()
-    # Drop any cached HA entity-registry → device_id grouping so the next
-    # /api/devices/grouped call picks up rooms/areas changes immediately.
-    try:
-        from services.device_groups import invalidate_cache as _invalidate_groups
-        _invalidate_groups()
-    except Exception:
-        pass
-    # Drop the automation templates capability cache so the next /api/automations/
-    # templates call sees a freshly-paired (or unpaired) device immediately
-    # instead of waiting for the 30 s TTL to expire.
-    try:
-        from backend.routers.automation_router import invalidate_capability_cache
-        invalidate_capability_cache()
-    except Exception:
-        pass
+    states, live_ids = _local_states_and_ids()
+    diff = _run_pipeline(states, live_ids)
+    _reconcile_stats["refreshes"] += 1
     # Re-run the critical-plug auto-tag pass. Cheap, idempotent; catches
     # plugs that were named "Mekarer" or "Fridge" after the last reconcile.
     try:
         auto_tag_critical_plugs()
     except Exception as e:
         log_error(f"[DeviceRegistry] auto_tag_critical_plugs (refresh) failed: {e}")
-    log_info("[DeviceRegistry] Refreshed")
+    n = sum(len(v) for v in diff.values())
+    log_info(f"[DeviceRegistry] Refreshed ({n} row(s) changed)")
+
+
+# ---------------------------------------------------------------------------
+# Incremental reconciliation
+#
+# ha_subscriber hands every state_changed event to apply_state() and every
+# entity/device/area registry event to apply_registry_event(). Each applies
+# the delta to the one affected row in place — index entries included — and
+# bumps generation(); the file write is coalesced (see _FLUSH_DELAY_S). The
+# full pipeline only runs after local edits (refresh), on reconnect
+# (catch_up) and as a consistency audit every AUDIT_INTERVAL_S, which reports
+# whatever the deltas missed as drift.
+#
+# With no event stream (HA down, or the subscriber not started) the background
+# tick falls back to a full refresh() every pass, as before.
+# ---------------------------------------------------------------------------
+
+AUDIT_INTERVAL_S = 15 * 60
+
+# Entity-registry fields whose change can move an entity's room or hide it.
+_AREA_CHANGE_KEYS = frozenset({"area_id", "device_id", "entity_category"})
+_AREA_SYNC_DELAY_S = 1.0
+_area_sync_task = None   # asyncio.Task coalescing a burst of registry events
+
+_last_audit_at = 0.0
+_reconcile_stats: dict = {
+    "state_deltas": 0, "registry_events": 0, "renames": 0, "area_syncs": 0,
+    "flushes": 0, "refreshes": 0, "audits": 0, "last_audit": None,
+}
+
+
+def events_live() -> bool:
+    """True while ha_subscriber holds a live HA connection with a loaded state cache."""
+    try:
+        from services import ha_subscriber
+    except Exception:
+        return False
+    return bool(ha_subscriber.ha_connected and ha_subscriber.state_cache)
+
+
+def _index_add(d: dict) -> None:
+    """Add one row to the lookup indexes. Caller holds _lock."""
+    if d.get("entity_id"):
+        _idx_by_entity_id[d["entity_id"]] = d
+    if d.get("room") and d.get("device_type"):
+        _idx_by_room_type.setdefault((d["room"], d["device_type"]), []).append(d)
+
+
+def _index_remove(d: dict) -> None:
+    """Drop one row from the lookup indexes. Caller holds _lock."""
+    if _idx_by_entity_id.get(d.get("entity_id")) is d:
+        del _idx_by_entity_id[d["entity_id"]]
+    key = (d.get("room"), d.get("device_type"))
+    bucket = [x for x in _idx_by_room_type.get(key, ()) if x is not d]
+    if bucket:
+        _idx_by_room_type[key] = bucket
+    else:
+        _idx_by_room_type.pop(key, None)
+
+
+def _commit_delta() -> None:
+    """A delta changed the in-memory table. Caller holds _lock."""
+    global _generation
+    _generation += 1
+    _invalidate_resolve_cache()
+    _schedule_flush()
+
+
+def _schedule_flush() -> None:
+    """Have flush() write the table shortly. Caller holds _lock."""
+    global _dirty, _flush_timer
+    _dirty = True
+    if _flush_timer is None:
+        _flush_timer = threading.Timer(_FLUSH_DELAY_S, flush)
+        _flush_timer.daemon = True
+        _flush_timer.start()
+
+
+def flush() -> bool:
+    """Write the table if a delta is pending. True when it wrote."""
+    global _dirty, _flush_timer
+    with _lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        if not _dirty:
+            return False
+        _dirty = False
+        _write_registry_file(_registry)
+    _reconcile_stats["flushes"] += 1
+    return True
+
+
+def _mark_lost(d: dict) -> bool:
+    # Same outcome as _reconcile for an entity missing from HA. Hybrid rows keep
+    # no prune stamp — the IR side is real whatever the Wi-Fi side does.
+    if d.get("status") == LOST:
+        return False
+    if not d.get("ir_device_id"):
+        d.setdefault("_lost_since", time.time())
+    d["status"] = LOST
+    return True
+
+
+def _mark_live(d: dict, entity_id: str, attrs: dict) -> bool:
+    changed = False
+    # Mirrors _reconcile for a live entity.
+    status = d.get("status")
+    if status in (LOST, UNCONFIGURED) or (status == UNCLAIMED and d.get("room")):
+        d["status"] = CONNECTED
+        d.pop("_lost_since", None)
+        changed = True
+    # device_class refinement, as _heal_unclaimed does for sensors.
+    if (d.get("status") in (UNCLAIMED, CONNECTED)
+            and entity_id.split(".")[0] in ("sensor", "binary_sensor")
+            and attrs.get("device_class")):
+        new_type = _infer_device_type(entity_id, attrs)
+        if new_type != d.get("device_type"):
+            _index_remove(d)
+            d["device_type"] = new_type
+            _index_add(d)
+            changed = True
+    return changed
+
+
+def _add_live(entity_id: str, attrs: dict) -> bool:
+    # The per-entity form of _add_unclaimed + the _reconcile domain filter.
+    if (entity_id.split(".")[0] in _NON_DEVICE_DOMAINS or _should_hide(entity_id)
+            or _is_hidden_category(entity_id)):
+        return False
+    row = _unclaimed_row(entity_id, attrs)
+    _registry.append(row)
+    _index_add(row)
+    return True
+
+
+def apply_state(entity_id: str, new_state: Optional[dict]) -> bool:
+    """Fold one HA state_changed event into the table. True when a row changed.
+
+    `new_state` is the event's new_state — None when HA removed the entity.
+    The steady state (a known, connected entity changing value) is a dict
+    lookup and nothing else.
+    """
+    if not _initialized or not entity_id:
+        return False
+    with _lock:
+        d = _idx_by_entity_id.get(entity_id)
+        if d is not None and d.get("origin") == "ziggy_template":
+            return False   # rebuilt from Ziggy's KV, not from HA state
+        if new_state is None:
+            changed = d is not None and _mark_lost(d)
+        elif d is not None:
+            changed = _mark_live(d, entity_id, new_state.get("attributes") or {})
+        else:
+            changed = _add_live(entity_id, new_state.get("attributes") or {})
+        if changed:
+            _commit_delta()
+    if changed:
+        _reconcile_stats["state_deltas"] += 1
+    return changed
+
+
+def rename_entity(old_entity_id: str, new_entity_id: str) -> bool:
+    """Follow an HA entity_id rename, keeping the row's room, IR link and tags.
+
+    Without this a rename looks like a deletion plus a new UNCLAIMED entity,
+    and the user's room assignment is stranded on the LOST ghost.
+    """
+    if not _initialized or not old_entity_id or not new_entity_id:
+        return False
+    with _lock:
+        d = _idx_by_entity_id.get(old_entity_id)
+        if d is None or new_entity_id in _idx_by_entity_id:
+            return False
+        _index_remove(d)
+        d["entity_id"] = new_entity_id
+        if d.get("name") == old_entity_id:
+            d["name"] = new_entity_id
+        _index_add(d)
+        _commit_delta()
+    _reconcile_stats["renames"] += 1
+    log_info(f"[DeviceRegistry] HA renamed {old_entity_id} → {new_entity_id}")
+    return True
+
+
+async def sync_ha_areas() -> int:
+    """Re-apply HA area placement and entity categories to the table.
+
+    The area-only slice of reconcile_with_ha: no /api/states snapshot, no IR
+    or smart-sensor merge. Returns the number of rows that changed.
+    """
+    import asyncio as _asyncio
+    entity_areas, _ = await _fetch_entity_areas()
+    await _refresh_hidden_categories()
+
+    def _do() -> int:
+        global _registry
+        with _lock:
+            before = _row_sigs(_registry)
+            devices = _adopt_ha_area_rooms(_registry, entity_areas)
+            devices = _enforce_user_rooms(devices)
+            devices = [d for d in devices if not _is_hidden_category(d.get("entity_id"))]
+            diff = _diff(before, _row_sigs(devices))
+            n = sum(len(v) for v in diff.values())
+            if n:
+                _registry = devices
+                _rebuild_indexes()   # rooms moved → (room, type) buckets stale
+                _commit_delta()
+            return n
+
+    n = await _asyncio.to_thread(_do)
+    _reconcile_stats["area_syncs"] += 1
+    return n
+
+
+async def _area_sync_later() -> None:
+    import asyncio as _asyncio
+    global _area_sync_task
+    await _asyncio.sleep(_AREA_SYNC_DELAY_S)
+    # Cleared before syncing: an event landing mid-sync schedules another pass.
+    _area_sync_task = None
+    try:
+        await sync_ha_areas()
+    except Exception as e:
+        log_error(f"[DeviceRegistry] HA area sync failed: {e}")
+
+
+async def apply_registry_event(event_type: str, data: dict) -> None:
+    """Fold one HA entity/device/area registry event into the table.
+
+    Renames are applied directly; anything that can move an entity between
+    areas or change its category schedules one coalesced sync_ha_areas().
+    """
+    import asyncio as _asyncio
+    global _area_sync_task
+    if not _initialized:
+        return
+    _reconcile_stats["registry_events"] += 1
+    # HA's registry changed under us: the cached snapshot (and the device
+    # grouping built from it) is stale whatever the event was.
+    try:
+        from services.ha_areas import invalidate_registry_cache
+        invalidate_registry_cache()
+    except Exception:
+        pass
+    action = data.get("action")
+    changes = data.get("changes") or {}
+    if event_type == "entity_registry_updated" and action == "update" and data.get("old_entity_id"):
+        rename_entity(data["old_entity_id"], data.get("entity_id"))
+    if (event_type == "area_registry_updated"
+            or (event_type == "device_registry_updated" and "area_id" in changes)
+            or (event_type == "entity_registry_updated" and _AREA_CHANGE_KEYS & changes.keys())):
+        if _area_sync_task is None or _area_sync_task.done():
+            _area_sync_task = _asyncio.get_running_loop().create_task(_area_sync_later())
+
+
+def catch_up() -> None:
+    """Re-run the local pipeline once the event stream (re)connects — deltas
+    for whatever changed while it was down never arrived. No-op before init()."""
+    if _initialized:
+        refresh()
+
+
+def audit() -> dict:
+    """Full-pipeline consistency check against a fresh HA REST snapshot.
+
+    Adopts the result like refresh() does and reports the rows it had to
+    change as drift — with the event stream live, anything here is a delta
+    that was missed or misapplied.
+    """
+    global _last_audit_at
+    states, live_ids = _live_states_and_ids()
+    diff = _run_pipeline(states, live_ids)
+    _last_audit_at = time.monotonic()
+    report = {
+        "at": time.time(),
+        "events_live": events_live(),
+        **{k: len(v) for k, v in diff.items()},
+        "sample": {k: v[:10] for k, v in diff.items() if v},
+    }
+    _reconcile_stats["audits"] += 1
+    _reconcile_stats["last_audit"] = report
+    if report["events_live"] and any(diff.values()):
+        log_info(
+            f"[DeviceRegistry] audit drift: added={report['added']} "
+            f"removed={report['removed']} changed={report['changed']} {report['sample']}"
+        )
+    return report
+
+
+def consistency_pass() -> None:
+    """One background reconcile tick (scheduler or dedicated thread).
+
+    Event stream live: a full audit every AUDIT_INTERVAL_S, nothing in
+    between. Otherwise: refresh() every tick — the self-heal for a registry
+    pinned by a bad startup snapshot (see _mass_loss_veto).
+    """
+    if events_live():
+        if time.monotonic() - _last_audit_at >= AUDIT_INTERVAL_S:
+            audit()
+        return
+    refresh()
+
+
+def reconcile_stats() -> dict:
+    with _lock:
+        pending = _dirty
+    return {**_reconcile_stats, "generation": _generation, "events_live": events_live(),
+            "write_pending": pending, "audit_interval_s": AUDIT_INTERVAL_S}
 
 
 def get_entity(room: str, device_type: str) -> Optional[str]:
@@ -1477,7 +1914,7 @@ def start_reconciliation_loop(interval_s: int = 60) -> threading.Thread:
         while True:
             time.sleep(interval_s)
             try:
-                refresh()
+                consistency_pass()
             except Exception as e:
                 log_error(f"[DeviceRegistry] Reconciliation loop error: {e}")
 
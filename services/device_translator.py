@@ -424,7 +424,7 @@ def query_state(ziggy_id: str) -> dict:
 #   services/ir_manager.py           — IR codeset storage, edge-only
 #   services/ir_listener.py          — Broadlink physical-remote listener
 #   services/automation_history.py   — logs already-resolved entity_ids
-#   services/pattern_logger.py       — events.jsonl logs entity_ids
+#   services/pattern_logger.py       — events.db logs entity_ids
 #   services/state_memory.py         — last-known-state per entity_id
 #
 # BRAIN-SIDE THAT STILL TOUCHES entity_id (would need migration if brain
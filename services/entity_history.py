@@ -0,0 +1,306 @@
+"""
+Local numeric history for device charts.
+
+The sensor chart on DeviceDetail used to proxy every request to HA's
+/api/history/period — up to a week of raw recorder rows per open, the most
+expensive call Ziggy makes against HA's recorder DB. Ziggy already sees every
+state change on the ha_subscriber stream, so it keeps its own series here:
+
+  * record() buffers numeric states of chartable domains in memory (cheap —
+    it runs on the event loop for every state_changed);
+  * flush() — on a short timer — appends the batch to user_files/history.db
+    and folds it into pre-aggregated 1-minute / 15-minute / 1-hour
+    min/mean/max buckets, pruning each tier to its retention;
+  * series() serves a window from the finest tier that still covers it,
+    decimated to a pixel budget with LTTB, plus the time recording began so
+    the caller can fetch only the gap before it from HA.
+
+Tiers:  raw 24 h · 1 min 3 d · 15 min 14 d · 1 h 400 d.
+
+Counters: stats(), surfaced on GET /api/debug/entity-history.
+"""
+from __future__ import annotations
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Optional
+
+from core.logger_module import log_error
+
+HISTORY_DB = Path("user_files/history.db")
+
+RECORD_DOMAINS = frozenset({"sensor", "number", "input_number", "counter"})
+
+RAW_RETENTION_S = 24 * 3600
+# (bucket seconds, retention seconds), finest first.
+TIERS: tuple[tuple[int, int], ...] = (
+    (60,   3 * 24 * 3600),
+    (900,  14 * 24 * 3600),
+    (3600, 400 * 24 * 3600),
+)
+DEFAULT_POINTS = 300
+_FLUSH_DELAY_S = 10.0
+_PRUNE_INTERVAL_S = 600.0
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS raw (
+    entity_id TEXT NOT NULL,
+    ts        REAL NOT NULL,
+    v         REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_raw_entity ON raw(entity_id, ts);
+CREATE INDEX IF NOT EXISTS idx_raw_ts     ON raw(ts);
+CREATE TABLE IF NOT EXISTS buckets (
+    entity_id TEXT    NOT NULL,
+    res       INTEGER NOT NULL,
+    start     REAL    NOT NULL,
+    n         INTEGER NOT NULL,
+    sum       REAL    NOT NULL,
+    min       REAL    NOT NULL,
+    max       REAL    NOT NULL,
+    PRIMARY KEY (entity_id, res, start)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_buckets_age ON buckets(res, start);
+CREATE TABLE IF NOT EXISTS entities (
+    entity_id TEXT PRIMARY KEY,
+    first_ts  REAL NOT NULL,
+    unit      TEXT
+);
+"""
+
+_lock = threading.RLock()
+_ready_for: Path | None = None
+_pending: list[tuple[str, float, float]] = []
+_pending_units: dict[str, Optional[str]] = {}
+_flush_timer: Optional[threading.Timer] = None
+_last_prune_at = 0.0
+_stats = {"recorded": 0, "skipped": 0, "flushes": 0, "rows_written": 0,
+          "prunes": 0, "rows_pruned": 0, "reads": 0, "points_served": 0}
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the history store, creating it on first use."""
+    global _ready_for
+    with _lock:
+        fresh = _ready_for != HISTORY_DB or not HISTORY_DB.exists()
+        if fresh:
+            HISTORY_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(HISTORY_DB, timeout=10.0)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if fresh:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            conn.commit()
+            _ready_for = HISTORY_DB
+        return conn
+
+
+# ---------------------------------------------------------------------------
+# Write path
+# ---------------------------------------------------------------------------
+
+def record(entity_id: str, state, attributes: Optional[dict] = None,
+           ts: Optional[float] = None) -> bool:
+    """Buffer one state for entity_id. True when it was numeric and chartable."""
+    if entity_id.split(".", 1)[0] not in RECORD_DOMAINS:
+        return False
+    try:
+        v = float(state)
+    except (TypeError, ValueError):
+        _stats["skipped"] += 1
+        return False
+    if v != v or v in (float("inf"), float("-inf")):
+        _stats["skipped"] += 1
+        return False
+    unit = (attributes or {}).get("unit_of_measurement")
+    global _flush_timer
+    with _lock:
+        _pending.append((entity_id, time.time() if ts is None else ts, v))
+        _pending_units[entity_id] = unit
+        _stats["recorded"] += 1
+        if _flush_timer is None:
+            _flush_timer = threading.Timer(_FLUSH_DELAY_S, flush)
+            _flush_timer.daemon = True
+            _flush_timer.start()
+    return True
+
+
+def _fold(batch: list[tuple[str, float, float]]) -> dict[tuple[str, int, float], list]:
+    """Pre-aggregate a batch into {(entity_id, res, start): [n, sum, min, max]}."""
+    out: dict[tuple[str, int, float], list] = {}
+    for eid, ts, v in batch:
+        for res, _ in TIERS:
+            key = (eid, res, float(int(ts // res) * res))
+            agg = out.get(key)
+            if agg is None:
+                out[key] = [1, v, v, v]
+            else:
+                agg[0] += 1
+                agg[1] += v
+                if v < agg[2]:
+                    agg[2] = v
+                if v > agg[3]:
+                    agg[3] = v
+    return out
+
+
+def flush() -> int:
+    """Write buffered points and their bucket deltas. Returns points written."""
+    global _flush_timer
+    with _lock:
+        if _flush_timer is not None:
+            _flush_timer.cancel()
+            _flush_timer = None
+        batch, units = list(_pending), dict(_pending_units)
+        _pending.clear()
+        _pending_units.clear()
+    if not batch:
+        return 0
+    try:
+        conn = _connect()
+    except (sqlite3.Error, OSError) as e:
+        log_error(f"[EntityHistory] open failed, dropping {len(batch)} points: {e}")
+        return 0
+    try:
+        with conn:
+            conn.executemany("INSERT INTO raw (entity_id, ts, v) VALUES (?, ?, ?)", batch)
+            conn.executemany(
+                "INSERT INTO buckets (entity_id, res, start, n, sum, min, max)"
+                " VALUES (?, ?, ?, ?, ?, ?, ?)"
+                " ON CONFLICT(entity_id, res, start) DO UPDATE SET"
+                " n = n + excluded.n, sum = sum + excluded.sum,"
+                " min = MIN(min, excluded.min), max = MAX(max, excluded.max)",
+                [(*key, *agg) for key, agg in _fold(batch).items()],
+            )
+            first: dict[str, float] = {}
+            for eid, ts, _ in batch:
+                if eid not in first or ts < first[eid]:
+                    first[eid] = ts
+            conn.executemany(
+                "INSERT INTO entities (entity_id, first_ts, unit) VALUES (?, ?, ?)"
+                " ON CONFLICT(entity_id) DO UPDATE SET"
+                " unit = COALESCE(excluded.unit, unit)",
+                [(eid, ts, units.get(eid)) for eid, ts in first.items()],
+            )
+        with _lock:
+            _stats["flushes"] += 1
+            _stats["rows_written"] += len(batch)
+        if time.monotonic() - _last_prune_at >= _PRUNE_INTERVAL_S:
+            _prune(conn)
+        return len(batch)
+    except sqlite3.Error as e:
+        log_error(f"[EntityHistory] flush failed: {e}")
+        return 0
+    finally:
+        conn.close()
+
+
+def _prune(conn: sqlite3.Connection, now: Optional[float] = None) -> int:
+    """Drop raw rows and buckets past their tier's retention."""
+    global _last_prune_at
+    now = time.time() if now is None else now
+    with conn:
+        removed = conn.execute("DELETE FROM raw WHERE ts < ?", (now - RAW_RETENTION_S,)).rowcount
+        for res, retention in TIERS:
+            removed += conn.execute("DELETE FROM buckets WHERE res = ? AND start < ?",
+                                    (res, now - retention)).rowcount
+    with _lock:
+        _last_prune_at = time.monotonic()
+        _stats["prunes"] += 1
+        _stats["rows_pruned"] += removed
+    return removed
+
+
+# ---------------------------------------------------------------------------
+# Read path
+# ---------------------------------------------------------------------------
+
+def lttb(points: list[tuple[float, float]], threshold: int) -> list[tuple[float, float]]:
+    """Largest-Triangle-Three-Buckets downsampling of time-ordered (t, v) points."""
+    n = len(points)
+    if threshold >= n or threshold < 3:
+        return list(points)
+    out = [points[0]]
+    every = (n - 2) / (threshold - 2)
+    a = 0
+    for i in range(threshold - 2):
+        lo = int(i * every) + 1
+        hi = int((i + 1) * every) + 1
+        nxt_lo, nxt_hi = hi, min(int((i + 2) * every) + 1, n)
+        span = points[nxt_lo:nxt_hi] or [points[-1]]
+        avg_t = sum(p[0] for p in span) / len(span)
+        avg_v = sum(p[1] for p in span) / len(span)
+        at, av = points[a]
+        best, best_area = lo, -1.0
+        for j in range(lo, hi):
+            t, v = points[j]
+            area = abs((at - avg_t) * (v - av) - (at - t) * (avg_v - av))
+            if area > best_area:
+                best, best_area = j, area
+        out.append(points[best])
+        a = best
+    out.append(points[-1])
+    return out
+
+
+def _tier_for(start: float, now: float) -> Optional[int]:
+    """Bucket size serving a window that starts at `start`; None = raw rows."""
+    if start >= now - RAW_RETENTION_S and now - start <= 6 * 3600:
+        return None
+    for res, retention in TIERS:
+        if start >= now - retention:
+            return res
+    return TIERS[-1][0]
+
+
+def series(entity_id: str, start: float, end: Optional[float] = None,
+           max_points: int = DEFAULT_POINTS) -> dict:
+    """Points for [start, end] (epoch seconds) from the local store.
+
+    Returns {"points": [(t, v)], "unit", "recorded_since", "resolution"}.
+    recorded_since is None for an entity Ziggy has never recorded; otherwise
+    anything before it has to come from HA.
+    """
+    flush()   # a chart opened right after a change should include it
+    now = time.time()
+    end = now if end is None else end
+    res = _tier_for(start, now)
+    try:
+        conn = _connect()
+    except (sqlite3.Error, OSError):
+        return {"points": [], "unit": None, "recorded_since": None, "resolution": res}
+    try:
+        meta = conn.execute("SELECT first_ts, unit FROM entities WHERE entity_id = ?",
+                            (entity_id,)).fetchone()
+        if res is None:
+            rows = conn.execute(
+                "SELECT ts, v FROM raw WHERE entity_id = ? AND ts >= ? AND ts <= ? ORDER BY ts",
+                (entity_id, start, end)).fetchall()
+        else:
+            # Mean at the bucket midpoint; LTTB keeps the extremes' shape.
+            rows = conn.execute(
+                "SELECT start + ? / 2.0, sum / n FROM buckets"
+                " WHERE entity_id = ? AND res = ? AND start >= ? AND start <= ? ORDER BY start",
+                (res, entity_id, res, float(int(start // res) * res), end)).fetchall()
+    except sqlite3.Error as e:
+        log_error(f"[EntityHistory] read failed for {entity_id}: {e}")
+        return {"points": [], "unit": None, "recorded_since": None, "resolution": res}
+    finally:
+        conn.close()
+    points = lttb([(float(t), float(v)) for t, v in rows], max_points)
+    with _lock:
+        _stats["reads"] += 1
+        _stats["points_served"] += len(points)
+    return {
+        "points":         points,
+        "unit":           meta[1] if meta else None,
+        "recorded_since": meta[0] if meta else None,
+        "resolution":     res,
+    }
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "pending": len(_pending), "db": str(HISTORY_DB)}
@@ -14,51 +14,28 @@ lives on the hub so a phone reinstall / new device inherits the same choices.
 """
 from __future__ import annotations
 
-import json
 import os
-import threading
-from typing import Optional
+
+from services.json_store import JsonStore
 
 _FILE = os.environ.get("ZIGGY_ENTITY_PREFS_PATH", "user_files/entity_prefs.json")
-_lock = threading.Lock()
-_cache: Optional[dict] = None
+_store = JsonStore(lambda: _FILE)
 _UNSET = object()
 
 
 def _load() -> dict:
-    global _cache
-    if _cache is not None:
-        return _cache
-    try:
-        with open(_FILE, "r", encoding="utf-8") as f:
-            data = json.load(f)
-        _cache = data if isinstance(data, dict) else {}
-    except Exception:
-        _cache = {}
-    return _cache
-
-
-def _save(data: dict) -> None:
-    global _cache
-    _cache = data
-    os.makedirs(os.path.dirname(_FILE) or ".", exist_ok=True)
-    tmp = _FILE + ".tmp"
-    with open(tmp, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
-    os.replace(tmp, _FILE)
+    return _store.read()
 
 
 def get_all() -> dict:
     """entity_id → {is_tile?, hidden?, icon?}. Copy, safe to mutate."""
-    with _lock:
-        return {k: dict(v) for k, v in _load().items()}
+    return _store.query(lambda data: {k: dict(v) for k, v in data.items()})
 
 
 def get_pref(entity_id: str) -> dict:
     if not entity_id:
         return {}
-    with _lock:
-        return dict(_load().get(entity_id, {}))
+    return dict(_load().get(entity_id, {}))
 
 
 def set_pref(entity_id: str, *, is_tile=_UNSET, hidden=_UNSET, icon=_UNSET) -> dict:
@@ -66,8 +43,7 @@ def set_pref(entity_id: str, *, is_tile=_UNSET, hidden=_UNSET, icon=_UNSET) -> d
     or omit to leave unchanged. Empty records are pruned so the file stays sparse."""
     if not entity_id:
         return {}
-    with _lock:
-        data = dict(_load())
+    def _apply(data: dict) -> dict:
         cur = dict(data.get(entity_id, {}))
         if is_tile is not _UNSET:
             if is_tile is None:
@@ -88,5 +64,6 @@ def set_pref(entity_id: str, *, is_tile=_UNSET, hidden=_UNSET, icon=_UNSET) -> d
             data[entity_id] = cur
         else:
             data.pop(entity_id, None)
-        _save(data)
         return cur
+
+    return dict(_store.update(_apply))
@@ -5,8 +5,8 @@ Drives the manual-only Fake Occupancy automation. A single activation persists
 across restarts and ticks once per minute from `ziggy_scheduler.py`. Each day
 during the active window the scheduler generates a randomized plan (2–3 rooms,
 45–90 min light-on periods, 20–40 min gaps, ±15 min start-time jitter, optional
-TV blast for 60–120 min) and executes lights via `home_automation.call_service`
-and TV via `ir_manager.send_ir_command`. After `duration_days` days the
+TV blast for 60–120 min) and executes lights via `service_batch` (lights due
+on the same tick share one HA call) and TV via `ir_manager.send_ir_command`. After `duration_days` days the
 activation auto-removes itself.
 
 State file:
@@ -224,12 +224,17 @@ async def _process_activation(act: dict, now: datetime) -> bool:
     if plan and plan.get("date") == today_str:
         now_ts = now.timestamp()
         executed = set(plan.get("executed", []))
-        for i, job in enumerate(plan["jobs"]):
-            if i in executed:
-                continue
-            if job["at_ts"] > now_ts:
-                continue
-            await _execute_job(act, job)
+        due = [i for i, job in enumerate(plan["jobs"])
+               if i not in executed and job["at_ts"] <= now_ts]
+        # Lights due this tick (several after a restart or a missed tick) go
+        # out together as one batched HA call; TV jobs stay one-by-one.
+        lights = [plan["jobs"][i] for i in due
+                  if plan["jobs"][i]["kind"] in ("light_on", "light_off")]
+        if lights:
+            await _execute_light_jobs(act, lights)
+        for i in due:
+            if plan["jobs"][i]["kind"] not in ("light_on", "light_off"):
+                await _execute_job(act, plan["jobs"][i])
             executed.add(i)
             changed = True
         plan["executed"] = sorted(executed)
@@ -345,31 +350,46 @@ def _build_daily_plan(act: dict, now: datetime) -> dict:
 # Job execution
 # ---------------------------------------------------------------------------
 
+async def _execute_light_jobs(act: dict, jobs: list[dict]) -> None:
+    """Run due light jobs through service_batch — one HA call per shape."""
+    from services.service_batch import ServiceCall, execute_async
+    # An on and an off for the same light can both be due after a missed
+    # tick; batched groups run concurrently, so only the latest one is sent.
+    latest: dict[str, dict] = {}
+    for job in sorted(jobs, key=lambda j: j["at_ts"]):
+        if job.get("entity_id"):
+            latest[job["entity_id"]] = job
+    calls: list[ServiceCall] = []
+    for entity_id, job in latest.items():
+        domain = entity_id.split(".")[0] if "." in entity_id else "light"
+        data: dict = {}
+        if job["kind"] == "light_on":
+            bp = job.get("brightness_pct")
+            if bp and domain == "light":
+                data["brightness_pct"] = int(bp)
+        service = "turn_on" if job["kind"] == "light_on" else "turn_off"
+        calls.append(ServiceCall(domain, service, entity_id, data))
+    if not calls:
+        return
+    try:
+        batch = await execute_async(calls, origin="fake_occupancy")
+    except Exception as exc:
+        log_error(f"[FakeOccupancy] light jobs failed: {exc}")
+        _bus.emit("automation", BASIC, "fake_occupancy_job_error",
+                  automation_id=act["automation_id"], kind="light", error=str(exc))
+        return
+    for call in calls:
+        ok = batch["results"].get(call.entity_id, {}).get("ok")
+        _bus.emit("automation", VERBOSE, "fake_occupancy_job_done",
+                  automation_id=act["automation_id"],
+                  kind="light_on" if call.service == "turn_on" else "light_off",
+                  entity_id=call.entity_id, result="ok" if ok else "error")
+
+
 async def _execute_job(act: dict, job: dict) -> None:
     kind = job["kind"]
     try:
-        if kind in ("light_on", "light_off"):
-            from services.home_automation import call_service
-            entity_id = job.get("entity_id") or ""
-            if not entity_id:
-                return
-            domain = entity_id.split(".")[0] if "." in entity_id else "light"
-            if kind == "light_on":
-                data = {"entity_id": entity_id}
-                bp = job.get("brightness_pct")
-                if bp and domain == "light":
-                    data["brightness_pct"] = int(bp)
-                result = await asyncio.to_thread(call_service, domain, "turn_on", data)
-            else:
-                result = await asyncio.to_thread(
-                    call_service, domain, "turn_off", {"entity_id": entity_id}
-                )
-            ok = bool(result.get("ok"))
-            _bus.emit("automation", VERBOSE, "fake_occupancy_job_done",
-                      automation_id=act["automation_id"], kind=kind,
-                      entity_id=entity_id, result="ok" if ok else "error")
-
-        elif kind in ("tv_on", "tv_off"):
+        if kind in ("tv_on", "tv_off"):
             # Most TVs use a single toggle "power" code for both directions.
             # ir_manager's assumed-state tracker knows whether the TV is on or
             # off after the previous command and won't double-power the device.
@@ -15,6 +15,13 @@ What this owns
 - WS helper:           ws(*commands, timeout=4.0) — opens a short-lived
                        authenticated connection, runs N commands, returns
                        N results. Replaces ha_areas._ws (now aliased to this).
+- Pooled async REST:   request_async(), call_service_async(),
+                       get_state_async(), get_all_states_async(),
+                       history_async() — one
+                       httpx.AsyncClient with a bounded keep-alive pool, a
+                       concurrency gate and a per-call deadline, for async
+                       routes and engines. request() is its sync facade for
+                       thread-based code. See "Pooled REST client" below.
 
 What this does NOT own
 ----------------------
@@ -36,8 +43,11 @@ from __future__ import annotations
 
 import asyncio
 import json
-from typing import Any
+import threading
+import time
+from typing import Any, Optional
 
+import httpx
 import websockets
 
 from core.settings_loader import settings
@@ -134,3 +144,223 @@ async def ws(*commands: dict, timeout: float = 4.0) -> list[dict]:
         for _ in commands:
             results.append(json.loads(await asyncio.wait_for(conn.recv(), timeout=timeout)))
         return results
+
+
+# ── Pooled REST client ──────────────────────────────────────────────────────
+#
+# Async routes used to reach HA through the sync requests.Session — inline on
+# the event loop (one slow HA reply stalled every other request on the hub)
+# or via ad-hoc to_thread / executor hops. The client below lives on its own
+# event-loop thread ("ha-client"): async callers await it through
+# wrap_future, sync callers block on the same future, so both share one
+# bounded connection pool and one concurrency gate, and nothing HA does can
+# hold the application's loop. The thread and client start on first use.
+
+DEFAULT_TIMEOUT = 10.0
+MAX_CONNECTIONS = 20
+MAX_KEEPALIVE = 10
+# Requests in flight against HA at once; the rest queue (within their deadline).
+MAX_CONCURRENCY = 16
+
+_pool_lock = threading.Lock()
+_pool_loop: Optional[asyncio.AbstractEventLoop] = None
+_pool_thread: Optional[threading.Thread] = None
+_client: Optional[httpx.AsyncClient] = None
+_gate: Optional[asyncio.Semaphore] = None
+_rest_stats = {"requests": 0, "errors": 0, "timeouts": 0, "in_flight": 0,
+               "max_in_flight": 0, "ms_total": 0.0, "ms_max": 0.0}
+
+
+def _pool() -> asyncio.AbstractEventLoop:
+    """The client's event loop, starting its thread on first use."""
+    global _pool_loop, _pool_thread, _client, _gate
+    with _pool_lock:
+        if _pool_loop is None or not _pool_thread or not _pool_thread.is_alive():
+            loop = asyncio.new_event_loop()
+            _client = None   # built on the ha-client thread (SSL context load is slow)
+            _gate = asyncio.Semaphore(MAX_CONCURRENCY)
+            _pool_thread = threading.Thread(target=loop.run_forever, name="ha-client", daemon=True)
+            _pool_thread.start()
+            _pool_loop = loop
+        return _pool_loop
+
+
+async def _send(method: str, path: str, json_body: Any, params: Optional[dict],
+                timeout: float) -> httpx.Response:
+    """Runs on the ha-client loop. `timeout` bounds queueing plus the request."""
+    global _client
+    t0 = time.perf_counter()
+    if _client is None:
+        _client = httpx.AsyncClient(limits=httpx.Limits(
+            max_connections=MAX_CONNECTIONS,
+            max_keepalive_connections=MAX_KEEPALIVE,
+        ))
+    try:
+        async with asyncio.timeout(timeout):
+            async with _gate:
+                _rest_stats["in_flight"] += 1
+                _rest_stats["max_in_flight"] = max(_rest_stats["max_in_flight"], _rest_stats["in_flight"])
+                try:
+                    return await _client.request(
+                        method, f"{url()}{path}", headers=headers(),
+                        json=json_body, params=params, timeout=timeout,
+                    )
+                finally:
+                    _rest_stats["in_flight"] -= 1
+    except TimeoutError:
+        _rest_stats["timeouts"] += 1
+        raise httpx.TimeoutException(f"HA {method} {path} exceeded {timeout}s") from None
+    except Exception:
+        _rest_stats["errors"] += 1
+        raise
+    finally:
+        ms = (time.perf_counter() - t0) * 1000
+        _rest_stats["requests"] += 1
+        _rest_stats["ms_total"] += ms
+        _rest_stats["ms_max"] = max(_rest_stats["ms_max"], ms)
+
+
+async def request_async(method: str, path: str, *, json: Any = None,
+                        params: Optional[dict] = None,
+                        timeout: float = DEFAULT_TIMEOUT) -> httpx.Response:
+    """HA REST call (path like "/api/states") on the pooled client.
+
+    Raises httpx.HTTPError on transport failure and httpx.TimeoutException
+    when `timeout` (queueing included) runs out. Cancelling the caller
+    cancels the request.
+    """
+    fut = asyncio.run_coroutine_threadsafe(_send(method, path, json, params, timeout), _pool())
+    return await asyncio.wrap_future(fut)
+
+
+def request(method: str, path: str, *, json: Any = None,
+            params: Optional[dict] = None,
+            timeout: float = DEFAULT_TIMEOUT) -> httpx.Response:
+    """Sync facade over request_async for thread-based engines.
+
+    Blocks the calling thread, so it refuses to run on any thread with a
+    running event loop (the app's, or the ha-client loop itself) — async
+    code awaits request_async or moves the sync caller to a thread."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        pass
+    else:
+        raise RuntimeError("ha_client.request() called from a running event loop; "
+                           "await request_async() or use asyncio.to_thread")
+    loop = _pool()
+    return asyncio.run_coroutine_threadsafe(_send(method, path, json, params, timeout), loop).result()
+
+
+async def call_service_async(domain: str, service: str, data: dict,
+                             origin: str = "ziggy", timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """call_service() for async callers, on the pooled client.
+
+    Same result dicts, command-ledger intent and bus events as
+    home_automation.call_service — the outcome handling is shared."""
+    from services import home_automation as ha
+    from core.debug_bus import bus, VERBOSE
+    path = f"/api/services/{domain}/{service}"
+    bus.emit("ha", VERBOSE, "ha_service_call",
+             domain=domain, service=service, payload=data, endpoint=f"{url()}{path}")
+    t0 = time.perf_counter()
+
+    def _ms() -> float:
+        return round((time.perf_counter() - t0) * 1000, 1)
+
+    try:
+        resp = await request_async("POST", path, json=data, timeout=timeout)
+        if resp.status_code == 200:
+            try:
+                payload = resp.json()
+            except Exception:
+                payload = None
+            return ha._service_ok(domain, service, data, origin, payload, _ms())
+        return ha._service_http_error(domain, service, resp.status_code, resp.text, _ms())
+    except httpx.ConnectTimeout as e:
+        return ha._service_unreachable(domain, service, e, _ms())
+    except httpx.TimeoutException:
+        return ha._service_timeout(domain, service, data, _ms())
+    except httpx.TransportError as e:
+        return ha._service_unreachable(domain, service, e, _ms())
+    except Exception as e:
+        return ha._service_exception(domain, service, e, _ms())
+
+
+async def get_state_async(entity_id: str) -> dict:
+    """get_state() for async callers: the WS state cache, else one pooled GET.
+
+    Same {"ok", "message", "data"} shape as home_automation.get_state."""
+    from services.home_automation import _state_from_cache
+    cached = _state_from_cache(entity_id)
+    if cached is not None:
+        return {"ok": True, "message": "ok (cache)", "data": cached}
+    try:
+        resp = await request_async("GET", f"/api/states/{entity_id}")
+    except httpx.HTTPError as e:
+        return {"ok": False, "message": f"HA state exception: {e}"}
+    if resp.status_code == 200:
+        js = resp.json()
+        return {"ok": True, "message": "ok",
+                "data": {"state": js.get("state"), "attributes": js.get("attributes", {})}}
+    return {"ok": False, "message": f"HA state error {resp.status_code}: {resp.text}"}
+
+
+async def get_all_states_async() -> list[dict]:
+    """All HA entity states, [] on any failure."""
+    try:
+        resp = await request_async("GET", "/api/states")
+        if resp.status_code == 200:
+            return resp.json()
+    except (httpx.HTTPError, ValueError):
+        pass
+    return []
+
+
+async def history_async(entity_ids: list[str], start: str, end: Optional[str] = None,
+                        *, minimal: bool = True, attributes: bool = True,
+                        timeout: float = 15.0) -> list[list[dict]]:
+    """HA /api/history/period for `entity_ids` from ISO `start` (to `end`).
+
+    One list of state rows per entity, as HA returns it; [] on any failure."""
+    params = {"filter_entity_id": ",".join(entity_ids)}
+    if minimal:
+        params["minimal_response"] = "true"
+    if not attributes:
+        params["no_attributes"] = "true"
+    if end:
+        params["end_time"] = end
+    try:
+        resp = await request_async("GET", f"/api/history/period/{start}",
+                                   params=params, timeout=timeout)
+        if resp.status_code == 200:
+            return resp.json() or []
+    except (httpx.HTTPError, ValueError):
+        pass
+    return []
+
+
+def rest_stats() -> dict:
+    s = dict(_rest_stats)
+    n = s["requests"] or 1
+    s["ms_total"] = round(s["ms_total"], 1)
+    s["ms_max"] = round(s["ms_max"], 1)
+    s["ms_avg"] = round(s["ms_total"] / n, 1)
+    s["limits"] = {"max_connections": MAX_CONNECTIONS, "max_keepalive": MAX_KEEPALIVE,
+                   "max_concurrency": MAX_CONCURRENCY, "default_timeout_s": DEFAULT_TIMEOUT}
+    return s
+
+
+async def aclose() -> None:
+    """Close the pooled client and stop its loop (shutdown)."""
+    global _pool_loop, _client
+    with _pool_lock:
+        loop, client = _pool_loop, _client
+        _pool_loop, _client = None, None
+    if loop is None:
+        return
+    try:
+        if client is not None:
+            await asyncio.wrap_future(asyncio.run_coroutine_threadsafe(client.aclose(), loop))
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
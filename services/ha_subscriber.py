@@ -3,12 +3,14 @@ Persistent HA WebSocket subscriber.
 
 Maintains a single long-lived connection to Home Assistant, receives all
 state_changed events, keeps an in-memory state cache, and drives the
-anomaly engine on every change.
+anomaly engine on every change. State and registry events are also folded
+into services.device_registry as per-entity deltas.
 
 Startup sequence (critical — prevents stale-state race):
   1. Connect + authenticate
-  2. Subscribe to state_changed events (buffering begins)
-  3. Full REST state snapshot → populate state_cache
+  2. Subscribe to state_changed events (buffering begins), then to the
+     entity/device/area registry events
+  3. Full REST state snapshot → populate state_cache, registry catch-up
   4. Begin processing buffered + live events
 
 Reconnect sequence:
@@ -21,6 +23,7 @@ Reconnect sequence:
 from __future__ import annotations
 
 import asyncio
+import contextvars
 import json
 import time
 from datetime import datetime, timezone
@@ -32,7 +35,7 @@ import requests
 from core.settings_loader import settings
 from core.logger_module import log_info, log_error
 from core.debug_bus import bus as _dbus, BASIC, VERBOSE, TRACE
-from services import ha_client
+from services import ha_client, state_dispatch
 
 # Credentials are read live inside _run_once / _refresh_with_retry. Snapshotting
 # them at import time would mean a token rotation only takes effect after a full
@@ -61,6 +64,13 @@ ha_last_reconnect_wall: float = 0.0
 _BACKOFF_BASE = 2
 _BACKOFF_MAX = 60
 
+# WS subscription id → HA registry event type (id 1 is state_changed).
+_REGISTRY_SUBSCRIPTIONS: dict[int, str] = {
+    2: "entity_registry_updated",
+    3: "device_registry_updated",
+    4: "area_registry_updated",
+}
+
 # Set by run_subscriber once its event loop exists; kick_reconnect() fires it to
 # cut a backoff sleep short after credentials change.
 _reconnect_kick: Optional[asyncio.Event] = None
@@ -69,6 +79,19 @@ _reconnect_kick: Optional[asyncio.Event] = None
 # notification so a silent self-repair is still auditable by the owner.
 _last_healed_url: Optional[str] = None
 
+# Command channel on the authenticated socket (services.service_batch). Set
+# once the snapshot is loaded, cleared on disconnect. Result messages are
+# matched to their futures by id in the main loop; ids 1–4 are subscriptions.
+_ws: Any = None
+_ws_loop: Optional[asyncio.AbstractEventLoop] = None
+_next_cmd_id = 100
+_pending_cmds: dict[int, asyncio.Future] = {}
+# True while the reader is dispatching a message (and in anything it awaits or
+# hands to to_thread). A command sent from there could never be answered —
+# its result waits behind the very dispatch that is waiting for it.
+_dispatching: contextvars.ContextVar[bool] = contextvars.ContextVar(
+    "ha_subscriber_dispatching", default=False)
+
 # Home Assistant's version, captured from the WebSocket greeting.
 # edge_health_router reads this via getattr to populate /health.ha_version —
 # it had been reading an attribute nothing ever assigned, so that field was
@@ -246,6 +269,8 @@ async def _process_event(event: dict) -> None:
     # device "reappears" on the Devices page after the user confirms delete.
     if raw_new_state is None:
         had_entry = state_cache.pop(entity_id, None) is not None
+        _registry_delta(entity_id, None)
+        await _health_delta(entity_id, None)
         if not had_entry:
             return
         try:
@@ -290,66 +315,137 @@ async def _process_event(event: dict) -> None:
     except Exception as e:
         log_error(f"[HASubscriber] broadcast failed: {e}")
 
+    # TRACE-level: emit every HA state change (very noisy — only in trace mode)
+    _dbus.emit("ha", TRACE, "ha_state_changed",
+               entity_id=entity_id, prev_state=prev_s, new_state=new_s)
+
+    _registry_delta(entity_id, new_state)
+    await _health_delta(entity_id, state_cache[entity_id])
+    _history_record(entity_id, new_s, attrs)
+
+    # Internal bookkeeping hooks (manual overrides, circadian, smart climate,
+    # room presence, automation bridge, command_router learning, restore,
+    # anomaly, self_heal) — only the ones that registered interest in this
+    # entity run. See _install_state_hooks below.
+    _install_state_hooks()
+    await state_dispatch.dispatch(state_dispatch.StateChange(
+        entity_id=entity_id,
+        domain=entity_id.split(".", 1)[0],
+        prev_state=prev_s,
+        new_state=new_s,
+        old=old_state,
+        new=new_state,
+        attributes=attrs,
+    ))
+
+
+def _registry_delta(entity_id: str, new_state: Optional[dict]) -> None:
+    # Device registry follows HA per event (new entity, removal, lost →
+    # connected). Called directly rather than as a state_dispatch hook because
+    # removals (new_state=None) never reach the dispatcher.
+    try:
+        from services import device_registry
+        device_registry.apply_state(entity_id, new_state)
+    except Exception as e:
+        log_error(f"[HASubscriber] registry delta failed for {entity_id}: {e}")
+
+
+def _history_record(entity_id: str, state: str, attrs: dict) -> None:
+    # Numeric series for the device charts (services.entity_history). Buffers
+    # in memory; the store writes on its own timer.
+    try:
+        from services import entity_history
+        entity_history.record(entity_id, state, attrs)
+    except Exception as e:
+        log_error(f"[HASubscriber] history record failed for {entity_id}: {e}")
+
+
+async def _health_delta(entity_id: str, entry: Optional[dict]) -> None:
+    # Offline / battery signals behind /api/health; pushes `health_changed`.
+    try:
+        from services import health_aggregate
+        await health_aggregate.on_state(entity_id, entry)
+    except Exception as e:
+        log_error(f"[HASubscriber] health delta failed for {entity_id}: {e}")
+
+
+async def _process_registry_message(msg: dict) -> None:
+    """Result or event on one of the _REGISTRY_SUBSCRIPTIONS."""
+    event_type = _REGISTRY_SUBSCRIPTIONS[msg["id"]]
+    if msg.get("type") == "result":
+        if not msg.get("success"):
+            # Registry events need an admin token. Without them area moves and
+            # renames reach the device registry via its periodic audit only.
+            log_info(f"[HASubscriber] {event_type} subscription refused: {msg.get('error')}")
+        return
+    if msg.get("type") != "event":
+        return
+    from services import device_registry
+    await device_registry.apply_registry_event(
+        event_type, msg.get("event", {}).get("data") or {})
+
+
+# ---------------------------------------------------------------------------
+# state_changed hooks
+#
+# Registered once, in the order they used to run inline in _process_event.
+# Each declares the domains / entity set it cares about so the dispatcher can
+# skip it for everything else (a 1 Hz power sensor no longer pays for the
+# circadian / climate / presence / learning / restore / self-heal checks).
+# The anomaly hook is the one wildcard: its offline (ANOM-07/09) and battery
+# (ANOM-08) rules read any entity, so every event still reaches it.
+# ---------------------------------------------------------------------------
+
+_hooks_installed = False
+
+
+def _hook_manual_override(ch: "state_dispatch.StateChange") -> None:
     # Manual-override detection — if the user (or another system) just changed
     # a controllable entity and Ziggy did NOT initiate the change, mark it as
     # manually overridden for the default window. The executor will skip steps
     # targeting overridden entities to avoid fighting the user.
-    try:
-        from services.manual_overrides import (
-            was_ziggy_initiated, mark_manual, CONTROLLABLE_DOMAINS,
-        )
-        if prev_s and new_s and prev_s != new_s:
-            domain = entity_id.split(".", 1)[0]
-            if domain in CONTROLLABLE_DOMAINS and not was_ziggy_initiated(entity_id):
-                mark_manual(entity_id)
-    except Exception:
-        pass
+    from services import manual_overrides as _mo
+    if ch.prev_state and ch.new_state and not _mo.was_ziggy_initiated(ch.entity_id):
+        _mo.mark_manual(ch.entity_id)
+
 
+def _hook_circadian(ch: "state_dispatch.StateChange") -> None:
     # Smart Light Schedule hook — a scheduled light joining/leaving the ramp.
     # off→on: enroll it (snap to the current ramp point). Staying on but with a
     # hand-changed brightness/color (not our own write): mark it manual so the
-    # engine backs off "until manually set". Cheap early-out on non-lights.
-    if entity_id.startswith("light."):
-        try:
-            from services import circadian_engine as _circ
-            if entity_id in _circ.scheduled_lights():
-                if prev_s != "on" and new_s == "on":
-                    _circ.on_light_turned_on(entity_id)
-                elif prev_s == "on" and new_s == "on" and not was_ziggy_initiated(entity_id):
-                    old_a = old_state.get("attributes", {}) or {}
-                    changed = (old_a.get("brightness") != attrs.get("brightness")
-                               or old_a.get("color_temp_kelvin") != attrs.get("color_temp_kelvin"))
-                    # ...but not if it's just the schedule's OWN write confirming
-                    # late (Zigbee round-trip > the 5s ziggy-call window). Value-
-                    # aware: a real hand change reports a different value → still manual.
-                    from services.manual_overrides import ziggy_write_settling
-                    if changed and not ziggy_write_settling(entity_id, attrs):
-                        _circ.mark_manual(entity_id)
-        except Exception as e:
-            log_error(f"[HASubscriber] circadian hook {entity_id}: {e}")
-
+    # engine backs off "until manually set".
+    from services import circadian_engine as _circ
+    from services.manual_overrides import was_ziggy_initiated, ziggy_write_settling
+    entity_id, prev_s, new_s, attrs = ch.entity_id, ch.prev_state, ch.new_state, ch.attributes
+    if prev_s != "on" and new_s == "on":
+        _circ.on_light_turned_on(entity_id)
+    elif prev_s == "on" and new_s == "on" and not was_ziggy_initiated(entity_id):
+        old_a = ch.old.get("attributes", {}) or {}
+        changed = (old_a.get("brightness") != attrs.get("brightness")
+                   or old_a.get("color_temp_kelvin") != attrs.get("color_temp_kelvin"))
+        # ...but not if it's just the schedule's OWN write confirming
+        # late (Zigbee round-trip > the 5s ziggy-call window). Value-
+        # aware: a real hand change reports a different value → still manual.
+        if changed and not ziggy_write_settling(entity_id, attrs):
+            _circ.mark_manual(entity_id)
+
+
+def _hook_smart_climate(ch: "state_dispatch.StateChange") -> None:
     # Smart Climate Control hook — a watched room temperature sensor reported a
     # new reading. Evaluate that room's thermostat now (event-driven; the engine's
-    # ~5 min loop is only a safety net). Cheap early-out on non-sensors.
-    if entity_id.startswith("sensor.") and prev_s != new_s:
-        try:
-            from services import smart_climate_engine as _clim
-            if entity_id in _clim.configured_sensors():
-                _clim.on_temperature_changed(entity_id, new_s)
-        except Exception as e:
-            log_error(f"[HASubscriber] smart-climate hook {entity_id}: {e}")
+    # ~5 min loop is only a safety net).
+    from services import smart_climate_engine as _clim
+    _clim.on_temperature_changed(ch.entity_id, ch.new_state)
 
+
+def _hook_room_presence(ch: "state_dispatch.StateChange") -> None:
     # Door-aware room presence hook — a watched door/motion sensor changed.
     # The engine's state machine reacts (latch / walk-out grace / quiet clear).
-    # Cheap early-out: frozenset membership, no lock.
-    if entity_id.startswith("binary_sensor.") and prev_s != new_s:
-        try:
-            from services import room_presence_engine as _rp
-            if entity_id in _rp.watched_entities():
-                _rp.on_sensor_event(entity_id, new_s)
-        except Exception as e:
-            log_error(f"[HASubscriber] room-presence hook {entity_id}: {e}")
+    from services import room_presence_engine as _rp
+    _rp.on_sensor_event(ch.entity_id, ch.new_state)
+
 
+async def _hook_automation_fired(ch: "state_dispatch.StateChange") -> None:
     # HA-automation-fired bridge — a stored Ziggy automation with a state/sensor
     # trigger is fired by HA, but its Ziggy-native actions (turn_off_all_lights,
     # IR) are dropped/placeholder'd by the compiler, so HA fires the trigger and
@@ -358,62 +454,98 @@ async def _process_event(event: dict) -> None:
     # `last_triggered` attribute advancing — run ONLY the actions HA deferred,
     # itself. call_service/delay/notify already ran natively in HA, so they are
     # excluded (re-running Pre-cool's climate call would double-fire).
-    if entity_id.startswith("automation."):
-        try:
-            old_a = old_state.get("attributes", {}) or {}
-            old_fired = old_a.get("last_triggered")
-            new_fired = attrs.get("last_triggered")
-            if new_fired and new_fired != old_fired:
-                await _run_deferred_automation_actions(entity_id, attrs)
-        except Exception as e:
-            log_error(f"[HASubscriber] automation-fired bridge {entity_id}: {e}")
+    old_a = ch.old.get("attributes", {}) or {}
+    old_fired = old_a.get("last_triggered")
+    new_fired = ch.attributes.get("last_triggered")
+    if new_fired and new_fired != old_fired:
+        await _run_deferred_automation_actions(ch.entity_id, ch.attributes)
 
-    # TRACE-level: emit every HA state change (very noisy — only in trace mode)
-    _dbus.emit("ha", TRACE, "ha_state_changed",
-               entity_id=entity_id, prev_state=prev_s, new_state=new_s)
 
+def _hook_command_router(ch: "state_dispatch.StateChange") -> None:
     # Hybrid-routing learning: track last meaningful state per entity, and learn
     # wifi_dies_when_off on hybrid devices that go off → unavailable.
-    try:
-        from services.command_router import observe_state_transition
-        observe_state_transition(entity_id, prev_s, new_s)
-    except Exception:
-        pass
+    from services.command_router import observe_state_transition
+    observe_state_transition(ch.entity_id, ch.prev_state, ch.new_state)
 
+
+def _hook_restore(ch: "state_dispatch.StateChange") -> None:
     # Restore last intentional settings when a device regains power.
     # Trigger: unavailable/unknown → on (physical switch restored / brief outage).
     # A normal software turn-on goes off→on and is excluded.
-    # The set of restore-eligible domains is driven by domain_registry (restore_on_reconnect=True).
-    if new_s == "on" and prev_s in ("unavailable", "unknown"):
-        domain = entity_id.split(".")[0]
-        try:
-            from services.domain_registry import restore_domains as _restore_domains
-            _eligible = _restore_domains()
-        except Exception:
-            _eligible = frozenset({"light", "climate", "fan"})
-        if domain in _eligible:
-            asyncio.create_task(_restore_entity_state(entity_id))
+    if ch.new_state == "on" and ch.prev_state in ("unavailable", "unknown"):
+        asyncio.create_task(_restore_entity_state(ch.entity_id))
+
 
+async def _hook_anomaly(ch: "state_dispatch.StateChange") -> None:
     # Drive anomaly evaluation on every state change (already debounced to
-    # ~250 ms so this no longer blocks the event handler measurably).
-    try:
-        from services.anomaly_engine import evaluate
-        await evaluate(entity_id, state_cache, active_anomalies)
-    except Exception as e:
-        log_error(f"[HASubscriber] anomaly evaluate failed: {e}")
+    # ~250 ms so this no longer blocks the event handler measurably). Wildcard
+    # on purpose — see the section comment above.
+    from services.anomaly_engine import evaluate
+    await evaluate(ch.entity_id, state_cache, active_anomalies)
+
 
+async def _hook_self_heal(ch: "state_dispatch.StateChange") -> None:
     # Self-heal: correlate this change with Ziggy's last intended command and
     # recover devices that repeatedly revert right after a command.
+    from services import self_heal
+    await self_heal.observe(ch.entity_id, ch.old, ch.new)
+
+
+def _install_state_hooks() -> None:
+    """Register the built-in state_changed hooks (idempotent)."""
+    global _hooks_installed
+    if _hooks_installed:
+        return
+    _hooks_installed = True
+
+    from services.manual_overrides import CONTROLLABLE_DOMAINS
+    # The set of restore-eligible domains is driven by domain_registry
+    # (restore_on_reconnect=True).
     try:
-        from services import self_heal
-        await self_heal.observe(entity_id, old_state, new_state)
-    except Exception as e:
-        log_error(f"[HASubscriber] self_heal observe failed: {e}")
+        from services.domain_registry import restore_domains as _restore_domains
+        restore_eligible = _restore_domains()
+    except Exception:
+        restore_eligible = frozenset({"light", "climate", "fan"})
+
+    def _circadian_lights():
+        from services import circadian_engine as _circ
+        return [e for e in _circ.scheduled_lights() if e.startswith("light.")]
+
+    def _climate_sensors():
+        from services import smart_climate_engine as _clim
+        return [e for e in _clim.configured_sensors() if e.startswith("sensor.")]
+
+    def _presence_entities():
+        from services import room_presence_engine as _rp
+        return [e for e in _rp.watched_entities() if e.startswith("binary_sensor.")]
+
+    def _hybrid_entities():
+        # command_router only learns (and is_expected_offline only consults)
+        # wifi_dies_when_off on rows with both an HA entity and an IR link.
+        from services import device_registry as _dr
+        return [d["entity_id"] for d in _dr.get_all()
+                if d.get("entity_id") and d.get("ir_device_id")]
+
+    reg = state_dispatch.register
+    reg("manual_overrides", _hook_manual_override,
+        domains=CONTROLLABLE_DOMAINS, changed_only=True)
+    reg("circadian", _hook_circadian, entities=_circadian_lights)
+    reg("smart_climate", _hook_smart_climate,
+        entities=_climate_sensors, changed_only=True)
+    reg("room_presence", _hook_room_presence,
+        entities=_presence_entities, changed_only=True)
+    reg("automation_fired", _hook_automation_fired, domains={"automation"})
+    reg("command_router", _hook_command_router,
+        entities=_hybrid_entities, changed_only=True)
+    reg("restore", _hook_restore, domains=restore_eligible)
+    reg("anomaly", _hook_anomaly)
+    reg("self_heal", _hook_self_heal, domains=CONTROLLABLE_DOMAINS)
 
 
 async def _run_once() -> None:
     """One connection attempt: connect, auth, subscribe, refresh, process events."""
     global ha_connected, ha_last_reconnect, ha_last_reconnect_wall, _last_healed_url, ha_version
+    global _ws, _ws_loop
     # Resolve creds at connect time so a credential rotation is picked up on
     # the next reconnect without a process restart.
     ws_url = ha_client.ws_url()
@@ -438,6 +570,11 @@ async def _run_once() -> None:
         sub_resp = json.loads(await ws.recv())
         if not sub_resp.get("success"):
             raise RuntimeError(f"HA subscribe failed: {sub_resp}")
+        # Registry events feed device_registry's incremental reconcile. Their
+        # results are read in the main loop below — best-effort, not fatal.
+        for sub_id, event_type in _REGISTRY_SUBSCRIPTIONS.items():
+            await ws.send(json.dumps({"id": sub_id, "type": "subscribe_events",
+                                      "event_type": event_type}))
 
         import time as _time_mod
         log_info("[HASubscriber] Connected and subscribed. Loading state snapshot…")
@@ -479,14 +616,81 @@ async def _run_once() -> None:
         _dbus.emit("ha", VERBOSE, "ha_state_snapshot_loaded",
                    entity_count=len(state_cache))
 
+        # Registry deltas missed while disconnected: one local reconcile pass
+        # against the fresh state_cache (no extra REST call).
+        try:
+            from services import device_registry
+            await loop.run_in_executor(None, device_registry.catch_up)
+        except Exception as e:
+            log_error(f"[HASubscriber] device registry catch-up failed: {e}")
+        try:
+            from services import health_aggregate
+            health_aggregate.invalidate()
+        except Exception as e:
+            log_error(f"[HASubscriber] health aggregate reset failed: {e}")
+
         # Main event loop
-        async for raw in ws:
-            try:
-                msg = json.loads(raw)
-                if msg.get("type") == "event" and msg.get("id") == 1:
-                    await _process_event(msg)
-            except Exception as e:
-                log_error(f"[HASubscriber] Event processing error: {e}")
+        _ws, _ws_loop = ws, asyncio.get_running_loop()
+        try:
+            async for raw in ws:
+                try:
+                    await _dispatch(json.loads(raw))
+                except Exception as e:
+                    log_error(f"[HASubscriber] Event processing error: {e}")
+        finally:
+            _drop_command_channel()
+
+
+async def send_command(cmd: dict, timeout: float = 10.0) -> dict:
+    """Send one command on the live connection and return its result message.
+
+    Must run on the subscriber's loop, outside event dispatch (see
+    _dispatching). Raises ConnectionError when there is no connection,
+    RuntimeError when called from dispatch and asyncio.TimeoutError when HA
+    doesn't answer in time.
+    """
+    global _next_cmd_id
+    if _dispatching.get():
+        raise RuntimeError("send_command() called from HA event dispatch")
+    ws = _ws
+    if ws is None:
+        raise ConnectionError("HA WebSocket not connected")
+    _next_cmd_id += 1
+    cmd_id = _next_cmd_id
+    fut = asyncio.get_running_loop().create_future()
+    _pending_cmds[cmd_id] = fut
+    try:
+        await ws.send(json.dumps({**cmd, "id": cmd_id}))
+        return await asyncio.wait_for(fut, timeout)
+    finally:
+        _pending_cmds.pop(cmd_id, None)
+
+
+async def _dispatch(msg: dict) -> None:
+    """Route one message from the socket: events, registry events, command results."""
+    if msg.get("id") in _pending_cmds:
+        fut = _pending_cmds[msg["id"]]
+        if not fut.done():
+            fut.set_result(msg)
+        return
+    token = _dispatching.set(True)
+    try:
+        if msg.get("type") == "event" and msg.get("id") == 1:
+            await _process_event(msg)
+        elif msg.get("id") in _REGISTRY_SUBSCRIPTIONS:
+            await _process_registry_message(msg)
+    finally:
+        _dispatching.reset(token)
+
+
+def _drop_command_channel() -> None:
+    """Forget the socket and fail every command still waiting on it."""
+    global _ws
+    _ws = None
+    for fut in _pending_cmds.values():
+        if not fut.done():
+            fut.set_exception(ConnectionError("HA WebSocket closed"))
+    _pending_cmds.clear()
 
 
 async def kick_reconnect() -> None:
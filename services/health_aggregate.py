@@ -0,0 +1,441 @@
+"""
+Incrementally maintained device-health aggregate behind GET /api/health.
+
+The endpoint used to rebuild everything on every request: enrich the whole
+device registry, fetch HA's entity registry, run device_groups.build_groups,
+then scan every state_cache row for offline and battery signals — and the
+Dashboard polls it. The aggregate splits that work in two:
+
+  * topology — what an entity *is* for health purposes: its group primary,
+    user-promoted tiles, the Wi-Fi half of IR-merged devices, automation
+    dependencies, the battery threshold and the extra hidden filters. Rebuilt
+    by refresh_topology() when device_registry.generation(), the
+    device_groups HA-registry cache or the IR device file changes, and after
+    TOPOLOGY_TTL_S for the inputs without a change stamp (entity prefs,
+    automation deps, device overrides, settings).
+  * per-entity signals — which visible entities are unavailable/unknown and
+    which report a battery level. on_state() maintains them from
+    ha_subscriber's event stream; a rescan of state_cache seeds them, and
+    again after a reconnect snapshot (invalidate()).
+
+read() derives the legacy /api/health fields from the two. The derivation
+walks the offline and battery entities only and is cached until either side
+changes; on_state() pushes a `health_changed` WS event when the summary moves.
+
+scan() is the from-scratch computation over a full state map; the tests hold
+the aggregate to it after arbitrary event sequences.
+"""
+from __future__ import annotations
+
+import re
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.logger_module import log_error
+from services.entity_filter import _should_hide
+
+OFFLINE_STATES = frozenset({"unavailable", "unknown"})
+BATTERY_THRESHOLD_DEFAULT = 20
+TOPOLOGY_TTL_S = 60.0
+# ≥ this many physical devices offline at once reads as a coordinator problem.
+COORDINATOR_WARNING_MIN = 3
+
+
+@dataclass(frozen=True)
+class Topology:
+    primary_by_eid: dict = field(default_factory=dict)   # eid → its group's primary eid
+    promoted: frozenset = frozenset()                     # siblings promoted to their own tile
+    ir_linked: frozenset = frozenset()                    # Wi-Fi half of an IR-merged device
+    deps: dict = field(default_factory=dict)              # eid → [automation names]
+    battery_threshold: int = BATTERY_THRESHOLD_DEFAULT
+    extra_hidden_domains: frozenset = frozenset()
+    extra_hidden_patterns: tuple = ()                     # compiled re.Pattern
+
+
+_lock = threading.Lock()
+_topology = Topology()
+_topology_stamp: Optional[tuple] = None
+_topology_at = 0.0
+
+# eid → (state, name) for visible entities in OFFLINE_STATES
+_offline: dict[str, tuple[str, str]] = {}
+# eid → (battery, name) for visible entities reporting a battery level
+_battery: dict[str, tuple[int, str]] = {}
+_primaries: frozenset = frozenset()   # set(_topology.primary_by_eid.values())
+_seeded_from: Optional[int] = None     # id() of the state map the signals were seeded from
+_seeded = False
+_snapshot: Optional[dict] = None
+_last_summary: Optional[tuple] = None
+
+_stats = {"events": 0, "signal_changes": 0, "rescans": 0, "topology_builds": 0,
+          "derives": 0, "reads": 0, "pushes": 0}
+
+
+def _states() -> dict:
+    from services.ha_subscriber import state_cache
+    return state_cache
+
+
+# ---------------------------------------------------------------------------
+# Per-entity signals
+# ---------------------------------------------------------------------------
+
+def _name(eid: str, attrs: dict) -> str:
+    return attrs.get("friendly_name") or eid.split(".")[-1].replace("_", " ").title()
+
+
+def _battery_of(state: str, attrs: dict) -> Optional[int]:
+    if attrs.get("device_class") == "battery":
+        try:
+            return int(float(state))
+        except (ValueError, TypeError):
+            return None
+    for key in ("battery_level", "battery", "battery_percent"):
+        if key in attrs:
+            try:
+                return int(attrs[key])
+            except (ValueError, TypeError):
+                pass
+    return None
+
+
+def _apply(eid: str, entry: Optional[dict]) -> bool:
+    """Update the signal maps for one entity. Caller holds _lock. True when the
+    derived aggregate may have changed."""
+    if _should_hide(eid):
+        # Not counted itself, but a hidden group primary still decides (and
+        # names) the offline record its siblings are attributed to.
+        return eid in _primaries
+    old = (_offline.get(eid), _battery.get(eid))
+    _offline.pop(eid, None)
+    _battery.pop(eid, None)
+    if entry is not None:
+        state = entry.get("state", "")
+        attrs = entry.get("attributes", {}) or {}
+        name = _name(eid, attrs)
+        if state in OFFLINE_STATES:
+            _offline[eid] = (state, name)
+        battery = _battery_of(state, attrs)
+        if battery is not None:
+            _battery[eid] = (battery, name)
+    return (_offline.get(eid), _battery.get(eid)) != old
+
+
+def _rescan() -> None:
+    """Seed the signal maps from the full state cache. Caller holds _lock."""
+    global _seeded, _seeded_from, _snapshot
+    _offline.clear()
+    _battery.clear()
+    states = _states()
+    for eid, entry in list(states.items()):
+        _apply(eid, entry)
+    _seeded = True
+    _seeded_from = id(states)
+    _snapshot = None
+    _stats["rescans"] += 1
+
+
+# ---------------------------------------------------------------------------
+# Derivation
+# ---------------------------------------------------------------------------
+
+def _attribute(eid: str, topo: Topology, states: dict) -> Optional[str]:
+    """The device key an offline entity counts under, or None when it doesn't count.
+
+    A device is offline only when its group PRIMARY (the controllable the
+    Devices card is keyed on) is offline. A config/diagnostic sibling that
+    merely sits at 'unknown' — e.g. a Z2M `auto_close_when_water_shortage`
+    switch that was never set — doesn't make the device offline, and the
+    Devices grid collapses such siblings into the (online) primary. A
+    sibling the user promoted to its own tile stands on its own card, so it
+    counts under its own id.
+    """
+    primary = topo.primary_by_eid.get(eid, eid)
+    promoted = eid in topo.promoted
+    if primary != eid and not promoted:
+        if (states.get(primary) or {}).get("state") not in OFFLINE_STATES:
+            return None   # primary is online → the device is fine
+    return eid if (primary == eid or promoted) else primary
+
+
+def _extra_hidden(key: str, topo: Topology) -> bool:
+    # The Devices page's user-configured filters (filter_entities); the banner
+    # must not claim devices the user can't see there.
+    if not (topo.extra_hidden_domains or topo.extra_hidden_patterns):
+        return False
+    return (_should_hide(key) or key.split(".")[0] in topo.extra_hidden_domains
+            or any(p.search(key) for p in topo.extra_hidden_patterns))
+
+
+def _result(offline_keys: list[tuple[str, str, str]], batteries: list[tuple[str, int, str]],
+            topo: Topology, states: dict) -> dict:
+    """Build the aggregate from (key, contributing eid, fallback state) and
+    (eid, battery, name) lists, both in entity_id order."""
+    offline_all: list[dict] = []
+    offline_with_deps: list[dict] = []
+    for key, eid, fallback_state in offline_keys:
+        if _extra_hidden(key, topo):
+            continue
+        k_entry = states.get(key) or {}
+        auto_names = topo.deps.get(key) or topo.deps.get(eid) or []
+        record = {
+            "entity_id":       key,
+            "name":            _name(key, k_entry.get("attributes", {}) or {}),
+            "ha_state":        k_entry.get("state") or fallback_state,
+            "automation_deps": auto_names,
+        }
+        offline_all.append(record)
+        if auto_names:
+            offline_with_deps.append(record)
+    battery_warnings = sorted(
+        ({"entity_id": eid, "name": name, "battery": b}
+         for eid, b, name in batteries if 0 <= b < topo.battery_threshold),
+        key=lambda x: x["battery"],
+    )
+    return {
+        "offline_devices":     offline_all,
+        "offline_with_deps":   offline_with_deps,
+        "battery_warnings":    battery_warnings,
+        "coordinator_warning": len(offline_all) >= COORDINATOR_WARNING_MIN,
+        # Entities in device groups — the share denominator for ha_health.
+        "total_devices":       len(topo.primary_by_eid),
+    }
+
+
+def scan(states: dict, topo: Topology) -> dict:
+    """From-scratch aggregate over a full entity_id → state-entry map."""
+    offline_keys: list[tuple[str, str, str]] = []
+    seen: set[str] = set()
+    batteries: list[tuple[str, int, str]] = []
+    for eid in sorted(states):
+        if _should_hide(eid) or eid in topo.ir_linked:
+            continue
+        entry = states[eid]
+        state = entry.get("state", "")
+        attrs = entry.get("attributes", {}) or {}
+        if state in OFFLINE_STATES:
+            key = _attribute(eid, topo, states)
+            if key is not None and key not in seen:
+                seen.add(key)
+                offline_keys.append((key, eid, state))
+        battery = _battery_of(state, attrs)
+        if battery is not None:
+            batteries.append((eid, battery, _name(eid, attrs)))
+    return _result(offline_keys, batteries, topo, states)
+
+
+def _derive(topo: Topology, states: dict) -> dict:
+    """The aggregate from the maintained signal maps. Caller holds _lock."""
+    offline_keys: list[tuple[str, str, str]] = []
+    seen: set[str] = set()
+    for eid in sorted(_offline):
+        if eid in topo.ir_linked:
+            continue
+        key = _attribute(eid, topo, states)
+        if key is not None and key not in seen:
+            seen.add(key)
+            offline_keys.append((key, eid, _offline[eid][0]))
+    batteries = [(eid, b, name) for eid, (b, name) in sorted(_battery.items())
+                 if eid not in topo.ir_linked]
+    _stats["derives"] += 1
+    return _result(offline_keys, batteries, topo, states)
+
+
+# ---------------------------------------------------------------------------
+# Topology
+# ---------------------------------------------------------------------------
+
+def _topology_version() -> tuple:
+    try:
+        import services.device_registry as dr
+        registry_gen = dr.generation()
+    except Exception:
+        registry_gen = 0
+    try:
+        from services import device_groups
+        groups_entry = device_groups.cache_version()
+    except Exception:
+        groups_entry = None
+    try:
+        from services.ir_manager import devices_version
+        ir_version = devices_version()
+    except Exception:
+        ir_version = None
+    return (registry_gen, groups_entry, ir_version)
+
+
+async def _build_topology() -> Topology:
+    from core.settings_loader import settings
+
+    # Group collapse: count physical devices, not entities. A Switcher boiler
+    # exposes 4 entities (switch + 3 sensors); all four unavailable is ONE
+    # offline device on the Devices page card. Same grouping the FE renders.
+    primary_by_eid: dict[str, str] = {}
+    try:
+        from services.device_groups import build_groups, get_cached_registry_async
+        import services.device_registry as _dr
+        if not _dr._initialized:
+            _dr.init()
+        from backend.routers.device_router import _enrich_devices_with_ha_state
+        enriched = _enrich_devices_with_ha_state(_dr.get_all())
+        registry = await get_cached_registry_async()
+        for g in build_groups(enriched, registry):
+            primary = g.get("primary_entity_id")
+            if not primary:
+                continue
+            for ge in (g.get("entities") or []):
+                if ge.get("entity_id"):
+                    primary_by_eid[ge["entity_id"]] = primary
+    except Exception:
+        pass
+
+    promoted: set[str] = set()
+    try:
+        from services import entity_prefs
+        promoted = {k for k, v in (entity_prefs.get_all() or {}).items()
+                    if isinstance(v, dict) and v.get("is_tile")}
+    except Exception:
+        pass
+
+    # When the Wi-Fi half of an IR+Wi-Fi merged device (a TV / AC with a
+    # linked IR remote) goes 'unavailable' the device is merely OFF and still
+    # IR-controllable — the Devices grid hides it from the disconnected filter.
+    ir_linked: set[str] = set()
+    try:
+        from services.ir_manager import list_ir_devices
+        ir_linked = {(d.get("ha_entity_id") or "").strip()
+                     for d in list_ir_devices(enabled_only=False)
+                     if (d.get("ha_entity_id") or "").strip()}
+    except Exception:
+        pass
+
+    try:
+        from services.anomaly_engine import get_automation_deps
+        deps = dict(get_automation_deps())
+    except Exception:
+        deps = {}
+
+    try:
+        threshold = int(settings.get("anomaly_engine", {}).get(
+            "anom08_battery_threshold", BATTERY_THRESHOLD_DEFAULT))
+    except Exception:
+        threshold = BATTERY_THRESHOLD_DEFAULT
+    ef = settings.get("entity_filter", {}) or {}
+    patterns = []
+    for p in ef.get("extra_hidden_patterns") or []:
+        try:
+            patterns.append(re.compile(p))
+        except re.error as e:
+            log_error(f"[HealthAggregate] bad extra_hidden_pattern {p!r}: {e}")
+
+    return Topology(
+        primary_by_eid=primary_by_eid,
+        promoted=frozenset(promoted),
+        ir_linked=frozenset(ir_linked),
+        deps=deps,
+        battery_threshold=threshold,
+        extra_hidden_domains=frozenset(ef.get("extra_hidden_domains") or []),
+        extra_hidden_patterns=tuple(patterns),
+    )
+
+
+async def refresh_topology(force: bool = False) -> bool:
+    """Rebuild the topology when an input changed or it aged out. True when rebuilt."""
+    global _topology, _topology_stamp, _topology_at, _primaries, _snapshot
+    stamp = _topology_version()
+    if (not force and stamp == _topology_stamp
+            and time.monotonic() - _topology_at < TOPOLOGY_TTL_S):
+        return False
+    topo = await _build_topology()
+    with _lock:
+        _topology = topo
+        _primaries = frozenset(topo.primary_by_eid.values())
+        # Re-stamp after the build: building may itself have filled the
+        # device_groups cache, which is part of the stamp.
+        _topology_stamp = _topology_version()
+        _topology_at = time.monotonic()
+        _snapshot = None
+    _stats["topology_builds"] += 1
+    return True
+
+
+# ---------------------------------------------------------------------------
+# Public API
+# ---------------------------------------------------------------------------
+
+def _current() -> dict:
+    """Cached aggregate, rebuilt when stale. Caller holds _lock."""
+    global _snapshot
+    if not _seeded or _seeded_from != id(_states()):
+        _rescan()
+    if _snapshot is None:
+        _snapshot = _derive(_topology, _states())
+    return _snapshot
+
+
+async def read() -> dict:
+    """The current aggregate (offline_devices, offline_with_deps,
+    battery_warnings, coordinator_warning, total_devices). Full lists —
+    callers truncate."""
+    await refresh_topology()
+    with _lock:
+        _stats["reads"] += 1
+        return _current()
+
+
+def _summary(agg: dict) -> tuple:
+    return (tuple(r["entity_id"] for r in agg["offline_devices"]),
+            tuple(r["entity_id"] for r in agg["battery_warnings"]),
+            agg["coordinator_warning"])
+
+
+async def _push(agg: dict) -> None:
+    from backend.ws_manager import manager
+    await manager.broadcast({
+        "type":                "health_changed",
+        "offline_count":       len(agg["offline_devices"]),
+        "battery_warnings":    len(agg["battery_warnings"]),
+        "coordinator_warning": agg["coordinator_warning"],
+    })
+
+
+async def on_state(entity_id: str, new_state: Optional[dict]) -> None:
+    """Fold one HA state_changed event (new_state None = removed) into the
+    aggregate; push `health_changed` when the offline / battery summary moved."""
+    global _snapshot, _last_summary
+    _stats["events"] += 1
+    with _lock:
+        if not _seeded:
+            return   # nothing to maintain until the first read seeds the maps
+        if not _apply(entity_id, new_state):
+            return
+        _stats["signal_changes"] += 1
+        _snapshot = None
+        agg = _current()
+        summary = _summary(agg)
+        if summary == _last_summary:
+            return
+        _last_summary = summary
+    _stats["pushes"] += 1
+    try:
+        await _push(agg)
+    except Exception as e:
+        log_error(f"[HealthAggregate] health_changed broadcast failed: {e}")
+
+
+def invalidate() -> None:
+    """Drop the signal maps; the next read rescans state_cache. Call after
+    state_cache was reloaded wholesale (reconnect snapshot)."""
+    global _seeded, _snapshot
+    with _lock:
+        _seeded = False
+        _snapshot = None
+
+
+def stats() -> dict:
+    with _lock:
+        return {**_stats, "seeded": _seeded, "offline_entities": len(_offline),
+                "battery_entities": len(_battery),
+                "topology_age_s": round(time.monotonic() - _topology_at, 1) if _topology_at else None}
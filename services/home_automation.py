@@ -145,52 +145,84 @@ def call_service(domain: str, service: str, data: Dict[str, Any],
                 payload = resp.json()
             except Exception:
                 payload = None
-            _eid = (data or {}).get("entity_id")
-            if isinstance(_eid, str):
-                _record_intent(_eid, _intended_state_for(service, _eid), origin)
-            log_info(f"[HA] {domain}.{service} OK | data={data}")
-            bus.emit("ha", BASIC, "ha_service_ok",
-                     domain=domain, service=service, duration_ms=duration_ms,
-                     result="ok")
-            return {"ok": True, "message": "service call ok", "data": payload}
-        log_error(f"[HA] {domain}.{service} failed: {resp.status_code} - {resp.text}")
-        bus.emit("ha", BASIC, "ha_service_error",
-                 domain=domain, service=service, duration_ms=duration_ms,
-                 status_code=resp.status_code, body=resp.text[:200],
-                 result="error",
-                 suggestion=f"Check HA logs for {domain}.{service} errors.")
-        return {"ok": False, "message": f"HA {domain}.{service} error {resp.status_code}: {resp.text}"}
+            return _service_ok(domain, service, data, origin, payload, duration_ms)
+        return _service_http_error(domain, service, resp.status_code, resp.text, duration_ms)
     except requests.exceptions.ReadTimeout:
-        # HA blocks the REST until the device handler returns. Hitting our
-        # timeout almost always means the physical device didn't ack — it's
-        # offline, on a flaky link, or its integration is misbehaving. HA
-        # itself is fine (state reads still work).
-        duration_ms = round((_time.perf_counter() - t0) * 1000, 1)
-        entity = (data or {}).get("entity_id", "")
-        log_error(f"[HA] Device timeout on {domain}.{service} (entity={entity}) after {duration_ms}ms")
-        bus.emit("ha", BASIC, "ha_service_timeout",
-                 domain=domain, service=service, duration_ms=duration_ms,
-                 entity_id=entity, result="timeout",
-                 suggestion="Device did not respond. Check power, WiFi/Zigbee link, or the integration.")
-        label = entity.split(".", 1)[1].replace("_", " ") if entity else f"{domain}.{service}"
-        return {"ok": False, "message": f"{label} did not respond — check it's powered and online"}
+        return _service_timeout(domain, service, data, round((_time.perf_counter() - t0) * 1000, 1))
     except requests.exceptions.ConnectionError as e:
-        duration_ms = round((_time.perf_counter() - t0) * 1000, 1)
-        log_error(f"[HA] Connection error to HA on {domain}.{service}: {e}")
-        bus.emit("ha", BASIC, "ha_service_connection_error",
-                 domain=domain, service=service, duration_ms=duration_ms,
-                 error=str(e), result="connection_error",
-                 suggestion="Home Assistant is unreachable. Check the HA URL and that HA is running.")
-        return {"ok": False, "message": "Home Assistant is unreachable"}
+        return _service_unreachable(domain, service, e, round((_time.perf_counter() - t0) * 1000, 1))
     except Exception as e:
-        duration_ms = round((_time.perf_counter() - t0) * 1000, 1)
-        log_error(f"[HA] Exception in call_service({domain}.{service}): {e}")
-        bus.emit("ha", BASIC, "ha_service_exception",
-                 domain=domain, service=service, duration_ms=duration_ms,
-                 error=str(e), error_type=type(e).__name__,
-                 result="exception",
-                 suggestion="Check HA connectivity and token validity.")
-        return {"ok": False, "message": f"HA service exception: {e}"}
+        return _service_exception(domain, service, e, round((_time.perf_counter() - t0) * 1000, 1))
+
+
+# Outcome handling shared with ha_client.call_service_async — same ledger
+# intent, logs, bus events and result dicts whichever transport made the call.
+
+def _service_ok(domain: str, service: str, data: Dict[str, Any], origin: str,
+                payload: Any, duration_ms: float) -> Dict[str, Any]:
+    _eid = (data or {}).get("entity_id")
+    for _e in ([_eid] if isinstance(_eid, str) else _eid or []):
+        _record_intent(_e, _intended_state_for(service, _e), origin)
+    log_info(f"[HA] {domain}.{service} OK | data={data}")
+    bus.emit("ha", BASIC, "ha_service_ok",
+             domain=domain, service=service, duration_ms=duration_ms,
+             result="ok")
+    return {"ok": True, "message": "service call ok", "data": payload}
+
+
+def _service_http_error(domain: str, service: str, status_code: int, text: str,
+                        duration_ms: float) -> Dict[str, Any]:
+    log_error(f"[HA] {domain}.{service} failed: {status_code} - {text}")
+    bus.emit("ha", BASIC, "ha_service_error",
+             domain=domain, service=service, duration_ms=duration_ms,
+             status_code=status_code, body=text[:200],
+             result="error",
+             suggestion=f"Check HA logs for {domain}.{service} errors.")
+    return {"ok": False, "message": f"HA {domain}.{service} error {status_code}: {text}"}
+
+
+def _service_timeout(domain: str, service: str, data: Dict[str, Any],
+                     duration_ms: float) -> Dict[str, Any]:
+    # HA blocks the REST until the device handler returns. Hitting our
+    # timeout almost always means the physical device didn't ack — it's
+    # offline, on a flaky link, or its integration is misbehaving. HA
+    # itself is fine (state reads still work).
+    entity = (data or {}).get("entity_id", "")
+    entities = [entity] if isinstance(entity, str) else list(entity or [])
+    entity = ", ".join(entities)
+    if len(entities) > 1:
+        label = f"{len(entities)} devices"   # a batched call
+    elif entity and "." in entity:
+        label = entity.split(".", 1)[1].replace("_", " ")
+    else:
+        label = f"{domain}.{service}"
+    log_error(f"[HA] Device timeout on {domain}.{service} (entity={entity}) after {duration_ms}ms")
+    bus.emit("ha", BASIC, "ha_service_timeout",
+             domain=domain, service=service, duration_ms=duration_ms,
+             entity_id=entity, result="timeout",
+             suggestion="Device did not respond. Check power, WiFi/Zigbee link, or the integration.")
+    return {"ok": False, "message": f"{label} did not respond — check it's powered and online"}
+
+
+def _service_unreachable(domain: str, service: str, e: Exception,
+                         duration_ms: float) -> Dict[str, Any]:
+    log_error(f"[HA] Connection error to HA on {domain}.{service}: {e}")
+    bus.emit("ha", BASIC, "ha_service_connection_error",
+             domain=domain, service=service, duration_ms=duration_ms,
+             error=str(e), result="connection_error",
+             suggestion="Home Assistant is unreachable. Check the HA URL and that HA is running.")
+    return {"ok": False, "message": "Home Assistant is unreachable"}
+
+
+def _service_exception(domain: str, service: str, e: Exception,
+                       duration_ms: float) -> Dict[str, Any]:
+    log_error(f"[HA] Exception in call_service({domain}.{service}): {e}")
+    bus.emit("ha", BASIC, "ha_service_exception",
+             domain=domain, service=service, duration_ms=duration_ms,
+             error=str(e), error_type=type(e).__name__,
+             result="exception",
+             suggestion="Check HA connectivity and token validity.")
+    return {"ok": False, "message": f"HA service exception: {e}"}
 
 
 _missing_entities: set[str] = set()  # suppress repeated 404 log noise
@@ -357,8 +389,10 @@ def toggle_all_lights_in_room(room: str, turn_on: bool) -> Dict[str, Any]:
     """Turn on or off all lights mapped under a room in device_map.
 
     HA accepts a list of entity_ids in a single service call; one round-trip
-    here used to be N round-trips, ~150 ms each.
+    here used to be N round-trips, ~150 ms each. Sent through service_batch
+    so it rides the subscriber's WebSocket and records per-light intent.
     """
+    from services.service_batch import ServiceCall, execute
     entities = get_all_light_entities_in_room(room)
     if not entities:
         return {
@@ -367,7 +401,7 @@ def toggle_all_lights_in_room(room: str, turn_on: bool) -> Dict[str, Any]:
                        f"Add light entries under device_map.{room} in settings.yaml.",
         }
     service = "turn_on" if turn_on else "turn_off"
-    result = call_service("light", service, {"entity_id": entities})
+    result = execute([ServiceCall("light", service, e) for e in entities])
 
     verb = "Turned on" if turn_on else "Turned off"
     if not result.get("ok"):
@@ -389,7 +423,8 @@ def turn_off_all_lights() -> Dict[str, Any]:
     if not light_ids:
         return {"ok": True, "message": "All lights are already off."}
     # One HA call with the full entity list instead of N sequential calls.
-    result = call_service("light", "turn_off", {"entity_id": light_ids})
+    from services.service_batch import ServiceCall, execute
+    result = execute([ServiceCall("light", "turn_off", e) for e in light_ids])
     if not result.get("ok"):
         return {"ok": False, "message": f"Failed to turn off lights: {result.get('message')}"}
     return {"ok": True, "message": f"All lights turned off ({len(light_ids)} light{'s' if len(light_ids) != 1 else ''})."}
@@ -420,18 +455,16 @@ def turn_off_everything() -> Dict[str, Any]:
 
     turned_off = 0
     errors: List[str] = []
-    if light_ids:
-        r = call_service("light", "turn_off", {"entity_id": light_ids})
-        if r.get("ok"):
-            turned_off += len(light_ids)
-        else:
-            errors.append(f"lights: {r.get('message')}")
-    if media_ids:
-        r = call_service("media_player", "turn_off", {"entity_id": media_ids})
-        if r.get("ok"):
-            turned_off += len(media_ids)
-        else:
-            errors.append(f"media: {r.get('message')}")
+    if light_ids or media_ids:
+        # Lights and media players go out as two concurrent multi-entity calls.
+        from services.service_batch import ServiceCall, execute
+        r = execute([ServiceCall("light", "turn_off", e) for e in light_ids]
+                    + [ServiceCall("media_player", "turn_off", e) for e in media_ids])
+        for label, ids in (("lights", light_ids), ("media", media_ids)):
+            failed = [r["results"][e]["message"] for e in ids if not r["results"][e]["ok"]]
+            turned_off += len(ids) - len(failed)
+            if failed:
+                errors.append(f"{label}: {failed[0]}")
 
     if errors:
         return {"ok": turned_off > 0, "message": f"Turned off {turned_off} devices. Some errors: {errors}"}
@@ -0,0 +1,133 @@
+"""
+In-memory index of every learned IR code, for the listener's RX matcher.
+
+ir_listener._find_code_match used to re-walk list_ir_devices() and re-decode
+every stored base64 code (parse / fingerprint / protocol decode) on every
+frame the receiver captured — four linear passes, O(devices × codes × decode)
+per physical remote press. This module does that decode work ONCE per change
+of ir_devices.json and keeps:
+
+  • exact      base64 string           → (device_id, command)
+  • fingerprint fingerprint_pulses key → (device_id, command)
+  • protocol   (family, payload_hex)   → (device_id, command)
+  • fuzzy      pre-parsed short pulse trains in one FuzzyPulseMatcher
+               (length-bucketed padded matrix, scored in one vector pass)
+
+First-seen wins on key collisions so the exact / fingerprint / protocol
+passes give the same answer as the old device-order / command-order scan.
+The fuzzy pass returns the CLOSEST accepted train (ties → scan order)
+rather than the first one that happened to be within tolerance.
+
+Invalidation: ir_manager calls invalidate() from the mutators that can change
+which codes exist or which devices are enabled (create / update / delete /
+mark_command_learned). State-only writes (assumed_state, ac_memory — fired on
+every matched press) deliberately do NOT invalidate, so a press never pays
+for a rebuild.
+"""
+from __future__ import annotations
+
+import base64
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+from core.logger_module import log_error, log_info
+from services.ir_protocol import (
+    FuzzyPulseMatcher, decode_protocol, fingerprint_pulses, parse_broadlink_raw,
+)
+
+# Frames longer than this are "stateful protocol" (AC class) and never enter
+# the fuzzy table — see ir_listener._FUZZY_MAX_FRAME_PULSES for the rationale.
+FUZZY_MAX_FRAME_PULSES = 100
+
+
+@dataclass
+class IrCodeIndex:
+    """Precomputed lookup tables. Values are (device_id, logical_command)."""
+    exact: dict[str, tuple[str, str]] = field(default_factory=dict)
+    fingerprint: dict[str, tuple[str, str]] = field(default_factory=dict)
+    protocol: dict[tuple[str, str], tuple[str, str]] = field(default_factory=dict)
+    # Short stored trains; FuzzyPulseMatcher keys are (device_id, command).
+    fuzzy: FuzzyPulseMatcher = field(default_factory=lambda: FuzzyPulseMatcher([]))
+    device_summary: str = "none"
+    total_codes: int = 0
+    device_count: int = 0
+
+
+_lock = threading.Lock()
+_generation = 0
+_built: Optional[tuple[int, IrCodeIndex]] = None
+
+
+def invalidate() -> None:
+    """Mark the index stale — next get_index() rebuilds from ir_devices.json."""
+    global _generation
+    with _lock:
+        _generation += 1
+
+
+def generation() -> int:
+    return _generation
+
+
+def build_index(devices: list[dict]) -> IrCodeIndex:
+    """Decode every stored code of `devices` once into an IrCodeIndex."""
+    idx = IrCodeIndex()
+    fuzzy_trains: list[list[int]] = []
+    fuzzy_keys: list[tuple[str, str]] = []
+    for device in devices:
+        device_id = device.get("id")
+        ir_codes: dict = device.get("ir_codes") or {}
+        idx.total_codes += len(ir_codes)
+        for logical_cmd, stored_b64 in ir_codes.items():
+            hit = (device_id, logical_cmd)
+            if not isinstance(stored_b64, str):
+                continue
+            idx.exact.setdefault(stored_b64, hit)
+            try:
+                pulses = parse_broadlink_raw(base64.b64decode(stored_b64))
+            except Exception:
+                continue
+            if not pulses:
+                continue
+            fp = fingerprint_pulses(pulses)
+            if fp:
+                idx.fingerprint.setdefault(fp, hit)
+            decoded = decode_protocol(pulses)
+            if decoded is not None:
+                idx.protocol.setdefault((decoded.family, decoded.payload_hex), hit)
+            if len(pulses) <= FUZZY_MAX_FRAME_PULSES:
+                fuzzy_trains.append(pulses)
+                fuzzy_keys.append(hit)
+    idx.fuzzy = FuzzyPulseMatcher(fuzzy_trains, fuzzy_keys)
+    idx.device_count = len(devices)
+    idx.device_summary = ", ".join(
+        f"{d.get('name','?')}({len(d.get('ir_codes') or {})} codes)"
+        for d in devices
+    ) or "none"
+    return idx
+
+
+def get_index() -> IrCodeIndex:
+    """Return the current index, rebuilding it if invalidate() ran since."""
+    global _built
+    gen = _generation
+    built = _built
+    if built is not None and built[0] == gen:
+        return built[1]
+    try:
+        from services.ir_manager import list_ir_devices
+        idx = build_index(list_ir_devices(enabled_only=True))
+    except Exception as e:
+        log_error(f"[IRIndex] Build failed: {e}")
+        return IrCodeIndex()
+    with _lock:
+        # A concurrent invalidate() during the build leaves gen stale — store
+        # it anyway; the next call sees the newer generation and rebuilds.
+        _built = (gen, idx)
+    log_info(
+        f"[IRIndex] Built gen={gen}: {idx.total_codes} codes across "
+        f"{idx.device_count} device(s), {len(idx.fingerprint)} fingerprints, "
+        f"{len(idx.protocol)} protocol keys, {len(idx.fuzzy)} fuzzy trains"
+    )
+    return idx
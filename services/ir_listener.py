@@ -30,6 +30,7 @@ import time
 from typing import Callable, Optional
 
 from core.logger_module import log_info, log_error
+from services.ir_code_index import FUZZY_MAX_FRAME_PULSES
 
 
 def _lan_scan_base() -> Optional[str]:
@@ -482,12 +483,15 @@ def _all_ir_devices_by_host() -> dict[str, list[dict]]:
 # (e.g. pressing power/off on a Tadiran remote matching a previously-learned
 # mode_cool button because both share the same Gree leader + first 19 header
 # bits). Long frames must go through protocol decode + AC state inference.
-_FUZZY_MAX_FRAME_PULSES = 100
+# Single-sourced from the code index, which applies the same cut when it
+# builds its fuzzy table.
+_FUZZY_MAX_FRAME_PULSES = FUZZY_MAX_FRAME_PULSES
 
 
 def _find_code_match(received_bytes: bytes) -> Optional[tuple[str, str, str]]:
     """
-    Scan all ir_devices.json entries for a code matching received_bytes.
+    Look up received_bytes against every learned code in ir_devices.json
+    (via the precompiled services.ir_code_index).
 
     Match strategy, in order:
       1. Exact base64 match — fastest path, hits if Broadlink captures are
@@ -504,16 +508,13 @@ def _find_code_match(received_bytes: bytes) -> Optional[tuple[str, str, str]]:
     `match_method` is one of "exact" | "fingerprint" | "protocol" | "fuzzy".
     """
     try:
-        from services.ir_manager import list_ir_devices
+        from services.ir_code_index import get_index
         from services.ir_protocol import (
-            fingerprint_bytes, fingerprint_b64,
-            parse_broadlink_raw, fuzzy_match_pulses,
-            decode_protocol_bytes, decode_protocol_b64,
+            fingerprint_pulses, parse_broadlink_raw, decode_protocol,
         )
 
         received_b64 = base64.b64encode(received_bytes).decode()
-        devices = list_ir_devices(enabled_only=True)
-        total_codes = sum(len(d.get("ir_codes") or {}) for d in devices)
+        recv_pulses = parse_broadlink_raw(received_bytes)
 
         # Stateful-AC guard (2026-07-27 real-hardware finding): full-state AC
         # frames carry the complete settings snapshot, and any two button
@@ -524,66 +525,48 @@ def _find_code_match(received_bytes: bytes) -> Optional[tuple[str, str, str]]:
         # equality therefore CANNOT identify which button was pressed on
         # these remotes — skip command attribution entirely and let the
         # AC-state inference path apply the truth the frame actually carries.
-        _early_decode = decode_protocol_bytes(received_bytes)
-        if _early_decode is not None and _early_decode.ac_state is not None:
+        recv_decode = decode_protocol(recv_pulses)
+        if recv_decode is not None and recv_decode.ac_state is not None:
             return None
 
+        # Every stored code was parsed/fingerprinted/decoded once when the
+        # index was built — each pass below is a dict lookup, not a re-decode
+        # of every learned button.
+        index = get_index()
+
         # Pass 1: exact bytes
-        for device in devices:
-            ir_codes: dict = device.get("ir_codes") or {}
-            for logical_cmd, stored_b64 in ir_codes.items():
-                if stored_b64 == received_b64:
-                    return device["id"], logical_cmd, "exact"
+        hit = index.exact.get(received_b64)
+        if hit is not None:
+            return hit[0], hit[1], "exact"
 
         # Pass 2: fingerprint
-        recv_fp = fingerprint_bytes(received_bytes)
+        recv_fp = fingerprint_pulses(recv_pulses) if recv_pulses else None
         if recv_fp:
-            for device in devices:
-                ir_codes = device.get("ir_codes") or {}
-                for logical_cmd, stored_b64 in ir_codes.items():
-                    if fingerprint_b64(stored_b64) == recv_fp:
-                        return device["id"], logical_cmd, "fingerprint"
+            hit = index.fingerprint.get(recv_fp)
+            if hit is not None:
+                return hit[0], hit[1], "fingerprint"
 
         # Pass 3: protocol-decode payload equivalence — canonical "what was
         # pressed". Runs BEFORE fuzzy because protocol equality is exact at
         # the semantic layer; fuzzy can false-positive across different
         # buttons of the same stateful remote.
-        recv_decode = decode_protocol_bytes(received_bytes)
         if recv_decode:
-            for device in devices:
-                ir_codes = device.get("ir_codes") or {}
-                for logical_cmd, stored_b64 in ir_codes.items():
-                    stored_decode = decode_protocol_b64(stored_b64)
-                    if (stored_decode is not None
-                            and stored_decode.family == recv_decode.family
-                            and stored_decode.payload_hex == recv_decode.payload_hex):
-                        return device["id"], logical_cmd, "protocol"
-
-        # Pass 4: fuzzy pulse comparison — SHORT frames only.
-        recv_pulses = parse_broadlink_raw(received_bytes)
+            hit = index.protocol.get((recv_decode.family, recv_decode.payload_hex))
+            if hit is not None:
+                return hit[0], hit[1], "protocol"
+
+        # Pass 4: fuzzy pulse comparison — SHORT frames only. The index only
+        # holds short stored trains; the batched matcher scores the frame
+        # against every length-compatible one at once and picks the closest.
         if recv_pulses and len(recv_pulses) <= _FUZZY_MAX_FRAME_PULSES:
-            for device in devices:
-                ir_codes = device.get("ir_codes") or {}
-                for logical_cmd, stored_b64 in ir_codes.items():
-                    try:
-                        stored_pulses = parse_broadlink_raw(
-                            base64.b64decode(stored_b64)
-                        )
-                    except Exception:
-                        continue
-                    # Both sides must be short for fuzzy to apply.
-                    if len(stored_pulses) > _FUZZY_MAX_FRAME_PULSES:
-                        continue
-                    if fuzzy_match_pulses(recv_pulses, stored_pulses):
-                        return device["id"], logical_cmd, "fuzzy"
+            best = index.fuzzy.best(recv_pulses)
+            if best is not None:
+                (device_id, logical_cmd), _distance = best
+                return device_id, logical_cmd, "fuzzy"
 
         # No match — diagnostics for the user. Includes the leader pulse
         # timings + magnitude class so the protocol family can be identified
         # from the log even when no decoder catches it (e.g. unknown AC).
-        device_summary = ", ".join(
-            f"{d.get('name','?')}({len(d.get('ir_codes') or {})} codes)"
-            for d in devices
-        ) or "none"
         proto_info = (
             f"{recv_decode.family}/{recv_decode.payload_bits}b"
             if recv_decode else "no_protocol"
@@ -601,8 +584,8 @@ def _find_code_match(received_bytes: bytes) -> Optional[tuple[str, str, str]]:
         log_info(
             f"[IRListener] No match (fp={recv_fp} proto={proto_info} "
             f"pulses={len(recv_pulses) if recv_pulses else 0}){leader_info}: "
-            f"{total_codes} stored codes across {len(devices)} device(s): "
-            f"{device_summary}"
+            f"{index.total_codes} stored codes across {index.device_count} "
+            f"device(s): {index.device_summary}"
         )
         return None
     except Exception as e:
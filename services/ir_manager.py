@@ -24,6 +24,7 @@ from typing import Optional
 
 from core.logger_module import log_info, log_error
 from core.debug_bus import bus as _debug_bus, BASIC, VERBOSE
+from services import ir_code_index as _ir_code_index
 from services.home_automation import call_service, get_all_states, get_state
 from services.device_state_compat import (
     ac_state_to_dict,
@@ -61,6 +62,16 @@ def _load() -> list[dict]:
     return devices
 
 
+def devices_version() -> tuple:
+    """Cheap change stamp for the IR device file (path, mtime, size) — lets
+    callers cache things derived from _load() without re-reading it."""
+    try:
+        st = os.stat(IR_DEVICES_FILE)
+    except OSError:
+        return (IR_DEVICES_FILE, None)
+    return (IR_DEVICES_FILE, st.st_mtime_ns, st.st_size)
+
+
 def _save(devices: list[dict]) -> None:
     os.makedirs(os.path.dirname(IR_DEVICES_FILE), exist_ok=True)
     with open(IR_DEVICES_FILE, "w", encoding="utf-8") as f:
@@ -231,6 +242,7 @@ def create_ir_device(
     devices = _load()
     devices.append(device)
     _save(devices)
+    _ir_code_index.invalidate()
     log_info(f"[IR] Created device: {device['name']} ({device['id']})")
     return device
 
@@ -264,6 +276,7 @@ def update_ir_device(device_id: str, updates: dict) -> Optional[dict]:
                 if k in _allowed:
                     devices[i][k] = v
             _save(devices)
+            _ir_code_index.invalidate()
             return devices[i]
     return None
 
@@ -274,6 +287,7 @@ def delete_ir_device(device_id: str) -> bool:
     if len(updated) == len(devices):
         return False
     _save(updated)
+    _ir_code_index.invalidate()
     log_info(f"[IR] Deleted device: {device_id}")
     return True
 
@@ -444,6 +458,7 @@ def remove_custom_command(device_id: str, command_id: str) -> Optional[dict]:
         ir_codes.pop(command_id, None)
         d["ir_codes"] = ir_codes
         _save(devices)
+        _ir_code_index.invalidate()
         log_info(f"[IR] Removed custom command '{command_id}' from {d.get('name')}")
         return d
     return None
@@ -511,6 +526,8 @@ def mark_command_learned(device_id: str, command_name: str, raw_code_b64: Option
                     caps["supports_feedback"] = True
                 d["ir_capabilities"] = caps
             _save(devices)
+            if raw_code_b64:
+                _ir_code_index.invalidate()
             return True
     return False
 
@@ -16,9 +16,17 @@ Daikin, Mitsubishi, LG, Panasonic) and AC state decoding.
 from __future__ import annotations
 
 import base64
+import bisect
 import hashlib
 from dataclasses import dataclass, field
-from typing import Iterable, Optional
+from typing import Any, Iterable, Optional, Sequence
+
+# NumPy backs the batched fuzzy matcher only. Import-safe without it — the
+# batch matcher then degrades to looping the scalar fuzzy_match_pulses.
+try:
+    import numpy as _np  # type: ignore
+except Exception:
+    _np = None  # type: ignore
 
 # Broadlink RM family encodes each pulse duration as an integer count of
 # ~32.84µs ticks. (Precise value: 269.83 / 8192 ms ≈ 32.94 µs; the community
@@ -269,6 +277,185 @@ def fuzzy_match_b64(a_b64: str, b_b64: str, **kwargs) -> bool:
     return fuzzy_match_bytes(a, b, **kwargs)
 
 
+def fuzzy_pulse_distance(a: list[int], b: list[int], *, max_pulses: int = 40) -> float:
+    """
+    Mean per-pulse relative deviation over the window fuzzy_match_pulses
+    compares. Only meaningful for pairs that fuzzy-match; used to rank
+    several accepted candidates (lower is closer).
+    """
+    n = min(len(a), len(b), max_pulses)
+    if n <= 0:
+        return 1.0
+    total = 0.0
+    for i in range(n):
+        m = max(a[i], b[i])
+        if m:
+            total += abs(a[i] - b[i]) / m
+    return total / n
+
+
+class FuzzyPulseMatcher:
+    """
+    Batched fuzzy_match_pulses: score one received pulse train against many
+    stored trains in a single vectorised pass.
+
+    Every stored train is truncated to `max_pulses` and packed (zero-padded)
+    into one matrix, rows sorted by full train length. fuzzy_match_pulses
+    rejects any pair whose lengths differ by more than 4, so a query only
+    touches the contiguous length bucket [len-4, len+4] of that matrix.
+    `body_tolerances` optionally gives each row its own body tolerance (e.g.
+    looser for a noisy blaster); leader tolerance and mismatch budget are
+    shared.
+
+    fuzzy_match_pulses stays the reference implementation — for every row,
+    `accepts()` is exactly fuzzy_match_pulses(received, stored_row) with
+    that row's body tolerance. Without NumPy the matcher loops the scalar
+    function, so callers never need to care which path ran.
+    """
+
+    _LEN_SLACK = 4
+    _MIN_COMPARED = 6
+    _LEADER_N = 2
+
+    def __init__(
+        self,
+        trains: Sequence[list[int]],
+        keys: Optional[Sequence[Any]] = None,
+        *,
+        max_pulses: int = 40,
+        leader_tolerance: float = 0.25,
+        body_tolerance: float = 0.20,
+        max_body_mismatches: int = 3,
+        body_tolerances: Optional[Sequence[float]] = None,
+    ) -> None:
+        if keys is None:
+            keys = list(range(len(trains)))
+        if len(keys) != len(trains):
+            raise ValueError("keys and trains must have the same length")
+        if body_tolerances is not None and len(body_tolerances) != len(trains):
+            raise ValueError("body_tolerances and trains must have the same length")
+        self.max_pulses = max_pulses
+        self.leader_tolerance = leader_tolerance
+        self.max_body_mismatches = max_body_mismatches
+
+        tols = list(body_tolerances) if body_tolerances is not None else [body_tolerance] * len(trains)
+        # Stable sort by length keeps insertion order inside a bucket, which
+        # is the tie-break when two rows score the same distance.
+        order = sorted(range(len(trains)), key=lambda i: len(trains[i]))
+        self._trains = [list(trains[i]) for i in order]
+        self._keys = [keys[i] for i in order]
+        self._tols = [float(tols[i]) for i in order]
+        self._rank = list(order)
+        self._lengths = [len(t) for t in self._trains]
+
+        self._mat = self._len_arr = self._tol_arr = self._rank_arr = None
+        if _np is not None and self._trains:
+            mat = _np.zeros((len(self._trains), max_pulses), dtype=_np.float64)
+            for r, t in enumerate(self._trains):
+                head = t[:max_pulses]
+                mat[r, :len(head)] = head
+            self._mat = mat
+            self._len_arr = _np.asarray(self._lengths, dtype=_np.int64)
+            self._tol_arr = _np.asarray(self._tols, dtype=_np.float64)
+            self._rank_arr = _np.asarray(self._rank, dtype=_np.int64)
+
+    def __len__(self) -> int:
+        return len(self._trains)
+
+    def _bucket(self, n_pulses: int) -> tuple[int, int]:
+        """Row slice whose full length is within ±_LEN_SLACK of n_pulses."""
+        lo = bisect.bisect_left(self._lengths, n_pulses - self._LEN_SLACK)
+        hi = bisect.bisect_right(self._lengths, n_pulses + self._LEN_SLACK)
+        return lo, hi
+
+    def _score_scalar(self, received: list[int], lo: int, hi: int):
+        ok, dist = [], []
+        for r in range(lo, hi):
+            hit = fuzzy_match_pulses(
+                received, self._trains[r],
+                max_pulses=self.max_pulses,
+                leader_tolerance=self.leader_tolerance,
+                body_tolerance=self._tols[r],
+                max_body_mismatches=self.max_body_mismatches,
+            )
+            ok.append(hit)
+            dist.append(fuzzy_pulse_distance(received, self._trains[r],
+                                             max_pulses=self.max_pulses))
+        return ok, dist
+
+    def _score_numpy(self, received: list[int], lo: int, hi: int):
+        np = _np
+        head = received[:self.max_pulses]
+        recv = np.zeros(self.max_pulses, dtype=np.float64)
+        recv[:len(head)] = head
+
+        block = self._mat[lo:hi]
+        # Per-row compared window: min(truncated stored, truncated received).
+        n_row = np.minimum(np.minimum(self._len_arr[lo:hi], self.max_pulses), len(head))
+        cols = np.arange(self.max_pulses)
+        in_window = cols[None, :] < n_row[:, None]
+
+        peak = np.maximum(block, recv[None, :])
+        diff = np.abs(block - recv[None, :])
+        with np.errstate(divide="ignore", invalid="ignore"):
+            rel = np.where(peak > 0, diff / np.where(peak > 0, peak, 1.0), 0.0)
+        rel = np.where(in_window, rel, 0.0)
+
+        leader_ok = (rel[:, :self._LEADER_N] <= self.leader_tolerance).all(axis=1)
+        body = rel[:, self._LEADER_N:] > self._tol_arr[lo:hi, None]
+        mismatches = body.sum(axis=1)
+        ok = (
+            (n_row >= self._MIN_COMPARED)
+            & leader_ok
+            & (mismatches <= self.max_body_mismatches)
+        )
+        dist = rel.sum(axis=1) / np.maximum(n_row, 1)
+        return ok, dist
+
+    def accepts(self, received: list[int]) -> list[bool]:
+        """Per stored train (in construction order): does it fuzzy-match?"""
+        out = [False] * len(self._trains)
+        if not received or not self._trains:
+            return out
+        lo, hi = self._bucket(len(received))
+        if lo >= hi:
+            return out
+        if self._mat is not None:
+            ok, _ = self._score_numpy(received, lo, hi)
+            ok = ok.tolist()
+        else:
+            ok, _ = self._score_scalar(received, lo, hi)
+        for r, hit in zip(range(lo, hi), ok):
+            out[self._rank[r]] = bool(hit)
+        return out
+
+    def best(self, received: list[int]) -> Optional[tuple[Any, float]]:
+        """
+        Closest accepted stored train as (key, distance), or None when no
+        row fuzzy-matches. Ties go to the row supplied first.
+        """
+        if not received or not self._trains:
+            return None
+        lo, hi = self._bucket(len(received))
+        if lo >= hi:
+            return None
+        if self._mat is not None:
+            np = _np
+            ok, dist = self._score_numpy(received, lo, hi)
+            if not ok.any():
+                return None
+            cand = np.flatnonzero(ok)
+            # lexsort: last key is primary → distance, then original order.
+            pick = cand[np.lexsort((self._rank_arr[lo:hi][cand], dist[cand]))[0]]
+            return self._keys[lo + int(pick)], float(dist[pick])
+        ok, dist = self._score_scalar(received, lo, hi)
+        hits = [(dist[i], self._rank[lo + i], lo + i) for i in range(hi - lo) if ok[i]]
+        if not hits:
+            return None
+        d, _, r = min(hits)
+        return self._keys[r], float(d)
+
+
 # ===========================================================================
 # Phase 2 — Protocol decoders
 #
@@ -0,0 +1,229 @@
+"""
+Shared write-behind JSON document store for user_files state.
+
+Most services keep their state in one `user_files/*.json` document and each
+grew its own load/save pair — usually a full read on every call and a full
+pretty-printed rewrite on every change, on the request path. JsonStore is
+that pair done once:
+
+  * In-memory copy, validated against the file's (mtime_ns, size) on read so
+    an out-of-band edit or delete (reset scripts, a restore) is picked up.
+  * Writes mutate the in-memory copy and mark it dirty; a timer flushes
+    after `flush_delay` seconds, so a burst of changes costs one write.
+    While dirty, the in-memory copy wins over the file.
+  * Flushes serialize compactly, fsync the temp file and atomically replace
+    the document — a crash leaves either the old or the new file, never a
+    torn one.
+  * flush_all() writes every dirty store; it runs at interpreter exit and
+    from the API server's shutdown hook.
+
+`path` may be a callable so modules can keep a patchable module-level path
+constant (tests monkeypatch it); when it changes, pending writes go to the
+old path and the next read loads the new one.
+
+Usage:
+    _store = JsonStore(lambda: STORE_FILE)
+    data = _store.read()                      # treat as read-only
+    _store.update(lambda d: d.update(k=v))    # mutate under the store lock
+"""
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import weakref
+from typing import Any, Callable, Union
+
+PathLike = Union[str, "os.PathLike[str]"]
+
+DEFAULT_FLUSH_DELAY_S = 1.0
+
+_stores: "weakref.WeakSet[JsonStore]" = weakref.WeakSet()
+_stores_lock = threading.Lock()
+
+
+class _Unchanged:
+    __slots__ = ()
+
+    def __repr__(self) -> str:
+        return "UNCHANGED"
+
+
+# Returned from an update() callback to skip marking the store dirty.
+UNCHANGED = _Unchanged()
+
+
+class JsonStore:
+    def __init__(
+        self,
+        path: PathLike | Callable[[], PathLike],
+        *,
+        default: Callable[[], Any] = dict,
+        flush_delay: float = DEFAULT_FLUSH_DELAY_S,
+        indent: int | None = None,
+    ) -> None:
+        self._path_fn = path if callable(path) else (lambda: path)
+        self._default = default
+        self.flush_delay = flush_delay
+        self._indent = indent
+        self._lock = threading.RLock()
+        self._data: Any = None
+        self._loaded_path: str | None = None
+        self._sig: tuple[int, int] | None = None
+        self._dirty = False
+        self._timer: threading.Timer | None = None
+        self._stats = {"reads": 0, "loads": 0, "updates": 0, "flushes": 0, "flush_errors": 0}
+        with _stores_lock:
+            _stores.add(self)
+
+    # -- Public API ----------------------------------------------------------
+
+    @property
+    def path(self) -> str:
+        return os.fspath(self._path_fn())
+
+    def read(self) -> Any:
+        """The current document. Shared, not a copy — do not mutate it."""
+        with self._lock:
+            self._stats["reads"] += 1
+            return self._current()
+
+    def query(self, fn: Callable[[Any], Any]) -> Any:
+        """fn(document) under the store lock — for reads that iterate."""
+        with self._lock:
+            self._stats["reads"] += 1
+            return fn(self._current())
+
+    def update(self, fn: Callable[[Any], Any]) -> Any:
+        """Run fn(document) under the store lock, mark dirty, return fn's result.
+
+        fn mutates the document in place. Returning UNCHANGED from fn skips
+        the write.
+        """
+        with self._lock:
+            doc = self._current()
+            result = fn(doc)
+            if result is UNCHANGED:
+                return None
+            self._stats["updates"] += 1
+            self._mark_dirty()
+            return result
+
+    def replace(self, data: Any) -> None:
+        """Swap in a whole new document."""
+        with self._lock:
+            self._current()
+            self._data = data
+            self._stats["updates"] += 1
+            self._mark_dirty()
+
+    def flush(self) -> bool:
+        """Write the document now if it has pending changes. Never raises."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if not self._dirty or self._loaded_path is None:
+                return False
+            path = self._loaded_path
+            try:
+                _atomic_write(path, self._data, self._indent)
+            except (OSError, TypeError, ValueError):
+                self._stats["flush_errors"] += 1
+                return False
+            self._dirty = False
+            self._sig = _signature(path)
+            self._stats["flushes"] += 1
+            return True
+
+    def invalidate(self) -> None:
+        """Drop the in-memory copy (after flushing) so the next read reloads."""
+        with self._lock:
+            self.flush()
+            self._data = None
+            self._loaded_path = None
+            self._sig = None
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {**self._stats, "path": self.path, "dirty": self._dirty}
+
+    # -- Internals -----------------------------------------------------------
+
+    def _current(self) -> Any:
+        path = self.path
+        if self._loaded_path != path:
+            if self._dirty:
+                self.flush()
+            self._load(path)
+        elif not self._dirty:
+            sig = _signature(path)
+            if sig != self._sig:
+                self._load(path, sig)
+        return self._data
+
+    def _load(self, path: str, sig: tuple[int, int] | None = None) -> None:
+        self._stats["loads"] += 1
+        self._loaded_path = path
+        self._sig = sig if sig is not None else _signature(path)
+        data: Any = None
+        if self._sig is not None:
+            try:
+                with open(path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+            except (OSError, ValueError):
+                data = None
+        default = self._default()
+        if data is None or not isinstance(data, type(default)):
+            data = default
+        self._data = data
+
+    def _mark_dirty(self) -> None:
+        self._dirty = True
+        if self.flush_delay <= 0:
+            self.flush()
+            return
+        if self._timer is None:
+            self._timer = threading.Timer(self.flush_delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+
+def _signature(path: str) -> tuple[int, int] | None:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_mtime_ns, st.st_size
+
+
+def _atomic_write(path: str, data: Any, indent: int | None) -> None:
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    if indent is None:
+        text = json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+    else:
+        text = json.dumps(data, indent=indent, ensure_ascii=False)
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(text)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def flush_all() -> int:
+    """Flush every store with pending changes; returns how many were written."""
+    with _stores_lock:
+        stores = list(_stores)
+    return sum(1 for s in stores if s.flush())
+
+
+def all_stats() -> list[dict]:
+    with _stores_lock:
+        stores = list(_stores)
+    return sorted((s.stats() for s in stores), key=lambda s: s["path"])
+
+
+atexit.register(flush_all)
@@ -305,6 +305,59 @@ def _eval_single_condition(cond: dict) -> tuple[bool, str]:
     return passed, f"{entity_id}={actual} (op={operator}, expected={expected})"
 
 
+def _service_step(step: dict) -> tuple[str, str, str, dict]:
+    """(domain, service, entity_id, payload) for a call_service / device step."""
+    entity_id = step.get("entity_id", "")
+    svc_key = (
+        step.get("ha_service")
+        or step.get("service_value")
+        or step.get("action")
+        or ""
+    )
+    if not svc_key:
+        svc_key = step.get("service", "homeassistant.turn_on").split(".")[-1]
+    domain = entity_id.split(".")[0] if "." in entity_id else "homeassistant"
+    payload: dict = {"entity_id": entity_id}
+    payload.update(step.get("service_data") or {})
+    return domain, svc_key, entity_id, payload
+
+
+async def _batch_service_run(steps: list[dict], start: int,
+                             automation_id: str = "") -> dict[int, dict]:
+    """Send the run of on/off service steps starting at `start` as one batch.
+
+    A scene is typically a list of consecutive turn_on / turn_off steps; they
+    go out through service_batch as merged multi-entity calls instead of one
+    HA round trip each. Returns {step index: result} — empty when the run is
+    a single step, which keeps the ordinary path. The run stops at any other
+    step type (delays keep their meaning), at an overridden entity, and at an
+    entity already in the run, since batched groups are sent concurrently.
+    Every step's override gate is evaluated here, before the send; nothing is
+    batched while the automation has a cancel pending.
+    """
+    from services.manual_overrides import is_overridden
+    from services.service_batch import ServiceCall, execute_async
+    if automation_id and _cancel_flags.get(automation_id):
+        return {}
+    run: list[tuple[int, ServiceCall]] = []
+    seen: set[str] = set()
+    for j in range(start, len(steps)):
+        step = steps[j]
+        if step.get("type") not in ("call_service", "device"):
+            break
+        domain, svc_key, entity_id, payload = _service_step(step)
+        if svc_key not in ("turn_on", "turn_off") or "." not in entity_id or entity_id in seen:
+            break
+        if step.get("respect_override", True) and is_overridden(entity_id):
+            break
+        seen.add(entity_id)
+        run.append((j, ServiceCall(domain, svc_key, entity_id, payload)))
+    if len(run) < 2:
+        return {}
+    batch = await execute_async([c for _, c in run])
+    return {j: batch["results"][c.entity_id] for j, c in run}
+
+
 async def execute_ziggy_actions(
     automation_id: str,
     label: str = "",
@@ -387,6 +440,8 @@ async def execute_ziggy_actions(
               label=label, steps_count=len(steps))
     results: list[dict] = []
     prev_kind: str | None = None
+    # Step index → result for service steps already sent as part of a batch.
+    batched: dict[int, dict] = {}
 
     try:
         # ── Evaluate conditions before running any steps ──────────────────────
@@ -427,23 +482,17 @@ async def execute_ziggy_actions(
                     from services.manual_overrides import (
                         is_overridden, register_ziggy_call,
                     )
-                    entity_id = step.get("entity_id", "")
-                    svc_key = (
-                        step.get("ha_service")
-                        or step.get("service_value")
-                        or step.get("action")
-                        or ""
-                    )
-                    if not svc_key:
-                        svc_key = step.get("service", "homeassistant.turn_on").split(".")[-1]
-                    domain = entity_id.split(".")[0] if "." in entity_id else "homeassistant"
-                    payload: dict = {"entity_id": entity_id}
-                    payload.update(step.get("service_data") or {})
+                    domain, svc_key, entity_id, payload = _service_step(step)
+                    # Already sent with an earlier step's batch: HA has run it,
+                    # and its override gate was evaluated before the send.
+                    pre = batched.pop(i, None)
+                    already_sent = pre is not None and bool(pre.get("ok"))
 
                     # Manual-override gate — if the user just changed this entity by hand,
                     # leave it alone for the override window. The step's `respect_override`
                     # flag (default True) lets advanced automations force-through.
-                    if entity_id and step.get("respect_override", True) and is_overridden(entity_id):
+                    if (not already_sent and entity_id and step.get("respect_override", True)
+                            and is_overridden(entity_id)):
                         log_info(
                             f"[Executor] {entity_id} manually overridden — "
                             f"skipping {domain}.{svc_key}"
@@ -460,7 +509,7 @@ async def execute_ziggy_actions(
                     # Block immediately if HA reports the entity as clearly unreachable.
                     # "off" is intentionally excluded: HA state can be stale (TV shown as
                     # "on" while physically off, or vice versa), so we try anyway and retry.
-                    if entity_id and svc_key not in ("turn_on", "turn_off"):
+                    if not already_sent and entity_id and svc_key not in ("turn_on", "turn_off"):
                         state_res = get_state(entity_id)
                         entity_state = state_res.get("data", {}).get("state", "unknown")
                         if entity_state in ("unavailable", "unknown"):
@@ -476,29 +525,38 @@ async def execute_ziggy_actions(
                             prev_kind = kind
                             continue
 
-                    # Retry up to 3 times with a 5-second gap. Handles devices that are
-                    # still booting after an IR power command, and stale HA state readings.
-                    log_info(f"[Executor] Calling {domain}.{svc_key} on {entity_id} | data={payload}")
-                    result = {"ok": False, "message": "not attempted"}
-                    for attempt in range(3):
-                        # Tag the call so the HA subscriber doesn't misclassify the
-                        # resulting state_changed event as a manual override.
-                        if entity_id:
-                            register_ziggy_call(entity_id)
-                        # to_thread the sync HA REST call so the event loop stays
-                        # responsive during routine execution. A 5-step routine
-                        # was previously blocking the loop for ~5 × HA-RTT — every
-                        # other request stacked behind it. WS broadcasts froze too,
-                        # which is why bursts felt laggy on every screen.
-                        result = await asyncio.to_thread(ha_call, domain, svc_key, payload)
-                        if result.get("ok"):
-                            break
-                        if attempt < 2:
-                            log_info(
-                                f"[Executor] {domain}.{svc_key} failed "
-                                f"(attempt {attempt + 1}/3) — retrying in 5s…"
-                            )
-                            await asyncio.sleep(5)
+                    # Consecutive on/off steps go out together the first time
+                    # the run is reached; a step whose batched call failed
+                    # falls through to the retry loop below.
+                    if pre is None:
+                        batched.update(await _batch_service_run(steps, i, automation_id))
+                        pre = batched.pop(i, None)
+                    if pre is not None and pre.get("ok"):
+                        result = pre
+                    else:
+                        # Retry up to 3 times with a 5-second gap. Handles devices that are
+                        # still booting after an IR power command, and stale HA state readings.
+                        log_info(f"[Executor] Calling {domain}.{svc_key} on {entity_id} | data={payload}")
+                        result = {"ok": False, "message": "not attempted"}
+                        for attempt in range(3):
+                            # Tag the call so the HA subscriber doesn't misclassify the
+                            # resulting state_changed event as a manual override.
+                            if entity_id:
+                                register_ziggy_call(entity_id)
+                            # to_thread the sync HA REST call so the event loop stays
+                            # responsive during routine execution. A 5-step routine
+                            # was previously blocking the loop for ~5 × HA-RTT — every
+                            # other request stacked behind it. WS broadcasts froze too,
+                            # which is why bursts felt laggy on every screen.
+                            result = await asyncio.to_thread(ha_call, domain, svc_key, payload)
+                            if result.get("ok"):
+                                break
+                            if attempt < 2:
+                                log_info(
+                                    f"[Executor] {domain}.{svc_key} failed "
+                                    f"(attempt {attempt + 1}/3) — retrying in 5s…"
+                                )
+                                await asyncio.sleep(5)
 
                 # ── Dynamic device command (from HA capability mirror) ───────────
                 # Shape: {
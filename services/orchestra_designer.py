@@ -23,6 +23,7 @@ from typing import Optional
 from integrations.llm_gateway import chat_completion
 from services.automation_catalog import get_supported_only, get_gaps
 from services.home_context import load_home_context
+from core import prompt_prefix
 from core.logger_module import log_info, log_error
 
 
@@ -95,6 +96,20 @@ The user's outcome request follows in the user message. Return the bundle JSON n
 """
 
 
+def _render_system_prompt(home: dict) -> str:
+    """Designer system prompt for a home snapshot. Canonical JSON (sorted keys,
+    no build timestamp) so an unchanged home renders byte-identically."""
+    catalog = get_supported_only()
+    # Gaps surface separately so the LLM can craft a Ziggy-native decline if blocked
+    catalog["gaps"] = get_gaps()
+    home = {**home, "meta": {k: v for k, v in (home.get("meta") or {}).items()
+                             if k != "generated_at"}}
+    return _SYSTEM_PROMPT_TMPL.format(
+        capability_catalog_json=json.dumps(catalog, ensure_ascii=False, sort_keys=True),
+        home_context_json=json.dumps(home, ensure_ascii=False, sort_keys=True),
+    )
+
+
 def design_bundle(outcome: str, language: Optional[str] = None) -> dict:
     """Design an automation bundle for the user's outcome.
 
@@ -111,19 +126,18 @@ def design_bundle(outcome: str, language: Optional[str] = None) -> dict:
     lang = language or ("he" if _is_hebrew(outcome) else "en")
 
     try:
-        catalog = get_supported_only()
-        # Gaps surface separately so the LLM can craft a Ziggy-native decline if blocked
-        catalog["gaps"] = get_gaps()
         home = load_home_context(lang)
+        # The whole system prompt is one prompt_prefix block, rebuilt only
+        # when home_context hands back a new snapshot (its own cache is
+        # invalidated by registry/automation/blueprint writes).
+        (system_prompt,) = prompt_prefix.assemble("automation_design", [
+            (f"automation_design.{lang}", (home.get("meta") or {}).get("generated_at") or object(),
+             lambda: _render_system_prompt(home)),
+        ])
     except Exception as e:
         log_error(f"[designer] context build failed: {e}")
         return {"ok": False, "error": "Could not load home context."}
 
-    system_prompt = _SYSTEM_PROMPT_TMPL.format(
-        capability_catalog_json=json.dumps(catalog, ensure_ascii=False),
-        home_context_json=json.dumps(home, ensure_ascii=False),
-    )
-
     messages = [
         {"role": "system", "content": system_prompt},
         {"role": "user",   "content": outcome.strip()},
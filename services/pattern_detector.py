@@ -33,6 +33,7 @@ from datetime import datetime, timedelta
 from pathlib import Path
 from typing import NamedTuple
 
+from services import pattern_stats
 from services.pattern_logger import load_events, _SKIP_INTENTS
 from core.settings_loader import settings
 
@@ -90,31 +91,35 @@ def update_and_detect(extra_events: list[dict] | None = None) -> list[QualifiedC
     """
     Main entry point called by the suggestion engine.
 
-    1. Loads events from the lookback window.
-    2. Updates (or creates) candidates in the persistent store.
+    1. Folds events logged since the last run into the persisted sufficient
+       statistics (services/pattern_stats) and ages out days that left the
+       lookback window.
+    2. Re-derives only the candidates whose statistics changed — nothing is
+       rewritten when nothing new was logged.
     3. Returns candidates that pass both the evidence gate and the confidence threshold.
+
+    extra_events are merged with the current lookback window for this run
+    only (statistics are recomputed, not persisted).
     """
     cfg = _cfg()
     lookback = cfg.get("lookback_days", 30)
-    events = load_events(lookback_days=lookback)
+    gap_s = cfg.get("sequence_gap_minutes", 5) * 60
     if extra_events:
-        events = extra_events + events
-
-    # Only use successfully executed, automatable, non-reversed actions
-    events = [
-        e for e in events
-        if e.get("result") == "ok"
-        and e.get("automatable", True)
-        and not e.get("reversed", False)
-    ]
-    if not events:
-        return []
+        stats = pattern_stats.from_events(
+            list(extra_events) + load_events(lookback_days=lookback), lookback, gap_s
+        )
+        time_keys, pair_keys = set(stats["time"]), set(stats["pairs"])
+    else:
+        stats, time_keys, pair_keys = pattern_stats.advance(lookback, gap_s)
 
-    events.sort(key=lambda e: e["ts"])
+    if not stats["time"] and not stats["pairs"]:
+        return []
+    if not time_keys and not pair_keys:
+        return _qualify(_load_candidates())
 
     candidates = _load_candidates()
-    _update_time_based(events, candidates)
-    _update_sequence(events, candidates)
+    _update_time_based(stats["time"], time_keys, candidates)
+    _update_sequence(stats["pairs"], pair_keys, candidates)
     _save_candidates(candidates)
 
     return _qualify(candidates)
@@ -205,7 +210,7 @@ def template_signal_detector(
         if not intent or min_occ <= 0 or window_days <= 0:
             continue
 
-        events = load_events(lookback_days=window_days)
+        events = load_events(lookback_days=window_days, intent=intent)
         if extra_events:
             events = list(extra_events) + events
 
@@ -279,27 +284,29 @@ def _day_class_from_weekdays(weekdays: set[int]) -> str:
 # Time-based pattern updates
 # ---------------------------------------------------------------------------
 
-def _update_time_based(events: list[dict], candidates: dict) -> None:
+def _time_occurrences(days: dict) -> list[tuple]:
+    """Expand one bucket's per-day occurrences into occurrence tuples:
+    (date_str, week_str, minute_of_day, weekday, ts_str, entity_id)."""
+    out: list[tuple] = []
+    for date in sorted(days):
+        day = datetime.strptime(date, "%Y-%m-%d")
+        week = day.strftime("%Y-W%W")
+        weekday = day.weekday()
+        for ts_str, eid in days[date]:
+            hh, mm = int(ts_str[11:13]), int(ts_str[14:16])
+            out.append((date, week, hh * 60 + mm, weekday, ts_str, eid))
+    return out
+
+
+def _update_time_based(time_stats: dict, keys: set[str], candidates: dict) -> None:
     cfg = _cfg()
     window = cfg.get("time_window_minutes", 45)
 
-    # Bucket: (intent, room, action) → list of
-    #   (date_str, week_str, minute_of_day, weekday, ts_str, entity_id)
-    buckets: dict[str, list[tuple]] = defaultdict(list)
-    for ev in events:
-        key = f"{ev['intent']}|{ev.get('room') or 'global'}|{ev.get('action') or ''}"
-        ts = datetime.fromisoformat(ev["ts"])
-        minute_of_day = ts.hour * 60 + ts.minute
-        buckets[key].append((
-            ts.strftime("%Y-%m-%d"),
-            ts.strftime("%Y-W%W"),
-            minute_of_day,
-            ts.weekday(),
-            ts.isoformat(timespec="seconds"),
-            ev.get("entity_id"),
-        ))
-
-    for bucket_key, occurrences_data in buckets.items():
+    for bucket_key in sorted(keys):
+        days = time_stats.get(bucket_key)
+        if not days:
+            continue
+        occurrences_data = _time_occurrences(days)
         if len(occurrences_data) < _MIN_OCCURRENCES:
             continue
 
@@ -331,13 +338,13 @@ def _update_time_based(events: list[dict], candidates: dict) -> None:
                 # Merge: extend sets, keep history
                 existing_dates = set(existing["evidence"].get("occurrence_dates", []))
                 existing_weeks = set(existing["evidence"].get("occurrence_weeks", []))
-                existing_times = existing["evidence"].get("times_of_day_minutes", [])
-                existing_entities = existing["evidence"].get("entity_ids", [])
                 all_dates = existing_dates | dates
                 all_weeks = existing_weeks | weeks
                 all_dates, all_weeks = _prune_old(all_dates, all_weeks)
-                all_times = (existing_times + times_of_day)[-120:]  # cap at 120 values
-                all_entities = (existing_entities + entity_ids_in_cluster)[-120:]
+                # Times/entities describe the current window's cluster; the
+                # statistics already hold every occurrence still in it.
+                all_times = times_of_day[-120:]  # cap at 120 values
+                all_entities = entity_ids_in_cluster[-120:]
                 existing["evidence"].update({
                     "occurrences": len(all_dates),
                     "unique_days": len(all_dates),
@@ -381,37 +388,23 @@ def _update_time_based(events: list[dict], candidates: dict) -> None:
 # Sequence pattern updates
 # ---------------------------------------------------------------------------
 
-def _update_sequence(events: list[dict], candidates: dict) -> None:
-    cfg = _cfg()
-    gap_s = cfg.get("sequence_gap_minutes", 5) * 60
+def _pair_occurrences(days: dict) -> list[tuple]:
+    """Expand one pair's per-day co-occurrences into occurrence tuples:
+    (date_str, week_str, weekday, ts_str, a_entity_id, b_entity_id).
 
-    # Collect (pair_key, date_str, week_str, ts_str) for each observed pair
-    pair_occurrences: dict[str, list[tuple]] = defaultdict(list)
+    Ordered by A then B, as the old all-pairs scan emitted them; the
+    statistics record each pair when its B arrives."""
+    out: list[tuple] = []
+    for date in sorted(days):
+        day = datetime.strptime(date, "%Y-%m-%d")
+        week, weekday = day.strftime("%Y-W%W"), day.weekday()
+        for a_ts, _, a_eid, b_eid in sorted(days[date], key=lambda o: (o[0], o[1])):
+            out.append((date, week, weekday, a_ts, a_eid, b_eid))
+    return out
 
-    for i, ev_a in enumerate(events):
-        ts_a = datetime.fromisoformat(ev_a["ts"]).timestamp()
 
-        for ev_b in events[i + 1:]:
-            ts_b = datetime.fromisoformat(ev_b["ts"]).timestamp()
-            if ts_b - ts_a > gap_s:
-                break
-            if ev_b["intent"] == ev_a["intent"] and ev_b.get("room") == ev_a.get("room"):
-                continue
-
-            pair_key = (
-                f"{ev_a['intent']}:{ev_a.get('room') or 'global'}:{ev_a.get('action') or ''}"
-                "→"
-                f"{ev_b['intent']}:{ev_b.get('room') or 'global'}:{ev_b.get('action') or ''}"
-            )
-            ts_dt = datetime.fromisoformat(ev_a["ts"])
-            pair_occurrences[pair_key].append((
-                ts_dt.strftime("%Y-%m-%d"),
-                ts_dt.strftime("%Y-W%W"),
-                ts_dt.weekday(),
-                ev_a["ts"],
-                ev_a.get("entity_id"),
-                ev_b.get("entity_id"),
-            ))
+def _update_sequence(pair_stats: dict, keys: set[str], candidates: dict) -> None:
+    pair_occurrences = {k: _pair_occurrences(pair_stats[k]) for k in sorted(keys) if pair_stats.get(k)}
 
     for pair_key, occ_data in pair_occurrences.items():
         if len(occ_data) < _MIN_OCCURRENCES:
@@ -441,8 +434,6 @@ def _update_sequence(events: list[dict], candidates: dict) -> None:
         if existing:
             existing_dates = set(existing["evidence"].get("occurrence_dates", []))
             existing_weeks = set(existing["evidence"].get("occurrence_weeks", []))
-            existing_a = existing["evidence"].get("entity_ids", [])
-            existing_b = existing["evidence"].get("b_entity_ids", [])
             all_dates = existing_dates | dates
             all_weeks = existing_weeks | weeks
             all_dates, all_weeks = _prune_old(all_dates, all_weeks)
@@ -452,8 +443,8 @@ def _update_sequence(events: list[dict], candidates: dict) -> None:
                 "unique_weeks": len(all_weeks),
                 "occurrence_dates": sorted(all_dates),
                 "occurrence_weeks": sorted(all_weeks),
-                "entity_ids": (existing_a + a_entities)[-120:],
-                "b_entity_ids": (existing_b + b_entities)[-120:],
+                "entity_ids": a_entities[-120:],
+                "b_entity_ids": b_entities[-120:],
                 "last_seen": max(existing["evidence"].get("last_seen", ""), last_seen),
             })
         else:
@@ -1,8 +1,17 @@
 """
 Structured event logger for pattern learning.
 
-Appends one normalized JSON line per handled intent to user_files/events.jsonl.
-This file is the raw data source for the pattern detector.
+Appends one normalized record per handled intent to user_files/events.db, the
+raw data source for the pattern detector. The store is a single SQLite table
+with the fields the readers filter on broken out into indexed columns
+(ts_epoch, intent/room/action, entity_id) and the full record kept as JSON,
+so the detector's lookback window is a range scan and the hygiene filters
+below are point lookups instead of re-reading a growing JSONL file.
+
+Every insert and every later rewrite (reversal marking) stamps the row with a
+new `seq`, so a reader can stream just what changed since its last checkpoint
+via events_since(). The legacy user_files/events.jsonl is imported once on
+first open and renamed to events.jsonl.migrated.
 
 Three hygiene filters applied at log time:
   1. Session dedup  — same (intent, room, action) within 60 s from same source is a retry,
@@ -16,11 +25,37 @@ Three hygiene filters applied at log time:
 from __future__ import annotations
 
 import json
+import sqlite3
+import threading
 from datetime import datetime, timedelta
 from pathlib import Path
 
+EVENTS_DB = Path("user_files/events.db")
+# Legacy append-only log; imported into EVENTS_DB once, then renamed.
 EVENTS_FILE = Path("user_files/events.jsonl")
 
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS events (
+    id          INTEGER PRIMARY KEY AUTOINCREMENT,
+    seq         INTEGER NOT NULL,
+    ts          TEXT    NOT NULL,
+    ts_epoch    REAL    NOT NULL,
+    source      TEXT,
+    intent      TEXT    NOT NULL,
+    room        TEXT,
+    entity_id   TEXT,
+    action      TEXT,
+    result      TEXT,
+    automatable INTEGER NOT NULL DEFAULT 1,
+    reversed    INTEGER NOT NULL DEFAULT 0,
+    body        TEXT    NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_events_ts     ON events(ts_epoch);
+CREATE INDEX IF NOT EXISTS idx_events_key    ON events(intent, room, action, ts_epoch);
+CREATE INDEX IF NOT EXISTS idx_events_entity ON events(entity_id, ts_epoch);
+CREATE INDEX IF NOT EXISTS idx_events_seq    ON events(seq);
+"""
+
 # Intents that are meta/system — never log. These represent user interactions
 # with Ziggy itself (browsing, managing, asking) — they aren't habits Ziggy can
 # turn into automations, so they have no business in the pattern store.
@@ -66,7 +101,7 @@ _REVERSAL_WINDOW_SECONDS = 120
 
 
 def log_event(intent: str, params: dict, result: dict, source: str) -> None:
-    """Append a normalized, hygiene-filtered event record to the JSONL event log."""
+    """Append a normalized, hygiene-filtered event record to the event store."""
     if intent in _SKIP_INTENTS:
         return
 
@@ -75,10 +110,6 @@ def log_event(intent: str, params: dict, result: dict, source: str) -> None:
     action = _extract_action(intent, params)
     room = params.get("room")
 
-    # --- Filter 1: session dedup ---
-    if automatable and _is_recent_duplicate(intent, room, action, source, now):
-        return
-
     entry = {
         "ts": now.isoformat(timespec="seconds"),
         "source": source,
@@ -99,47 +130,177 @@ def log_event(intent: str, params: dict, result: dict, source: str) -> None:
     }
 
     try:
-        EVENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-        with open(EVENTS_FILE, "a", encoding="utf-8") as f:
-            f.write(json.dumps(entry) + "\n")
-    except OSError:
+        with _lock:
+            conn = _connect()
+            try:
+                # --- Filter 1: session dedup ---
+                if automatable and _is_recent_duplicate(conn, intent, room, action, source, now):
+                    return
+                row_id = _insert(conn, entry)
+                # --- Filter 2: reversal marking (post-write) ---
+                if automatable and result.get("ok"):
+                    _mark_reversal_pair(conn, row_id, intent, room, action, now)
+                conn.commit()
+            finally:
+                conn.close()
+    except (sqlite3.Error, OSError):
         return  # Never crash Ziggy because of logging
 
-    # --- Filter 2: reversal marking (post-write) ---
-    if automatable and result.get("ok"):
-        _mark_reversal_pair(intent, room, action, now)
+
+def load_events(lookback_days: int = 30, intent: str | None = None) -> list[dict]:
+    """Load events from the last N days (optionally one intent), oldest first."""
+    cutoff = datetime.now().timestamp() - lookback_days * 86400
+    sql = "SELECT body FROM events WHERE ts_epoch >= ?"
+    args: list = [cutoff]
+    if intent is not None:
+        sql = "SELECT body FROM events WHERE intent = ? AND ts_epoch >= ?"
+        args = [intent, cutoff]
+    rows = _query(sql + " ORDER BY ts_epoch, id", args)
+    return [ev for ev in (_decode(r[0]) for r in rows) if ev is not None]
+
+
+def events_since(
+    checkpoint: int, since_epoch: float | None = None,
+) -> tuple[list[tuple[int, int, dict]], int]:
+    """Rows inserted or rewritten after `checkpoint`, in write order.
+
+    Returns ([(row_id, seq, event), …], new_checkpoint). A row rewritten after it
+    was first streamed (reversal marking) comes back again under the same
+    row_id, so callers keying on row_id see the latest version. `since_epoch`
+    additionally drops events older than that timestamp (initial fill).
+    """
+    if since_epoch is None:
+        rows = _query(
+            "SELECT id, seq, body FROM events WHERE seq > ? ORDER BY seq", [checkpoint]
+        )
+    else:
+        # Rows filtered out by age must still advance the checkpoint: pin the
+        # head first so nothing written mid-read is skipped.
+        head = latest_seq()
+        rows = _query(
+            "SELECT id, seq, body FROM events WHERE seq > ? AND seq <= ?"
+            " AND ts_epoch >= ? ORDER BY seq", [checkpoint, head, since_epoch]
+        )
+        checkpoint = max(checkpoint, head)
+    out: list[tuple[int, int, dict]] = []
+    for row_id, seq, body in rows:
+        ev = _decode(body)
+        if ev is not None:
+            out.append((row_id, seq, ev))
+        checkpoint = max(checkpoint, seq)
+    return out, checkpoint
+
+
+def latest_seq() -> int:
+    """Current write checkpoint — the seq of the newest insert or rewrite."""
+    rows = _query("SELECT COALESCE(MAX(seq), 0) FROM events", [])
+    return rows[0][0] if rows else 0
+
+
+def recent_events(limit: int = 20) -> list[dict]:
+    """The newest `limit` events, newest first (activity feed)."""
+    rows = _query("SELECT body FROM events ORDER BY id DESC LIMIT ?", [limit])
+    return [ev for ev in (_decode(r[0]) for r in rows) if ev is not None]
 
 
-def load_events(lookback_days: int = 30) -> list[dict]:
-    """Load events from the last N days, oldest first."""
-    if not EVENTS_FILE.exists():
+def inject_sample_events(events: list[dict]) -> None:
+    """Write sample events directly to the log (used for testing only)."""
+    with _lock:
+        conn = _connect()
+        try:
+            for ev in events:
+                _insert(conn, ev)
+            conn.commit()
+        finally:
+            conn.close()
+
+
+# ---------------------------------------------------------------------------
+# Storage
+# ---------------------------------------------------------------------------
+
+_lock = threading.RLock()
+_ready_for: Path | None = None
+
+
+def _connect() -> sqlite3.Connection:
+    """Open the event store, creating it (and importing events.jsonl) on first use."""
+    global _ready_for
+    with _lock:
+        fresh = _ready_for != EVENTS_DB or not EVENTS_DB.exists()
+        if fresh:
+            EVENTS_DB.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(EVENTS_DB, timeout=10.0)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if fresh:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(_SCHEMA)
+            _migrate_jsonl(conn)
+            conn.commit()
+            _ready_for = EVENTS_DB
+        return conn
+
+
+def _query(sql: str, args: list) -> list[tuple]:
+    try:
+        conn = _connect()
+    except (sqlite3.Error, OSError):
+        return []
+    try:
+        return conn.execute(sql, args).fetchall()
+    except sqlite3.Error:
         return []
+    finally:
+        conn.close()
 
-    cutoff = datetime.now().timestamp() - lookback_days * 86400
-    events: list[dict] = []
 
-    with open(EVENTS_FILE, encoding="utf-8") as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            try:
-                ev = json.loads(line)
-                ts = datetime.fromisoformat(ev["ts"]).timestamp()
-                if ts >= cutoff:
-                    events.append(ev)
-            except (json.JSONDecodeError, KeyError, ValueError):
-                continue
+def _decode(body: str) -> dict | None:
+    try:
+        ev = json.loads(body)
+    except (json.JSONDecodeError, TypeError):
+        return None
+    return ev if isinstance(ev, dict) else None
 
-    return events
 
+def _next_seq(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM events").fetchone()[0]
 
-def inject_sample_events(events: list[dict]) -> None:
-    """Write sample events directly to the log (used for testing only)."""
-    EVENTS_FILE.parent.mkdir(parents=True, exist_ok=True)
-    with open(EVENTS_FILE, "a", encoding="utf-8") as f:
-        for ev in events:
-            f.write(json.dumps(ev) + "\n")
+
+def _insert(conn: sqlite3.Connection, ev: dict) -> int | None:
+    try:
+        ts_epoch = datetime.fromisoformat(ev["ts"]).timestamp()
+        intent = ev["intent"]
+    except (KeyError, TypeError, ValueError):
+        return None
+    cur = conn.execute(
+        "INSERT INTO events (seq, ts, ts_epoch, source, intent, room, entity_id,"
+        " action, result, automatable, reversed, body)"
+        " VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        (
+            _next_seq(conn), ev["ts"], ts_epoch, ev.get("source"), intent,
+            ev.get("room"), ev.get("entity_id"), ev.get("action"), ev.get("result"),
+            1 if ev.get("automatable", True) else 0,
+            1 if ev.get("reversed", False) else 0,
+            json.dumps(ev),
+        ),
+    )
+    return cur.lastrowid
+
+
+def _migrate_jsonl(conn: sqlite3.Connection) -> None:
+    """One-time import of the legacy events.jsonl, then set it aside."""
+    if not EVENTS_FILE.exists():
+        return
+    try:
+        with open(EVENTS_FILE, encoding="utf-8") as f:
+            for line in f:
+                ev = _decode(line.strip()) if line.strip() else None
+                if ev is not None:
+                    _insert(conn, ev)
+        conn.commit()
+        EVENTS_FILE.replace(EVENTS_FILE.with_name(EVENTS_FILE.name + ".migrated"))
+    except OSError:
+        pass
 
 
 # ---------------------------------------------------------------------------
@@ -147,111 +308,50 @@ def inject_sample_events(events: list[dict]) -> None:
 # ---------------------------------------------------------------------------
 
 def _is_recent_duplicate(
-    intent: str, room: str | None, action: str, source: str, now: datetime
+    conn: sqlite3.Connection,
+    intent: str, room: str | None, action: str, source: str, now: datetime,
 ) -> bool:
     """Return True if the same (intent, room, action, source) was logged within the dedup window."""
-    if not EVENTS_FILE.exists():
-        return False
-
-    cutoff = now - timedelta(seconds=_SESSION_DEDUP_SECONDS)
-    try:
-        with open(EVENTS_FILE, "rb") as f:
-            # Read last 8 KB — enough to cover recent events without loading the whole file
-            f.seek(0, 2)
-            size = f.tell()
-            f.seek(max(0, size - 8192))
-            tail = f.read().decode("utf-8", errors="ignore")
-    except OSError:
-        return False
-
-    for line in reversed(tail.splitlines()):
-        if not line.strip():
-            continue
-        try:
-            ev = json.loads(line)
-            ts = datetime.fromisoformat(ev["ts"])
-            if ts < cutoff:
-                break
-            if (
-                ev.get("intent") == intent
-                and ev.get("room") == room
-                and ev.get("action") == action
-                and ev.get("source") == source
-            ):
-                return True
-        except (json.JSONDecodeError, KeyError, ValueError):
-            continue
-
-    return False
+    cutoff = (now - timedelta(seconds=_SESSION_DEDUP_SECONDS)).timestamp()
+    row = conn.execute(
+        "SELECT 1 FROM events WHERE intent = ? AND room IS ? AND action = ?"
+        " AND ts_epoch >= ? AND source IS ? LIMIT 1",
+        (intent, room, action, cutoff, source),
+    ).fetchone()
+    return row is not None
 
 
 def _mark_reversal_pair(
-    intent: str, room: str | None, action: str, now: datetime
+    conn: sqlite3.Connection, row_id: int | None,
+    intent: str, room: str | None, action: str, now: datetime,
 ) -> None:
     """
-    Scan the recent log for the opposite action on the same (intent, room).
-    If found within the reversal window, rewrite both lines as reversed=true.
-
-    Operates on the tail of the file to stay efficient.
+    Look up the opposite action on the same (intent, room) within the reversal
+    window. If found, mark both it and the just-written event reversed=true.
     """
     opposite = _opposite_action(action)
-    if opposite is None:
+    if opposite is None or row_id is None:
         return
 
-    if not EVENTS_FILE.exists():
+    cutoff = (now - timedelta(seconds=_REVERSAL_WINDOW_SECONDS)).timestamp()
+    prior = conn.execute(
+        "SELECT id FROM events WHERE intent = ? AND room IS ? AND action = ?"
+        " AND ts_epoch >= ? AND reversed = 0 AND id < ?"
+        " ORDER BY id DESC LIMIT 1",
+        (intent, room, opposite, cutoff, row_id),
+    ).fetchone()
+    if prior is None:
         return
-
-    cutoff = now - timedelta(seconds=_REVERSAL_WINDOW_SECONDS)
-
-    try:
-        with open(EVENTS_FILE, "r", encoding="utf-8") as f:
-            lines = f.readlines()
-    except OSError:
-        return
-
-    # Scan from the end; only look at the tail within the reversal window
-    changed = False
-    # Mark the just-written event (last line) as reversed
-    last_idx = len(lines) - 1
-    if last_idx < 0:
-        return
-
-    for i in range(last_idx - 1, max(last_idx - 50, -1), -1):
-        line = lines[i].strip()
-        if not line:
-            continue
-        try:
-            ev = json.loads(line)
-            ts = datetime.fromisoformat(ev["ts"])
-            if ts < cutoff:
-                break
-            if (
-                ev.get("intent") == intent
-                and ev.get("room") == room
-                and ev.get("action") == opposite
-                and not ev.get("reversed", False)
-            ):
-                # Mark the prior event as reversed
-                ev["reversed"] = True
-                lines[i] = json.dumps(ev) + "\n"
-                # Mark the current (last) event as reversed too
-                try:
-                    last_ev = json.loads(lines[last_idx].strip())
-                    last_ev["reversed"] = True
-                    lines[last_idx] = json.dumps(last_ev) + "\n"
-                except (json.JSONDecodeError, KeyError):
-                    pass
-                changed = True
-                break
-        except (json.JSONDecodeError, KeyError, ValueError):
+    for rid in (prior[0], row_id):
+        body = conn.execute("SELECT body FROM events WHERE id = ?", (rid,)).fetchone()
+        ev = _decode(body[0]) if body else None
+        if ev is None:
             continue
-
-    if changed:
-        try:
-            with open(EVENTS_FILE, "w", encoding="utf-8") as f:
-                f.writelines(lines)
-        except OSError:
-            pass
+        ev["reversed"] = True
+        conn.execute(
+            "UPDATE events SET reversed = 1, body = ?, seq = ? WHERE id = ?",
+            (json.dumps(ev), _next_seq(conn), rid),
+        )
 
 
 def _opposite_action(action: str) -> str | None:
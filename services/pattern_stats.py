@@ -0,0 +1,327 @@
+"""
+Sufficient statistics for the pattern detector.
+
+pattern_detector used to rebuild every time-based bucket and every sequence
+pair from the whole lookback window on each run — O(window) parsing plus an
+O(window × gap) pair scan, however few events had arrived since. The
+statistics below are exactly what the candidate derivation reads, kept per
+calendar day so they can be aged out:
+
+  time   {intent|room|action: {date: [[ts, entity_id], …]}}
+  pairs  {a_intent:room:action→b_intent:room:action:
+              {date: [[a_ts, b_ts, a_entity_id, b_entity_id], …]}}
+  tail   the last `gap_s` of ingested events, to pair with the next arrivals
+
+Every occurrence is kept, timestamps to the second, so the detector sees the
+same occurrence tuples the old full rescan built — counts alone (or a day's
+first/last time) would shift cluster means, last_seen and entity pairing.
+
+advance() folds in only the event-store rows written since the stored
+checkpoint, drops days that left the lookback, and returns the bucket / pair
+keys whose statistics changed so the detector re-derives just those
+candidates. Rows younger than SETTLE_S wait in `pending` for the next run:
+reversal marking can still rewrite them, and the tail pairing assumes
+arrivals in time order. A row rewritten after it was folded in (which
+settling rules out in practice) forces a rebuild from the store.
+
+verify() recomputes the statistics from the store and reports any bucket or
+pair where the incrementally maintained copy disagrees.
+"""
+from __future__ import annotations
+
+import json
+import threading
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from services import pattern_logger
+
+STATS_FILE = Path("user_files/pattern_stats.json")
+
+_VERSION = 2
+
+SETTLE_S = pattern_logger._REVERSAL_WINDOW_SECONDS + 60
+
+_lock = threading.Lock()
+
+
+# ---------------------------------------------------------------------------
+# Keys
+# ---------------------------------------------------------------------------
+
+def usable(ev: dict) -> bool:
+    """Only successfully executed, automatable, non-reversed actions count."""
+    return (
+        ev.get("result") == "ok"
+        and ev.get("automatable", True)
+        and not ev.get("reversed", False)
+    )
+
+
+def time_key(ev: dict) -> str:
+    return f"{ev['intent']}|{ev.get('room') or 'global'}|{ev.get('action') or ''}"
+
+
+def _pair_key(a: list, b: list) -> str:
+    return (
+        f"{a[3]}:{a[4] or 'global'}:{a[5] or ''}"
+        "→"
+        f"{b[3]}:{b[4] or 'global'}:{b[5] or ''}"
+    )
+
+
+# ---------------------------------------------------------------------------
+# Folding events in / ageing them out
+# ---------------------------------------------------------------------------
+
+def empty(lookback_days: int, gap_s: int) -> dict:
+    return {
+        "version": _VERSION,
+        "db": str(pattern_logger.EVENTS_DB),
+        "lookback_days": lookback_days,
+        "gap_s": gap_s,
+        "checkpoint": 0,
+        "max_row_id": 0,
+        "horizon": 0.0,
+        "pending": {},
+        "pruned_before": "",
+        "derived_on": "",
+        "time": {},
+        "pairs": {},
+        "tail": [],
+    }
+
+
+def _cutoff_date(lookback_days: int, now: datetime) -> str:
+    return (now - timedelta(days=lookback_days)).strftime("%Y-%m-%d")
+
+
+def ingest(
+    stats: dict,
+    rows: list[tuple[int, int, dict]],
+    *,
+    horizon: float,
+    cutoff_date: str,
+) -> tuple[set[str], set[str], bool]:
+    """Fold `rows` ((row_id, seq, event) in seq order) into `stats`.
+
+    Rows newer than `horizon` (epoch seconds) wait in stats["pending"]; a
+    later rewrite of a pending row replaces it there. Ready rows are folded
+    in time order. Returns (changed time keys, changed pair keys,
+    rewrite_seen) — rewrite_seen means a row already folded in came back
+    rewritten and the statistics need a rebuild.
+    """
+    pending: dict[str, dict] = stats["pending"]
+    rewrite_seen = False
+    for row_id, seq, ev in rows:
+        stats["checkpoint"] = max(stats["checkpoint"], seq)
+        key = str(row_id)
+        if key in pending or row_id > stats["max_row_id"]:
+            pending[key] = ev
+            stats["max_row_id"] = max(stats["max_row_id"], row_id)
+        else:
+            rewrite_seen = True
+
+    ready: list[tuple[float, int, datetime, dict]] = []
+    for key, ev in list(pending.items()):
+        try:
+            ts = datetime.fromisoformat(ev["ts"])
+            ev["intent"]
+        except (KeyError, TypeError, ValueError):
+            del pending[key]
+            continue
+        if ts.timestamp() <= horizon:
+            ready.append((ts.timestamp(), int(key), ts, ev))
+            del pending[key]
+    ready.sort(key=lambda r: (r[0], r[1]))
+    stats["horizon"] = horizon
+
+    time_keys: set[str] = set()
+    pair_keys: set[str] = set()
+    gap_s = stats["gap_s"]
+    tail: list[list] = stats["tail"]
+
+    for epoch, row_id, ts, ev in ready:
+        date = ts.strftime("%Y-%m-%d")
+        if not usable(ev) or date < cutoff_date:
+            continue
+
+        # Time-of-day occurrences
+        tkey = time_key(ev)
+        ts_str = ts.isoformat(timespec="seconds")
+        stats["time"].setdefault(tkey, {}).setdefault(date, []).append(
+            [ts_str, ev.get("entity_id")])
+        time_keys.add(tkey)
+
+        # Sequence co-occurrence against the recent tail
+        rec = [epoch, row_id, ts_str, ev["intent"],
+               ev.get("room"), ev.get("action"), ev.get("entity_id")]
+        for a in tail:
+            if epoch - a[0] > gap_s:
+                continue
+            if a[3] == rec[3] and a[4] == rec[4]:
+                continue
+            pkey = _pair_key(a, rec)
+            a_date = a[2][:10]
+            if a_date < cutoff_date:
+                continue
+            stats["pairs"].setdefault(pkey, {}).setdefault(a_date, []).append(
+                [a[2], rec[2], a[6], rec[6]])
+            pair_keys.add(pkey)
+
+        tail.append(rec)
+        tail[:] = [r for r in tail if r[0] >= epoch - gap_s]
+
+    return time_keys, pair_keys, rewrite_seen
+
+
+def prune(stats: dict, cutoff_date: str) -> tuple[set[str], set[str]]:
+    """Drop days older than `cutoff_date`; return the keys that lost data."""
+    if stats.get("pruned_before") == cutoff_date:
+        return set(), set()
+    changed: list[set[str]] = []
+    for section in ("time", "pairs"):
+        keys: set[str] = set()
+        table = stats[section]
+        for key in list(table):
+            days = table[key]
+            old = [d for d in days if d < cutoff_date]
+            if not old:
+                continue
+            for d in old:
+                del days[d]
+            keys.add(key)
+            if not days:
+                del table[key]
+        changed.append(keys)
+    stats["pruned_before"] = cutoff_date
+    return changed[0], changed[1]
+
+
+def rebuild(lookback_days: int, gap_s: int, *, horizon: float,
+            now: datetime, upto_seq: int | None = None) -> dict:
+    """Statistics computed from scratch over the event store."""
+    stats = empty(lookback_days, gap_s)
+    cutoff = _cutoff_date(lookback_days, now)
+    rows, _ = pattern_logger.events_since(
+        0, since_epoch=(now - timedelta(days=lookback_days + 1)).timestamp()
+    )
+    if upto_seq is not None:
+        rows = [r for r in rows if r[1] <= upto_seq]
+    ingest(stats, rows, horizon=horizon, cutoff_date=cutoff)
+    stats["checkpoint"] = max(stats["checkpoint"], upto_seq or 0)
+    prune(stats, cutoff)
+    return stats
+
+
+def from_events(events: list[dict], lookback_days: int, gap_s: int,
+                now: datetime | None = None) -> dict:
+    """Statistics over an explicit event list (not persisted)."""
+    now = now or datetime.now()
+    stats = empty(lookback_days, gap_s)
+    ordered = sorted(
+        (ev for ev in events if isinstance(ev.get("ts"), str)), key=lambda e: e["ts"]
+    )
+    rows = [(i + 1, i + 1, ev) for i, ev in enumerate(ordered)]
+    cutoff = _cutoff_date(lookback_days, now)
+    ingest(stats, rows, horizon=float("inf"), cutoff_date=cutoff)
+    prune(stats, cutoff)
+    return stats
+
+
+def advance(lookback_days: int, gap_s: int,
+            now: datetime | None = None) -> tuple[dict, set[str], set[str]]:
+    """Bring the persisted statistics up to date with the event store.
+
+    Returns (stats, changed time keys, changed pair keys). On the first run
+    of a calendar day every key is reported changed, so candidates whose
+    evidence ages by date alone are re-derived once a day.
+    """
+    now = now or datetime.now()
+    horizon = now.timestamp() - SETTLE_S
+    cutoff = _cutoff_date(lookback_days, now)
+    with _lock:
+        stats = load()
+        fresh = (
+            stats is None
+            or stats.get("version") != _VERSION
+            or stats.get("db") != str(pattern_logger.EVENTS_DB)
+            or stats.get("lookback_days") != lookback_days
+            or stats.get("gap_s") != gap_s
+            or pattern_logger.latest_seq() < stats.get("checkpoint", 0)
+        )
+        if fresh:
+            stats = rebuild(lookback_days, gap_s, horizon=horizon, now=now)
+            time_keys, pair_keys = set(stats["time"]), set(stats["pairs"])
+        else:
+            before = (stats["checkpoint"], stats["pruned_before"])
+            rows, _ = pattern_logger.events_since(stats["checkpoint"])
+            time_keys, pair_keys, rewrite_seen = ingest(
+                stats, rows, horizon=horizon, cutoff_date=cutoff
+            )
+            if rewrite_seen:
+                stats = rebuild(lookback_days, gap_s, horizon=horizon, now=now)
+                time_keys, pair_keys = set(stats["time"]), set(stats["pairs"])
+                fresh = True
+            else:
+                pruned_t, pruned_p = prune(stats, cutoff)
+                time_keys |= pruned_t
+                pair_keys |= pruned_p
+                fresh = before != (stats["checkpoint"], stats["pruned_before"])
+
+        today = now.strftime("%Y-%m-%d")
+        if stats.get("derived_on") != today:
+            stats["derived_on"] = today
+            time_keys, pair_keys = set(stats["time"]), set(stats["pairs"])
+            fresh = True
+        if fresh:
+            save(stats)
+        return stats, time_keys, pair_keys
+
+
+def verify(now: datetime | None = None) -> dict:
+    """Compare the persisted statistics with a recompute over the same rows."""
+    now = now or datetime.now()
+    with _lock:
+        stats = load()
+        if stats is None:
+            return {"ok": True, "checkpoint": 0, "time_mismatch": [], "pair_mismatch": []}
+        full = rebuild(stats["lookback_days"], stats["gap_s"], horizon=stats["horizon"],
+                       now=now, upto_seq=stats["checkpoint"])
+    prune(stats, _cutoff_date(stats["lookback_days"], now))
+    time_bad = sorted(k for k in set(stats["time"]) | set(full["time"])
+                      if stats["time"].get(k) != full["time"].get(k))
+    pair_bad = sorted(k for k in set(stats["pairs"]) | set(full["pairs"])
+                      if stats["pairs"].get(k) != full["pairs"].get(k))
+    return {
+        "ok": not time_bad and not pair_bad,
+        "checkpoint": stats["checkpoint"],
+        "time_buckets": len(stats["time"]),
+        "pairs": len(stats["pairs"]),
+        "time_mismatch": time_bad,
+        "pair_mismatch": pair_bad,
+    }
+
+
+# ---------------------------------------------------------------------------
+# Persistence
+# ---------------------------------------------------------------------------
+
+def load() -> dict | None:
+    try:
+        with open(STATS_FILE, encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def save(stats: dict) -> None:
+    try:
+        STATS_FILE.parent.mkdir(parents=True, exist_ok=True)
+        tmp = STATS_FILE.with_suffix(STATS_FILE.suffix + ".tmp")
+        tmp.write_text(json.dumps(stats, separators=(",", ":"), ensure_ascii=False),
+                       encoding="utf-8")
+        tmp.replace(STATS_FILE)
+    except OSError:
+        pass
@@ -0,0 +1,144 @@
+"""Decision cache for the PEP — memoized ``authorize`` results.
+
+A burst like "turn off everything" runs dozens of authorize calls for the same
+subject within milliseconds; each one re-expanded principals, gathered grants
+and ran selector matching. A decision is a pure function of:
+
+* the policy state → entries are keyed to one policy ``seq`` and the whole
+  cache is dropped when the log grows;
+* the subject's principal expansion → keyed by the context values the group
+  predicates read;
+* the context values the subject's grant conditions read (plus ``emergency``,
+  which the engine checks itself) — found with
+  :func:`conditions.referenced_vars`, so unrelated context churn (a new
+  request id, a different presence list nobody conditions on) still hits;
+* ``now`` — only through grant expiry. Each entry records the window
+  ``[valid_from, valid_until)`` in which no grant it saw changes temporal
+  validity, and is only served for a ``now`` inside it.
+
+Traces are cached with the decision; within an entry's window a fresh decide
+would produce the same trace, and callers wanting to be sure can bypass the
+cache (``PermissionService.authorize(use_cache=False)``, used by /explain).
+"""
+from __future__ import annotations
+
+import json
+import math
+from collections import OrderedDict
+from typing import Any, Iterable, Optional
+
+from .conditions import referenced_vars
+from .context import Context
+from .grants import Grant
+from .types import Decision
+
+# Bounded: a home has a handful of subjects × capabilities × devices in play.
+MAX_ENTRIES = 4096
+
+_ENGINE_VARS = frozenset({"emergency"})
+
+
+def context_key(ctx: Context, paths: tuple[str, ...]) -> tuple:
+    """Hashable projection of ``ctx`` onto ``paths``."""
+    out = []
+    for path in paths:
+        val = ctx.resolve(path)
+        if isinstance(val, (dict, list)):
+            val = json.dumps(val, sort_keys=True, default=str)
+        out.append(val)
+    return tuple(out)
+
+
+def condition_vars(conditions: Iterable[Any]) -> tuple[str, ...]:
+    paths: set[str] = set()
+    for cond in conditions:
+        if cond is not None:
+            paths |= referenced_vars(cond)
+    return tuple(sorted(paths))
+
+
+def temporal_window(grants: Iterable[Grant], now: Optional[float]) -> tuple[float, float]:
+    """The interval around ``now`` in which none of ``grants`` expires or
+    un-expires. ``now=None`` skips time checks, so it never changes."""
+    lo, hi = -math.inf, math.inf
+    if now is None:
+        return lo, hi
+    for g in grants:
+        exp = g.expires_at
+        if exp is None:
+            continue
+        if exp <= now:
+            lo = max(lo, exp)
+        else:
+            hi = min(hi, exp)
+    return lo, hi
+
+
+def copy_decision(d: Decision) -> Decision:
+    return Decision(d.effect, obligations=list(d.obligations), reason=d.reason,
+                    matched_grant_ids=list(d.matched_grant_ids), trace=list(d.trace))
+
+
+class DecisionCache:
+    def __init__(self, max_entries: int = MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.seq = -1
+        # (subject_ref, group-context key) → (principals, grants, cond paths)
+        self._expansions: OrderedDict[tuple, tuple] = OrderedDict()
+        # (expansion key, action, resource, cond-context key, timed)
+        #   → (valid_from, valid_until, Decision)
+        self._decisions: OrderedDict[tuple, tuple] = OrderedDict()
+        self.stats = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0,
+                      "invalidations": 0}
+
+    def reset_for(self, seq: int) -> None:
+        if seq == self.seq:
+            return
+        if self._expansions or self._decisions:
+            self.stats["invalidations"] += 1
+        self._expansions.clear()
+        self._decisions.clear()
+        self.seq = seq
+
+    def expansion(self, key: tuple) -> tuple | None:
+        hit = self._expansions.get(key)
+        if hit is not None:
+            self._expansions.move_to_end(key)
+        return hit
+
+    def put_expansion(self, key: tuple, principals, grants: list[Grant]) -> tuple:
+        entry = (principals, grants,
+                 tuple(sorted(set(condition_vars(g.condition for g in grants)) | _ENGINE_VARS)))
+        self._expansions[key] = entry
+        self._bound(self._expansions)
+        return entry
+
+    def get(self, key: tuple, now: Optional[float]) -> Decision | None:
+        entry = self._decisions.get(key)
+        if entry is None:
+            self.stats["misses"] += 1
+            return None
+        valid_from, valid_until, decision = entry
+        if now is not None and not (valid_from <= now < valid_until):
+            del self._decisions[key]
+            self.stats["expired"] += 1
+            self.stats["misses"] += 1
+            return None
+        self._decisions.move_to_end(key)
+        self.stats["hits"] += 1
+        return decision
+
+    def put(self, key: tuple, decision: Decision, window: tuple[float, float]) -> None:
+        self._decisions[key] = (window[0], window[1], decision)
+        self._bound(self._decisions)
+
+    def _bound(self, table: OrderedDict) -> None:
+        while len(table) > self.max_entries:
+            table.popitem(last=False)
+            self.stats["evictions"] += 1
+
+    def snapshot(self) -> dict:
+        total = self.stats["hits"] + self.stats["misses"]
+        return {**self.stats, "seq": self.seq, "entries": len(self._decisions),
+                "expansions": len(self._expansions),
+                "hit_rate": round(self.stats["hits"] / total, 3) if total else None}
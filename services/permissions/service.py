@@ -7,25 +7,47 @@ log into two things:
   ``delegate`` …) that append policy events; and
 * **``authorize``** — the Policy Enforcement Point entry: expand the subject to
   its principals, load their grants, decide, and record an audit event.
-
-The read-model is cached and only rebuilt when the event log grows (``latest_seq``
-changes), so steady-state authorize calls don't replay the log every time.
+  Decisions are memoized per policy seq (see ``decision_cache``); audit
+  recording still happens on every call.
+
+The read-model is built once (newest snapshot + the events after it) and then
+kept current by applying only new events as they are appended. "Has the log
+grown?" is answered by the store's in-process head seq, so a steady-state
+authorize never touches SQLite. Every ``_SNAPSHOT_EVERY`` applied events the
+model is checkpointed back to the store so the next process starts near the
+head instead of at event 1. Writes made by another process are picked up by
+:meth:`PermissionService.refresh`.
 """
 from __future__ import annotations
 
+import sqlite3
+import threading
 from typing import Optional
 
 from .audit import AuditLog
 from .capabilities import CapabilityRegistry, build_default_registry
 from .context import Context
+from .decision_cache import (
+    DecisionCache, condition_vars, context_key, copy_decision, temporal_window,
+)
 from .delegation import validate_delegation
 from .engine import Engine
 from .grants import Grant
 from .groups import Group, PrincipalResolver, default_groups
 from .roles import expand_role
-from .store import PolicyState, PolicyStore, build_state
+from .store import PolicyState, PolicyStore, restore_state
 from .types import ActorKind, Decision, Principal, RiskTier
 
+# Applied events between snapshots written back to the store.
+_SNAPSHOT_EVERY = 500
+
+# Event types whose effect reaches beyond PolicyState's own dicts: the Engine
+# holds a ResourceGraph built from spaces/devices, the resolver a copy of the
+# group list. (Relationships are shared by reference and need nothing.)
+_RESOURCE_EVENTS = frozenset({"space_added", "space_removed",
+                              "device_added", "device_removed"})
+_GROUP_EVENTS = frozenset({"group_upserted", "group_removed"})
+
 
 class PermissionService:
     def __init__(self, store: PolicyStore | None = None, audit: AuditLog | None = None,
@@ -34,26 +56,66 @@ class PermissionService:
         self.audit = audit or AuditLog()
         self.capabilities = capabilities or build_default_registry()
         self._cache_seq = -1
+        self._snapshot_seq = 0
         self._state: PolicyState | None = None
         self._engine: Engine | None = None
         self._resolver: PrincipalResolver | None = None
+        self._group_vars: tuple[str, ...] = ()
+        # Guards the live read model: incremental apply mutates it in place.
+        self._lock = threading.RLock()
+        self.decisions = DecisionCache()
 
     # ------------------------------------------------------------------
-    # Read-model (cached; rebuilt only when the log grows)
+    # Read-model (snapshot + replay, then incremental apply)
     # ------------------------------------------------------------------
     def _ensure(self) -> tuple[PolicyState, Engine, PrincipalResolver]:
-        seq = self.store.latest_seq()
-        if seq != self._cache_seq or self._state is None:
-            state = build_state(self.store)
-            engine = Engine(self.capabilities, state.to_resource_graph())
-            # Custom groups override built-ins of the same id.
-            merged: dict[str, Group] = {g.id: g for g in default_groups()}
-            for g in state.groups_list():
-                merged[g.id] = g
-            resolver = PrincipalResolver(list(merged.values()), state.relationships)
-            self._state, self._engine, self._resolver = state, engine, resolver
-            self._cache_seq = seq
-        return self._state, self._engine, self._resolver
+        head = self.store.head_seq()
+        if self._state is not None and head == self._cache_seq:
+            return self._state, self._engine, self._resolver
+        with self._lock:
+            if self._state is None or head < self._cache_seq:
+                state, seq, self._snapshot_seq = restore_state(self.store)
+                self._state = state
+                self._engine = self._build_engine(state)
+                self._resolver = self._build_resolver(state)
+                self._cache_seq = seq
+            elif head > self._cache_seq:
+                touched: set[str] = set()
+                for ev in self.store.events(after_seq=self._cache_seq):
+                    self._state.apply(ev)
+                    touched.add(ev["event_type"])
+                    self._cache_seq = ev["seq"]
+                if touched & _RESOURCE_EVENTS:
+                    self._engine = self._build_engine(self._state)
+                if touched & _GROUP_EVENTS:
+                    self._resolver = self._build_resolver(self._state)
+            if self._cache_seq - self._snapshot_seq >= _SNAPSHOT_EVERY:
+                self._save_snapshot()
+            return self._state, self._engine, self._resolver
+
+    def _build_engine(self, state: PolicyState) -> Engine:
+        return Engine(self.capabilities, state.to_resource_graph())
+
+    def _build_resolver(self, state: PolicyState) -> PrincipalResolver:
+        # Custom groups override built-ins of the same id.
+        merged: dict[str, Group] = {g.id: g for g in default_groups()}
+        for g in state.groups_list():
+            merged[g.id] = g
+        self._group_vars = condition_vars(g.predicate for g in merged.values())
+        return PrincipalResolver(list(merged.values()), state.relationships)
+
+    def _save_snapshot(self) -> None:
+        try:
+            self.store.save_snapshot(self._cache_seq, self._state.to_snapshot())
+        except sqlite3.Error:
+            return  # a cache write; the log is still the truth
+        self._snapshot_seq = self._cache_seq
+
+    def refresh(self) -> int:
+        """Catch up with events appended outside this process."""
+        self.store.sync_head()
+        self._ensure()
+        return self._cache_seq
 
     def state(self) -> PolicyState:
         return self._ensure()[0]
@@ -63,19 +125,55 @@ class PermissionService:
     # ------------------------------------------------------------------
     def authorize(self, *, subject, action: str, resource: str,
                   context: Context | dict | None = None, now: Optional[float] = None,
-                  record: bool = True, correlation_id: str | None = None) -> Decision:
-        state, engine, resolver = self._ensure()
+                  record: bool = True, correlation_id: str | None = None,
+                  use_cache: bool = True) -> Decision:
+        """Decide ``subject`` × ``action`` × ``resource``.
+
+        ``use_cache=False`` re-runs the engine from scratch (the explain path),
+        neither reading nor filling the decision cache.
+        """
         subject_p = subject if isinstance(subject, Principal) else Principal.parse(subject)
-        ctx = self._build_context(subject_p, context, state)
-        principals = resolver.expand(subject_p, ctx)
-        grants = state.grants_for({p.ref for p in principals})
+        with self._lock:
+            state, engine, resolver = self._ensure()
+            ctx = self._build_context(subject_p, context, state)
+            if use_cache:
+                decision = self._decide_cached(subject_p, action, resource, ctx, now,
+                                               state, engine, resolver)
+            else:
+                principals = resolver.expand(subject_p, ctx)
+                grants = state.grants_for({p.ref for p in principals})
+                decision = engine.decide(
+                    subject_principals=principals, action=action, resource=resource,
+                    grants=grants, context=ctx, now=now)
+        if record:
+            self._maybe_audit(subject_p, action, resource, ctx, decision, correlation_id)
+        return decision
+
+    def _decide_cached(self, subject_p, action, resource, ctx, now,
+                       state, engine, resolver) -> Decision:
+        cache = self.decisions
+        cache.reset_for(self._cache_seq)
+        exp_key = (subject_p.ref, context_key(ctx, self._group_vars))
+        expansion = cache.expansion(exp_key)
+        if expansion is None:
+            principals = resolver.expand(subject_p, ctx)
+            grants = state.grants_for({p.ref for p in principals})
+            expansion = cache.put_expansion(exp_key, principals, grants)
+        principals, grants, cond_vars = expansion
+        key = (exp_key, action, resource, context_key(ctx, cond_vars), now is None)
+        hit = cache.get(key, now)
+        if hit is not None:
+            return copy_decision(hit)
         decision = engine.decide(
             subject_principals=principals, action=action, resource=resource,
             grants=grants, context=ctx, now=now)
-        if record:
-            self._maybe_audit(subject_p, action, resource, ctx, decision, correlation_id)
+        cache.put(key, copy_decision(decision), temporal_window(grants, now))
         return decision
 
+    def decision_cache_stats(self) -> dict:
+        with self._lock:
+            return self.decisions.snapshot()
+
     def _maybe_audit(self, subject, action, resource, ctx, decision, correlation_id):
         cap = self.capabilities.resolve(action)
         # Record protected actions (risk >= MEDIUM), any denial-by-grant, and
@@ -13,12 +13,22 @@ Falls out for free:
 * **provenance** — every grant traces to the event (and actor) that issued it.
 * **revoke cascade** — revoking a delegation root removes its whole subtree.
 
+Replaying from event 1 gets slower as the log grows, so the read model is also
+checkpointed: ``policy_snapshots`` holds serialized :class:`PolicyState` copies
+tagged with the seq they reflect, and :func:`restore_state` loads the newest
+usable one and replays only the events after it. Snapshots are a cache — they
+carry a fingerprint of the snapshot format + preset role definitions (role
+bindings are expanded to grants at apply time) and are ignored when it doesn't
+match, so a code change can never resurrect stale state. :func:`build_state`
+stays a plain replay and is the reference the snapshots are checked against.
+
 Storage conventions mirror ``services.auth_db``: SQLite, sync API (policy writes
 are not perf-sensitive), a git-ignored file under ``user_files/``. The store is a
 class (not module globals) so tests inject a temp path directly.
 """
 from __future__ import annotations
 
+import hashlib
 import json
 import os
 import sqlite3
@@ -47,8 +57,32 @@ CREATE TABLE IF NOT EXISTS policy_events (
     correlation_id TEXT
 );
 CREATE INDEX IF NOT EXISTS idx_policy_events_type ON policy_events(event_type);
+CREATE TABLE IF NOT EXISTS policy_snapshots (
+    seq         INTEGER PRIMARY KEY,
+    ts          TEXT NOT NULL,
+    fingerprint TEXT NOT NULL,
+    state       TEXT NOT NULL
+);
 """
 
+# Bump when PolicyState.to_snapshot()'s shape changes.
+_SNAPSHOT_FORMAT = 1
+# Older snapshots are only useful for point-in-time restores; keep a few.
+_SNAPSHOTS_KEPT = 3
+
+# In-process write notification: db path → highest seq appended through any
+# PolicyStore on that path in this process (or found on disk when the first
+# store opened it). Read-model caches compare against this instead of asking
+# SQLite for MAX(seq) on every decision.
+_head_seqs: dict[str, int] = {}
+_head_lock = threading.Lock()
+
+
+def _note_head(key: str, seq: int) -> None:
+    with _head_lock:
+        if seq > _head_seqs.get(key, 0):
+            _head_seqs[key] = seq
+
 
 def _now() -> str:
     return datetime.now(timezone.utc).isoformat()
@@ -61,8 +95,10 @@ def _now() -> str:
 class PolicyStore:
     def __init__(self, db_path: str | None = None) -> None:
         self.db_path = db_path or _DEFAULT_DB
+        self._key = os.path.abspath(self.db_path)
         self._lock = threading.Lock()
         self._init()
+        _note_head(self._key, self.latest_seq())
 
     def _connect(self) -> sqlite3.Connection:
         os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
@@ -84,17 +120,20 @@ class PolicyStore:
                 (_now(), event_type, json.dumps(payload), actor, correlation_id),
             )
             db.commit()
-            return cur.lastrowid
+            seq = cur.lastrowid
+        _note_head(self._key, seq)
+        return seq
 
-    def events(self, up_to_seq: Optional[int] = None) -> list[dict]:
+    def events(self, up_to_seq: Optional[int] = None, after_seq: int = 0) -> list[dict]:
         with self._connect() as db:
             if up_to_seq is None:
                 rows = db.execute(
-                    "SELECT * FROM policy_events ORDER BY seq").fetchall()
+                    "SELECT * FROM policy_events WHERE seq > ? ORDER BY seq",
+                    (after_seq,)).fetchall()
             else:
                 rows = db.execute(
-                    "SELECT * FROM policy_events WHERE seq <= ? ORDER BY seq",
-                    (up_to_seq,)).fetchall()
+                    "SELECT * FROM policy_events WHERE seq > ? AND seq <= ? ORDER BY seq",
+                    (after_seq, up_to_seq)).fetchall()
             out = []
             for r in rows:
                 d = dict(r)
@@ -107,6 +146,66 @@ class PolicyStore:
             row = db.execute("SELECT MAX(seq) AS m FROM policy_events").fetchone()
             return row["m"] or 0
 
+    def head_seq(self) -> int:
+        """Highest seq known to this process — memory only, no SQLite."""
+        return _head_seqs.get(self._key, 0)
+
+    def sync_head(self) -> int:
+        """Pick up events appended by another process (scripts, a second
+        worker); in-process appends are seen without this."""
+        _note_head(self._key, self.latest_seq())
+        return self.head_seq()
+
+    # -- snapshots -------------------------------------------------------
+    def save_snapshot(self, seq: int, snapshot: dict) -> None:
+        blob = json.dumps(snapshot, separators=(",", ":"))
+        with self._lock, self._connect() as db:
+            db.execute(
+                "INSERT OR REPLACE INTO policy_snapshots (seq, ts, fingerprint, state)"
+                " VALUES (?, ?, ?, ?)",
+                (seq, _now(), snapshot_fingerprint(), blob),
+            )
+            db.execute(
+                "DELETE FROM policy_snapshots WHERE seq NOT IN"
+                " (SELECT seq FROM policy_snapshots ORDER BY seq DESC LIMIT ?)",
+                (_SNAPSHOTS_KEPT,),
+            )
+            db.commit()
+
+    def load_snapshot(self, up_to_seq: Optional[int] = None) -> tuple[int, dict] | None:
+        """Newest snapshot at or before ``up_to_seq`` that this code can use."""
+        with self._connect() as db:
+            row = db.execute(
+                "SELECT seq, state FROM policy_snapshots"
+                " WHERE fingerprint = ? AND seq <= ? ORDER BY seq DESC LIMIT 1",
+                (snapshot_fingerprint(),
+                 up_to_seq if up_to_seq is not None else self.latest_seq()),
+            ).fetchone()
+        if row is None:
+            return None
+        try:
+            return row["seq"], json.loads(row["state"])
+        except ValueError:
+            return None
+
+    def snapshot_seqs(self) -> list[int]:
+        with self._connect() as db:
+            return [r["seq"] for r in db.execute(
+                "SELECT seq FROM policy_snapshots ORDER BY seq").fetchall()]
+
+
+_fingerprint: str | None = None
+
+
+def snapshot_fingerprint() -> str:
+    global _fingerprint
+    if _fingerprint is None:
+        from .seeds import PRESET_ROLES
+        blob = json.dumps({"format": _SNAPSHOT_FORMAT, "roles": PRESET_ROLES},
+                          sort_keys=True, default=str)
+        _fingerprint = hashlib.sha256(blob.encode("utf-8")).hexdigest()[:16]
+    return _fingerprint
+
 
 # ---------------------------------------------------------------------------
 # The read model — rebuilt by replaying events
@@ -124,6 +223,12 @@ class PolicyState:
         self.relationships = RelationshipGraph()
         self.bindings: dict[str, dict] = {}     # binding_id -> meta
         self.grants: dict[str, Grant] = {}      # grant_id -> Grant
+        # principal ref -> {grant_id: Grant}; grants_for() reads this instead
+        # of scanning every grant. _grant_order keeps self.grants' iteration
+        # order so indexed lookups list grants exactly as the scan did.
+        self._grants_by_principal: dict[str, dict[str, Grant]] = {}
+        self._grant_order: dict[str, int] = {}
+        self._next_order = 0
 
     # -- replay ----------------------------------------------------------
     def apply(self, event: dict) -> None:
@@ -163,8 +268,8 @@ class PolicyState:
         ref = p["ref"]
         self.principals.pop(ref, None)
         # Cascade: drop that principal's grants + identities + relationships.
-        for gid in [g for g, gr in self.grants.items() if gr.principal.ref == ref]:
-            self.grants.pop(gid, None)
+        for gid in list(self._grants_by_principal.get(ref, {})):
+            self._drop_grant(gid)
         for iid in [i for i, iv in self.identities.items() if iv.get("person_ref") == ref]:
             self.identities.pop(iid, None)
 
@@ -204,29 +309,90 @@ class PolicyState:
             scope_ref=p["scope"], binding_id=binding_id,
             condition=p.get("condition"), expires_at=p.get("expires_at"))
         for g in grants:
-            self.grants[g.id] = g
+            self._put_grant(g)
 
     def _on_role_unbound(self, p):
         binding_id = p["binding_id"]
         self.bindings.pop(binding_id, None)
         for gid in [g for g in self.grants if g.startswith(f"{binding_id}#")]:
-            self.grants.pop(gid, None)
+            self._drop_grant(gid)
 
     # grants
     def _on_grant_issued(self, p):
-        g = Grant.from_json(p)
-        self.grants[g.id] = g
+        self._put_grant(Grant.from_json(p))
 
     def _on_grant_revoked(self, p):
         gid = p.get("id")
         root = p.get("revoke_root")
         if gid:
-            self.grants.pop(gid, None)
+            self._drop_grant(gid)
         if root:
             # Cascade: remove the root and every grant delegated beneath it.
             for g in [g for g, gr in self.grants.items()
                       if gr.revoke_root == root or g == root]:
-                self.grants.pop(g, None)
+                self._drop_grant(g)
+
+    def _put_grant(self, g: Grant) -> None:
+        old = self.grants.get(g.id)
+        if old is None:
+            self._grant_order[g.id] = self._next_order
+            self._next_order += 1
+        elif old.principal.ref != g.principal.ref:
+            self._grants_by_principal.get(old.principal.ref, {}).pop(g.id, None)
+        self.grants[g.id] = g
+        self._grants_by_principal.setdefault(g.principal.ref, {})[g.id] = g
+
+    def _drop_grant(self, gid: str) -> None:
+        g = self.grants.pop(gid, None)
+        if g is None:
+            return
+        self._grant_order.pop(gid, None)
+        bucket = self._grants_by_principal.get(g.principal.ref)
+        if bucket is not None:
+            bucket.pop(gid, None)
+            if not bucket:
+                del self._grants_by_principal[g.principal.ref]
+
+    # -- snapshots -------------------------------------------------------
+    def to_snapshot(self) -> dict:
+        """JSON-safe copy of the whole read model. Lists keep insertion order
+        so a restored state iterates (and so breaks ties) like the replayed one."""
+        return {
+            "spaces": [{"id": s.id, "type": s.type, "parent_ids": list(s.parent_ids),
+                        "tags": sorted(s.tags), "attrs": s.attrs}
+                       for s in self.spaces.values()],
+            "devices": [{"id": d.id, "device_class": d.device_class, "space_id": d.space_id,
+                         "tags": sorted(d.tags), "attrs": d.attrs}
+                        for d in self.devices.values()],
+            "principals": self.principals,
+            "identities": self.identities,
+            "groups": [{"id": g.id, "kind": g.kind, "label": g.label,
+                        "members": list(g.members), "predicate": g.predicate}
+                       for g in self.groups.values()],
+            "relationships": [list(e) for e in self.relationships.all_edges()],
+            "bindings": self.bindings,
+            "grants": [g.to_json() for g in self.grants.values()],
+        }
+
+    @classmethod
+    def from_snapshot(cls, snap: dict) -> "PolicyState":
+        state = cls()
+        for p in snap.get("spaces", []):
+            state._on_space_added(p)
+        for p in snap.get("devices", []):
+            state._on_device_added(p)
+        state.principals = {ref: {"type": v["type"], "attrs": dict(v.get("attrs", {})),
+                                  "status": v.get("status", "active")}
+                            for ref, v in snap.get("principals", {}).items()}
+        state.identities = {iid: dict(v) for iid, v in snap.get("identities", {}).items()}
+        for p in snap.get("groups", []):
+            state._on_group_upserted(p)
+        for f, r, t in snap.get("relationships", []):
+            state.relationships.add(f, r, t)
+        state.bindings = dict(snap.get("bindings", {}))
+        for p in snap.get("grants", []):
+            state._put_grant(Grant.from_json(p))
+        return state
 
     # -- read helpers ----------------------------------------------------
     def to_resource_graph(self) -> ResourceGraph:
@@ -244,7 +410,10 @@ class PolicyState:
         return list(self.grants.values())
 
     def grants_for(self, principal_refs: set[str]) -> list[Grant]:
-        return [g for g in self.grants.values() if g.principal.ref in principal_refs]
+        found = [g for ref in principal_refs
+                 for g in self._grants_by_principal.get(ref, {}).values()]
+        found.sort(key=lambda g: self._grant_order[g.id])
+        return found
 
     def principal_attrs(self, ref: str) -> dict:
         p = self.principals.get(ref)
@@ -256,3 +425,23 @@ def build_state(store: PolicyStore, up_to_seq: Optional[int] = None) -> PolicySt
     for ev in store.events(up_to_seq=up_to_seq):
         state.apply(ev)
     return state
+
+
+def restore_state(store: PolicyStore,
+                  up_to_seq: Optional[int] = None) -> tuple[PolicyState, int, int]:
+    """Newest usable snapshot + replay of the events after it.
+
+    Returns ``(state, seq, snapshot_seq)`` — ``seq`` is the last event the
+    state reflects, ``snapshot_seq`` the snapshot it started from (0 = none).
+    """
+    snap = store.load_snapshot(up_to_seq)
+    if snap is None:
+        state, snap_seq = PolicyState(), 0
+    else:
+        snap_seq, data = snap
+        state = PolicyState.from_snapshot(data)
+    seq = snap_seq
+    for ev in store.events(up_to_seq=up_to_seq, after_seq=snap_seq):
+        state.apply(ev)
+        seq = ev["seq"]
+    return state, seq, snap_seq
@@ -39,6 +39,7 @@ from collections import deque
 from typing import Any, Optional
 
 from core.logger_module import log_error, log_info
+from services import state_dispatch
 
 _DISCOVERY_PREFIX = "homeassistant"
 AVAILABILITY_TOPIC = "ziggy/presence/availability"
@@ -212,6 +213,7 @@ def _rebuild_watched() -> None:
     for m in _rooms.values():
         s |= m.watches()
     _watched = frozenset(s)
+    state_dispatch.invalidate()
 
 
 def on_sensor_event(entity_id: str, new_state: str) -> None:
@@ -0,0 +1,275 @@
+"""
+Batched service-call executor.
+
+Whole-home actions ("Good night", turn-off-everything, scene-like automation
+runs, the fake-occupancy ticker) used to reach HA one service call per entity,
+each a REST round trip. HA's call_service accepts an entity list, so here:
+
+  * merge() groups calls with the same domain, service and service data into
+    one multi-entity call;
+  * execute_async() sends the groups as `call_service` commands on
+    ha_subscriber's already-authenticated WebSocket, at most `parallelism` in
+    flight, falling back to the pooled REST client (ha_client) when the socket
+    is down;
+  * every entity gets its own result, and the bookkeeping a single call does
+    still happens per entity — manual_overrides.register_ziggy_call before
+    the send, command-ledger intent via home_automation._service_ok after.
+
+Forty devices across two or three (domain, service, data) shapes go out in
+one round trip's worth of time.
+
+execute() is the sync facade for thread-based callers (home_automation's bulk
+helpers run under to_thread). Called on the subscriber's own loop thread it
+can't block on that loop, so it falls back to sync REST per group.
+
+Neither path uses the socket while ha_subscriber is dispatching an event
+(a state hook running an automation, say): the command's result would queue
+behind that dispatch, which is waiting for it. Those calls go over REST.
+
+Counters: stats(), surfaced on GET /api/debug/service-batch.
+"""
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import json
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Optional
+
+from core.logger_module import log_error
+from core.debug_bus import bus, BASIC, VERBOSE
+
+DEFAULT_PARALLELISM = 4
+DEFAULT_TIMEOUT = 10.0
+
+
+@dataclass(frozen=True)
+class ServiceCall:
+    """One entity's share of a service call. `data` excludes entity_id."""
+    domain: str
+    service: str
+    entity_id: str
+    data: dict = field(default_factory=dict)
+
+
+_lock = threading.Lock()
+_stats = {"batches": 0, "calls": 0, "groups": 0, "ws_calls": 0, "rest_calls": 0,
+          "failed_groups": 0, "loop_timeouts": 0, "ms_total": 0.0, "ms_max": 0.0}
+
+
+def merge(calls: list[ServiceCall]) -> list[tuple[str, str, dict, list[str]]]:
+    """Group compatible calls: [(domain, service, data, [entity_id, …])].
+
+    Groups keep the order of their first call; entities keep call order and
+    are de-duplicated within a group.
+    """
+    groups: dict[tuple[str, str, str], tuple[str, str, dict, list[str]]] = {}
+    for c in calls:
+        data = {k: v for k, v in (c.data or {}).items() if k != "entity_id"}
+        key = (c.domain, c.service, json.dumps(data, sort_keys=True, default=str))
+        group = groups.get(key)
+        if group is None:
+            groups[key] = (c.domain, c.service, data, [c.entity_id])
+        elif c.entity_id not in group[3]:
+            group[3].append(c.entity_id)
+    return list(groups.values())
+
+
+def _subscriber():
+    from services import ha_subscriber
+    return ha_subscriber
+
+
+async def _ws_call(domain: str, service: str, data: dict, entity_ids: list[str],
+                   timeout: float) -> Optional[dict]:
+    """One call_service over the subscriber's socket; None when it isn't up."""
+    sub = _subscriber()
+    loop = sub._ws_loop
+    if sub._ws is None or loop is None or not loop.is_running() or sub._dispatching.get():
+        return None
+    cmd = {"type": "call_service", "domain": domain, "service": service,
+           "service_data": data, "target": {"entity_id": entity_ids}}
+    try:
+        if asyncio.get_running_loop() is loop:
+            return await sub.send_command(cmd, timeout)
+        fut = asyncio.run_coroutine_threadsafe(sub.send_command(cmd, timeout), loop)
+        return await asyncio.wrap_future(fut)
+    except ConnectionError:
+        return None
+
+
+async def _call_group(domain: str, service: str, data: dict, entity_ids: list[str],
+                      origin: str, timeout: float) -> dict:
+    """Send one merged group; returns a call_service-shaped result dict."""
+    from services import ha_client, home_automation as ha
+    from services.manual_overrides import register_ziggy_call
+    for eid in entity_ids:
+        register_ziggy_call(eid)
+    payload = {**data, "entity_id": entity_ids}
+    bus.emit("ha", VERBOSE, "ha_service_call",
+             domain=domain, service=service, payload=payload, transport="ws")
+    t0 = time.perf_counter()
+
+    def _ms() -> float:
+        return round((time.perf_counter() - t0) * 1000, 1)
+
+    try:
+        msg = await _ws_call(domain, service, data, entity_ids, timeout)
+    except asyncio.TimeoutError:
+        with _lock:
+            _stats["ws_calls"] += 1
+        return ha._service_timeout(domain, service, payload, _ms())
+    except Exception as e:
+        return ha._service_exception(domain, service, e, _ms())
+    if msg is None:
+        with _lock:
+            _stats["rest_calls"] += 1
+        return await ha_client.call_service_async(domain, service, payload,
+                                                  origin=origin, timeout=timeout)
+    with _lock:
+        _stats["ws_calls"] += 1
+    if msg.get("success"):
+        return ha._service_ok(domain, service, payload, origin, msg.get("result"), _ms())
+    err = msg.get("error") or {}
+    return _ws_error(domain, service, err.get("code", "unknown_error"),
+                     err.get("message", ""), _ms())
+
+
+def _ws_error(domain: str, service: str, code: str, message: str,
+              duration_ms: float) -> dict:
+    log_error(f"[HA] {domain}.{service} failed over WS: {code} - {message}")
+    bus.emit("ha", BASIC, "ha_service_error",
+             domain=domain, service=service, duration_ms=duration_ms,
+             code=code, body=message[:200],
+             result="error",
+             suggestion=f"Check HA logs for {domain}.{service} errors.")
+    return {"ok": False, "message": f"HA {domain}.{service} error {code}: {message}"}
+
+
+def _summarise(groups: list, results: list[dict], t0: float) -> dict:
+    per_entity: dict[str, dict] = {}
+    failed = 0
+    for (_, _, _, entity_ids), r in zip(groups, results):
+        failed += not r.get("ok")
+        for eid in entity_ids:
+            per_entity[eid] = {"ok": bool(r.get("ok")), "message": r.get("message", "")}
+    ms = (time.perf_counter() - t0) * 1000
+    with _lock:
+        _stats["groups"] += len(groups)
+        _stats["failed_groups"] += failed
+        _stats["ms_total"] += ms
+        _stats["ms_max"] = max(_stats["ms_max"], ms)
+    first_error = next((r.get("message", "") for r in results if not r.get("ok")), "")
+    return {
+        "ok": failed == 0,
+        "message": first_error or f"{len(per_entity)} entities in {len(groups)} call(s)",
+        "results": per_entity,
+        "groups": len(groups),
+    }
+
+
+async def execute_async(calls: list[ServiceCall], origin: str = "ziggy",
+                        parallelism: int = DEFAULT_PARALLELISM,
+                        timeout: float = DEFAULT_TIMEOUT,
+                        _claims: Optional[dict[int, str]] = None) -> dict:
+    """Run `calls` as merged multi-entity service calls.
+
+    Returns {"ok", "message", "results": {entity_id: {"ok", "message"}},
+    "groups"}; "message" is the first failure's, if any.
+
+    `_claims` is execute()'s ledger of which groups left for HA: each group is
+    claimed (under _lock) before it is sent, and one already claimed by the
+    facade's REST fallback is not sent here.
+    """
+    t0 = time.perf_counter()
+    groups = merge(calls)
+    with _lock:
+        _stats["batches"] += 1
+        _stats["calls"] += len(calls)
+    gate = asyncio.Semaphore(max(1, parallelism))
+
+    async def _one(i: int, group) -> dict:
+        async with gate:
+            if _claims is not None:
+                with _lock:
+                    if i in _claims:
+                        return {"ok": False, "message": "sent by the REST fallback"}
+                    _claims[i] = "sent"
+            try:
+                return await _call_group(*group, origin=origin, timeout=timeout)
+            except Exception as e:
+                return {"ok": False, "message": f"HA service exception: {e}"}
+
+    results = await asyncio.gather(*(_one(i, g) for i, g in enumerate(groups)))
+    return _summarise(groups, list(results), t0)
+
+
+def execute(calls: list[ServiceCall], origin: str = "ziggy",
+            parallelism: int = DEFAULT_PARALLELISM,
+            timeout: float = DEFAULT_TIMEOUT) -> dict:
+    """Sync facade over execute_async for thread-based callers.
+
+    Waits at most as long as the batch could take at `timeout` per wave of
+    `parallelism` groups. After that, groups the loop never got to go over
+    sync REST; groups it already sent are reported as timed out, never sent
+    twice — toggles, scenes and scripts aren't idempotent.
+    """
+    sub = _subscriber()
+    loop = sub._ws_loop
+    groups = merge(calls)
+    claims: dict[int, str] = {}
+    t0 = time.perf_counter()
+    # _dispatching is inherited through to_thread: a hook's worker thread must
+    # not wait on the loop whose reader is waiting for the hook.
+    if (loop is not None and loop.is_running() and not _on_loop_thread(loop)
+            and not sub._dispatching.get()):
+        fut = asyncio.run_coroutine_threadsafe(
+            execute_async(calls, origin=origin, parallelism=parallelism, timeout=timeout,
+                          _claims=claims), loop)
+        try:
+            return fut.result(timeout * (len(groups) / max(1, parallelism) + 1))
+        except concurrent.futures.TimeoutError:
+            fut.cancel()
+            with _lock:
+                _stats["loop_timeouts"] += 1
+                for i in range(len(groups)):
+                    claims.setdefault(i, "rest")
+            log_error(f"[ServiceBatch] subscriber loop did not finish {len(groups)} group(s) "
+                      f"in time — {list(claims.values()).count('rest')} left for REST")
+    else:
+        with _lock:
+            _stats["batches"] += 1
+            _stats["calls"] += len(calls)
+    # No subscriber loop to borrow (or we're on it, or it stalled): sync REST,
+    # one call per group not already sent.
+    from services import home_automation as ha
+    from services.manual_overrides import register_ziggy_call
+    results = []
+    for i, (domain, service, data, entity_ids) in enumerate(groups):
+        payload = {**data, "entity_id": entity_ids}
+        if claims.get(i) == "sent":
+            results.append(ha._service_timeout(domain, service, payload,
+                                               round((time.perf_counter() - t0) * 1000, 1)))
+            continue
+        with _lock:
+            _stats["rest_calls"] += 1
+        for eid in entity_ids:
+            register_ziggy_call(eid)
+        results.append(ha.call_service(domain, service, payload, origin=origin))
+    return _summarise(groups, results, t0)
+
+
+def _on_loop_thread(loop: asyncio.AbstractEventLoop) -> bool:
+    try:
+        return asyncio.get_running_loop() is loop
+    except RuntimeError:
+        return False
+
+
+def stats() -> dict:
+    with _lock:
+        out = dict(_stats)
+    out["ws_connected"] = _subscriber()._ws is not None
+    return out
@@ -34,6 +34,7 @@ import time
 from typing import Optional
 
 from core.logger_module import log_info, log_error
+from services import state_dispatch
 
 _CONFIG_FILE = "user_files/smart_climate_config.json"
 
@@ -76,6 +77,7 @@ def save_config(cfg: dict) -> dict:
             json.dump(merged, f, indent=2, ensure_ascii=False)
     except Exception as e:
         log_error(f"[SmartClimate] save_config: {e}")
+    state_dispatch.invalidate()  # configured_sensors() feeds the ha_subscriber hook
     return merged
 
 
@@ -0,0 +1,263 @@
+"""
+State-changed hook registry for ha_subscriber.
+
+Every HA state_changed event used to run a fixed chain of hooks (manual
+overrides, circadian, smart climate, room presence, automation bridge,
+command_router learning, restore, anomaly, self_heal), each re-importing its
+module and re-checking membership — so a chatty power sensor paid for every
+engine on every report.
+
+Engines now register interest up front:
+
+    state_dispatch.register("circadian", handler,
+                            entities=circadian_engine.scheduled_lights)
+    state_dispatch.register("self_heal", handler, domains=CONTROLLABLE_DOMAINS)
+    state_dispatch.register("anomaly", handler)            # every entity
+
+and dispatch() looks the entity up in a compiled {entity_id: (hooks…)} table.
+A hook matches when the entity is in its entity set OR its domain is in its
+domain set; a hook with neither is a wildcard and sees every entity. Entities
+nobody watches resolve to an empty tuple and skip straight past the
+bookkeeping — with ha_subscriber's anomaly hook installed there are none, but
+each event still runs only the engines that declared it.
+
+Entity sets are snapshotted at compile time. Engines call invalidate() when
+the set they watch changes (config save, room-machine rebuild); the table is
+also recompiled every _RECOMPILE_S as a safety net for edits made behind an
+engine's back (backup restore, hand-edited JSON).
+
+Per-hook call counts, errors and cumulative/max handler time are kept for the
+/api/debug/state-dispatch endpoint.
+"""
+from __future__ import annotations
+
+import inspect
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Any, Callable, Iterable, Optional
+
+from core.logger_module import log_error
+
+# Safety-net recompile interval (seconds) for entity sets changed without an
+# explicit invalidate().
+_RECOMPILE_S = 60.0
+
+
+@dataclass(frozen=True)
+class StateChange:
+    """One state_changed event, pre-digested once for every hook."""
+    entity_id: str
+    domain: str
+    prev_state: str
+    new_state: str
+    old: dict          # HA old_state object ({} when absent)
+    new: dict          # HA new_state object
+    attributes: dict   # new_state.attributes
+
+
+@dataclass
+class StateHook:
+    name: str
+    handler: Callable[[StateChange], Any]
+    domains: Optional[frozenset[str]] = None
+    entities: Optional[Callable[[], Iterable[str]]] = None
+    changed_only: bool = False     # skip when prev_state == new_state
+    order: int = 0
+
+    @property
+    def wildcard(self) -> bool:
+        return self.domains is None and self.entities is None
+
+
+@dataclass
+class _HookStats:
+    calls: int = 0
+    errors: int = 0
+    total_s: float = 0.0
+    max_s: float = 0.0
+    last_error: str = ""
+
+
+@dataclass
+class _Compiled:
+    by_entity: dict[str, list[StateHook]] = field(default_factory=dict)
+    by_domain: dict[str, list[StateHook]] = field(default_factory=dict)
+    wildcard: list[StateHook] = field(default_factory=list)
+    table: dict[str, tuple[StateHook, ...]] = field(default_factory=dict)
+    watched_counts: dict[str, int] = field(default_factory=dict)
+    built_at: float = 0.0
+
+
+_lock = threading.Lock()
+_hooks: dict[str, StateHook] = {}
+_compiled: Optional[_Compiled] = None
+_stats: dict[str, _HookStats] = {}
+_events_total = 0
+_events_unwatched = 0
+_compiles = 0
+_next_order = 0
+
+
+def register(
+    name: str,
+    handler: Callable[[StateChange], Any],
+    *,
+    domains: Optional[Iterable[str]] = None,
+    entities: Optional[Callable[[], Iterable[str]]] = None,
+    changed_only: bool = False,
+) -> None:
+    """Register (or replace) a hook. Hooks run in registration order; a
+    re-registered name keeps its original slot."""
+    global _compiled, _next_order
+    with _lock:
+        prev = _hooks.get(name)
+        if prev is None:
+            _next_order += 1
+        _hooks[name] = StateHook(
+            name=name,
+            handler=handler,
+            domains=frozenset(domains) if domains is not None else None,
+            entities=entities,
+            changed_only=changed_only,
+            order=prev.order if prev else _next_order,
+        )
+        _stats.setdefault(name, _HookStats())
+        _compiled = None
+
+
+def unregister(name: str) -> None:
+    global _compiled
+    with _lock:
+        _hooks.pop(name, None)
+        _compiled = None
+
+
+def registered() -> list[str]:
+    return [h.name for h in sorted(_hooks.values(), key=lambda h: h.order)]
+
+
+def invalidate() -> None:
+    """Drop the compiled table — call when a hook's watched entity set changed."""
+    global _compiled
+    _compiled = None
+
+
+def _compile() -> _Compiled:
+    global _compiles
+    comp = _Compiled(built_at=time.monotonic())
+    for hook in sorted(_hooks.values(), key=lambda h: h.order):
+        if hook.wildcard:
+            comp.wildcard.append(hook)
+            continue
+        for d in hook.domains or ():
+            comp.by_domain.setdefault(d, []).append(hook)
+        if hook.entities is not None:
+            try:
+                watched = set(hook.entities() or ())
+            except Exception as e:
+                log_error(f"[StateDispatch] {hook.name} entity set failed: {e}")
+                watched = set()
+            for eid in watched:
+                comp.by_entity.setdefault(eid, []).append(hook)
+            comp.watched_counts[hook.name] = len(watched)
+    _compiles += 1
+    return comp
+
+
+def _current() -> _Compiled:
+    global _compiled
+    comp = _compiled
+    if comp is None or (time.monotonic() - comp.built_at) > _RECOMPILE_S:
+        with _lock:
+            comp = _compiled
+            if comp is None or (time.monotonic() - comp.built_at) > _RECOMPILE_S:
+                comp = _compiled = _compile()
+    return comp
+
+
+def handlers_for(entity_id: str) -> tuple[StateHook, ...]:
+    """Hooks interested in entity_id, in registration order (memoised)."""
+    comp = _current()
+    hit = comp.table.get(entity_id)
+    if hit is not None:
+        return hit
+    domain = entity_id.split(".", 1)[0]
+    seen: dict[str, StateHook] = {}
+    for hook in (comp.wildcard
+                 + comp.by_domain.get(domain, [])
+                 + comp.by_entity.get(entity_id, [])):
+        seen[hook.name] = hook
+    hooks = tuple(sorted(seen.values(), key=lambda h: h.order))
+    comp.table[entity_id] = hooks
+    return hooks
+
+
+async def dispatch(change: StateChange) -> None:
+    """Run every interested hook for one state change, timing each."""
+    global _events_total, _events_unwatched
+    _events_total += 1
+    hooks = handlers_for(change.entity_id)
+    if not hooks:
+        _events_unwatched += 1
+        return
+    changed = change.prev_state != change.new_state
+    for hook in hooks:
+        if hook.changed_only and not changed:
+            continue
+        st = _stats.setdefault(hook.name, _HookStats())
+        t0 = time.perf_counter()
+        try:
+            result = hook.handler(change)
+            if inspect.isawaitable(result):
+                await result
+        except Exception as e:
+            st.errors += 1
+            st.last_error = f"{type(e).__name__}: {e}"
+            log_error(f"[StateDispatch] {hook.name} hook {change.entity_id}: {e}")
+        finally:
+            dt = time.perf_counter() - t0
+            st.calls += 1
+            st.total_s += dt
+            if dt > st.max_s:
+                st.max_s = dt
+
+
+def stats() -> dict:
+    """Snapshot for /api/debug/state-dispatch."""
+    comp = _compiled
+    hooks = []
+    for hook in sorted(_hooks.values(), key=lambda h: h.order):
+        st = _stats.get(hook.name) or _HookStats()
+        hooks.append({
+            "name": hook.name,
+            "interest": (
+                "all" if hook.wildcard else {
+                    "domains": sorted(hook.domains or ()),
+                    "entities": comp.watched_counts.get(hook.name, 0) if comp else None,
+                }
+            ),
+            "changed_only": hook.changed_only,
+            "calls": st.calls,
+            "errors": st.errors,
+            "total_ms": round(st.total_s * 1000, 3),
+            "avg_ms": round(st.total_s * 1000 / st.calls, 4) if st.calls else 0.0,
+            "max_ms": round(st.max_s * 1000, 3),
+            "last_error": st.last_error or None,
+        })
+    return {
+        "events_total": _events_total,
+        "events_unwatched": _events_unwatched,
+        "compiles": _compiles,
+        "table_entities": len(comp.table) if comp else 0,
+        "hooks": hooks,
+    }
+
+
+def reset_stats() -> None:
+    global _events_total, _events_unwatched
+    with _lock:
+        for name in list(_stats):
+            _stats[name] = _HookStats()
+        _events_total = 0
+        _events_unwatched = 0
@@ -9,11 +9,11 @@ regaining power.
 """
 from __future__ import annotations
 
-import json
-import os
 from datetime import datetime
 from typing import Optional
 
+from services.json_store import UNCHANGED, JsonStore
+
 STORE_FILE = "user_files/state_memory.json"
 
 TRACKED_DOMAINS = {"light", "climate", "fan"}
@@ -26,17 +26,13 @@ _SETTING_KEYS: dict[str, set] = {
 }
 
 
-def _load() -> dict:
-    if not os.path.exists(STORE_FILE):
-        return {}
-    with open(STORE_FILE, "r", encoding="utf-8") as f:
-        return json.load(f)
+# record_service_call runs on every HA service call — writes land in memory
+# and are flushed behind the request.
+_store = JsonStore(lambda: STORE_FILE)
 
 
-def _save(data: dict) -> None:
-    os.makedirs(os.path.dirname(STORE_FILE), exist_ok=True)
-    with open(STORE_FILE, "w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+def _load() -> dict:
+    return _store.read()
 
 
 def record_service_call(entity_id: str, service: str, service_data: dict) -> None:
@@ -53,32 +49,33 @@ def record_service_call(entity_id: str, service: str, service_data: dict) -> Non
     if domain not in TRACKED_DOMAINS:
         return
 
-    store = _load()
-    current = store.get(entity_id, {})
-
-    if service == "turn_off":
-        store[entity_id] = {
-            **current,
-            "intentionally_off": True,
-            "saved_at": datetime.now().isoformat(),
-        }
-        _save(store)
-        return
-
     # Extract only meaningful settings; strip entity_id and HA plumbing keys.
     valid_keys = _SETTING_KEYS.get(domain, set())
     new_settings = {k: v for k, v in service_data.items() if k in valid_keys}
 
-    if not new_settings and service not in ("turn_on",):
-        return  # Nothing worth recording
+    def _apply(store: dict):
+        current = store.get(entity_id, {})
+
+        if service == "turn_off":
+            store[entity_id] = {
+                **current,
+                "intentionally_off": True,
+                "saved_at": datetime.now().isoformat(),
+            }
+            return None
+
+        if not new_settings and service not in ("turn_on",):
+            return UNCHANGED  # Nothing worth recording
+
+        merged = {**current.get("settings", {}), **new_settings}
+        store[entity_id] = {
+            "settings": merged,
+            "intentionally_off": False,
+            "saved_at": datetime.now().isoformat(),
+        }
+        return None
 
-    merged = {**current.get("settings", {}), **new_settings}
-    store[entity_id] = {
-        "settings": merged,
-        "intentionally_off": False,
-        "saved_at": datetime.now().isoformat(),
-    }
-    _save(store)
+    _store.update(_apply)
 
 
 def get_restore_payload(entity_id: str) -> Optional[dict]:
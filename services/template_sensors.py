@@ -22,7 +22,7 @@ Flow:
 from __future__ import annotations
 from typing import Optional
 import re
-import requests
+import httpx
 
 from services import ha_client
 from core.logger_module import log_info, log_error
@@ -39,24 +39,21 @@ _MQTT_ENTRY_PREFIX = "ziggy_mqtt_"
 
 
 def _ha_post(path: str, body: dict, timeout: float = 10.0) -> tuple[int, dict]:
-    url = f"{ha_client.url().rstrip('/')}{path}"
     try:
-        resp = requests.post(url, json=body, headers=ha_client.headers(), timeout=timeout)
+        resp = ha_client.request("POST", path, json=body, timeout=timeout)
         try:
             data = resp.json()
         except Exception:
             data = {"_raw": resp.text}
         return resp.status_code, data
-    except requests.RequestException as e:
+    except httpx.HTTPError as e:
         return 0, {"error": str(e)}
 
 
 def _ha_delete(path: str, timeout: float = 10.0) -> int:
-    url = f"{ha_client.url().rstrip('/')}{path}"
     try:
-        resp = requests.delete(url, headers=ha_client.headers(), timeout=timeout)
-        return resp.status_code
-    except requests.RequestException:
+        return ha_client.request("DELETE", path, timeout=timeout).status_code
+    except httpx.HTTPError:
         return 0
 
 
@@ -283,16 +283,18 @@ async def _health_watchdog_tick() -> None:
 async def _device_registry_reconcile_tick() -> None:
     """Re-reconcile the device registry against live HA.
 
-    refresh() is synchronous and does a blocking HA REST call, so it runs
-    off-thread. No-op when a dedicated reconciliation thread already owns the
-    job (the core/ziggy_main.py entry point) — see device_registry
+    consistency_pass() is synchronous and may do a blocking HA REST call, so
+    it runs off-thread: a full refresh() when the HA event stream is down, a
+    drift audit every device_registry.AUDIT_INTERVAL_S while it is live. No-op
+    when a dedicated reconciliation thread already owns the job (the
+    core/ziggy_main.py entry point) — see device_registry
     .reconcile_loop_running().
     """
     try:
         from services import device_registry
         if device_registry.reconcile_loop_running():
             return
-        await asyncio.to_thread(device_registry.refresh)
+        await asyncio.to_thread(device_registry.consistency_pass)
     except Exception as exc:
         log_error(f"[Scheduler] registry refresh failed: {exc}")
 
@@ -499,6 +501,8 @@ async def run_scheduler() -> None:
         # whole registry to "lost" permanently. That is exactly what happened to
         # a customer home on 2026-08-09 and went unnoticed for 19 h.
         # This tick is the self-heal: it re-reads HA and clears stale statuses.
+        # While ha_subscriber's event stream is live the registry follows HA
+        # per event and this tick only runs the periodic drift audit.
         if _tick % 2 == 0:
             try:
                 await _device_registry_reconcile_tick()
@@ -28,3 +28,25 @@ def _isolate_auth_db(tmp_path, monkeypatch):
     yield
     # Reset the memo so a later test's own _DB_PATH monkeypatch re-inits cleanly.
     monkeypatch.setattr(auth_db, "_initialized", False)
+
+
+@pytest.fixture(autouse=True)
+def _isolate_intent_cache(tmp_path, monkeypatch):
+    # core.intent_cache learns parses into user_files/intent_cache.db; a parse
+    # learned in one test must never answer for a later test's mocked LLM.
+    from core import intent_cache
+    monkeypatch.setattr(intent_cache, "CACHE_DB", tmp_path / "_conftest_intent_cache.db")
+    monkeypatch.setattr(intent_cache, "_pending", {})
+
+
+@pytest.fixture(autouse=True)
+def _isolate_event_log(tmp_path, monkeypatch):
+    # Executed intents are logged through pattern_logger into
+    # user_files/events.db, and tool_router's usage prior reads them back;
+    # neither may leak between tests or into the developer's real log.
+    from core import tool_router
+    from services import pattern_logger
+    monkeypatch.setattr(pattern_logger, "EVENTS_DB", tmp_path / "_conftest_events.db")
+    monkeypatch.setattr(pattern_logger, "EVENTS_FILE", tmp_path / "_conftest_events.jsonl")
+    monkeypatch.setattr(pattern_logger, "_ready_for", None)
+    monkeypatch.setattr(tool_router, "_prior", (0.0, ()))
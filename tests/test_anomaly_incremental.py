@@ -0,0 +1,129 @@
+"""
+Incremental rule loop in services/anomaly_engine.py.
+
+After the first (full) sweep, a state change re-runs only the (rule, target)
+pairs the changed entity can affect: the room it sits in for entity-scope
+rules, its areas for area-scope rules, and home rules whose declared
+domains/device_classes include it. Time-driven conditions are still picked
+up by the periodic full sweep.
+"""
+import time
+
+import pytest
+
+from services import anomaly_engine as ae
+
+
+def _entry(state, **attrs):
+    return {"state": state, "attributes": attrs, "last_changed": ""}
+
+
+_AREAS = {
+    "kitchen": {"id": "kitchen", "name": "Kitchen",
+                "entities": ["sensor.kitchen_power", "sensor.kitchen_door_battery",
+                             "switch.kettle"]},
+    "office":  {"id": "office", "name": "Office",
+                "entities": ["sensor.office_power", "switch.heater"]},
+}
+
+
+@pytest.fixture
+def engine(monkeypatch):
+    clock = [1_000_000.0]
+    monkeypatch.setattr(time, "time", lambda: clock[0])
+    monkeypatch.setattr(ae, "_cfg", lambda: {"enabled": True})
+    monkeypatch.setattr(ae, "_ziggy_load_persons", lambda: [])
+    monkeypatch.setattr(ae, "_log_history_fired", lambda *a, **k: None)
+    monkeypatch.setattr(ae, "_log_history_cleared", lambda *a, **k: None)
+    monkeypatch.setattr(ae, "_RULE_LOOP_DEBOUNCE_S", 0)
+    monkeypatch.setattr(ae, "_rule_index", None)
+    monkeypatch.setattr(ae, "_dirty_entities", set())
+    monkeypatch.setattr(ae, "_last_full_sweep_ts", 0.0)
+    monkeypatch.setattr(ae, "_loop_stats", {"runs": 0, "full_sweeps": 0, "rule_evals": 0})
+    monkeypatch.setattr(ae, "_snooze", {})
+    monkeypatch.setattr(ae, "_last_fired", {})
+    monkeypatch.setattr(ae, "_last_on", {})
+    monkeypatch.setattr(ae, "_recent_unavailable", {})
+
+    async def _areas():
+        return _AREAS
+    monkeypatch.setattr(ae, "_get_area_map", _areas)
+
+    cache = {
+        "sensor.kitchen_power": _entry("120"),
+        "sensor.kitchen_door_battery": _entry("80", device_class="battery"),
+        "switch.kettle": _entry("off"),
+        "sensor.office_power": _entry("40"),
+        "switch.heater": _entry("off"),
+        "person.alice": _entry("home"),
+    }
+    active: dict = {}
+
+    async def change(eid, state=None, **attrs):
+        if state is not None:
+            cache[eid]["state"] = state
+        cache[eid]["attributes"].update(attrs)
+        await ae.evaluate(eid, cache, active)
+        if ae._eval_pending_task is not None:
+            await ae._eval_pending_task
+
+    class _Env:
+        pass
+    env = _Env()
+    env.clock, env.cache, env.active, env.change = clock, cache, active, change
+    return env
+
+
+def _rules_in(active, room):
+    return {e["rule_id"] for e in active.get(room, [])}
+
+
+async def test_first_run_is_full_then_incremental(engine):
+    await engine.change("sensor.kitchen_power", "121")
+    assert ae.rule_loop_stats()["full_sweeps"] == 1
+    full_evals = ae.rule_loop_stats()["rule_evals"]
+
+    await engine.change("sensor.kitchen_power", "122")
+    stats = ae.rule_loop_stats()
+    assert stats["full_sweeps"] == 1 and stats["runs"] == 2
+    # Only the wildcard rules for the kitchen room (3 entities × ANOM-07/08)
+    # and the wildcard home rule ANOM-09 re-ran.
+    assert stats["rule_evals"] - full_evals == 3 * 2 + 1
+
+
+async def test_change_fires_rule_for_its_room(engine):
+    await engine.change("sensor.office_power", "41")
+    await engine.change("sensor.kitchen_door_battery", "5")
+    assert "ANOM-08" in _rules_in(engine.active, "kitchen")
+    assert "ANOM-08" not in _rules_in(engine.active, "office")
+
+
+async def test_quiet_roommate_does_not_clear_alert(engine):
+    await engine.change("sensor.kitchen_door_battery", "5")
+    assert "ANOM-08" in _rules_in(engine.active, "kitchen")
+    # A later change to another kitchen entity re-runs the kitchen as a unit —
+    # the low battery still wins the room's ANOM-08 slot.
+    await engine.change("sensor.kitchen_power", "300")
+    assert "ANOM-08" in _rules_in(engine.active, "kitchen")
+    await engine.change("sensor.kitchen_door_battery", "90")
+    assert "ANOM-08" not in _rules_in(engine.active, "kitchen")
+
+
+async def test_time_driven_rule_waits_for_full_sweep(engine):
+    await engine.change("switch.heater", "on")
+    ae._last_on["switch.heater"] = engine.clock[0] - 5 * 3600
+
+    await engine.change("sensor.kitchen_power", "1")   # unrelated room
+    assert "ANOM-06" not in _rules_in(engine.active, "office")
+
+    engine.clock[0] += ae._FULL_SWEEP_S + 1
+    await engine.change("sensor.kitchen_power", "2")
+    assert "ANOM-06" in _rules_in(engine.active, "office")
+
+
+async def test_new_entity_rebuilds_index(engine):
+    await engine.change("sensor.kitchen_power", "121")
+    engine.cache["sensor.garage_battery"] = _entry("3", device_class="battery")
+    await engine.change("sensor.garage_battery")
+    assert ae.rule_loop_stats()["full_sweeps"] == 2
+    assert "ANOM-08" in _rules_in(engine.active, "sensor.garage_battery")
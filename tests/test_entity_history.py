@@ -0,0 +1,128 @@
+"""
+Local downsampled history behind the device charts (services/entity_history).
+
+Covers the write path (numeric filter, batched flush into raw rows and
+1 min / 15 min / 1 h buckets), tier selection and retention, LTTB decimation,
+and the chart endpoint's fallback to HA for the gap before recording began.
+"""
+import asyncio
+import time
+
+import pytest
+
+from services import entity_history as eh
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(eh, "HISTORY_DB", tmp_path / "history.db")
+    monkeypatch.setattr(eh, "_ready_for", None)
+    monkeypatch.setattr(eh, "_FLUSH_DELAY_S", 3600.0)
+    monkeypatch.setattr(eh, "_pending", [])
+    monkeypatch.setattr(eh, "_pending_units", {})
+    monkeypatch.setattr(eh, "_flush_timer", None)
+    monkeypatch.setattr(eh, "_last_prune_at", time.monotonic())
+    monkeypatch.setattr(eh, "_stats", dict.fromkeys(eh._stats, 0))
+    yield tmp_path
+    if eh._flush_timer is not None:
+        eh._flush_timer.cancel()
+
+
+def _rows(sql, *args):
+    conn = eh._connect()
+    try:
+        return conn.execute(sql, args).fetchall()
+    finally:
+        conn.close()
+
+
+def test_record_keeps_numeric_chartable_states_only():
+    assert eh.record("sensor.office_t", "21.5", {"unit_of_measurement": "°C"}) is True
+    assert eh.record("sensor.office_t", "unavailable") is False
+    assert eh.record("sensor.office_t", "nan") is False
+    assert eh.record("light.kitchen", "1") is False
+    assert eh.flush() == 1
+    assert eh.flush() == 0
+    assert _rows("SELECT entity_id, unit FROM entities") == [("sensor.office_t", "°C")]
+
+
+def test_flush_folds_a_batch_into_every_bucket_tier():
+    base = 1_700_000_400.0   # multiple of 3600
+    for i, v in enumerate([10.0, 14.0, 12.0]):
+        eh.record("sensor.power", v, ts=base + i * 20)
+    eh.record("sensor.power", 30.0, ts=base + 120)
+    eh.flush()
+    eh.record("sensor.power", 2.0, ts=base + 30)   # later batch, same minute
+    eh.flush()
+
+    minute = _rows("SELECT start, n, sum, min, max FROM buckets WHERE res = 60 ORDER BY start")
+    assert minute == [(base, 4, 38.0, 2.0, 14.0), (base + 120, 1, 30.0, 30.0, 30.0)]
+    assert _rows("SELECT n, sum, min, max FROM buckets WHERE res = 3600") == [(5, 68.0, 2.0, 30.0)]
+    assert _rows("SELECT COUNT(*) FROM raw")[0][0] == 5
+
+
+def test_series_picks_the_finest_tier_covering_the_window():
+    now = time.time()
+    for i in range(600):
+        eh.record("sensor.t", 20 + (i % 7), ts=now - 3 * 24 * 3600 + i * 400)
+    for i in range(50):
+        eh.record("sensor.t", 5.0, ts=now - 3600 + i * 60)
+    eh.flush()
+
+    short = eh.series("sensor.t", now - 2 * 3600)
+    assert short["resolution"] is None and len(short["points"]) == 50
+    day = eh.series("sensor.t", now - 24 * 3600, max_points=40)
+    assert day["resolution"] == 60 and len(day["points"]) == 40
+    week = eh.series("sensor.t", now - 7 * 24 * 3600)
+    assert week["resolution"] == 900
+    assert week["recorded_since"] == pytest.approx(now - 3 * 24 * 3600)
+
+
+def test_prune_applies_each_tiers_retention():
+    now = time.time()
+    eh.record("sensor.t", 1.0, ts=now - 2 * 24 * 3600)
+    eh.record("sensor.t", 2.0, ts=now - 20 * 24 * 3600)
+    eh.record("sensor.t", 3.0, ts=now - 60)
+    eh.flush()
+    conn = eh._connect()
+    try:
+        eh._prune(conn, now=now)
+    finally:
+        conn.close()
+    assert _rows("SELECT v FROM raw") == [(3.0,)]
+    counts = dict(_rows("SELECT res, COUNT(*) FROM buckets GROUP BY res"))
+    assert counts == {60: 2, 900: 2, 3600: 3}
+
+
+def test_lttb_keeps_endpoints_and_the_spike():
+    pts = [(float(i), 0.0) for i in range(1000)]
+    pts[437] = (437.0, 100.0)
+    out = eh.lttb(pts, 50)
+    assert len(out) == 50
+    assert out[0] == pts[0] and out[-1] == pts[-1]
+    assert (437.0, 100.0) in out
+    assert eh.lttb(pts[:10], 50) == pts[:10]
+
+
+def test_endpoint_fills_only_the_gap_before_recording_from_ha(monkeypatch):
+    from backend.routers import device_router
+
+    now = time.time()
+    for i in range(10):
+        eh.record("sensor.t", 21.0, {"unit_of_measurement": "°C"}, ts=now - 3600 + i * 60)
+    eh.flush()
+    calls = []
+
+    async def fake_ha(entity_id, start, end):
+        calls.append((start.timestamp(), end.timestamp() if end else None))
+        return [(now - 20 * 3600, 18.0), (now - 3000, 99.0)], "°C"
+
+    monkeypatch.setattr(device_router, "_ha_history", fake_ha)
+    out = asyncio.run(device_router.entity_history("sensor.t", hours=24))
+    assert calls and calls[0][1] == pytest.approx(now - 3600)
+    assert [p["v"] for p in out["points"]] == [18.0] + [21.0] * 10   # HA overlap dropped
+    assert out["unit"] == "°C"
+
+    calls.clear()
+    asyncio.run(device_router.entity_history("sensor.t", hours=1))
+    assert calls == []
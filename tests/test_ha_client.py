@@ -116,3 +116,132 @@ def test_ha_areas_ws_is_an_alias(monkeypatch):
     without churn."""
     import services.ha_areas as ha_areas
     assert ha_areas._ws is ha_client.ws
+
+
+# ── Pooled REST client ──────────────────────────────────────────────────────
+
+import asyncio
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import httpx
+
+
+class _FakeHA(BaseHTTPRequestHandler):
+    """/api/states/<eid> answers after ?delay / the server's `delay` seconds."""
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body):
+        srv = self.server
+        with srv.lock:
+            srv.active += 1
+            srv.peak = max(srv.peak, srv.active)
+            srv.auth.append(self.headers.get("Authorization"))
+        try:
+            time.sleep(srv.delay)
+            raw = json.dumps(body).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            self.end_headers()
+            self.wfile.write(raw)
+        finally:
+            with srv.lock:
+                srv.active -= 1
+
+    def do_GET(self):
+        eid = self.path.rsplit("/", 1)[-1]
+        if eid == "sensor.missing":
+            self._reply(404, {"message": "Entity not found."})
+        else:
+            self._reply(200, {"entity_id": eid, "state": "21", "attributes": {}})
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        body = json.loads(self.rfile.read(length) or b"{}")
+        self._reply(200 if self.path.endswith("/turn_on") else 500, [body])
+
+
+@pytest.fixture
+def fake_ha(monkeypatch):
+    from core.settings_loader import settings as live_settings
+    srv = ThreadingHTTPServer(("127.0.0.1", 0), _FakeHA)
+    srv.daemon_threads = True
+    srv.handle_error = lambda request, address: None   # clients that timed out hang up
+    srv.delay, srv.active, srv.peak, srv.auth = 0.0, 0, 0, []
+    srv.lock = threading.Lock()
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    monkeypatch.setitem(live_settings, "home_assistant",
+                        {"url": f"http://127.0.0.1:{srv.server_address[1]}", "token": "tok"})
+    monkeypatch.setattr("services.ha_subscriber.state_cache", {})
+    monkeypatch.setattr(ha_client, "MAX_CONCURRENCY", 3)
+    asyncio.run(ha_client.aclose())      # fresh pool picks up the limits
+    yield srv
+    asyncio.run(ha_client.aclose())
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_async_state_and_service_calls(fake_ha):
+    async def run():
+        ok = await ha_client.get_state_async("sensor.office_t")
+        missing = await ha_client.get_state_async("sensor.missing")
+        on = await ha_client.call_service_async("light", "turn_on", {"entity_id": "light.a"})
+        bad = await ha_client.call_service_async("light", "turn_off", {"entity_id": "light.a"})
+        return ok, missing, on, bad
+
+    ok, missing, on, bad = asyncio.run(run())
+    assert ok == {"ok": True, "message": "ok", "data": {"state": "21", "attributes": {}}}
+    assert missing["ok"] is False and "404" in missing["message"]
+    assert on == {"ok": True, "message": "service call ok", "data": [{"entity_id": "light.a"}]}
+    assert bad["ok"] is False and "500" in bad["message"]
+    assert set(fake_ha.auth) == {"Bearer tok"}
+
+
+def test_slow_ha_does_not_block_the_loop_and_concurrency_is_bounded(fake_ha):
+    fake_ha.delay = 0.3
+
+    async def run():
+        ticks = 0
+
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        t = asyncio.create_task(ticker())
+        t0 = time.perf_counter()
+        results = await asyncio.gather(*(ha_client.get_state_async(f"sensor.s{i}") for i in range(6)))
+        elapsed = time.perf_counter() - t0
+        t.cancel()
+        return results, elapsed, ticks
+
+    results, elapsed, ticks = asyncio.run(run())
+    assert all(r["ok"] for r in results)
+    assert fake_ha.peak == 3                 # MAX_CONCURRENCY
+    assert 0.55 < elapsed < 1.5              # two waves of three
+    assert ticks > 0.5 * elapsed / 0.01      # the loop kept running throughout
+
+
+def test_sync_facade_and_deadline(fake_ha):
+    resp = ha_client.request("GET", "/api/states/sensor.x")
+    assert resp.status_code == 200 and resp.json()["entity_id"] == "sensor.x"
+
+    fake_ha.delay = 0.5
+    with pytest.raises(httpx.TimeoutException):
+        ha_client.request("GET", "/api/states/sensor.x", timeout=0.1)
+    assert ha_client.rest_stats()["timeouts"] >= 1
+
+
+def test_sync_facade_refuses_a_running_loop(fake_ha):
+    async def handler():
+        ha_client.request("GET", "/api/states/sensor.x")
+
+    with pytest.raises(RuntimeError, match="running event loop"):
+        asyncio.run(handler())
+    assert fake_ha.auth == []
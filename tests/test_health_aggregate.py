@@ -0,0 +1,153 @@
+"""Incremental /api/health aggregate.
+
+on_state() folds single state events into the offline / battery signal maps;
+scan() is the from-scratch computation the endpoint used to run per request.
+After any sequence of events the two must agree.
+"""
+import asyncio
+import random
+import re
+
+import pytest
+
+from services import health_aggregate as ha
+
+_topology_version = ha._topology_version   # before the fixture stubs it
+
+TOPO = ha.Topology(
+    primary_by_eid={
+        "switch.boiler": "switch.boiler", "sensor.boiler_power": "switch.boiler",
+        "sensor.boiler_temp": "switch.boiler", "sensor.boiler_battery": "switch.boiler",
+        "light.hall": "light.hall", "sensor.hall_lux": "light.hall",
+        "automation.hidden_primary": "automation.hidden_primary",
+        "sensor.orphan_child": "automation.hidden_primary",
+    },
+    promoted=frozenset({"sensor.boiler_temp"}),
+    ir_linked=frozenset({"media_player.tv"}),
+    deps={"switch.boiler": ["Morning heat"], "sensor.door": ["Alarm"]},
+    battery_threshold=20,
+    extra_hidden_domains=frozenset({"vacuum"}),
+    extra_hidden_patterns=(re.compile(r"_ghost$"),),
+)
+ENTITIES = sorted(set(TOPO.primary_by_eid) | {
+    "media_player.tv", "sensor.door", "lock.front", "vacuum.roomba",
+    "binary_sensor.window_ghost", "climate.office", "sensor.door_battery",
+})
+
+
+@pytest.fixture(autouse=True)
+def aggregate(monkeypatch):
+    states: dict = {}
+    pushes: list = []
+
+    async def fake_build():
+        return TOPO
+
+    async def fake_push(agg):
+        pushes.append(ha._summary(agg))
+
+    monkeypatch.setattr(ha, "_states", lambda: states)
+    monkeypatch.setattr(ha, "_build_topology", fake_build)
+    monkeypatch.setattr(ha, "_push", fake_push)
+    monkeypatch.setattr(ha, "_topology_version", lambda: ("fixed",))
+    for name, value in (("_topology", ha.Topology()), ("_topology_stamp", None),
+                        ("_topology_at", 0.0), ("_primaries", frozenset()),
+                        ("_offline", {}), ("_battery", {}), ("_seeded", False),
+                        ("_seeded_from", None), ("_snapshot", None),
+                        ("_last_summary", None), ("_stats", dict(ha._stats))):
+        monkeypatch.setattr(ha, name, value)
+    yield states, pushes
+
+
+def _random_entry(rng: random.Random, eid: str):
+    if rng.random() < 0.1:
+        return None
+    attrs = {}
+    if rng.random() < 0.5:
+        attrs["friendly_name"] = rng.choice(["Boiler", "Hall", "Front door", "TV"])
+    if eid.endswith("_battery") and rng.random() < 0.8:
+        attrs["device_class"] = "battery"
+        state = rng.choice(["5", "15.5", "19", "20", "80", "unavailable", "n/a"])
+    else:
+        state = rng.choice(["on", "off", "unavailable", "unknown", "unknown", "12"])
+        roll = rng.random()
+        if roll < 0.15:
+            attrs["battery_level"] = rng.choice([3, 19, 20, 55, "low", -1])
+        elif roll < 0.25:
+            attrs["battery"] = rng.choice([7, 90])
+    return {"state": state, "attributes": attrs}
+
+
+def _apply_event(states, eid, entry):
+    if entry is None:
+        states.pop(eid, None)
+    else:
+        states[eid] = entry
+    asyncio.run(ha.on_state(eid, entry))
+
+
+@pytest.mark.parametrize("seed", range(8))
+def test_incremental_matches_full_scan_after_random_events(aggregate, seed):
+    states, _ = aggregate
+    rng = random.Random(seed)
+    for eid in ENTITIES:
+        entry = _random_entry(rng, eid)
+        if entry is not None:
+            states[eid] = entry
+    assert asyncio.run(ha.read()) == ha.scan(states, TOPO)
+
+    for step in range(300):
+        eid = rng.choice(ENTITIES)
+        _apply_event(states, eid, _random_entry(rng, eid))
+        if step % 25 == 0:
+            assert asyncio.run(ha.read()) == ha.scan(states, TOPO), f"seed={seed} step={step}"
+    assert asyncio.run(ha.read()) == ha.scan(states, TOPO)
+    assert ha._stats["rescans"] == 1
+
+
+def test_siblings_collapse_into_the_offline_primary(aggregate):
+    states, _ = aggregate
+    off = {"state": "unavailable", "attributes": {}}
+    states.update({"switch.boiler": off, "sensor.boiler_power": off,
+                   "sensor.hall_lux": off, "light.hall": {"state": "on", "attributes": {}},
+                   "media_player.tv": off, "sensor.boiler_temp": off})
+    agg = asyncio.run(ha.read())
+    assert [r["entity_id"] for r in agg["offline_devices"]] == ["switch.boiler", "sensor.boiler_temp"]
+    assert [r["entity_id"] for r in agg["offline_with_deps"]] == ["switch.boiler"]
+    assert agg["total_devices"] == len(TOPO.primary_by_eid)
+
+
+def test_push_only_when_the_summary_moves(aggregate):
+    states, pushes = aggregate
+    states["lock.front"] = {"state": "locked", "attributes": {"battery_level": 50}}
+    asyncio.run(ha.read())
+
+    _apply_event(states, "lock.front", {"state": "unlocked", "attributes": {"battery_level": 50}})
+    assert pushes == []
+    _apply_event(states, "lock.front", {"state": "unlocked", "attributes": {"battery_level": 10}})
+    _apply_event(states, "lock.front", {"state": "unlocked", "attributes": {"battery_level": 9}})
+    assert pushes == [((), ("lock.front",), False)]
+    _apply_event(states, "lock.front", None)
+    assert pushes[-1] == ((), (), False)
+    assert ha._stats["derives"] <= 4
+
+
+def test_invalidate_rescans_on_next_read(aggregate):
+    states, _ = aggregate
+    asyncio.run(ha.read())
+    states["climate.office"] = {"state": "unavailable", "attributes": {}}   # no event
+    ha.invalidate()
+    agg = asyncio.run(ha.read())
+    assert [r["entity_id"] for r in agg["offline_devices"]] == ["climate.office"]
+
+
+def test_topology_stamp_follows_a_device_groups_refetch(monkeypatch):
+    from services import device_groups
+    monkeypatch.setattr(device_groups, "_cache_entry",
+                        {"fetched_at": 100.0, "generation": 3, "by_entity": {}, "names": {}})
+    first = _topology_version()
+    monkeypatch.setattr(device_groups, "_cache_entry",
+                        {"fetched_at": 160.0, "generation": 3, "by_entity": {}, "names": {}})
+    assert _topology_version() != first
+    device_groups.invalidate_cache()
+    assert _topology_version()[1] is None
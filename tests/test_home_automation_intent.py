@@ -61,3 +61,16 @@ def test_non_controllable_domain_not_recorded(monkeypatch):
     monkeypatch.setattr(ha, "_session", _fake_session(_Resp(200)))
     ha.call_service("sensor", "turn_on", {"entity_id": "sensor.temp"})
     assert cl.get_last("sensor.temp") is None
+
+
+def test_multi_entity_call_records_each_entity():
+    ha._service_ok("light", "turn_off", {"entity_id": ["light.a", "light.b"]}, "ziggy", None, 1.0)
+    assert cl.get_last("light.a")["state"] == "off"
+    assert cl.get_last("light.b")["state"] == "off"
+
+
+def test_timeout_message_names_one_device_or_counts_a_batch():
+    one = ha._service_timeout("light", "turn_off", {"entity_id": "light.hall_lamp"}, 10.0)
+    assert one["message"].startswith("hall lamp did not respond")
+    many = ha._service_timeout("light", "turn_off", {"entity_id": ["light.a", "light.b"]}, 10.0)
+    assert many["message"].startswith("2 devices did not respond")
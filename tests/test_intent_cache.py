@@ -0,0 +1,116 @@
+"""core.intent_cache — learned tool-call parses in front of _parse_with_tools.
+
+The LLM is a stub that counts calls. A parse is only served from the cache
+after action_parser._log_event_safe has reported a clean execution of it.
+"""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from core import action_parser, conversation_context, intent_cache, intent_parser
+
+
+def _tool_call(name, args):
+    return SimpleNamespace(function=SimpleNamespace(name=name, arguments=json.dumps(args)))
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    state = {"calls": 0, "tool_calls": [_tool_call("toggle_light", {"room": "kitchen", "status": "off"})],
+             "hints": ("", "\n\nConfigured devices by room: light: kitchen.")}
+
+    def fake_chat_completion(purpose, messages, **kwargs):
+        state["calls"] += 1
+        msg = SimpleNamespace(tool_calls=state["tool_calls"], content=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+    monkeypatch.setattr(intent_parser, "chat_completion", fake_chat_completion)
+    monkeypatch.setattr(intent_parser, "require_cloud_llm_active", lambda: None)
+    monkeypatch.setattr(intent_parser, "_home_hints", lambda: state["hints"])
+    monkeypatch.setattr(intent_cache, "_stats", dict.fromkeys(intent_cache._stats, 0))
+    conversation_context.clear_context()
+    yield state
+    conversation_context.clear_context()
+
+
+def _executed(parsed, ok=True):
+    for leaf in parsed.get("intents") or [parsed]:
+        params = dict(leaf["params"])
+        if leaf["intent"] == "toggle_light":
+            params["turn_on"] = params.get("status") != "off"  # as light_handler does
+        action_parser._log_event_safe(leaf["intent"], params, {"ok": ok}, "text")
+
+
+def test_repeat_is_answered_locally_once_it_executed(llm):
+    first = intent_parser.quick_parse("Turn off the kitchen light")
+    assert first["source"] == "tools"
+    # Parsed but not yet executed: not learned.
+    intent_parser.quick_parse("Turn off the kitchen light")
+    assert llm["calls"] == 2
+
+    _executed(first)
+    hit = intent_parser.quick_parse("turn off the  kitchen light.")
+    assert llm["calls"] == 2
+    assert hit == {"intent": "toggle_light", "params": {"room": "kitchen", "status": "off"},
+                   "source": "intent_cache"}
+    assert intent_cache.stats()["entries"] == 1
+
+
+def test_failed_execution_is_not_learned_and_failed_replay_is_dropped(llm):
+    _executed(intent_parser.quick_parse("turn off the kitchen light"), ok=False)
+    assert intent_cache.stats()["entries"] == 0
+
+    _executed(intent_parser.quick_parse("turn off the kitchen light"))
+    hit = intent_parser.quick_parse("turn off the kitchen light")
+    assert hit["source"] == "intent_cache"
+    _executed(hit, ok=False)
+    assert intent_cache.stats()["entries"] == 0
+    intent_parser.quick_parse("turn off the kitchen light")
+    assert llm["calls"] == 3
+
+
+def test_home_changes_miss(llm):
+    _executed(intent_parser.quick_parse("turn off the kitchen light"))
+    llm["hints"] = ("", "\n\nConfigured devices by room: light: kitchen, office.")
+    assert intent_parser.quick_parse("turn off the kitchen light")["source"] == "tools"
+    assert llm["calls"] == 2
+
+
+def test_history_pronouns_and_live_context_bypass(llm):
+    _executed(intent_parser.quick_parse("turn off the kitchen light"))
+    history = [{"role": "assistant", "content": "Which room?"}]
+    assert intent_parser.quick_parse("turn off the kitchen light",
+                                     chat_history=history)["source"] == "tools"
+
+    _executed(intent_parser.quick_parse("turn it back on"))
+    conversation_context.set_context(room="office", device_type="light")
+    _executed(intent_parser.quick_parse("switch off office light"))
+    assert intent_cache.stats()["entries"] == 1
+    assert intent_parser.quick_parse("turn it back on")["source"] == "tools"
+
+
+def test_learned_parse_is_not_served_while_a_context_slot_is_live(llm):
+    _executed(intent_parser.quick_parse("turn off the light"))
+    assert intent_parser.quick_parse("turn off the light")["source"] == "intent_cache"
+
+    # "the light" now means the office light GPT was just talking about.
+    conversation_context.set_context(room="office", device_type="light")
+    assert intent_parser.quick_parse("turn off the light")["source"] == "tools"
+    assert intent_cache.stats()["bypass"] >= 1
+
+
+def test_multi_intent_is_learned_when_every_part_succeeded(llm):
+    llm["tool_calls"] = [_tool_call("toggle_light", {"room": "kitchen", "status": "on"}),
+                         _tool_call("control_ac", {"room": "kitchen", "turn_on": True})]
+    parsed = intent_parser.quick_parse("turn on the kitchen light and ac")
+    assert parsed["intent"] == "__multi__"
+    action_parser._log_event_safe("control_ac", {"room": "kitchen", "turn_on": True},
+                                  {"ok": True}, "text")
+    assert intent_cache.stats()["entries"] == 0
+    _executed({"intent": "toggle_light", "params": {"room": "kitchen", "status": "on"}})
+
+    hit = intent_parser.quick_parse("turn on the kitchen light and ac")
+    assert llm["calls"] == 1
+    assert [i["intent"] for i in hit["intents"]] == ["toggle_light", "control_ac"]
+    assert {i["source"] for i in hit["intents"]} == {"intent_cache"}
@@ -0,0 +1,89 @@
+"""
+Precompiled IR code index behind ir_listener._find_code_match.
+
+The index must give the same answer as the old linear four-pass scan
+(exact → fingerprint → protocol → fuzzy, first device/command wins), and
+must be rebuilt after the ir_manager mutators that change stored codes —
+but NOT after state-only writes, which fire on every matched press.
+"""
+import base64
+
+import pytest
+
+from services import ir_code_index, ir_listener, ir_manager
+from services.ir_protocol import _encode_nec_pulses, encode_broadlink_raw
+
+
+def _nec_b64(bits: list[int], jitter: int = 0) -> str:
+    pulses = [p + jitter for p in _encode_nec_pulses(bits)]
+    return base64.b64encode(encode_broadlink_raw(pulses)).decode()
+
+
+_VOL_UP = [1, 0, 1, 1, 0, 0, 1, 0] * 4
+_VOL_DOWN = [0, 1, 0, 0, 1, 1, 0, 1] * 4
+
+
+@pytest.fixture(autouse=True)
+def _tmp_ir_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(ir_manager, "IR_DEVICES_FILE", str(tmp_path / "ir_devices.json"))
+    ir_code_index.invalidate()
+    yield
+    ir_code_index.invalidate()
+
+
+def _make_tv(**codes) -> str:
+    dev = ir_manager.create_ir_device("TV", "tv", "remote.broadlink", "living_room")
+    for name, b64 in codes.items():
+        ir_manager.mark_command_learned(dev["id"], name, raw_code_b64=b64)
+    return dev["id"]
+
+
+def test_exact_hit_from_index():
+    dev_id = _make_tv(vol_up=_nec_b64(_VOL_UP))
+    frame = base64.b64decode(_nec_b64(_VOL_UP))
+    assert ir_listener._find_code_match(frame) == (dev_id, "vol_up", "exact")
+
+
+def test_jittered_frame_matches_by_decoded_key_not_bytes():
+    dev_id = _make_tv(vol_up=_nec_b64(_VOL_UP), vol_down=_nec_b64(_VOL_DOWN))
+    frame = base64.b64decode(_nec_b64(_VOL_DOWN, jitter=40))
+    match = ir_listener._find_code_match(frame)
+    assert match is not None
+    assert match[:2] == (dev_id, "vol_down")
+    assert match[2] in ("fingerprint", "protocol")
+
+
+def test_first_device_wins_on_duplicate_code():
+    first = _make_tv(power=_nec_b64(_VOL_UP))
+    _make_tv(power=_nec_b64(_VOL_UP))
+    idx = ir_code_index.get_index()
+    assert idx.exact[_nec_b64(_VOL_UP)] == (first, "power")
+
+
+def test_mark_command_learned_invalidates():
+    dev_id = _make_tv()
+    frame = base64.b64decode(_nec_b64(_VOL_UP))
+    assert ir_listener._find_code_match(frame) is None
+    ir_manager.mark_command_learned(dev_id, "vol_up", raw_code_b64=_nec_b64(_VOL_UP))
+    assert ir_listener._find_code_match(frame) == (dev_id, "vol_up", "exact")
+
+
+def test_disabling_device_drops_its_codes():
+    dev_id = _make_tv(vol_up=_nec_b64(_VOL_UP))
+    ir_manager.update_ir_device(dev_id, {"enabled": False})
+    assert ir_listener._find_code_match(base64.b64decode(_nec_b64(_VOL_UP))) is None
+
+
+def test_state_only_write_keeps_index():
+    dev_id = _make_tv(vol_up=_nec_b64(_VOL_UP))
+    idx = ir_code_index.get_index()
+    ir_manager._set_assumed_state(dev_id, "on")
+    assert ir_code_index.get_index() is idx
+
+
+def test_short_codes_land_in_fuzzy_table():
+    dev_id = _make_tv(vol_up=_nec_b64(_VOL_UP))
+    idx = ir_code_index.get_index()
+    assert len(idx.fuzzy) == 1
+    pulses = _encode_nec_pulses(_VOL_UP)
+    assert idx.fuzzy.best(pulses)[0] == (dev_id, "vol_up")
@@ -0,0 +1,104 @@
+"""
+Parity tests for ir_protocol.FuzzyPulseMatcher against the scalar reference
+fuzzy_match_pulses.
+
+The batched matcher must accept exactly the stored trains the scalar
+comparator accepts — same length gate, same leader/body tolerances, same
+mismatch budget — on both the NumPy path and the pure-Python fallback.
+"""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from services import ir_protocol
+from services.ir_protocol import (
+    FuzzyPulseMatcher,
+    fuzzy_match_pulses,
+    fuzzy_pulse_distance,
+)
+
+
+def _train(rng: random.Random, n_bits: int) -> list[int]:
+    out = [9000, 4500]
+    for _ in range(n_bits):
+        out += [560, 1690 if rng.random() < 0.5 else 560]
+    out.append(560)
+    return out
+
+
+def _jitter(rng: random.Random, pulses: list[int], pct: float) -> list[int]:
+    return [max(1, int(p * (1 + rng.uniform(-pct, pct)))) for p in pulses]
+
+
+def _corpus(seed: int = 7, size: int = 300):
+    rng = random.Random(seed)
+    stored = [_train(rng, rng.choice([8, 12, 16, 20, 24, 32])) for _ in range(size)]
+    # Queries: jittered copies of stored trains, mutated lengths, and noise.
+    queries = []
+    for _ in range(60):
+        base = rng.choice(stored)
+        q = _jitter(rng, base, rng.choice([0.05, 0.15, 0.3]))
+        if rng.random() < 0.3:
+            q = q[:-rng.randint(1, 6)] or q
+        queries.append(q)
+    queries.append([0, 0, 0, 0, 0, 0, 0, 0])
+    queries.append([9000, 4500, 560])
+    return stored, queries
+
+
+@pytest.fixture(params=["numpy", "scalar"])
+def backend(request, monkeypatch):
+    if request.param == "numpy":
+        pytest.importorskip("numpy")
+    else:
+        monkeypatch.setattr(ir_protocol, "_np", None)
+    return request.param
+
+
+def test_accepts_matches_scalar_reference(backend):
+    stored, queries = _corpus()
+    matcher = FuzzyPulseMatcher(stored)
+    for q in queries:
+        expected = [fuzzy_match_pulses(q, s) for s in stored]
+        assert matcher.accepts(q) == expected
+
+
+def test_per_row_tolerance_matches_scalar_reference(backend):
+    stored, queries = _corpus(seed=11, size=120)
+    rng = random.Random(3)
+    tols = [rng.choice([0.05, 0.1, 0.2, 0.35]) for _ in stored]
+    matcher = FuzzyPulseMatcher(stored, body_tolerances=tols)
+    for q in queries:
+        expected = [fuzzy_match_pulses(q, s, body_tolerance=t) for s, t in zip(stored, tols)]
+        assert matcher.accepts(q) == expected
+
+
+def test_best_is_closest_accepted_row(backend):
+    stored, queries = _corpus(seed=5, size=200)
+    keys = [f"code{i}" for i in range(len(stored))]
+    matcher = FuzzyPulseMatcher(stored, keys)
+    for q in queries:
+        accepted = [(fuzzy_pulse_distance(q, s), i)
+                    for i, s in enumerate(stored) if fuzzy_match_pulses(q, s)]
+        got = matcher.best(q)
+        if not accepted:
+            assert got is None
+            continue
+        best_d = min(d for d, _ in accepted)
+        assert got is not None
+        assert got[1] == pytest.approx(best_d)
+        # Ties resolve to the first row supplied.
+        tied = [i for d, i in accepted if d == pytest.approx(best_d)]
+        assert got[0] == keys[tied[0]]
+
+
+def test_empty_matcher_and_empty_query(backend):
+    assert FuzzyPulseMatcher([]).best([9000, 4500] + [560] * 10) is None
+    assert FuzzyPulseMatcher([[9000, 4500] + [560] * 10]).best([]) is None
+
+
+def test_key_count_mismatch_rejected():
+    with pytest.raises(ValueError):
+        FuzzyPulseMatcher([[1, 2, 3]], keys=["a", "b"])
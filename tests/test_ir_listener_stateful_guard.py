@@ -46,7 +46,11 @@ def _stub_devices(monkeypatch, stored_b64: str, command: str):
             "ir_codes": {command: stored_b64},
         }]
     import services.ir_manager as irm
+    from services import ir_code_index
     monkeypatch.setattr(irm, "list_ir_devices", fake_list)
+    # The listener matches against a precompiled index — drop any index a
+    # previous test built from its own stub.
+    ir_code_index.invalidate()
 
 
 def test_stateful_ac_frame_never_matches_stored_command(monkeypatch):
@@ -0,0 +1,116 @@
+"""
+Write-behind JSON document store (services/json_store) and the hot-path
+stores moved onto it.
+
+Updates land in memory and a burst of them costs one atomic flush; a clean
+store picks up out-of-band edits and deletes; a dirty store keeps its
+pending changes; flush_all() writes everything before shutdown.
+"""
+import json
+import os
+import time
+
+import pytest
+
+from services import json_store
+from services.json_store import UNCHANGED, JsonStore
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "doc.json")
+
+
+def test_burst_of_updates_is_one_flush(path):
+    store = JsonStore(path, flush_delay=60)
+    for i in range(50):
+        store.update(lambda d, i=i: d.__setitem__(f"k{i}", i))
+    assert not os.path.exists(path)
+    assert store.read()["k49"] == 49
+
+    assert store.flush() is True
+    assert store.flush() is False
+    stats = store.stats()
+    assert stats["updates"] == 50 and stats["flushes"] == 1 and not stats["dirty"]
+    text = open(path, encoding="utf-8").read()
+    assert "\n" not in text and json.loads(text)["k0"] == 0
+    assert not os.path.exists(path + ".tmp")
+
+
+def test_unchanged_skips_write(path):
+    store = JsonStore(path, flush_delay=60)
+    assert store.update(lambda d: UNCHANGED) is None
+    assert store.stats()["dirty"] is False
+
+
+def test_timer_flushes_in_background(path):
+    store = JsonStore(path, flush_delay=0.05)
+    store.update(lambda d: d.update(a=1))
+    deadline = time.time() + 2
+    while not os.path.exists(path) and time.time() < deadline:
+        time.sleep(0.01)
+    assert json.load(open(path, encoding="utf-8")) == {"a": 1}
+
+
+def test_clean_store_sees_out_of_band_edit_and_delete(path):
+    store = JsonStore(path, flush_delay=0)
+    store.update(lambda d: d.update(a=1))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"a": 2, "extra": True}, f)
+    assert store.read() == {"a": 2, "extra": True}
+    os.remove(path)
+    assert store.read() == {}
+
+
+def test_dirty_store_keeps_pending_changes(path):
+    store = JsonStore(path, flush_delay=60)
+    store.update(lambda d: d.update(a=1))
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"a": 2}, f)
+    assert store.read() == {"a": 1}
+    store.flush()
+    assert json.load(open(path, encoding="utf-8")) == {"a": 1}
+
+
+def test_corrupt_or_wrong_type_file_loads_default(path):
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[1, 2")
+    assert JsonStore(path).read() == {}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump([1, 2], f)
+    assert JsonStore(path).read() == {}
+    assert JsonStore(path, default=list).read() == [1, 2]
+
+
+def test_path_change_flushes_to_old_path(tmp_path):
+    target = {"p": str(tmp_path / "a.json")}
+    store = JsonStore(lambda: target["p"], flush_delay=60)
+    store.update(lambda d: d.update(a=1))
+    target["p"] = str(tmp_path / "b.json")
+    assert store.read() == {}
+    assert json.load(open(tmp_path / "a.json", encoding="utf-8")) == {"a": 1}
+
+
+def test_flush_all_writes_dirty_stores(tmp_path):
+    stores = [JsonStore(str(tmp_path / f"{i}.json"), flush_delay=60) for i in range(3)]
+    stores[0].update(lambda d: d.update(x=0))
+    stores[2].update(lambda d: d.update(x=2))
+    assert json_store.flush_all() == 2
+    assert sorted(os.listdir(tmp_path)) == ["0.json", "2.json"]
+
+
+def test_state_memory_record_is_write_behind(tmp_path, monkeypatch):
+    from services import state_memory
+    monkeypatch.setattr(state_memory, "STORE_FILE", str(tmp_path / "state_memory.json"))
+    monkeypatch.setattr(state_memory._store, "flush_delay", 60)
+
+    state_memory.record_service_call("light.desk", "turn_on", {"brightness": 120})
+    state_memory.record_service_call("light.desk", "turn_on", {"color_temp": 300})
+    assert not os.path.exists(state_memory.STORE_FILE)
+    assert state_memory.get_restore_payload("light.desk") == {
+        "entity_id": "light.desk", "brightness": 120, "color_temp": 300,
+    }
+
+    state_memory._store.flush()
+    on_disk = json.load(open(state_memory.STORE_FILE, encoding="utf-8"))
+    assert on_disk["light.desk"]["settings"] == {"brightness": 120, "color_temp": 300}
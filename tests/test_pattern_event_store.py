@@ -0,0 +1,83 @@
+"""
+SQLite event store behind services/pattern_logger.
+
+Covers the hygiene filters as indexed lookups (dedup, reversal marking), the
+one-time import of the legacy events.jsonl, and the checkpoint stream the
+pattern detector's statistics are advanced from.
+"""
+import json
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import pattern_logger
+
+
+@pytest.fixture(autouse=True)
+def store(tmp_path, monkeypatch):
+    monkeypatch.setattr(pattern_logger, "EVENTS_DB", tmp_path / "events.db")
+    monkeypatch.setattr(pattern_logger, "EVENTS_FILE", tmp_path / "events.jsonl")
+    monkeypatch.setattr(pattern_logger, "_ready_for", None)
+    return tmp_path
+
+
+def _ev(intent, action, days_ago=0.0, room="kitchen", **extra):
+    ts = datetime.now() - timedelta(days=days_ago)
+    return {"ts": ts.isoformat(timespec="seconds"), "source": "voice", "intent": intent,
+            "room": room, "action": action, "result": "ok", "automatable": True,
+            "reversed": False, **extra}
+
+
+def test_load_events_range_and_intent_filter():
+    pattern_logger.inject_sample_events([
+        _ev("control_light", "on", days_ago=40),
+        _ev("control_light", "on", days_ago=3),
+        _ev("control_ac", "off", days_ago=1),
+    ])
+    recent = pattern_logger.load_events(lookback_days=30)
+    assert [e["intent"] for e in recent] == ["control_light", "control_ac"]
+    assert len(pattern_logger.load_events(lookback_days=60, intent="control_light")) == 2
+
+
+def test_session_dedup_drops_retry():
+    params = {"room": "kitchen", "turn_on": True}
+    pattern_logger.log_event("control_light", params, {"ok": True}, "voice")
+    pattern_logger.log_event("control_light", params, {"ok": True}, "voice")
+    pattern_logger.log_event("control_light", params, {"ok": True}, "app")
+    assert [e["source"] for e in pattern_logger.load_events()] == ["voice", "app"]
+
+
+def test_reversal_marks_both_and_restreams_prior_row():
+    pattern_logger.log_event("control_light", {"room": "hall", "turn_on": True}, {"ok": True}, "voice")
+    rows, cp = pattern_logger.events_since(0)
+    assert len(rows) == 1 and rows[0][2]["reversed"] is False
+
+    pattern_logger.log_event("control_light", {"room": "hall", "turn_on": False}, {"ok": True}, "voice")
+    assert all(e["reversed"] for e in pattern_logger.load_events())
+
+    rows, cp2 = pattern_logger.events_since(cp)
+    assert cp2 > cp
+    # Both rows come back: the new one plus the re-marked prior one.
+    assert sorted(r[0] for r in rows) == [1, 2]
+    assert all(ev["reversed"] for _, _, ev in rows)
+    assert pattern_logger.events_since(cp2) == ([], cp2)
+
+
+def test_legacy_jsonl_imported_once(store):
+    legacy = store / "events.jsonl"
+    legacy.write_text(
+        json.dumps(_ev("control_ac", "off", days_ago=2)) + "\n"
+        + "not json\n"
+        + json.dumps(_ev("control_ac", "on", days_ago=1)) + "\n",
+        encoding="utf-8",
+    )
+    assert [e["action"] for e in pattern_logger.load_events()] == ["off", "on"]
+    assert not legacy.exists()
+    assert (store / "events.jsonl.migrated").exists()
+    pattern_logger._ready_for = None          # fresh process
+    assert len(pattern_logger.load_events()) == 2
+
+
+def test_recent_events_newest_first():
+    pattern_logger.inject_sample_events([_ev("a", "on", 2), _ev("b", "on", 1), _ev("c", "on", 0)])
+    assert [e["intent"] for e in pattern_logger.recent_events(2)] == ["c", "b"]
@@ -0,0 +1,178 @@
+"""
+Incrementally maintained pattern statistics (services/pattern_stats).
+
+Advancing in batches must land on the same statistics as a recompute over
+the same event log, sequence counts must match the old all-pairs scan, rows
+still inside the reversal window must wait, and a run with nothing new must
+not rewrite the candidate store.
+"""
+import random
+from collections import Counter
+from datetime import datetime, timedelta
+
+import pytest
+
+from services import pattern_detector, pattern_logger, pattern_stats
+
+GAP_S = 300
+
+
+@pytest.fixture(autouse=True)
+def stores(tmp_path, monkeypatch):
+    monkeypatch.setattr(pattern_logger, "EVENTS_DB", tmp_path / "events.db")
+    monkeypatch.setattr(pattern_logger, "EVENTS_FILE", tmp_path / "events.jsonl")
+    monkeypatch.setattr(pattern_logger, "_ready_for", None)
+    monkeypatch.setattr(pattern_stats, "STATS_FILE", tmp_path / "pattern_stats.json")
+    monkeypatch.setattr(pattern_detector, "CANDIDATES_FILE", tmp_path / "cand.json")
+    monkeypatch.setattr(pattern_detector, "_entity_id_is_known", lambda eid: True)
+    return tmp_path
+
+
+def _ev(ts: datetime, intent: str, room: str, action: str, entity: str | None = None):
+    return {"ts": ts.isoformat(timespec="seconds"), "source": "voice", "intent": intent,
+            "room": room, "action": action, "entity_id": entity, "result": "ok",
+            "automatable": True, "reversed": False}
+
+
+def _synthetic(start: datetime, days: int, seed: int = 4) -> list[dict]:
+    rng = random.Random(seed)
+    out = []
+    for d in range(days):
+        day = start + timedelta(days=d)
+        # Evening routine: light on, then TV a couple of minutes later.
+        t = day.replace(hour=19, minute=rng.randint(0, 40), second=rng.randint(0, 59))
+        out.append(_ev(t, "control_light", "living_room", "on", "light.living"))
+        out.append(_ev(t + timedelta(seconds=rng.randint(30, 240)),
+                       "control_media", "living_room", "on", "media_player.tv"))
+        # Noise
+        for _ in range(rng.randint(0, 4)):
+            t = day.replace(hour=rng.randint(6, 23), minute=rng.randint(0, 59))
+            out.append(_ev(t, rng.choice(["control_light", "control_ac", "control_fan"]),
+                           rng.choice(["kitchen", "bedroom", "office"]),
+                           rng.choice(["on", "off"])))
+    out.sort(key=lambda e: e["ts"])
+    return out
+
+
+def _brute_force_pairs(events: list[dict], gap_s: int) -> Counter:
+    """The pre-statistics pair scan from pattern_detector._update_sequence."""
+    events = sorted(events, key=lambda e: e["ts"])
+    counts: Counter = Counter()
+    for i, a in enumerate(events):
+        ta = datetime.fromisoformat(a["ts"]).timestamp()
+        for b in events[i + 1:]:
+            if datetime.fromisoformat(b["ts"]).timestamp() - ta > gap_s:
+                break
+            if b["intent"] == a["intent"] and b.get("room") == a.get("room"):
+                continue
+            counts[(f"{a['intent']}:{a['room']}:{a['action']}"
+                    f"→{b['intent']}:{b['room']}:{b['action']}")] += 1
+    return counts
+
+
+def test_batched_advance_matches_recompute():
+    now = datetime.now().replace(microsecond=0)
+    events = _synthetic(now - timedelta(days=50), 50)
+    batches = [events[i:i + 37] for i in range(0, len(events), 37)]
+    for batch in batches:
+        pattern_logger.inject_sample_events(batch)
+        pattern_stats.advance(30, GAP_S, now=now)
+    report = pattern_stats.verify(now=now)
+    assert report["ok"], report
+    assert report["time_buckets"] > 0 and report["pairs"] > 0
+
+
+def test_pair_counts_match_all_pairs_scan():
+    now = datetime.now().replace(microsecond=0)
+    events = _synthetic(now - timedelta(days=20), 20, seed=9)
+    pattern_logger.inject_sample_events(events)
+    stats, _, _ = pattern_stats.advance(30, GAP_S, now=now)
+    got = Counter({k: sum(len(d) for d in days.values()) for k, days in stats["pairs"].items()})
+    assert got == _brute_force_pairs(events, GAP_S)
+
+
+def test_occurrences_match_the_full_rescan():
+    # Seconds, per-occurrence entity pairing and A-then-B order all feed
+    # cluster means, last_seen and the dominant entities.
+    now = datetime.now().replace(microsecond=0)
+    events = _synthetic(now - timedelta(days=12), 12, seed=3)
+    events += [_ev(datetime.fromisoformat(e["ts"]) + timedelta(seconds=20), "control_media",
+                   "living_room", "on", "media_player.soundbar")
+               for e in events if e["intent"] == "control_light" and e["room"] == "living_room"]
+    events.sort(key=lambda e: e["ts"])
+    pattern_logger.inject_sample_events(events)
+    stats, _, _ = pattern_stats.advance(30, GAP_S, now=now)
+
+    time_want: dict = {}
+    for e in events:
+        ts = datetime.fromisoformat(e["ts"])
+        time_want.setdefault(pattern_stats.time_key(e), []).append((
+            ts.strftime("%Y-%m-%d"), ts.strftime("%Y-W%W"), ts.hour * 60 + ts.minute,
+            ts.weekday(), e["ts"], e["entity_id"]))
+    assert {k: pattern_detector._time_occurrences(v) for k, v in stats["time"].items()} == time_want
+
+    pair_want: dict = {}
+    for i, a in enumerate(events):
+        ta = datetime.fromisoformat(a["ts"])
+        for b in events[i + 1:]:
+            if datetime.fromisoformat(b["ts"]).timestamp() - ta.timestamp() > GAP_S:
+                break
+            if b["intent"] == a["intent"] and b["room"] == a["room"]:
+                continue
+            key = f"{a['intent']}:{a['room']}:{a['action']}→{b['intent']}:{b['room']}:{b['action']}"
+            pair_want.setdefault(key, []).append((
+                ta.strftime("%Y-%m-%d"), ta.strftime("%Y-W%W"), ta.weekday(), a["ts"],
+                a["entity_id"], b["entity_id"]))
+    assert {k: pattern_detector._pair_occurrences(v) for k, v in stats["pairs"].items()} == pair_want
+
+
+def test_days_leaving_lookback_are_pruned_and_reported():
+    now = datetime.now().replace(microsecond=0)
+    pattern_logger.inject_sample_events(_synthetic(now - timedelta(days=10), 10))
+    stats, _, _ = pattern_stats.advance(30, GAP_S, now=now)
+    assert "control_light|living_room|on" in stats["time"]
+
+    later = now + timedelta(days=25)
+    stats, time_keys, _ = pattern_stats.advance(30, GAP_S, now=later)
+    oldest = min(d for days in stats["time"].values() for d in days)
+    assert oldest >= (later - timedelta(days=30)).strftime("%Y-%m-%d")
+    assert "control_light|living_room|on" in time_keys
+    assert pattern_stats.verify(now=later)["ok"]
+
+
+def test_young_rows_wait_for_reversal_window():
+    now = datetime.now().replace(microsecond=0)
+    pattern_logger.log_event("control_fan", {"room": "office", "turn_on": True}, {"ok": True}, "voice")
+    stats, _, _ = pattern_stats.advance(30, GAP_S, now=now)
+    assert "control_fan|office|on" not in stats["time"]
+    assert len(stats["pending"]) == 1
+
+    # Reversed before it settles: never counted, no rebuild needed.
+    pattern_logger.log_event("control_fan", {"room": "office", "turn_on": False}, {"ok": True}, "voice")
+    later = now + timedelta(seconds=pattern_stats.SETTLE_S + 5)
+    stats, _, _ = pattern_stats.advance(30, GAP_S, now=later)
+    assert stats["pending"] == {}
+    assert not any(k.startswith("control_fan|office") for k in stats["time"])
+
+
+def test_update_and_detect_only_rewrites_on_new_events(monkeypatch):
+    now = datetime.now().replace(microsecond=0)
+    pattern_logger.inject_sample_events(_synthetic(now - timedelta(days=28), 28))
+    saves: list = []
+    real_save = pattern_detector._save_candidates
+    monkeypatch.setattr(pattern_detector, "_save_candidates",
+                        lambda c: saves.append(1) or real_save(c))
+
+    first = pattern_detector.update_and_detect()
+    assert saves == [1]
+    assert any(c.intent == "control_light" and c.pattern_type == "time_based" for c in first)
+
+    again = pattern_detector.update_and_detect()
+    assert saves == [1]
+    assert [c.key for c in again] == [c.key for c in first]
+
+    pattern_logger.inject_sample_events(
+        [_ev(now - timedelta(hours=1), "control_light", "living_room", "on", "light.living")]
+    )
+    pattern_detector.update_and_detect()
+    assert saves == [1, 1]
@@ -23,7 +23,7 @@ def pd(tmp_path, monkeypatch):
     mod = importlib.import_module("services.pattern_detector")
     # Isolate the candidate store + ignore any real event log.
     monkeypatch.setattr(mod, "CANDIDATES_FILE", Path(tmp_path) / "cand.json")
-    monkeypatch.setattr(mod, "load_events", lambda lookback_days=30: [])
+    monkeypatch.setattr(mod, "load_events", lambda lookback_days=30, intent=None: [])
     # No device registry in tests — treat cached entity_ids as known so the
     # stale-entity gate doesn't drop the candidate.
     monkeypatch.setattr(mod, "_entity_id_is_known", lambda eid: True)
@@ -0,0 +1,124 @@
+"""Decision cache + principal-indexed grants behind PermissionService.authorize."""
+from __future__ import annotations
+
+import random
+
+import pytest
+
+from services.permissions.audit import AuditLog
+from services.permissions.context import ContextBuilder
+from services.permissions.grants import Grant
+from services.permissions.service import PermissionService
+from services.permissions.store import PolicyStore
+from services.permissions.types import Effect, Principal
+
+
+@pytest.fixture
+def svc(tmp_path):
+    service = PermissionService(store=PolicyStore(str(tmp_path / "perm.db")),
+                                audit=AuditLog(str(tmp_path / "audit.db")))
+    service.add_space("home", "home")
+    for r in ("kitchen", "kids_room", "office"):
+        service.add_space(r, "room", parent_ids=["home"])
+        for i in range(5):
+            service.add_device(f"{r}_light{i}", "light", space_id=r)
+    service.add_device("front_lock", "lock", space_id="home")
+    service.add_principal("person:emma", attrs={"age": 40})
+    service.add_principal("person:noam", attrs={"age": 9})
+    service.bind_role("b_emma", "person:emma", "space:home", "adult")
+    service.bind_role("b_noam", "person:noam", "space:home", "kid")
+    return service
+
+
+def _ctx(time="12:00", channel="app", **raw):
+    return ContextBuilder().session(channel=channel, trust_level=3) \
+        .time(local_hhmm=time).raw(**raw).build()
+
+
+def _same(a, b):
+    return (a.effect, a.reason, a.matched_grant_ids, a.obligations, a.trace) == \
+           (b.effect, b.reason, b.matched_grant_ids, b.obligations, b.trace)
+
+
+def test_grants_for_index_matches_scan(svc):
+    state = svc.state()
+    refs = {"person:noam", "group:kids", "group:everyone"}
+    assert state.grants_for(refs) == [g for g in state.grants.values()
+                                      if g.principal.ref in refs]
+
+
+def test_burst_is_served_from_cache(svc):
+    ctx = _ctx()
+    devices = [f"device:kitchen_light{i}" for i in range(5)]
+    for _ in range(6):
+        for d in devices:
+            svc.authorize(subject="person:emma", action="light.onoff",
+                          resource=d, context=ctx, record=False)
+    stats = svc.decision_cache_stats()
+    assert stats["misses"] == 5 and stats["hits"] == 25 and stats["expansions"] == 1
+
+
+def test_unrelated_context_hits_relevant_context_misses(svc):
+    svc.issue_grant(Grant("quiet", Principal.person("noam"), Effect.DENY,
+                          {"node": "space:kids_room"}, {"scope_tag": "lighting"},
+                          condition={"between": [{"var": "time.local"}, "21:00", "07:00"]}))
+    ask = lambda ctx: svc.authorize(subject="person:noam", action="light.onoff",  # noqa: E731
+                                    resource="device:kids_room_light0", context=ctx,
+                                    record=False)
+    day = ask(_ctx("12:00", request_id="a"))
+    assert ask(_ctx("12:00", request_id="b")).allowed == day.allowed
+    assert svc.decision_cache_stats()["hits"] == 1
+    assert not ask(_ctx("22:30")).allowed
+    assert svc.decision_cache_stats()["hits"] == 1
+
+
+def test_policy_write_invalidates(svc):
+    ctx = _ctx()
+    svc.issue_grant(Grant("extra", Principal.person("noam"), Effect.ALLOW,
+                          {"node": "device:front_lock"}, {"key": "lock.lock"}))
+    assert svc.authorize(subject="person:noam", action="lock.lock",
+                         resource="device:front_lock", context=ctx, record=False).allowed
+    svc.revoke_grant("extra")
+    assert not svc.authorize(subject="person:noam", action="lock.lock",
+                             resource="device:front_lock", context=ctx, record=False).allowed
+    assert svc.decision_cache_stats()["invalidations"] >= 1
+
+
+def test_expiring_grant_bounds_cached_decision(svc):
+    t0 = 1_800_000_000.0
+    svc.issue_grant(Grant("temp", Principal.person("noam"), Effect.ALLOW,
+                          {"node": "device:front_lock"}, {"key": "lock.lock"}, expires_at=t0 + 60))
+    ask = lambda now: svc.authorize(subject="person:noam", action="lock.lock",  # noqa: E731
+                                    resource="device:front_lock", context=_ctx(),
+                                    now=now, record=False).allowed
+    assert ask(t0) and ask(t0 + 59)
+    assert not ask(t0 + 60)
+    # Going back in time (point-in-time query) must not reuse the "expired" entry.
+    assert ask(t0 + 30)
+
+
+def test_cached_decision_equals_fresh_engine_run(svc):
+    rng = random.Random(3)
+    svc.issue_grant(Grant("night", Principal.group("kids"), Effect.DENY,
+                          {"node": "space:kitchen"}, {"scope_tag": "lighting"},
+                          condition={"between": [{"var": "time.local"}, "22:00", "06:00"]}))
+    svc.issue_grant(Grant("brief", Principal.person("emma"), Effect.ALLOW,
+                          {"node": "device:front_lock"}, {"key": "*"}, expires_at=1_800_000_100.0))
+    subjects = ["person:emma", "person:noam", "person:ghost"]
+    actions = ["light.onoff", "lock.unlock", "lock.lock", "climate.mode"]
+    resources = [f"device:{r}_light{i}" for r in ("kitchen", "office") for i in range(2)] \
+        + ["device:front_lock", "device:nope"]
+    for _ in range(400):
+        kw = dict(subject=rng.choice(subjects), action=rng.choice(actions),
+                  resource=rng.choice(resources),
+                  context=_ctx(rng.choice(["12:00", "23:00"]), emergency=rng.random() < 0.2),
+                  now=rng.choice([None, 1_800_000_000.0, 1_800_000_200.0]), record=False)
+        assert _same(svc.authorize(**kw), svc.authorize(**kw, use_cache=False))
+    assert svc.decision_cache_stats()["hits"] > 0
+
+
+def test_returned_decision_is_a_copy(svc):
+    kw = dict(subject="person:emma", action="light.onoff",
+              resource="device:office_light0", context=_ctx(), record=False)
+    svc.authorize(**kw).trace.clear()
+    assert svc.authorize(**kw).trace
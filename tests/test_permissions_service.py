@@ -115,6 +115,82 @@ def test_point_in_time_query(svc):
     assert late.grants_for({"person:sister"})
 
 
+# --------------------------------------------------------------------------
+# Read model: snapshot + replay, incremental apply, in-process head seq
+# --------------------------------------------------------------------------
+
+def _churn(svc, n):
+    for i in range(n):
+        svc.add_principal(f"person:p{i}", attrs={"age": 20 + i % 50})
+        svc.bind_role(f"b{i}", f"person:p{i}", "space:home",
+                      "kid" if i % 3 == 0 else "adult")
+        if i % 4 == 0:
+            svc.add_device(f"lamp{i}", "light", space_id="kids_room")
+        if i % 5 == 0:
+            svc.upsert_group(f"g{i}", "static", members=[f"person:p{i}"])
+        if i % 7 == 0:
+            svc.unbind_role(f"b{i}")
+        # Interleaved reads force an incremental apply after every few writes.
+        svc.authorize(subject=f"person:p{i}", action="light.onoff",
+                      resource="device:kr_light", context=_ctx(), record=False)
+
+
+def test_incremental_read_model_matches_replay(svc):
+    _churn(svc, 30)
+    assert svc.state().to_snapshot() == build_state(svc.store).to_snapshot()
+
+
+def test_steady_state_authorize_is_memory_only(svc, monkeypatch):
+    svc.add_principal("person:emma", attrs={"age": 40})
+    svc.bind_role("b_owner", "person:emma", "space:home", "owner")
+    svc.state()
+
+    def _no_db():
+        raise AssertionError("authorize touched SQLite")
+    monkeypatch.setattr(svc.store, "_connect", _no_db)
+    assert svc.authorize(subject="person:emma", action="lock.unlock",
+                         resource="device:front_lock", context=_ctx(), record=False).allowed
+
+
+def test_snapshot_restore_replays_only_the_tail(svc, monkeypatch):
+    import services.permissions.service as service_mod
+    monkeypatch.setattr(service_mod, "_SNAPSHOT_EVERY", 20)
+    _churn(svc, 25)
+    snaps = svc.store.snapshot_seqs()
+    assert snaps and max(snaps) > 0
+
+    svc.add_principal("person:late", attrs={"age": 30})
+    fresh = PermissionService(store=PolicyStore(svc.store.db_path), audit=svc.audit)
+    replayed = []
+    real_events = fresh.store.events
+    monkeypatch.setattr(fresh.store, "events",
+                        lambda **kw: replayed.extend(real_events(**kw)) or real_events(**kw))
+    state = fresh.state()
+    assert replayed and min(e["seq"] for e in replayed) > max(snaps)
+    assert state.to_snapshot() == build_state(svc.store).to_snapshot()
+
+
+def test_snapshot_with_stale_fingerprint_is_ignored(svc, monkeypatch):
+    from services.permissions import store as store_mod
+    svc.store.save_snapshot(svc.store.latest_seq(), {"spaces": []})   # bogus content
+    monkeypatch.setattr(store_mod, "_fingerprint", "other-code")
+    fresh = PermissionService(store=PolicyStore(svc.store.db_path), audit=svc.audit)
+    assert "home" in fresh.state().spaces
+
+
+def test_refresh_sees_out_of_process_writes(svc):
+    import json
+    import sqlite3
+    svc.state()
+    with sqlite3.connect(svc.store.db_path) as db:
+        db.execute("INSERT INTO policy_events (ts, event_type, payload) VALUES (?, ?, ?)",
+                   ("2026-01-01T00:00:00+00:00", "space_added",
+                    json.dumps({"id": "garage", "type": "room", "parent_ids": ["home"]})))
+    assert "garage" not in svc.state().spaces
+    svc.refresh()
+    assert "garage" in svc.state().spaces
+
+
 # --------------------------------------------------------------------------
 # Delegation + revoke cascade
 # --------------------------------------------------------------------------
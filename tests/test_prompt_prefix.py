@@ -0,0 +1,74 @@
+"""core.prompt_prefix — versioned prompt blocks and stable-first prompts."""
+from types import SimpleNamespace
+
+import pytest
+
+from core import intent_parser, prompt_prefix
+from core.handlers import chat_handler
+from services import device_registry, ir_manager
+
+
+@pytest.fixture(autouse=True)
+def fresh(monkeypatch):
+    monkeypatch.setattr(prompt_prefix, "_blocks", {})
+    monkeypatch.setattr(prompt_prefix, "_stats", {})
+    monkeypatch.setattr(prompt_prefix, "_last_prefix", {})
+
+
+def test_block_is_rebuilt_only_when_its_inputs_move():
+    builds = []
+
+    def build():
+        builds.append(1)
+        return f"block v{len(builds)}"
+
+    for version in (1, 1, 2, 2):
+        prompt_prefix.assemble("p", [("b", version, build)])
+    assert len(builds) == 2
+    s = prompt_prefix.stats()["purposes"]["p"]
+    assert (s["assemblies"], s["blocks_built"], s["blocks_reused"]) == (4, 2, 2)
+    assert s["prefix_repeats"] == 2 and s["prefix_reuse_rate"] == 0.5
+
+
+def test_intent_prompt_follows_registry_generation_and_ir_file(tmp_path, monkeypatch):
+    monkeypatch.setattr(ir_manager, "IR_DEVICES_FILE", str(tmp_path / "ir_devices.json"))
+    rooms = {"light": ["kitchen"]}
+    monkeypatch.setattr(device_registry, "get_rooms_by_device_type", lambda: dict(rooms))
+
+    assert intent_parser._home_hints() == ("", "\n\nConfigured devices by room: light: kitchen.")
+    rooms["fan"] = ["office"]
+    # Same generation: the cached block stands.
+    assert "fan" not in intent_parser._home_hints()[1]
+    monkeypatch.setattr(device_registry, "_generation", device_registry.generation() + 1)
+    assert "fan: office" in intent_parser._home_hints()[1]
+
+    ir_manager._save([{"id": "tv1", "name": "Salon TV", "type": "tv", "room": "living_room",
+                       "commands": {"power": "x"}}])
+    assert "Salon TV" in intent_parser._home_hints()[0]
+    s = prompt_prefix.stats()["purposes"]["intent_parse"]
+    assert s["assemblies"] == 4 and s["blocks_built"] == 3 + 1 + 1
+
+
+async def test_chat_prompt_shares_its_prefix_across_users(monkeypatch):
+    sent = []
+
+    def fake_chat_completion(purpose, messages, **kwargs):
+        sent.append(messages[0]["content"])
+        msg = SimpleNamespace(tool_calls=None, content="Sure.")
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)])
+
+    memories = iter([{"user_name": "Dana"}, {"user_name": "Noa", "likes": "tea"}])
+    monkeypatch.setattr(chat_handler, "chat_completion", fake_chat_completion)
+    monkeypatch.setattr(chat_handler, "require_cloud_llm_active", lambda: None)
+    monkeypatch.setattr(chat_handler, "list_memory", lambda: next(memories))
+    monkeypatch.setattr(chat_handler, "load_task_json", lambda: [])
+
+    for text in ("how long do eggs boil", "is tea healthy"):
+        r = await chat_handler.handle_chat_with_gpt(
+            {"text": text, "chat_history": [{"role": "user", "content": text}]})
+        assert r["ok"]
+    first, second = sent
+    rules = prompt_prefix._blocks["chat.rules"][1]
+    assert first.startswith(rules) and second.startswith(rules)
+    assert "Dana" not in rules and len(rules) > 4000
+    assert prompt_prefix.stats()["purposes"]["chat"]["blocks_reused"] == 2
@@ -0,0 +1,177 @@
+"""Event-driven device-registry reconciliation.
+
+ha_subscriber feeds state and registry events to apply_state /
+apply_registry_event; the full pipeline only runs as refresh() after edits and
+as the periodic drift audit. These tests drive the delta functions directly
+against an isolated in-memory table.
+"""
+import asyncio
+import json
+
+import pytest
+
+from services import device_registry as dr
+
+
+@pytest.fixture(autouse=True)
+def registry(tmp_path, monkeypatch):
+    path = tmp_path / "device_registry.json"
+    monkeypatch.setattr(dr, "REGISTRY_FILE", str(path))
+    monkeypatch.setattr(dr, "_FLUSH_DELAY_S", 3600.0)
+    monkeypatch.setattr(dr, "_dirty", False)
+    monkeypatch.setattr(dr, "_flush_timer", None)
+    monkeypatch.setattr(dr, "_initialized", True)
+    monkeypatch.setattr(dr, "_last_audit_at", 0.0)
+    monkeypatch.setattr(dr, "_reconcile_stats", {**dr._reconcile_stats, "flushes": 0, "audits": 0})
+    monkeypatch.setattr(dr, "_hidden_category_ids", set())
+    monkeypatch.setattr(dr, "_mass_loss_first_seen_at", None)
+    # Local-file merges are not under test here.
+    monkeypatch.setattr(dr, "_merge_ir_devices", lambda devices: devices)
+    monkeypatch.setattr(dr, "_merge_ziggy_smart_sensors", lambda devices: devices)
+    monkeypatch.setattr(dr, "_registry", [
+        {"entity_id": "light.kitchen", "room": "kitchen", "room_source": "user",
+         "device_type": "light", "ir_device_id": None, "status": dr.CONNECTED, "name": "Kitchen"},
+        {"entity_id": "sensor.office_t", "room": "office", "room_source": "user",
+         "device_type": "sensor", "ir_device_id": None, "status": dr.CONNECTED, "name": "Office"},
+    ])
+    with dr._lock:
+        dr._rebuild_indexes()
+    yield path
+    if dr._flush_timer is not None:
+        dr._flush_timer.cancel()
+
+
+def _state(state="on", **attrs):
+    return {"state": state, "attributes": attrs}
+
+
+def test_value_change_of_a_known_entity_is_a_no_op(registry):
+    gen = dr.generation()
+    assert dr.apply_state("light.kitchen", _state("off")) is False
+    assert dr.generation() == gen
+    assert dr.flush() is False
+    assert not registry.exists()
+
+
+def test_new_entity_lands_unclaimed_and_one_write_covers_the_burst(registry):
+    gen = dr.generation()
+    assert dr.apply_state("switch.boiler", _state("off")) is True
+    assert dr.apply_state("fan.bedroom", _state("off")) is True
+    assert dr.apply_state("automation.morning", _state("on")) is False   # not a device
+    assert dr.generation() == gen + 2
+    assert dr._idx_by_entity_id["switch.boiler"]["status"] == dr.UNCLAIMED
+
+    assert dr.flush() is True
+    assert dr.flush() is False
+    saved = {d["entity_id"] for d in json.loads(registry.read_text())}
+    assert {"switch.boiler", "fan.bedroom"} <= saved
+    assert dr._reconcile_stats["flushes"] == 1
+
+
+def test_removal_and_return(registry):
+    assert dr.apply_state("light.kitchen", None) is True
+    row = dr._idx_by_entity_id["light.kitchen"]
+    assert row["status"] == dr.LOST and "_lost_since" in row
+    assert dr.apply_state("light.kitchen", None) is False
+
+    assert dr.apply_state("light.kitchen", _state("on")) is True
+    assert row["status"] == dr.CONNECTED and "_lost_since" not in row
+    assert dr.get_entity("kitchen", "light") == "light.kitchen"
+
+
+def test_device_class_refinement_moves_the_room_type_index(registry):
+    assert dr.get_entity("office", "temperature") is None
+    assert dr.apply_state("sensor.office_t", _state("21.5", device_class="temperature")) is True
+    assert dr.get_entity("office", "temperature") == "sensor.office_t"
+    assert dr._idx_by_room_type.get(("office", "sensor")) is None
+
+
+def test_rename_keeps_the_users_room(registry):
+    assert dr.rename_entity("light.kitchen", "light.kitchen_ceiling") is True
+    assert dr.get_entity("kitchen", "light") == "light.kitchen_ceiling"
+    assert "light.kitchen" not in dr._idx_by_entity_id
+
+
+def test_audit_reports_only_what_the_deltas_missed(registry, monkeypatch):
+    live = [{"entity_id": "light.kitchen", **_state()},
+            {"entity_id": "sensor.office_t", **_state("21")},
+            {"entity_id": "switch.boiler", **_state("off")}]
+    monkeypatch.setattr(dr, "_live_states_and_ids",
+                        lambda: (live, {s["entity_id"] for s in live}))
+    dr.apply_state("switch.boiler", _state("off"))
+    dr.flush()
+    gen = dr.generation()
+
+    report = dr.audit()
+    assert (report["added"], report["removed"], report["changed"]) == (0, 0, 0), report
+    assert dr.generation() == gen      # nothing changed → no rewrite, no bump
+
+    live.append({"entity_id": "cover.blinds", **_state("open")})   # delta never arrived
+    report = dr.audit()
+    assert report["added"] == 1 and report["sample"]["added"] == ["cover.blinds"]
+    assert dr._idx_by_entity_id["cover.blinds"]["status"] == dr.UNCLAIMED
+    assert dr.generation() > gen
+
+
+def test_audit_pipeline_runs_without_the_lock_and_keeps_a_concurrent_delta(registry, monkeypatch):
+    live = [{"entity_id": "light.kitchen", **_state()},
+            {"entity_id": "sensor.office_t", **_state("21")},
+            {"entity_id": "cover.blinds", **_state("open")}]
+    monkeypatch.setattr(dr, "_live_states_and_ids",
+                        lambda: (live, {s["entity_id"] for s in live}))
+    passes = []
+
+    def merge_with_a_delta(devices):
+        # The HA loop delivers a state_changed mid-pass: apply_state must not
+        # block on the pass, and its row must survive the pass's swap.
+        passes.append(1)
+        if len(passes) == 1:
+            assert dr.apply_state("switch.boiler", _state("off")) is True
+        return devices
+
+    monkeypatch.setattr(dr, "_merge_ir_devices", merge_with_a_delta)
+    report = dr.audit()
+    assert len(passes) == 2                 # the stale first pass was redone
+    assert report["added"] == 1 and report["sample"]["added"] == ["cover.blinds"]
+    assert {"switch.boiler", "cover.blinds"} <= dr._idx_by_entity_id.keys()
+    saved = {d["entity_id"] for d in json.loads(registry.read_text())}
+    assert {"switch.boiler", "cover.blinds"} <= saved
+
+
+def test_consistency_pass_audits_on_interval_while_events_are_live(monkeypatch):
+    calls = []
+    monkeypatch.setattr(dr, "audit", lambda: calls.append("audit"))
+    monkeypatch.setattr(dr, "refresh", lambda: calls.append("refresh"))
+
+    monkeypatch.setattr(dr, "events_live", lambda: True)
+    dr.consistency_pass()
+    dr._last_audit_at = dr.time.monotonic()
+    dr.consistency_pass()
+    assert calls == ["audit"]
+
+    monkeypatch.setattr(dr, "events_live", lambda: False)
+    dr.consistency_pass()
+    assert calls == ["audit", "refresh"]
+
+
+def test_registry_events_coalesce_into_one_area_sync(monkeypatch):
+    syncs = []
+
+    async def fake_sync():
+        syncs.append(1)
+        return 0
+
+    monkeypatch.setattr(dr, "sync_ha_areas", fake_sync)
+    monkeypatch.setattr(dr, "_AREA_SYNC_DELAY_S", 0.01)
+    monkeypatch.setattr(dr, "_area_sync_task", None)
+
+    async def run():
+        await dr.apply_registry_event("area_registry_updated", {"action": "create", "area_id": "attic"})
+        await dr.apply_registry_event("device_registry_updated",
+                                      {"action": "update", "device_id": "d1", "changes": {"area_id": None}})
+        await dr.apply_registry_event("device_registry_updated",
+                                      {"action": "update", "device_id": "d1", "changes": {"name": "x"}})
+        await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert syncs == [1]
@@ -0,0 +1,87 @@
+"""relay/app/audit — queued high-frequency events, rollup counters, sampling.
+
+Successful hub telemetry / OTA polls become per-home daily counters instead
+of rows; failures and every other event stay individual audit_log rows, and
+nothing accepted onto the queue is lost on shutdown.
+"""
+
+from __future__ import annotations
+
+import pytest
+
+from relay.app import audit
+from relay.app import database as dbmod
+
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(dbmod, "DATABASE_URL", str(tmp_path / "relay.db"))
+    monkeypatch.setattr(audit, "_stats", audit._new_stats())
+    monkeypatch.setattr(audit, "_sample_seen", {})
+    await dbmod.init_db()
+    yield dbmod
+    await audit.stop_audit_writer()
+
+
+async def _rows(sql: str) -> list[dict]:
+    async with dbmod.get_db() as conn:
+        return [dict(r) for r in await conn.execute_fetchall(sql)]
+
+
+async def test_successes_roll_up_and_failures_stay_rows(db):
+    for ip in ("10.0.0.1", "10.0.0.2", "10.0.0.3"):
+        await audit.log_event("telemetry_posted", home_id="home-a", source_ip=ip)
+    await audit.log_event("telemetry_posted", home_id="home-a", ok=False,
+                          detail="signature: signature_mismatch")
+
+    rollup = await _rows("SELECT event, home_id, count, source_ip FROM audit_rollup")
+    assert rollup == [{"event": "telemetry_posted", "home_id": "home-a",
+                       "count": 3, "source_ip": "10.0.0.3"}]
+    rows = await _rows("SELECT event, ok, detail FROM audit_log")
+    assert rows == [{"event": "telemetry_posted", "ok": 0,
+                     "detail": "signature: signature_mismatch"}]
+
+
+async def test_queued_events_are_batched_and_flushed_on_stop(db):
+    audit.start_audit_writer()
+    for i in range(60):
+        await audit.log_event("ota_manifest_served", home_id=f"home-{i % 3}")
+    await audit.log_event("ota_manifest_served", home_id="home-0", ok=False)
+    assert await _rows("SELECT * FROM audit_rollup") == []
+
+    await audit.stop_audit_writer()
+    counts = await _rows("SELECT home_id, count FROM audit_rollup ORDER BY home_id")
+    assert [c["count"] for c in counts] == [20, 20, 20]
+    assert len(await _rows("SELECT * FROM audit_log")) == 1
+    stats = audit.audit_stats()
+    assert stats["queued"] == 61 and stats["flushes"] == 1 and stats["max_batch"] == 61
+
+
+async def test_other_events_are_written_before_log_event_returns(db):
+    audit.start_audit_writer()
+    await audit.log_event("support_session_opened", home_id="home-a", detail="by=a@ex.com")
+    rows = await _rows("SELECT event FROM audit_log")
+    assert rows == [{"event": "support_session_opened"}]
+
+
+async def test_sample_mode_keeps_every_nth_row_and_exact_counts(db, monkeypatch):
+    monkeypatch.setattr(audit, "AUDIT_HF_MODE", "sample")
+    monkeypatch.setattr(audit, "AUDIT_SAMPLE_EVERY", 4)
+    for _ in range(10):
+        await audit.log_event("telemetry_posted", home_id="home-a")
+    assert len(await _rows("SELECT * FROM audit_log")) == 3
+    assert (await _rows("SELECT count FROM audit_rollup"))[0]["count"] == 10
+
+
+async def test_full_queue_drops_successes_and_writes_failures_inline(db, monkeypatch):
+    monkeypatch.setattr(audit, "AUDIT_QUEUE_MAX", 2)
+    audit.start_audit_writer()
+    for _ in range(5):
+        await audit.log_event("telemetry_posted", home_id="home-a")
+    await audit.log_event("telemetry_posted", home_id="home-a", ok=False, detail="x")
+    assert len(await _rows("SELECT * FROM audit_log")) == 1
+
+    await audit.stop_audit_writer()
+    stats = audit.audit_stats()
+    assert (stats["queued"], stats["dropped"]) == (2, 3)
+    assert (await _rows("SELECT count FROM audit_rollup"))[0]["count"] == 2
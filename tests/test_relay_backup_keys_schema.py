@@ -243,8 +243,14 @@ async def test_init_db_creates_all_tables(relay_db):
         names = {r["name"] for r in rows}
     assert names == {
         "homes", "users", "invites", "audit_log", "home_backup_keys",
+        # Per-home counters for high-frequency audit events (relay/app/audit.py):
+        "audit_rollup",
         # Prompt 2 chunk 2.1 + 2.3:
         "ota_releases", "telemetry_raw", "telemetry_daily",
+        # Hourly rollups + fold bookkeeping (relay/app/telemetry_retention.py):
+        "telemetry_hourly", "telemetry_rollup_state",
+        # Fleet read model (relay/app/home_latest.py):
+        "home_latest",
         # Prompt 4 chunk 2.H (staged-rollout cohorts):
         "ota_release_cohorts", "home_cohorts",
         # Prompt 9 chunk 2 (Stripe billing):
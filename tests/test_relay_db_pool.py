@@ -0,0 +1,90 @@
+"""relay/app/database — pooled WAL connections and the batched single writer.
+
+get_db() must stay a drop-in: same Row objects, same "no commit means no
+write" semantics, and a plain per-call connection whenever no pool is open
+for the current DATABASE_URL (which is how every other relay test runs).
+"""
+
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from relay.app import database as dbmod
+
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(dbmod, "DATABASE_URL", str(tmp_path / "relay.db"))
+    await dbmod.init_db()
+    yield dbmod
+    await dbmod.close_pool()
+
+
+async def _count(table: str) -> int:
+    async with dbmod.get_db() as conn:
+        return (await conn.execute_fetchall(f"SELECT COUNT(*) AS c FROM {table}"))[0]["c"]
+
+
+def _audit(event: str, fail: bool = False):
+    async def fn(conn):
+        cur = await conn.execute(
+            "INSERT INTO audit_log (ts, event, ok) VALUES ('t', ?, 1)", (event,))
+        if fail:
+            raise RuntimeError(f"{event} failed")
+        return cur.lastrowid
+    return fn
+
+
+async def test_pooled_connections_are_reused_and_tuned(db):
+    await db.open_pool(size=2)
+    seen = set()
+    for _ in range(5):
+        async with db.get_db() as conn:
+            seen.add(id(conn))
+            mode = (await conn.execute_fetchall("PRAGMA journal_mode"))[0][0]
+            sync = (await conn.execute_fetchall("PRAGMA synchronous"))[0][0]
+    assert len(seen) <= 2
+    assert (mode, sync) == ("wal", 1)
+    assert db.pool_stats()["checkouts"] == 5
+
+
+async def test_uncommitted_work_is_discarded_on_return(db):
+    await db.open_pool(size=1)
+    async with db.get_db() as conn:
+        await conn.execute("INSERT INTO audit_log (ts, event, ok) VALUES ('t', 'x', 1)")
+    assert await _count("audit_log") == 0
+
+
+async def test_concurrent_writes_share_commits_and_fail_alone(db):
+    await db.open_pool(size=2)
+    results = await asyncio.gather(
+        *[db.run_write(_audit(f"e{i}", fail=(i == 7))) for i in range(40)],
+        return_exceptions=True,
+    )
+    errors = [r for r in results if isinstance(r, Exception)]
+    assert [str(e) for e in errors] == ["e7 failed"]
+    assert await _count("audit_log") == 39
+    stats = db.pool_stats()
+    assert stats["writes"] == 40 and stats["write_batches"] < 40
+    assert stats["write_errors"] == 1
+
+
+async def test_close_flushes_queued_writes(db):
+    await db.open_pool(size=1)
+    pending = [asyncio.ensure_future(db.run_write(_audit(f"e{i}"))) for i in range(10)]
+    await asyncio.sleep(0)
+    await db.close_pool()
+    assert all(p.done() and not p.exception() for p in pending)
+    assert await _count("audit_log") == 10
+
+
+async def test_falls_back_when_no_pool_matches_the_path(db, tmp_path, monkeypatch):
+    assert await db.run_write(_audit("unpooled")) == 1
+    await db.open_pool(size=1)
+    monkeypatch.setattr(dbmod, "DATABASE_URL", str(tmp_path / "other.db"))
+    await dbmod.init_db()
+    await db.run_write(_audit("elsewhere"))
+    assert db.pool_stats()["writes"] == 0
+    assert await _count("audit_log") == 1
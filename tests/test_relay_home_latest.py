@@ -0,0 +1,164 @@
+"""home_latest — the per-home read model behind the fleet page and remediator.
+
+Ingest interprets each post once; readers only add silence. The verdicts must
+be exactly what evaluating the newest raw payload would have produced, and the
+row must survive everything that touches telemetry_raw: backfill on upgrade,
+retention pruning, rule changes on deploy, and home deletion.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+_has_jwt = importlib.util.find_spec("jwt") is not None
+pytestmark = pytest.mark.skipif(
+    not _has_jwt,
+    reason="PyJWT not installed in this venv — see relay/requirements.txt",
+)
+
+if _has_jwt:
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from relay.app import database as dbmod
+    from relay.app import fleet_health, home_latest, remediator
+    from relay.app.audit import sign as sign_hmac
+    from relay.app.auth import issue_jwt
+    from relay.app.routers.fleet import router as fleet_router
+    from relay.app.routers.telemetry import router as telemetry_router
+
+
+SECRET = "test-secret-32-bytes-aaaaaaaaaa"
+
+_LOST = {"ha_version": "2026.6.1", "deploy": {"release_tag": "release-2026.08.11-5"},
+         "health": {"ha_reachable": True, "coordinator_state": "loaded",
+                    "devices": {"total": 23, "offline": 0},
+                    "registry": {"total": 23, "lost": 23}}}
+_HEALTHY = {"ha_version": "2026.6.1", "disk_pct_used": 40,
+            "health": {"ha_reachable": True, "coordinator_state": "loaded",
+                       "devices": {"total": 5, "offline": 0},
+                       "registry": {"total": 5, "lost": 0}}}
+
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(dbmod, "DATABASE_URL", str(tmp_path / "relay.db"))
+    monkeypatch.setattr(remediator, "log_event", _noop)
+    await dbmod.init_db()
+    async with dbmod.get_db() as conn:
+        for hid in ("home-a", "home-b", "home-c"):
+            await conn.execute(
+                "INSERT INTO homes (id, name, type, status, relay_secret, created_at) "
+                "VALUES (?,?,?,?,?,?)",
+                (hid, hid.upper(), "hub", "active", SECRET, "2026-01-01"),
+            )
+        await conn.commit()
+    return dbmod
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(telemetry_router)
+    app.include_router(fleet_router, prefix="/api")
+    return TestClient(app)
+
+
+async def _noop(*a, **k):
+    return None
+
+
+def _post(client, home_id, payload):
+    body = json.dumps(payload, separators=(",", ":")).encode()
+    r = client.post(f"/api/devices/{home_id}/telemetry", content=body,
+                    headers={"X-Ziggy-Signature": sign_hmac(SECRET, body),
+                             "Content-Type": "application/json"})
+    assert r.status_code == 200, r.text
+
+
+def _admin():
+    return {"Authorization": f"Bearer {issue_jwt('u-a', 'a@ex.com', 'relay_admin', None)}"}
+
+
+async def _insert_raw(home_id, ts, payload):
+    async with dbmod.get_db() as conn:
+        await conn.execute("INSERT INTO telemetry_raw (home_id, ts, payload) VALUES (?,?,?)",
+                           (home_id, ts, json.dumps(payload)))
+        await conn.commit()
+
+
+async def test_ingest_upserts_and_fleet_verdicts_match_raw_evaluation(client):
+    _post(client, "home-a", _HEALTHY)
+    _post(client, "home-a", _LOST)
+    _post(client, "home-b", _HEALTHY)
+
+    async with dbmod.get_db() as conn:
+        rows = await conn.execute_fetchall("SELECT home_id, raw_id FROM home_latest")
+        newest = await conn.execute_fetchall(
+            "SELECT MAX(id) FROM telemetry_raw WHERE home_id='home-a'")
+    assert {r["home_id"]: r["raw_id"] for r in rows}["home-a"] == newest[0][0]
+
+    body = client.get("/api/admin/fleet/health", headers=_admin()).json()
+    by_id = {v["home_id"]: v for v in body["homes"]}
+    now = body["generated_at"]
+    for hid, payload in (("home-a", _LOST), ("home-b", _HEALTHY), ("home-c", None)):
+        home = {"id": hid, "name": hid.upper(), "status": "active"}
+        expected = fleet_health.evaluate(home, payload, by_id[hid]["last_seen"], now=now)
+        got = {k: by_id[hid][k] for k in expected}
+        assert got == expected
+        assert by_id[hid]["vitals"] == fleet_health.vitals(payload)
+    assert by_id["home-a"]["actionable"] == ["reconcile"]
+    assert by_id["home-c"]["level"] == fleet_health.LEVEL_UNKNOWN
+
+
+async def test_remediator_reads_the_same_model(client):
+    _post(client, "home-a", _LOST)
+    verdicts = await remediator._load_fleet(time.time())
+    assert {v["home_id"]: v["level"] for v in verdicts}["home-a"] == fleet_health.LEVEL_DEGRADED
+    assert all("_home" in v for v in verdicts)
+
+
+async def test_backfill_seeds_homes_that_reported_before_the_table(db):
+    old = (datetime.now(timezone.utc) - timedelta(hours=2)).isoformat()
+    new = (datetime.now(timezone.utc) - timedelta(minutes=1)).isoformat()
+    await _insert_raw("home-a", old, _HEALTHY)
+    await _insert_raw("home-a", new, _LOST)
+    await dbmod.init_db()
+    async with dbmod.get_db() as conn:
+        latest = await home_latest.load(conn)
+    assert latest["home-a"]["ts"] == new
+    assert [i["code"] for i in latest["home-a"]["issues"]] == ["devices_mass_lost"]
+
+
+async def test_silent_hub_stays_silent_after_raw_retention(client):
+    _post(client, "home-a", _HEALTHY)
+    async with dbmod.get_db() as conn:
+        await conn.execute("DELETE FROM telemetry_raw")
+        await conn.commit()
+    verdicts = await remediator._load_fleet(time.time() + 40 * 86400)
+    v = next(v for v in verdicts if v["home_id"] == "home-a")
+    assert v["level"] == fleet_health.LEVEL_DOWN
+    assert v["issues"][0]["code"] == "hub_silent"
+
+
+async def test_rows_from_older_rules_are_reevaluated(client, monkeypatch):
+    _post(client, "home-a", _LOST)
+    monkeypatch.setattr(home_latest, "RULES_FINGERPRINT", "next-deploy")
+    monkeypatch.setattr(fleet_health, "_REMEDY", {})
+    async with dbmod.get_db() as conn:
+        latest = await home_latest.load(conn)
+        rules = await conn.execute_fetchall("SELECT rules FROM home_latest")
+    assert latest["home-a"]["issues"][0]["remedy"] is None
+    assert [r["rules"] for r in rules] == ["next-deploy"]
+
+
+async def test_deleting_a_home_drops_its_row(client):
+    _post(client, "home-a", _HEALTHY)
+    r = client.delete("/api/admin/fleet/homes/home-a?force=true", headers=_admin())
+    assert r.status_code == 200, r.text
+    assert r.json()["deleted"]["children"]["home_latest"] == 1
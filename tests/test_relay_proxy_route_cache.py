@@ -0,0 +1,142 @@
+"""relay/app/home_routes — cached proxy authorization and its invalidation.
+
+A repeat request for the same (home, user) must not read the homes row, and
+every endpoint that rewrites routing or gating columns must make the very
+next request see the change.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+import json
+
+import pytest
+
+_has_jwt = importlib.util.find_spec("jwt") is not None
+pytestmark = pytest.mark.skipif(
+    not _has_jwt,
+    reason="PyJWT not installed in this venv — see relay/requirements.txt",
+)
+
+if _has_jwt:
+    from fastapi import FastAPI, HTTPException
+    from fastapi.testclient import TestClient
+
+    from relay.app import database as dbmod
+    from relay.app import home_routes
+    from relay.app.audit import sign as sign_hmac
+    from relay.app.auth import issue_jwt
+    from relay.app.billing import webhooks
+    from relay.app.routers.fleet import router as fleet_router
+    from relay.app.routers.homes import router as homes_router
+    from relay.app.routers.proxy import _authorize_home
+
+
+HOME_ID = "home-rc"
+SECRET = "test-secret-32-bytes-aaaaaaaaaa"
+OWNER = {"sub": "u-owner", "email": "o@ex.com", "role": "user", "home_id": HOME_ID}
+
+
+@pytest.fixture
+async def db(tmp_path, monkeypatch):
+    monkeypatch.setattr(dbmod, "DATABASE_URL", str(tmp_path / "relay.db"))
+    monkeypatch.setattr(home_routes, "_stats", dict.fromkeys(home_routes._stats, 0))
+    await dbmod.init_db()
+    async with dbmod.get_db() as conn:
+        await conn.execute(
+            "INSERT INTO homes (id, name, type, status, relay_secret, tunnel_url, "
+            "public_hostname, created_at) VALUES (?,?,?,?,?,?,?,?)",
+            (HOME_ID, "RC", "hub", "active", SECRET, "https://t.cfargotunnel.com",
+             "https://rc.hubs.example", "2026-01-01"),
+        )
+        await conn.commit()
+    return dbmod
+
+
+@pytest.fixture
+def client(db):
+    app = FastAPI()
+    app.include_router(fleet_router, prefix="/api")
+    app.include_router(homes_router, prefix="/api")
+    return TestClient(app)
+
+
+def _admin():
+    return {"Authorization": f"Bearer {issue_jwt('u-a', 'a@ex.com', 'relay_admin', None)}"}
+
+
+async def _raw_update(sql: str, *args) -> None:
+    async with dbmod.get_db() as conn:
+        await conn.execute(sql, args)
+        await conn.commit()
+
+
+async def test_repeat_requests_are_served_without_the_db(db):
+    first = await _authorize_home(OWNER, HOME_ID)
+    # Changed behind the cache's back: a hit must not notice.
+    await _raw_update("UPDATE homes SET relay_secret='other' WHERE id=?", HOME_ID)
+    second = await _authorize_home(OWNER, HOME_ID)
+    assert second["relay_secret"] == first["relay_secret"] == SECRET
+    assert (home_routes.stats()["misses"], home_routes.stats()["hits"]) == (1, 1)
+
+    # A different user of the same home is its own entry.
+    admin = {"sub": "u-a", "role": "relay_admin"}
+    assert (await _authorize_home(admin, HOME_ID))["relay_secret"] == "other"
+
+
+async def test_ownership_is_checked_before_the_cache(db):
+    await _authorize_home(OWNER, HOME_ID)
+    intruder = {**OWNER, "home_id": "home-other"}
+    with pytest.raises(HTTPException) as ei:
+        await _authorize_home(intruder, HOME_ID)
+    assert ei.value.status_code == 403
+
+
+async def test_hostname_change_is_seen_by_the_next_request(client):
+    await _authorize_home(OWNER, HOME_ID)
+    r = client.put(f"/api/admin/fleet/homes/{HOME_ID}/hostname",
+                   json={"public_hostname": "new.hubs.example"}, headers=_admin())
+    assert r.status_code == 200, r.text
+    assert (await _authorize_home(OWNER, HOME_ID))["hub_base"] == "https://new.hubs.example"
+
+
+async def test_rotated_secret_is_seen_by_the_next_request(client):
+    await _authorize_home(OWNER, HOME_ID)
+    body = json.dumps({"home_id": HOME_ID}).encode()
+    r = client.post("/api/homes/rotate-hub-secret", content=body,
+                    headers={"X-Ziggy-Signature": sign_hmac(SECRET, body)})
+    assert r.status_code == 200, r.text
+    assert (await _authorize_home(OWNER, HOME_ID))["relay_secret"] == r.json()["relay_secret"]
+
+
+async def test_subscription_webhook_revokes_and_denial_is_cached(db):
+    await _authorize_home(OWNER, HOME_ID)
+    await webhooks._set_state(HOME_ID, "cancelled")
+    for _ in range(2):
+        with pytest.raises(HTTPException) as ei:
+            await _authorize_home(OWNER, HOME_ID)
+        assert ei.value.status_code == 403
+    assert home_routes.stats()["hits"] == 1
+
+    await webhooks._set_state(HOME_ID, "active")
+    assert (await _authorize_home(OWNER, HOME_ID))["hub_base"]
+
+
+async def test_deleted_home_is_not_found_and_stats_are_on_fleet_health(client):
+    await _authorize_home(OWNER, HOME_ID)
+    r = client.delete(f"/api/admin/fleet/homes/{HOME_ID}", headers=_admin())
+    assert r.status_code == 200, r.text
+    with pytest.raises(HTTPException) as ei:
+        await _authorize_home(OWNER, HOME_ID)
+    assert ei.value.status_code == 404
+
+    stats = client.get("/api/admin/fleet/health", headers=_admin()).json()["relay"]
+    assert stats["proxy_routes"]["invalidations"] >= 1
+    assert stats["proxy_routes"]["misses"] == 2
+
+
+async def test_lookup_that_straddles_an_invalidation_is_not_stored(db):
+    gen = home_routes.generation()
+    home_routes.invalidate(HOME_ID)
+    home_routes.store(HOME_ID, OWNER, {"hub_base": "stale"}, gen)
+    assert home_routes.lookup(HOME_ID, OWNER) is None
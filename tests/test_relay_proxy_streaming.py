@@ -0,0 +1,139 @@
+"""Streaming bodies through the relay HTTP proxy (relay/app/routers/proxy.py).
+
+The hub is an httpx.MockTransport behind the shared _proxy_client, so the
+tests see exactly what the relay sends upstream and can hand back a body
+that arrives in pieces.
+"""
+
+from __future__ import annotations
+
+import importlib.util
+
+import pytest
+
+_has_jwt = importlib.util.find_spec("jwt") is not None
+pytestmark = pytest.mark.skipif(
+    not _has_jwt,
+    reason="PyJWT not installed in this venv — see relay/requirements.txt",
+)
+
+if _has_jwt:
+    import httpx
+    from fastapi import FastAPI
+    from fastapi.testclient import TestClient
+
+    from relay.app import database as dbmod
+    from relay.app.auth import issue_jwt
+    from relay.app.routers import proxy as proxymod
+
+
+HOME_ID = "home-stream"
+
+
+class _Chunks(httpx.AsyncByteStream):
+    def __init__(self, chunks):
+        self.chunks = chunks
+        self.closed = False
+
+    async def __aiter__(self):
+        for c in self.chunks:
+            yield c
+
+    async def aclose(self):
+        self.closed = True
+
+
+@pytest.fixture
+async def hub(tmp_path, monkeypatch):
+    monkeypatch.setattr(dbmod, "DATABASE_URL", str(tmp_path / "relay.db"))
+    await dbmod.init_db()
+    async with dbmod.get_db() as conn:
+        await conn.execute(
+            "INSERT INTO homes (id, name, type, status, relay_secret, public_hostname, "
+            "created_at) VALUES (?,?,?,?,?,?,?)",
+            (HOME_ID, "S", "hub", "active", "sekret", "https://hub.test", "2026-01-01"),
+        )
+        await conn.commit()
+
+    state = {"requests": [], "response": lambda req: httpx.Response(200, content=b"ok")}
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        body = b"".join([c async for c in request.stream])
+        state["requests"].append((request, body))
+        return state["response"](request)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    monkeypatch.setattr(proxymod, "_proxy_client", client)
+    yield state
+    await client.aclose()
+
+
+@pytest.fixture
+def client(hub):
+    app = FastAPI()
+    app.include_router(proxymod.router, prefix="/api")
+    return TestClient(app)
+
+
+def _auth():
+    return {"Authorization": f"Bearer {issue_jwt('u-o', 'o@ex.com', 'user', HOME_ID)}"}
+
+
+async def test_upload_is_forwarded_with_its_length_and_relay_context(client, hub):
+    body = b"x" * 300_000
+    r = client.post(f"/api/proxy/{HOME_ID}/api/backup/upload?a=1", content=body,
+                    headers={**_auth(), "X-Relay-Secret": "spoof"})
+    assert r.status_code == 200
+    req, received = hub["requests"][0]
+    assert received == body
+    assert str(req.url) == "https://hub.test/api/backup/upload?a=1"
+    assert req.headers["content-length"] == str(len(body))
+    assert "transfer-encoding" not in req.headers
+    assert req.headers["x-relay-secret"] == "sekret"
+    assert req.headers["x-relay-home"] == HOME_ID
+
+
+async def test_chunked_upload_stays_chunked(client, hub):
+    r = client.put(f"/api/proxy/{HOME_ID}/api/x", content=iter([b"ab", b"cd"]),
+                   headers=_auth())
+    assert r.status_code == 200
+    req, received = hub["requests"][0]
+    assert received == b"abcd"
+    assert req.headers.get("transfer-encoding") == "chunked"
+
+
+async def test_response_is_streamed_back_and_upstream_closed(client, hub):
+    stream = _Chunks([b"a" * 65536] * 20)
+    hub["response"] = lambda req: httpx.Response(
+        206, stream=stream,
+        headers={"Content-Type": "image/jpeg", "Content-Length": str(65536 * 20),
+                 "Connection": "keep-alive", "X-Hub": "1"})
+    r = client.get(f"/api/proxy/{HOME_ID}/api/camera/snapshot", headers=_auth())
+    assert r.status_code == 206
+    assert len(r.content) == 65536 * 20
+    assert r.headers["content-type"] == "image/jpeg"
+    assert r.headers["x-hub"] == "1"
+    assert "connection" not in r.headers
+    assert stream.closed
+
+
+async def test_declared_oversize_upload_is_refused_before_the_hub(client, hub, monkeypatch):
+    monkeypatch.setattr(proxymod, "MAX_PROXY_BODY_BYTES", 1000)
+    r = client.post(f"/api/proxy/{HOME_ID}/api/x", content=b"y" * 1001, headers=_auth())
+    assert r.status_code == 413
+    assert hub["requests"] == []
+
+
+async def test_chunked_oversize_upload_is_cut_off_midstream(client, hub, monkeypatch):
+    monkeypatch.setattr(proxymod, "MAX_PROXY_BODY_BYTES", 1000)
+    r = client.post(f"/api/proxy/{HOME_ID}/api/x",
+                    content=iter([b"y" * 600, b"y" * 600]), headers=_auth())
+    assert r.status_code == 413
+
+
+async def test_unreachable_hub_still_maps_to_503(client, hub):
+    def refuse(req):
+        raise httpx.ConnectError("refused", request=req)
+    hub["response"] = refuse
+    r = client.get(f"/api/proxy/{HOME_ID}/api/health", headers=_auth())
+    assert r.status_code == 503
@@ -13,8 +13,12 @@ Coverage:
                        forbidden (403), respects limit
   GET  /api/admin/homes/{home_id}/telemetry/days
                        reads aggregated rows
+  GET  /api/admin/homes/{home_id}/telemetry/hours
+                       hourly avg/min/max for one day
   retention            aggregates yesterday's raw, leaves today raw,
-                       prunes 30d-stale raw, prunes 365d-stale daily
+                       prunes 30d-stale raw, prunes 365d-stale daily,
+                       folds each raw row once (late rows merge in),
+                       daily from hourly equals a direct raw average
 """
 
 from __future__ import annotations
@@ -42,6 +46,7 @@ if _has_jwt:
     from relay.app.telemetry_retention import (
         RAW_RETENTION_DAYS,
         DAILY_RETENTION_DAYS,
+        fold_new_raw,
         run_retention_pass,
     )
 
@@ -291,14 +296,88 @@ async def test_retention_idempotent(db):
 
     r1 = await run_retention_pass(now=now)
     r2 = await run_retention_pass(now=now)
-    # First pass aggregates 1 day; second has the same raw row so it
-    # aggregates again (rewriting the same daily row). Both passes
-    # must succeed without raising and yield consistent counts.
-    assert r1["aggregated_days"] == 1
-    assert r2["aggregated_days"] == 1
+    # First pass folds the row and publishes 1 day; the second finds
+    # nothing past the high-water mark, so it neither re-reads the raw
+    # row nor rewrites the daily one — and nothing is double-counted.
+    assert (r1["folded_raw"], r1["aggregated_days"]) == (1, 1)
+    assert (r2["folded_raw"], r2["aggregated_days"]) == (0, 0)
     async with dbmod.get_db() as conn:
         rows = await conn.execute_fetchall(
             "SELECT sample_count FROM telemetry_daily WHERE home_id=? AND day=?",
             (HOME_ID, yesterday))
     assert len(rows) == 1
     assert rows[0]["sample_count"] == 1
+
+
+async def test_late_rows_fold_into_published_day(db):
+    now = datetime(2026, 5, 27, 12, 0, 0, tzinfo=timezone.utc)
+    yesterday = (now - timedelta(days=1)).date().isoformat()
+    await _insert_raw(HOME_ID, f"{yesterday}T01:00:00+00:00",
+                      {"ha_version": "a", "cpu_pct": 10.0})
+    await run_retention_pass(now=now)
+    # A post for yesterday that arrives after the day was published —
+    # clock skew, or a hub flushing a backlog.
+    await _insert_raw(HOME_ID, f"{yesterday}T23:30:00+00:00",
+                      {"ha_version": "b", "cpu_pct": 30.0})
+    r = await run_retention_pass(now=now)
+    assert (r["folded_raw"], r["aggregated_days"]) == (1, 1)
+
+    async with dbmod.get_db() as conn:
+        rows = await conn.execute_fetchall(
+            "SELECT sample_count, cpu_pct_avg, ha_version, last_seen_ts "
+            "FROM telemetry_daily WHERE home_id=?", (HOME_ID,))
+    assert dict(rows[0]) == {"sample_count": 2, "cpu_pct_avg": 20.0, "ha_version": "b",
+                             "last_seen_ts": f"{yesterday}T23:30:00+00:00"}
+
+
+async def test_hourly_rollup_matches_direct_average(db):
+    import random
+    rng = random.Random(7)
+    now = datetime(2026, 5, 27, 12, 0, 0, tzinfo=timezone.utc)
+    samples = []
+    for _ in range(200):
+        ts = now - timedelta(days=2) + timedelta(minutes=rng.randrange(0, 2 * 24 * 60))
+        p = {"cpu_pct": rng.uniform(0, 100), "uptime_s": rng.randint(0, 10**6),
+             "sensors": [{}] * rng.randint(0, 9)}
+        if rng.random() < 0.3:
+            p.pop("cpu_pct")
+        samples.append((ts.isoformat(), p))
+    # Insert in shuffled order, folding part-way: merge must not care.
+    for i, (ts, p) in enumerate(samples):
+        await _insert_raw(HOME_ID, ts, p)
+        if i == 77:
+            async with dbmod.get_db() as conn:
+                await fold_new_raw(conn, batch=13)
+    await run_retention_pass(now=now)
+
+    async with dbmod.get_db() as conn:
+        daily = {r["day"]: dict(r) for r in await conn.execute_fetchall(
+            "SELECT * FROM telemetry_daily WHERE home_id=?", (HOME_ID,))}
+    for day, row in daily.items():
+        todays = [p for ts, p in samples if ts[:10] == day]
+        cpus = [p["cpu_pct"] for p in todays if "cpu_pct" in p]
+        assert row["sample_count"] == len(todays)
+        assert abs(row["cpu_pct_avg"] - sum(cpus) / len(cpus)) < 1e-9
+        assert row["uptime_avg_s"] == int(sum(p["uptime_s"] for p in todays) / len(todays))
+        assert row["sensor_count_avg"] == int(round(
+            sum(len(p["sensors"]) for p in todays) / len(todays)))
+    assert set(daily) == {s[0][:10] for s in samples if s[0][:10] < now.date().isoformat()}
+
+
+async def test_admin_read_hours(client):
+    day = "2026-05-26"
+    for hh, cpu in (("01", 10.0), ("01", 30.0), ("05", 50.0)):
+        await _insert_raw(HOME_ID, f"{day}T{hh}:15:00+00:00", {"cpu_pct": cpu})
+    async with dbmod.get_db() as conn:
+        assert await fold_new_raw(conn) == 3
+    resp = client.get(f"/api/admin/homes/{HOME_ID}/telemetry/hours?day={day}",
+                      headers=_home_user_headers())
+    assert resp.status_code == 200, resp.text
+    hours = resp.json()["hours"]
+    assert [h["hour"] for h in hours] == [f"{day}T01", f"{day}T05"]
+    assert hours[0]["cpu_pct"] == {"avg": 20.0, "min": 10.0, "max": 30.0}
+    assert hours[0]["sample_count"] == 2 and hours[0]["mem_pct"]["avg"] is None
+
+    bad = client.get(f"/api/admin/homes/{HOME_ID}/telemetry/hours?day=yesterday",
+                     headers=_admin_headers())
+    assert bad.status_code == 400
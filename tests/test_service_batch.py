@@ -0,0 +1,260 @@
+"""
+Batched service calls (services.service_batch).
+
+Calls are merged into multi-entity groups, sent as call_service commands on
+ha_subscriber's socket with bounded parallelism, and reported per entity with
+ledger / manual-override bookkeeping intact; REST covers a missing socket.
+"""
+import asyncio
+import json
+import time
+
+import pytest
+
+from services import command_ledger, ha_client, ha_subscriber, manual_overrides
+from services import service_batch as sb
+from services.service_batch import ServiceCall
+
+HA_RTT_S = 0.2
+
+
+class _FakeSocket:
+    """Answers each command after HA_RTT_S, like the subscriber's main loop."""
+
+    def __init__(self, fail: tuple[str, ...] = ()):
+        self.sent: list[dict] = []
+        self.fail = fail
+
+    async def send(self, raw: str):
+        msg = json.loads(raw)
+        self.sent.append(msg)
+        ok = msg.get("domain") not in self.fail
+        reply = {"id": msg["id"], "type": "result", "success": ok,
+                 "result": {"context": {"id": "c"}} if ok else None}
+        if not ok:
+            reply["error"] = {"code": "not_found", "message": "Service not found."}
+        asyncio.get_running_loop().call_later(HA_RTT_S, self._resolve, msg["id"], reply)
+
+    @staticmethod
+    def _resolve(cmd_id, reply):
+        fut = ha_subscriber._pending_cmds.get(cmd_id)
+        if fut is not None and not fut.done():
+            fut.set_result(reply)
+
+
+@pytest.fixture(autouse=True)
+def clean(monkeypatch):
+    monkeypatch.setattr(sb, "_stats", dict.fromkeys(sb._stats, 0))
+    monkeypatch.setattr(ha_subscriber, "_ws", None)
+    monkeypatch.setattr(ha_subscriber, "_ws_loop", None)
+    monkeypatch.setattr(ha_subscriber, "_pending_cmds", {})
+    command_ledger._last.clear()
+    manual_overrides._recent_ziggy_calls.clear()
+
+
+def _on_socket(sock, coro_fn):
+    async def run():
+        ha_subscriber._ws = sock
+        ha_subscriber._ws_loop = asyncio.get_running_loop()
+        return await coro_fn()
+    return asyncio.run(run())
+
+
+def test_merge_groups_by_domain_service_and_data():
+    groups = sb.merge([
+        ServiceCall("light", "turn_on", "light.a", {"brightness_pct": 40, "transition": 2}),
+        ServiceCall("light", "turn_off", "light.b"),
+        ServiceCall("light", "turn_on", "light.c", {"transition": 2, "brightness_pct": 40}),
+        ServiceCall("light", "turn_on", "light.a", {"brightness_pct": 40, "transition": 2}),
+        ServiceCall("light", "turn_on", "light.d", {"brightness_pct": 80}),
+    ])
+    assert [(d, s, ids) for d, s, _, ids in groups] == [
+        ("light", "turn_on", ["light.a", "light.c"]),
+        ("light", "turn_off", ["light.b"]),
+        ("light", "turn_on", ["light.d"]),
+    ]
+
+
+def test_good_night_across_40_devices_is_one_round_trip():
+    calls = ([ServiceCall("light", "turn_off", f"light.l{i}") for i in range(30)]
+             + [ServiceCall("media_player", "turn_off", f"media_player.m{i}") for i in range(6)]
+             + [ServiceCall("switch", "turn_off", f"switch.s{i}") for i in range(4)])
+    sock = _FakeSocket()
+    t0 = time.perf_counter()
+    out = _on_socket(sock, lambda: sb.execute_async(calls))
+    elapsed = time.perf_counter() - t0
+
+    assert out["ok"] and out["groups"] == 3 and len(out["results"]) == 40
+    assert len(sock.sent) == 3
+    assert sock.sent[0]["type"] == "call_service"
+    assert sock.sent[0]["target"]["entity_id"] == [f"light.l{i}" for i in range(30)]
+    assert elapsed < 2 * HA_RTT_S
+    assert command_ledger.get_last("light.l7")["state"] == "off"
+    assert "media_player.m3" in manual_overrides._recent_ziggy_calls
+    assert sb.stats()["ws_calls"] == 3 and sb.stats()["rest_calls"] == 0
+
+
+def test_failed_group_fails_only_its_entities():
+    calls = [ServiceCall("light", "turn_on", "light.a"),
+             ServiceCall("cover", "open_cover", "cover.blind")]
+    out = _on_socket(_FakeSocket(fail=("cover",)), lambda: sb.execute_async(calls))
+    assert not out["ok"]
+    assert out["results"]["light.a"]["ok"] is True
+    assert out["results"]["cover.blind"] == {
+        "ok": False, "message": "HA cover.open_cover error not_found: Service not found."}
+    assert command_ledger.get_last("cover.blind") is None
+
+
+def test_rest_fallback_when_the_socket_is_down_or_drops(monkeypatch):
+    posted = []
+
+    async def fake_rest(domain, service, data, origin="ziggy", timeout=10.0):
+        posted.append((domain, service, data["entity_id"]))
+        return {"ok": True, "message": "service call ok"}
+
+    monkeypatch.setattr(ha_client, "call_service_async", fake_rest)
+    calls = [ServiceCall("light", "turn_off", "light.a"), ServiceCall("light", "turn_off", "light.b")]
+    assert asyncio.run(sb.execute_async(calls))["ok"]
+    assert posted == [("light", "turn_off", ["light.a", "light.b"])]
+
+    class _Dropping(_FakeSocket):
+        async def send(self, raw):
+            ha_subscriber._drop_command_channel()
+            raise ConnectionError("closed")
+
+    posted.clear()
+    out = _on_socket(_Dropping(), lambda: sb.execute_async(calls))
+    assert out["ok"] and posted == [("light", "turn_off", ["light.a", "light.b"])]
+    assert ha_subscriber._ws is None
+
+
+def test_consecutive_on_off_steps_batch_until_a_different_step(monkeypatch):
+    from services import local_automation_actions as laa
+    batches = []
+
+    async def fake_execute(calls, **kw):
+        batches.append([(c.service, c.entity_id) for c in calls])
+        return {"ok": True, "results": {c.entity_id: {"ok": True, "message": "ok"} for c in calls}}
+
+    monkeypatch.setattr(sb, "execute_async", fake_execute)
+    monkeypatch.setattr(manual_overrides, "is_overridden", lambda eid: eid == "light.c")
+    steps = [
+        {"type": "call_service", "entity_id": "light.a", "service": "light.turn_off"},
+        {"type": "device", "entity_id": "switch.b", "action": "turn_on"},
+        {"type": "call_service", "entity_id": "light.c", "service": "light.turn_off"},
+        {"type": "call_service", "entity_id": "light.d", "service": "light.turn_off"},
+    ]
+    out = asyncio.run(laa._batch_service_run(steps, 0))
+    assert batches == [[("turn_off", "light.a"), ("turn_on", "switch.b")]]
+    assert sorted(out) == [0, 1]
+    assert asyncio.run(laa._batch_service_run(steps, 3)) == {}
+    steps[1] = {"type": "delay", "seconds": 1}
+    assert asyncio.run(laa._batch_service_run(steps, 0)) == {}
+
+
+def test_batch_from_inside_event_dispatch_goes_over_rest(monkeypatch):
+    # A state hook (automation_fired → execute_ziggy_actions) runs inside the
+    # reader's dispatch; a socket command there could never be answered.
+    posted = []
+
+    async def fake_rest(domain, service, data, origin="ziggy", timeout=10.0):
+        posted.append((domain, service, data["entity_id"]))
+        return {"ok": True, "message": "service call ok"}
+
+    calls = [ServiceCall("light", "turn_off", "light.a"), ServiceCall("switch", "turn_on", "switch.b")]
+    seen = {}
+
+    async def hook(msg):
+        seen["async"] = await sb.execute_async(calls, timeout=1.0)
+        seen["sync"] = await asyncio.to_thread(sb.execute, calls[:1], timeout=1.0)
+
+    monkeypatch.setattr(ha_client, "call_service_async", fake_rest)
+    monkeypatch.setattr(ha_subscriber, "_process_event", hook)
+    from services import home_automation
+    monkeypatch.setattr(home_automation, "call_service",
+                        lambda d, s, data, origin="ziggy": posted.append((d, s, data["entity_id"]))
+                        or {"ok": True, "message": "service call ok"})
+    sock = _FakeSocket()
+    t0 = time.perf_counter()
+    _on_socket(sock, lambda: ha_subscriber._dispatch({"type": "event", "id": 1, "event": {}}))
+    assert time.perf_counter() - t0 < 1.0
+    assert sock.sent == []
+    assert seen["async"]["ok"] and seen["sync"]["ok"]
+    assert sorted(posted) == [("light", "turn_off", ["light.a"]), ("light", "turn_off", ["light.a"]),
+                              ("switch", "turn_on", ["switch.b"])]
+
+
+def test_sync_execute_falls_back_to_rest_when_the_loop_is_wedged(monkeypatch):
+    from services import home_automation
+    posted = []
+    monkeypatch.setattr(home_automation, "call_service",
+                        lambda d, s, data, origin="ziggy": posted.append(data["entity_id"])
+                        or {"ok": True, "message": "service call ok"})
+
+    async def run():
+        ha_subscriber._ws = _FakeSocket()
+        ha_subscriber._ws_loop = asyncio.get_running_loop()
+        done = asyncio.get_running_loop().run_in_executor(
+            None, lambda: sb.execute([ServiceCall("light", "turn_off", "light.a")], timeout=0.1))
+        time.sleep(0.5)   # the loop is blocked: the batch can't even start
+        return await done
+
+    out = asyncio.run(run())
+    assert out["ok"] and posted == [["light.a"]]
+    assert sb.stats()["loop_timeouts"] == 1
+
+
+def test_sync_timeout_never_resends_a_group_already_on_the_socket(monkeypatch):
+    from services import home_automation
+    posted = []
+    monkeypatch.setattr(home_automation, "call_service",
+                        lambda d, s, data, origin="ziggy": posted.append(data["entity_id"])
+                        or {"ok": True, "message": "service call ok"})
+
+    class _Stuck(_FakeSocket):
+        async def send(self, raw):
+            self.sent.append(json.loads(raw))
+            await asyncio.Event().wait()   # written, never acknowledged
+
+    sock = _Stuck()
+
+    async def run():
+        ha_subscriber._ws = sock
+        ha_subscriber._ws_loop = asyncio.get_running_loop()
+        return await asyncio.to_thread(
+            sb.execute, [ServiceCall("script", "turn_on", "script.door_chime"),
+                         ServiceCall("light", "toggle", "light.hall")],
+            parallelism=1, timeout=0.1)
+
+    out = asyncio.run(run())
+    assert [m["domain"] for m in sock.sent] == ["script"]
+    assert posted == [["light.hall"]]
+    assert out["results"]["script.door_chime"]["ok"] is False
+    assert "did not respond" in out["results"]["script.door_chime"]["message"]
+    assert out["results"]["light.hall"]["ok"] is True
+
+
+def test_steps_sent_in_a_batch_are_not_regated_afterwards(monkeypatch):
+    from services import local_automation_actions as laa
+    sent = []
+
+    async def fake_execute(calls, **kw):
+        sent.extend(c.entity_id for c in calls)
+        return {"ok": True, "results": {c.entity_id: {"ok": True, "message": "ok"} for c in calls}}
+
+    monkeypatch.setattr(sb, "execute_async", fake_execute)
+    from services import automation_history
+    monkeypatch.setattr(automation_history, "record_run", lambda *a, **k: None)
+    # The user grabs light.b by hand after the batch went out: HA already ran
+    # the step, so it must not be reported as skipped.
+    monkeypatch.setattr(manual_overrides, "is_overridden", lambda eid: bool(sent) and eid == "light.b")
+    steps = [{"type": "call_service", "entity_id": "light.a", "service": "light.turn_off"},
+             {"type": "call_service", "entity_id": "light.b", "service": "light.turn_off"}]
+    results = asyncio.run(laa.execute_ziggy_actions("test_batch_gate", label="t", steps_override=steps))
+    assert sent == ["light.a", "light.b"]
+    assert [r.get("skipped") for r in results] == [None, None]
+    assert all(r["ok"] for r in results)
+
+    laa._cancel_flags["test_batch_gate"] = time.time()
+    assert asyncio.run(laa._batch_service_run(steps, 0, "test_batch_gate")) == {}
+    laa._cancel_flags.pop("test_batch_gate", None)
@@ -0,0 +1,141 @@
+"""
+state_dispatch — the compiled entity → hooks table behind
+ha_subscriber._process_event.
+
+Hooks declare interest by domain and/or entity set; everything else must
+skip them. Entity sets are snapshotted, so invalidate() must pick up a
+changed set, and per-hook counters must track calls and errors.
+"""
+from __future__ import annotations
+
+import asyncio
+
+import pytest
+
+from services import state_dispatch as sd
+
+
+@pytest.fixture(autouse=True)
+def _fresh_registry(monkeypatch):
+    monkeypatch.setattr(sd, "_hooks", {})
+    monkeypatch.setattr(sd, "_stats", {})
+    monkeypatch.setattr(sd, "_compiled", None)
+    monkeypatch.setattr(sd, "_events_total", 0)
+    monkeypatch.setattr(sd, "_events_unwatched", 0)
+
+
+def _change(entity_id: str, prev: str = "off", new: str = "on") -> sd.StateChange:
+    return sd.StateChange(
+        entity_id=entity_id, domain=entity_id.split(".", 1)[0],
+        prev_state=prev, new_state=new, old={"state": prev},
+        new={"state": new}, attributes={},
+    )
+
+
+def _recorder(calls: list, name: str):
+    def _h(ch):
+        calls.append((name, ch.entity_id))
+    return _h
+
+
+def test_domain_entity_and_wildcard_interest():
+    calls: list = []
+    sd.register("lights", _recorder(calls, "lights"), domains={"light"})
+    sd.register("door", _recorder(calls, "door"),
+                entities=lambda: {"binary_sensor.front_door"})
+    sd.register("all", _recorder(calls, "all"))
+
+    asyncio.run(sd.dispatch(_change("light.kitchen")))
+    asyncio.run(sd.dispatch(_change("binary_sensor.front_door")))
+    asyncio.run(sd.dispatch(_change("sensor.power")))
+
+    assert calls == [
+        ("lights", "light.kitchen"), ("all", "light.kitchen"),
+        ("door", "binary_sensor.front_door"), ("all", "binary_sensor.front_door"),
+        ("all", "sensor.power"),
+    ]
+
+
+def test_unwatched_entity_skips_every_hook():
+    calls: list = []
+    sd.register("lights", _recorder(calls, "lights"), domains={"light"})
+    asyncio.run(sd.dispatch(_change("sensor.plug_power", "10", "11")))
+    assert calls == []
+    assert sd.stats()["events_unwatched"] == 1
+    assert sd.handlers_for("sensor.plug_power") == ()
+
+
+def test_changed_only_skips_attribute_only_updates():
+    calls: list = []
+    sd.register("edge", _recorder(calls, "edge"), domains={"sensor"}, changed_only=True)
+    asyncio.run(sd.dispatch(_change("sensor.temp", "21", "21")))
+    asyncio.run(sd.dispatch(_change("sensor.temp", "21", "22")))
+    assert calls == [("edge", "sensor.temp")]
+
+
+def test_invalidate_picks_up_new_entity_set():
+    calls: list = []
+    watched = {"light.a"}
+    sd.register("sched", _recorder(calls, "sched"), entities=lambda: set(watched))
+    asyncio.run(sd.dispatch(_change("light.b")))
+    watched.add("light.b")
+    asyncio.run(sd.dispatch(_change("light.b")))
+    assert calls == []            # compiled table is a snapshot
+    sd.invalidate()
+    asyncio.run(sd.dispatch(_change("light.b")))
+    assert calls == [("sched", "light.b")]
+
+
+def test_async_handler_awaited_and_errors_counted():
+    seen: list = []
+
+    async def ok(ch):
+        seen.append(ch.entity_id)
+
+    def boom(ch):
+        raise RuntimeError("nope")
+
+    sd.register("ok", ok)
+    sd.register("boom", boom)
+    asyncio.run(sd.dispatch(_change("switch.x")))
+    asyncio.run(sd.dispatch(_change("switch.x")))
+
+    assert seen == ["switch.x", "switch.x"]
+    hooks = {h["name"]: h for h in sd.stats()["hooks"]}
+    assert hooks["ok"]["calls"] == 2 and hooks["ok"]["errors"] == 0
+    assert hooks["boom"]["errors"] == 2
+    assert "nope" in hooks["boom"]["last_error"]
+
+
+def test_reregister_keeps_order():
+    calls: list = []
+    sd.register("first", _recorder(calls, "first"))
+    sd.register("second", _recorder(calls, "second"))
+    sd.register("first", _recorder(calls, "first-v2"))
+    asyncio.run(sd.dispatch(_change("light.x")))
+    assert [c[0] for c in calls] == ["first-v2", "second"]
+
+
+def test_ha_subscriber_installs_builtin_hooks(monkeypatch):
+    from services import ha_subscriber
+    monkeypatch.setattr(ha_subscriber, "_hooks_installed", False)
+    ha_subscriber._install_state_hooks()
+    assert sd.registered() == [
+        "manual_overrides", "circadian", "smart_climate", "room_presence",
+        "automation_fired", "command_router", "restore", "anomaly", "self_heal",
+    ]
+    names = [h.name for h in sd.handlers_for("sensor.washer_power")]
+    assert names == ["anomaly"]
+
+
+def test_command_router_hook_watches_only_hybrid_devices(monkeypatch):
+    from services import device_registry, ha_subscriber
+    monkeypatch.setattr(ha_subscriber, "_hooks_installed", False)
+    monkeypatch.setattr(device_registry, "_registry", [
+        {"entity_id": "climate.bedroom_ac", "ir_device_id": "ac1"},
+        {"entity_id": "switch.heater", "ir_device_id": None},
+        {"entity_id": None, "ir_device_id": "tv1"},
+    ])
+    ha_subscriber._install_state_hooks()
+    assert "command_router" in [h.name for h in sd.handlers_for("climate.bedroom_ac")]
+    assert "command_router" not in [h.name for h in sd.handlers_for("switch.heater")]
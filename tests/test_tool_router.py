@@ -0,0 +1,92 @@
+"""core.tool_router — per-utterance tool pruning, and the parser's full-list fallback."""
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from core import intent_parser, tool_router
+from core.debug_bus import VERBOSE, bus
+from core.tools_schema import TOOLS
+
+
+@pytest.fixture(autouse=True)
+def no_prior(monkeypatch):
+    monkeypatch.setattr(tool_router, "usage_prior", lambda: ())
+
+
+def _names(tools):
+    return {t["function"]["name"] for t in tools}
+
+
+def test_light_command_gets_device_tools_only():
+    tools, groups = tool_router.select_tools("turn off the kitchen light", {})
+    names = _names(tools)
+    assert {"toggle_light", "turn_off_everything", "control_device"} <= names
+    assert not names & {"comm_send_email", "create_automation", "add_event"}
+    assert len(json.dumps(tools)) < len(json.dumps(TOOLS)) / 2
+
+
+def test_hebrew_verb_and_normalized_room_route_to_devices():
+    raw = "תדליק את הדוד"
+    norm = intent_parser._normalize_hebrew_devices(intent_parser._normalize_hebrew_rooms(raw))
+    tools, _ = tool_router.select_tools(f"{raw} {norm}", {})
+    assert "control_device" in _names(tools)
+
+
+def test_configured_device_type_pulls_its_group():
+    _, groups = tool_router.select_tools("is the heatpump running", {"heatpump": ["office"]})
+    assert "devices" in groups
+
+
+def test_room_added_at_runtime_is_a_home_signal(monkeypatch):
+    from core.settings_loader import settings
+    monkeypatch.setitem(settings, "room_aliases", {})
+    assert "devices" not in tool_router.select_groups("how warm is the zorblatt", {})
+    monkeypatch.setitem(settings, "room_aliases", {"zorblatt": "zorblatt"})
+    assert "devices" in tool_router.select_groups("how warm is the zorblatt", {})
+
+
+def test_usage_prior_is_added_to_every_pruned_selection(monkeypatch):
+    monkeypatch.setattr(tool_router, "usage_prior", lambda: ("media",))
+    tools, _ = tool_router.select_tools("what's the weather", {})
+    assert {"get_weather", "media_spotify_playlist"} <= _names(tools)
+
+
+def test_no_signal_sends_the_full_list():
+    assert tool_router.select_tools("asdkfjh qwerty", {}) == (None, [])
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    sent = []
+
+    def fake_chat_completion(purpose, messages, tools=None, **kwargs):
+        sent.append(tools)
+        calls = [SimpleNamespace(function=SimpleNamespace(
+            name="get_weather", arguments="{}"))] if len(tools) == len(TOOLS) else None
+        msg = SimpleNamespace(tool_calls=calls, content=None)
+        return SimpleNamespace(choices=[SimpleNamespace(message=msg)],
+                               usage=SimpleNamespace(prompt_tokens=len(tools)))
+
+    monkeypatch.setattr(intent_parser, "chat_completion", fake_chat_completion)
+    monkeypatch.setattr(intent_parser, "require_cloud_llm_active", lambda: None)
+    return sent
+
+
+def test_no_tool_call_on_a_pruned_request_retries_with_everything(llm, monkeypatch):
+    monkeypatch.setattr(bus, "_level", VERBOSE)
+    bus.clear()
+    parsed = intent_parser.quick_parse("turn on the kitchen light")
+    assert parsed["intent"] == "get_weather"
+    assert len(llm[0]) < len(TOOLS) and llm[1] is TOOLS
+    usage = [e["data"] for e in bus.get_events(scope="intent") if e["step"] == "gpt_parse_usage"]
+    assert [(u["pruned"], u["fallback"]) for u in usage] == [(True, False), (False, True)]
+    assert usage[0]["usage"]["prompt"] == len(llm[0])
+    assert usage[0]["schema_bytes"] < usage[1]["schema_bytes"]
+    bus.clear()
+
+
+def test_follow_up_turns_keep_the_full_list(llm):
+    intent_parser.quick_parse("the kitchen light", chat_history=[
+        {"role": "assistant", "content": "Which light?"}])
+    assert llm == [TOOLS]
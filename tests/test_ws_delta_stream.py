@@ -0,0 +1,154 @@
+"""
+Opt-in delta stream on backend/ws_manager.ConnectionManager.
+
+A client that subscribes with `"delta": true` gets a snapshot, then
+coalesced `state_delta` frames carrying only attribute differences, every
+frame numbered with `seq`; `resync` resets the baselines. Clients that never
+opt in keep receiving the full state_changed firehose.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+
+import pytest
+
+from backend.ws_manager import ConnectionManager
+
+
+class FakeWS:
+    def __init__(self):
+        self.sent: list[dict] = []
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text):
+        self.sent.append(json.loads(text))
+
+    async def send_json(self, data):
+        self.sent.append(data)
+
+
+def _state(eid, state, **attrs):
+    return {"type": "state_changed", "entity_id": eid, "new_state": state, "attributes": attrs}
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    import services.ha_subscriber as sub
+    data = {
+        "light.a": {"state": "off", "attributes": {"brightness": 0, "friendly_name": "A"}},
+        "light.b": {"state": "off", "attributes": {"friendly_name": "B"}},
+    }
+    monkeypatch.setattr(sub, "state_cache", data, raising=False)
+    return data
+
+
+async def _delta_client(mgr, window_ms=10_000, **sub):
+    ws = FakeWS()
+    await mgr.connect(ws)
+    await mgr.handle_stream_message(ws, {"action": "subscribe", "delta": True,
+                                         "window_ms": window_ms, **sub})
+    return ws
+
+
+async def test_snapshot_then_coalesced_delta(cache):
+    mgr = ConnectionManager()
+    ws = await _delta_client(mgr)
+    snap = ws.sent.pop(0)
+    assert snap["type"] == "state_snapshot" and snap["seq"] == 1
+    assert set(snap["entities"]) == {"light.a", "light.b"}
+
+    for b in (10, 50, 200):
+        await mgr.broadcast(_state("light.a", "on", brightness=b, friendly_name="A"))
+    await mgr.broadcast(_state("light.b", "off", friendly_name="B"))   # no-op vs baseline
+    assert ws.sent == []
+
+    await mgr._flush(ws)
+    assert ws.sent == [{"type": "state_delta", "seq": 2, "changes": [
+        {"entity_id": "light.a", "new_state": "on", "set": {"brightness": 200}},
+    ]}]
+    stats = mgr.client_stats()[0]
+    assert stats["mode"] == "delta" and stats["coalesced"] == 2 and stats["messages"] == 2
+
+
+async def test_unset_attributes_and_unknown_entity(cache):
+    mgr = ConnectionManager()
+    ws = await _delta_client(mgr, window_ms=0)
+    ws.sent.clear()
+    await mgr.broadcast(_state("light.a", "off", friendly_name="A"))
+    await mgr.broadcast(_state("sensor.new", "3", unit="W"))
+    assert ws.sent[0]["changes"] == [{"entity_id": "light.a", "new_state": "off",
+                                      "unset": ["brightness"]}]
+    assert ws.sent[1]["changes"] == [{"entity_id": "sensor.new", "new_state": "3",
+                                      "attributes": {"unit": "W"}}]
+    assert [m["seq"] for m in ws.sent] == [2, 3]
+
+
+async def test_other_messages_flush_pending_first_and_carry_seq(cache):
+    mgr = ConnectionManager()
+    ws = await _delta_client(mgr)
+    ws.sent.clear()
+    await mgr.broadcast(_state("light.b", "on", friendly_name="B"))
+    await mgr.broadcast({"type": "entity_removed", "entity_id": "light.b"})
+    assert [m["type"] for m in ws.sent] == ["state_delta", "entity_removed"]
+    assert [m["seq"] for m in ws.sent] == [2, 3]
+
+    # Baseline dropped with the entity: it comes back as a full record.
+    await mgr.broadcast(_state("light.b", "on", friendly_name="B"))
+    await mgr._flush(ws)
+    assert "attributes" in ws.sent[-1]["changes"][0]
+
+
+async def test_window_flushes_in_background(cache):
+    mgr = ConnectionManager()
+    ws = await _delta_client(mgr, window_ms=20)
+    ws.sent.clear()
+    await mgr.broadcast(_state("light.a", "on", brightness=5, friendly_name="A"))
+    await mgr.broadcast(_state("light.a", "on", brightness=6, friendly_name="A"))
+    await asyncio.sleep(0.1)
+    assert len(ws.sent) == 1
+    assert ws.sent[0]["changes"][0]["set"] == {"brightness": 6}
+
+
+async def test_ack_and_resync(cache):
+    mgr = ConnectionManager()
+    ws = await _delta_client(mgr, window_ms=0)
+    await mgr.broadcast(_state("light.a", "on", brightness=9, friendly_name="A"))
+    await mgr.handle_stream_message(ws, {"action": "ack", "seq": 2})
+    await mgr.handle_stream_message(ws, {"action": "ack", "seq": 99})   # ahead of server: ignored
+    row = mgr.client_stats()[0]
+    assert (row["seq"], row["acked_seq"], row["unacked"]) == (2, 2, 0)
+
+    cache["light.a"] = {"state": "on", "attributes": {"brightness": 9}}
+    await mgr.handle_stream_message(ws, {"action": "resync"})
+    snap = ws.sent[-1]
+    assert snap["type"] == "state_snapshot" and snap["seq"] == 3
+    assert snap["entities"]["light.a"] == {"new_state": "on", "attributes": {"brightness": 9}}
+
+
+async def test_entity_filter_applies_to_snapshot_and_stream(cache):
+    mgr = ConnectionManager()
+    ws = await _delta_client(mgr, window_ms=0, entities=["light.b"])
+    assert set(ws.sent[0]["entities"]) == {"light.b"}
+    await mgr.broadcast(_state("light.a", "on", friendly_name="A"))
+    assert len(ws.sent) == 1
+
+
+async def test_legacy_clients_unchanged_and_counted(cache):
+    mgr = ConnectionManager()
+    legacy = FakeWS()
+    await mgr.connect(legacy)
+    delta = await _delta_client(mgr)
+    msg = _state("light.a", "on", brightness=1, friendly_name="A")
+    await mgr.broadcast(msg)
+    assert legacy.sent == [msg]
+    by_mode = {r["mode"]: r for r in mgr.client_stats()}
+    assert by_mode["full"]["messages"] == 1
+    assert by_mode["full"]["bytes"] == len(json.dumps(msg).encode())
+
+    # Subscribing again without delta drops back to full messages.
+    await mgr.handle_stream_message(delta, {"action": "subscribe"})
+    await mgr.broadcast(msg)
+    assert delta.sent[-1] == msg